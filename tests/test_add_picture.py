@@ -0,0 +1,52 @@
+import asyncio
+import zipfile
+from pathlib import Path
+
+import pytest
+from docx import Document
+
+from word_document_server.tools.content_tools import add_picture
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def test_add_picture_downscales_to_display_size_and_reuses_media(tmp_path: Path):
+    photo = tmp_path / "photo.jpg"
+    Image.new("RGB", (3000, 2000), (40, 120, 200)).save(photo, quality=95, dpi=(300, 300))
+    document = tmp_path / "report.docx"
+    Document().save(document)
+
+    message = asyncio.run(add_picture(str(document), str(photo), width=2))
+    assert "3000x2000 -> 440x293 px" in message
+    assert "reused" in asyncio.run(add_picture(str(document), str(photo), width=2))
+
+    doc = Document(str(document))
+    assert [round(shape.width.inches, 2) for shape in doc.inline_shapes] == [2.0, 2.0]
+    with zipfile.ZipFile(document) as zf:
+        media = [name for name in zf.namelist() if name.startswith("word/media/")]
+        assert len(media) == 1
+        with Image.open(zf.open(media[0])) as embedded:
+            assert embedded.size == (440, 293)
+
+
+def test_add_picture_without_width_fits_text_width(tmp_path: Path):
+    wide = tmp_path / "wide.png"
+    Image.new("RGB", (4000, 500), (255, 255, 255)).save(wide, dpi=(72, 72))
+    document = tmp_path / "report.docx"
+    Document().save(document)
+
+    asyncio.run(add_picture(str(document), str(wide)))
+    doc = Document(str(document))
+    section = doc.sections[-1]
+    assert doc.inline_shapes[0].width == section.page_width - section.left_margin - section.right_margin
+
+
+def test_add_picture_coerces_and_validates_parameters(tmp_path: Path):
+    photo = tmp_path / "photo.jpg"
+    Image.new("RGB", (600, 400), (40, 120, 200)).save(photo)
+    document = tmp_path / "report.docx"
+    Document().save(document)
+
+    assert "Invalid parameter" in asyncio.run(add_picture(str(document), str(photo), quality="best"))
+    assert "Invalid parameter" in asyncio.run(add_picture(str(document), str(photo), dpi="0"))
+    assert "added" in asyncio.run(add_picture(str(document), str(photo), width=1, dpi="150", quality="85"))
@@ -0,0 +1,98 @@
+import asyncio
+import json
+from pathlib import Path
+
+from docx import Document
+from lxml import etree
+
+from word_document_server.core.comments import CommentIndex, get_comment_index
+from word_document_server.tools.comment_tools import (
+    add_comments_batch, get_comments_by_author, get_comments_for_paragraph, resolve_comments_batch
+)
+
+
+def test_comment_queries_resolve_anchors(tmp_path: Path):
+    path = tmp_path / "reviewed.docx"
+    doc = Document()
+    doc.add_paragraph("Introduction")
+    first = doc.add_paragraph("Revenue grew ").add_run("twelve percent")
+    second = doc.add_paragraph("Costs were ").add_run("flat")
+    doc.add_comment([first, second], text="Check these numbers", author="Ana", initials="A")
+    doc.add_comment(doc.paragraphs[0].runs[0], text="Shorter title?", author="Ben")
+    doc.save(path)
+
+    result = json.loads(asyncio.run(get_comments_for_paragraph(str(path), 2)))
+    assert result["paragraph_text"] == "Costs were flat"
+    assert [c["text"] for c in result["comments"]] == ["Check these numbers"]
+    comment = result["comments"][0]
+    assert comment["paragraph_index"] == 1
+    assert comment["reference_text"] == "twelve percent\nCosts were flat"
+
+    result = json.loads(asyncio.run(get_comments_by_author(str(path), "ben")))
+    assert [(c["text"], c["paragraph_index"]) for c in result["comments"]] == [("Shorter title?", 0)]
+
+
+def test_comment_index_links_replies():
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    w14 = "http://schemas.microsoft.com/office/word/2010/wordml"
+    w15 = "http://schemas.microsoft.com/office/word/2012/wordml"
+    comments = etree.fromstring(
+        f'<w:comments xmlns:w="{w}" xmlns:w14="{w14}">'
+        f'<w:comment w:id="0" w:author="Ana"><w:p w14:paraId="AAA"><w:r><w:t>Why?</w:t></w:r></w:p></w:comment>'
+        f'<w:comment w:id="1" w:author="Ben"><w:p w14:paraId="BBB"><w:r><w:t>Because.</w:t></w:r></w:p></w:comment>'
+        f'</w:comments>')
+    extended = etree.fromstring(
+        f'<w15:commentsEx xmlns:w15="{w15}"><w15:commentEx w15:paraId="AAA" w15:done="1"/>'
+        f'<w15:commentEx w15:paraId="BBB" w15:paraIdParent="AAA"/></w15:commentsEx>')
+    body = etree.fromstring(
+        f'<w:body xmlns:w="{w}"><w:p><w:commentRangeStart w:id="0"/><w:r><w:t>Claim</w:t></w:r>'
+        f'<w:commentRangeEnd w:id="0"/><w:r><w:commentReference w:id="0"/></w:r></w:p></w:body>')
+
+    index = CommentIndex.build(comments, extended, body.iterchildren())
+
+    parent, reply = index.by_id["0"], index.by_id["1"]
+    assert parent["resolved"] and parent["replies"] == ["1"]
+    assert reply["parent_id"] == "0" and reply["reference_text"] == "Claim"
+    assert index.for_paragraph(0) == [parent, reply]
+    assert index.thread("0") == [parent, reply]
+
+
+def test_batch_add_and_resolve_comments(tmp_path: Path):
+    path = tmp_path / "batch.docx"
+    doc = Document()
+    paragraph = doc.add_paragraph("Revenue grew ")
+    paragraph.add_run("twelve").bold = True
+    paragraph.add_run(" percent this year")
+    doc.add_paragraph("Costs were flat")
+    doc.add_paragraph("Outlook")
+    doc.save(path)
+
+    result = json.loads(asyncio.run(add_comments_batch(str(path), [
+        {"paragraph_index": 0, "text": "Source?", "author": "Ana", "anchor_text": "twelve percent"},
+        {"paragraph_index": 1, "end_paragraph_index": 2, "text": "Expand", "author": "Ben"},
+    ])))
+    assert result["comment_ids"] == ["0", "1"]
+    result = json.loads(asyncio.run(add_comments_batch(str(path), [
+        {"reply_to": "0", "text": "Annual report", "author": "Ben"},
+    ])))
+    assert result["comment_ids"] == ["2"]
+
+    index = get_comment_index(str(path))
+    assert index.by_id["0"]["reference_text"] == "twelve percent"
+    assert index.by_id["1"]["reference_text"] == "Costs were flat\nOutlook"
+    assert index.by_id["2"]["parent_id"] == "0" and index.by_id["0"]["replies"] == ["2"]
+    # Splitting runs keeps formatting and text intact
+    runs = Document(str(path)).paragraphs[0].runs
+    assert "".join(run.text for run in runs) == "Revenue grew twelve percent this year"
+    assert [run.text for run in runs if run.bold] == ["twelve"]
+
+    result = json.loads(asyncio.run(resolve_comments_batch(str(path), ["0", "1"])))
+    assert result["total_updated"] == 2
+    index = get_comment_index(str(path))
+    assert [index.by_id[i]["resolved"] for i in "012"] == [True, True, False]
+
+    result = json.loads(asyncio.run(add_comments_batch(str(path), [
+        {"paragraph_index": 0, "text": "ok"}, {"paragraph_index": 9, "text": "bad"},
+    ])))
+    assert not result["success"] and "Invalid comment 1" in result["error"]
+    assert len(get_comment_index(str(path)).comments) == 3
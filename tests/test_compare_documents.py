@@ -0,0 +1,87 @@
+import asyncio
+import json
+import re
+import zipfile
+
+from docx import Document
+
+from word_document_server.tools.document_tools import compare_documents
+
+
+def _versions(tmp_path):
+    original = Document()
+    original.add_heading("Report", 1)
+    original.add_paragraph("The quick brown fox jumps.")
+    original.add_paragraph("This paragraph is removed in the revision.")
+    table = original.add_table(rows=2, cols=2)
+    for row, values in zip(table.rows, (("Item", "Qty"), ("Pens", "2"))):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+    original.add_paragraph("Closing words.")
+
+    revised = Document()
+    revised.add_heading("Report", 1)
+    revised.add_paragraph("The quick red fox jumps.")
+    table = revised.add_table(rows=3, cols=2)
+    for row, values in zip(table.rows, (("Item", "Qty"), ("Pens", "3"), ("Ink", "1"))):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+    revised.add_paragraph("A new paragraph.")
+    revised.add_paragraph("Closing words.")
+
+    paths = tmp_path / "v1.docx", tmp_path / "v2.docx"
+    original.save(paths[0])
+    revised.save(paths[1])
+    return paths
+
+
+def test_compare_documents_reports_block_changes(tmp_path):
+    original, revised = _versions(tmp_path)
+    redline = tmp_path / "redline.docx"
+
+    result = json.loads(asyncio.run(compare_documents(str(original), str(revised), str(redline))))
+
+    assert result["summary"] == {"original_blocks": 5, "revised_blocks": 5, "unchanged": 2,
+                                 "inserted": 1, "deleted": 1, "modified": 2}
+    changes = result["changes"]
+    assert changes[0]["diff"] == [{"op": "equal", "text": "The quick "}, {"op": "delete", "text": "brown"},
+                                  {"op": "insert", "text": "red"}, {"op": "equal", "text": " fox jumps."}]
+    assert changes[1] == {"type": "deleted", "kind": "paragraph", "old_index": 2, "style": None,
+                          "text": "This paragraph is removed in the revision."}
+    assert changes[2]["rows"] == [
+        {"type": "modified", "old_row": 1, "new_row": 1, "cells": [{"column": 1, "old": "2", "new": "3"}]},
+        {"type": "inserted", "new_row": 2, "cells": ["Ink", "1"]},
+    ]
+    assert changes[3]["type"] == "inserted" and changes[3]["text"] == "A new paragraph."
+
+    xml = zipfile.ZipFile(redline).read("word/document.xml").decode("utf-8")
+    assert "<w:delText xml:space=\"preserve\">brown</w:delText>" in xml
+    assert "This paragraph is removed in the revision." in xml
+    assert re.search(r"<w:ins [^>]*><w:r><w:t>A new paragraph\.</w:t>", xml)
+
+
+def test_compare_documents_limit(tmp_path):
+    original, revised = _versions(tmp_path)
+
+    result = json.loads(asyncio.run(compare_documents(str(original), str(revised), limit=1)))
+
+    assert len(result["changes"]) == 1 and result["truncated"]
+    assert result["summary"]["modified"] == 2
+
+
+def test_compare_documents_unrelated_replacement_is_delete_and_insert(tmp_path):
+    original, revised = Document(), Document()
+    for doc, middle in ((original, "The quarterly budget review is scheduled for next Monday morning."),
+                        (revised, "Please remember to water the office plants before leaving tonight.")):
+        doc.add_paragraph("Opening line.")
+        doc.add_paragraph(middle)
+        doc.add_paragraph("Closing line.")
+    paths = tmp_path / "v1.docx", tmp_path / "v2.docx"
+    original.save(paths[0])
+    revised.save(paths[1])
+
+    result = json.loads(asyncio.run(compare_documents(str(paths[0]), str(paths[1]))))
+
+    assert result["summary"]["modified"] == 0
+    assert result["summary"]["deleted"] == 1 and result["summary"]["inserted"] == 1
+    assert sorted(change["type"] for change in result["changes"]) == ["deleted", "inserted"]
@@ -0,0 +1,87 @@
+import asyncio
+from pathlib import Path
+
+from docx import Document
+
+from word_document_server.tools.extended_document_tools import convert_markdown_to_docx, convert_to_markdown
+
+
+def _make_sample_docx(path: Path) -> None:
+    """Generates a .docx covering headings, emphasis, lists, tables and links."""
+    doc = Document()
+    doc.add_heading("Quarterly Report", level=1)
+    para = doc.add_paragraph("Revenue was ")
+    para.add_run("up").bold = True
+    para.add_run(" and costs were ")
+    para.add_run("flat").italic = True
+    doc.add_paragraph("First item", style="List Bullet")
+    doc.add_paragraph("Step one", style="List Number")
+    doc.add_paragraph("Step two", style="List Number")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Region"
+    table.cell(0, 1).text = "Sales|Total"
+    table.cell(1, 0).text = "North"
+    table.cell(1, 1).text = "42"
+    doc.add_paragraph("1. literal text, not a list")
+    doc.save(path)
+
+
+def test_convert_to_markdown_emits_gfm(tmp_path: Path):
+    src_doc = tmp_path / "report.docx"
+    _make_sample_docx(src_doc)
+    out_md = tmp_path / "report.md"
+
+    result_msg = asyncio.run(convert_to_markdown(str(src_doc), output_filename=str(out_md)))
+
+    assert "successfully converted" in result_msg
+    markdown = out_md.read_text(encoding="utf-8")
+    assert markdown.startswith("# Quarterly Report\n")
+    assert "Revenue was **up** and costs were *flat*" in markdown
+    assert "- First item" in markdown
+    assert "1. Step one\n2. Step two" in markdown
+    assert "| Region | Sales\\|Total |" in markdown
+    assert "| --- | --- |" in markdown
+    assert "1\\. literal text, not a list" in markdown
+
+
+def test_convert_markdown_to_docx_builds_native_structure(tmp_path: Path):
+    src_md = tmp_path / "notes.md"
+    src_md.write_text(
+        "# Notes\n\n"
+        "Plain **bold** and [site](https://example.com).\n\n"
+        "1. alpha\n2. beta\n   - inner\n\n"
+        "| A | B |\n|---|--:|\n| 1 | 2 |\n\n"
+        "```\ncode <line>\n```\n",
+        encoding="utf-8",
+    )
+    out_docx = tmp_path / "notes.docx"
+
+    result_msg = asyncio.run(convert_markdown_to_docx(str(src_md), str(out_docx)))
+
+    assert "successfully converted" in result_msg
+    doc = Document(str(out_docx))
+    paragraphs = doc.paragraphs
+    assert paragraphs[0].style.name == "Heading 1"
+    assert [r.text for r in paragraphs[1].runs if r.bold] == ["bold"]
+    numbered = [p for p in paragraphs if p._p.pPr is not None and p._p.pPr.numPr is not None]
+    assert [p.text for p in numbered] == ["alpha", "beta", "inner"]
+    assert numbered[2]._p.pPr.numPr.ilvl.val == 1
+    assert doc.tables[0].cell(1, 1).text == "2"
+    assert paragraphs[-1].text == "code <line>"
+
+
+def test_convert_to_markdown_separates_adjacent_lists(tmp_path: Path):
+    src_doc = tmp_path / "lists.docx"
+    doc = Document()
+    doc.add_paragraph("Apples", style="List Bullet")
+    doc.add_paragraph("Pears", style="List Bullet")
+    doc.add_paragraph("Wash", style="List Number")
+    doc.add_paragraph("Peel", style="List Number")
+    doc.add_paragraph("Done", style="List Bullet")
+    doc.save(src_doc)
+    out_md = tmp_path / "lists.md"
+
+    asyncio.run(convert_to_markdown(str(src_doc), output_filename=str(out_md)))
+
+    markdown = out_md.read_text(encoding="utf-8")
+    assert "- Apples\n- Pears\n\n1. Wash\n2. Peel\n\n- Done" in markdown
@@ -6,6 +6,7 @@ from docx import Document
 
 # Target for testing: convert_to_pdf (async function)
 from word_document_server.tools.extended_document_tools import convert_to_pdf
+from word_document_server.core.pdf import render_docx_to_pdf
 
 
 def _make_sample_docx(path: Path) -> None:
@@ -23,7 +24,8 @@ def test_convert_to_pdf_with_temp_docx(tmp_path: Path):
 
     Notes:
     - On Linux/macOS, it first tries LibreOffice (soffice/libreoffice),
-      and falls back to docx2pdf on failure (requires Microsoft Word).
+      falls back to docx2pdf on failure (requires Microsoft Word), and finally
+      to the built-in reportlab renderer.
     - If these tools are missing or the command is unavailable, the test is skipped with a reason.
     """
     # 1) Generate a docx file with spaces in its name in the temp directory
@@ -77,6 +79,22 @@ def test_convert_to_pdf_with_temp_docx(tmp_path: Path):
     assert found.stat().st_size > 0, f"The generated PDF file is empty: {found}"
 
 
+def test_render_docx_to_pdf_uses_cjk_font_for_cjk_runs_only(tmp_path: Path):
+    src_doc = tmp_path / "mixed.docx"
+    doc = Document()
+    para = doc.add_paragraph()
+    para.add_run("\u201cQuoted\u201d \u2014 \u20ac5 ").bold = True
+    para.add_run("\u4e2d\u6587")
+    doc.save(src_doc)
+    out_pdf = tmp_path / "mixed.pdf"
+
+    render_docx_to_pdf(str(src_doc), str(out_pdf))
+
+    data = out_pdf.read_bytes()
+    assert b"/Helvetica-Bold" in data
+    assert b"STSong-Light" in data
+
+
 if __name__ == "__main__":
     # Allow running this file directly for quick verification:
     #   python tests/test_convert_to_pdf.py
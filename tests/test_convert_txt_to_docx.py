@@ -0,0 +1,29 @@
+import asyncio
+from pathlib import Path
+
+from docx import Document
+
+from word_document_server.tools.extended_document_tools import convert_txt_to_docx
+
+
+def test_convert_txt_to_docx_streams_and_splits(tmp_path: Path):
+    src_txt = tmp_path / "app.log"
+    src_txt.write_text("".join(f"line {i}\tok <&>\n" for i in range(25)), encoding="utf-8")
+    out_docx = tmp_path / "app.docx"
+    progress = []
+
+    def on_progress(done, total, message):
+        progress.append((done, total))
+
+    result_msg = asyncio.run(convert_txt_to_docx(
+        str(src_txt), str(out_docx), max_paragraphs_per_part=10, progress_callback=on_progress
+    ))
+
+    assert "successfully converted" in result_msg
+    assert "3 parts" in result_msg
+    first = Document(str(out_docx))
+    assert [p.text for p in first.paragraphs][:2] == ["line 0\tok <&>", "line 1\tok <&>"]
+    assert len(first.paragraphs) == 10
+    last = Document(str(tmp_path / "app_part3.docx"))
+    assert [p.text for p in last.paragraphs][-1] == "line 24\tok <&>"
+    assert progress[-1][0] == progress[-1][1] == src_txt.stat().st_size
@@ -0,0 +1,53 @@
+import asyncio
+import json
+import zipfile
+from pathlib import Path
+
+from docx import Document
+
+from word_document_server.tools.document_tools import get_document_info
+
+
+def _sample(path: Path):
+    doc = Document()
+    doc.core_properties.title = "Report"
+    doc.add_paragraph("one two three")
+    doc.add_paragraph("")
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "four"
+    table.cell(0, 1).add_table(rows=1, cols=1)
+    doc.add_page_break()
+    doc.add_paragraph("five")
+    doc.save(path)
+
+
+def test_document_info_counts_body_when_app_statistics_are_missing(tmp_path: Path):
+    path = tmp_path / "report.docx"
+    _sample(path)
+
+    info = json.loads(asyncio.run(get_document_info(str(path))))
+    assert info["title"] == "Report"
+    assert info["statistics_source"] == "counted"
+    assert info["word_count"] == 5
+    assert info["paragraph_count"] == 3
+    assert info["table_count"] == 1
+    assert info["page_count"] == 2
+
+
+def test_document_info_prefers_statistics_saved_by_word(tmp_path: Path):
+    source = tmp_path / "source.docx"
+    path = tmp_path / "saved.docx"
+    _sample(source)
+    with zipfile.ZipFile(source) as src, zipfile.ZipFile(path, "w") as out:
+        for item in src.infolist():
+            data = src.read(item)
+            if item.filename == "docProps/app.xml":
+                data = (data.replace(b"<Pages>1</Pages>", b"<Pages>7</Pages>")
+                        .replace(b"<Words>0</Words>", b"<Words>1234</Words>")
+                        .replace(b"<Paragraphs>0</Paragraphs>", b"<Paragraphs>56</Paragraphs>"))
+            out.writestr(item, data)
+
+    info = json.loads(asyncio.run(get_document_info(str(path))))
+    assert info["statistics_source"] == "app.xml"
+    assert (info["page_count"], info["word_count"], info["paragraph_count"]) == (7, 1234, 56)
+    assert info["table_count"] == 1
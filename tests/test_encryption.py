@@ -0,0 +1,74 @@
+import asyncio
+import io
+import json
+import zipfile
+from pathlib import Path
+
+import msoffcrypto
+from docx import Document
+
+from word_document_server.core.encryption import decrypt_document, encrypt_document
+from word_document_server.tools.protection_tools import (
+    protect_document, protect_documents_batch, unprotect_document, unprotect_documents_batch
+)
+
+
+def test_protect_and_unprotect_round_trip(tmp_path: Path):
+    path = tmp_path / "secret.docx"
+    doc = Document()
+    doc.add_paragraph("Quarterly numbers")
+    doc.save(path)
+    original = path.read_bytes()
+
+    assert "successfully" in asyncio.run(protect_document(str(path), "s3cret"))
+    assert not zipfile.is_zipfile(path)
+    # The result opens with msoffcrypto, including the HMAC integrity check
+    with open(path, "rb") as f:
+        office = msoffcrypto.OfficeFile(f)
+        office.load_key(password="s3cret", verify_password=True)
+        decrypted = io.BytesIO()
+        office.decrypt(decrypted, verify_integrity=True)
+    assert decrypted.getvalue() == original
+
+    assert "Incorrect password" in asyncio.run(unprotect_document(str(path), "wrong"))
+    assert not zipfile.is_zipfile(path)
+    assert "successfully" in asyncio.run(unprotect_document(str(path), "s3cret"))
+    assert path.read_bytes() == original
+
+
+def test_streaming_encryption_spans_many_segments(tmp_path: Path):
+    source = tmp_path / "large.docx"
+    payload = bytes(range(256)) * 40000
+    with zipfile.ZipFile(source, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("[Content_Types].xml", "<Types/>")
+        zf.writestr("word/media/blob.bin", payload)
+
+    encrypted = tmp_path / "large.enc.docx"
+    encrypt_document(str(source), "pw", str(encrypted), buffer_size=8192)
+    restored = tmp_path / "restored.docx"
+    decrypt_document(str(encrypted), "pw", str(restored), buffer_size=8192)
+
+    assert restored.read_bytes() == source.read_bytes()
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_batch_protection_keeps_successes_when_some_files_fail(tmp_path: Path):
+    folder = tmp_path / "out"
+    folder.mkdir()
+    for n in range(3):
+        doc = Document()
+        doc.add_paragraph(f"Report {n}")
+        doc.save(folder / f"report{n}.docx")
+    (folder / "broken.docx").write_bytes(b"not a document")
+
+    progress = []
+    result = json.loads(asyncio.run(protect_documents_batch(
+        [str(folder)], "pw", max_workers=2, progress_callback=lambda done, total, message: progress.append(done))))
+    assert (result["total"], result["succeeded"], result["failed"]) == (4, 3, 1)
+    assert [r["success"] for r in result["results"]] == [False, True, True, True]
+    assert sorted(progress) == [1, 2, 3, 4]
+    assert not any(zipfile.is_zipfile(folder / f"report{n}.docx") for n in range(3))
+
+    result = json.loads(asyncio.run(unprotect_documents_batch([str(folder / "report0.docx")], "pw")))
+    assert result["success"]
+    assert Document(str(folder / "report0.docx")).paragraphs[0].text == "Report 0"
@@ -0,0 +1,41 @@
+import asyncio
+import csv
+import json
+from pathlib import Path
+
+from docx import Document
+
+from word_document_server.tools.document_tools import export_tables
+
+
+def _make_merged_table_docx(path: Path) -> None:
+    doc = Document()
+    doc.add_paragraph("Intro")
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "ignored"
+    table = doc.add_table(rows=4, cols=3)
+    for r, values in enumerate([["Region", "Units", "Price"], ["North", "3", "1.5"],
+                                ["South", "", "2"], ["", "7", "0.25"]]):
+        for c, value in enumerate(values):
+            table.cell(r, c).text = value
+    table.cell(2, 0).merge(table.cell(3, 0))
+    table.cell(0, 1).merge(table.cell(0, 2)).text = "Units"
+    doc.save(path)
+
+
+def test_export_tables_expands_merged_cells(tmp_path: Path):
+    src = tmp_path / "report.docx"
+    _make_merged_table_docx(src)
+
+    result = json.loads(asyncio.run(export_tables(str(src), "csv", [1])))
+    assert [t["index"] for t in result["tables"]] == [1]
+    with open(result["tables"][0]["path"], newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["Region", "Units", "Units"]
+    assert rows[3] == ["South", "7", "0.25"]
+
+    result = json.loads(asyncio.run(export_tables(str(src), "jsonl", [1, 5], output_dir=str(tmp_path / "out"))))
+    assert result["missing_indices"] == [5]
+    lines = Path(result["tables"][0]["path"]).read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[1]) == {"Region": "South", "Units": "", "Units_2": "2"}
+
+    assert "Invalid format" in asyncio.run(export_tables(str(src), "xlsx"))
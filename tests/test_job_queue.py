@@ -0,0 +1,78 @@
+import os
+import time
+from pathlib import Path
+
+from word_document_server.core.jobs import (
+    FAILED, QUEUED, RUNNING, SUCCEEDED, ConversionFailed, JobQueue, JobStore
+)
+
+
+def test_claim_order_respects_priority_and_client_fairness(tmp_path: Path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    batch = [store.submit("convert_to_pdf", f"/docs/{i}.docx", client_id="batch") for i in range(3)]
+    urgent = store.submit("convert_to_pdf", "/docs/urgent.docx", priority=9, client_id="ui")
+    later = store.submit("convert_to_pdf", "/docs/later.docx", client_id="ui")
+
+    assert store.claim(max_per_client=1)["id"] == urgent
+    # "ui" is at its limit, so the oldest batch job runs next
+    assert store.claim(max_per_client=1)["id"] == batch[0]
+    # Both clients are at the limit now
+    assert store.claim(max_per_client=1) is None
+    # With room for two each, the equal-priority jobs run in submission order
+    assert store.claim(max_per_client=2)["id"] == batch[1]
+    assert store.claim(max_per_client=2)["id"] == later
+
+
+def test_failed_jobs_retry_with_backoff_then_fail(tmp_path: Path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.submit("convert_to_pdf", "/docs/a.docx", max_attempts=2)
+
+    store.claim(max_per_client=1)
+    assert store.fail(job_id, "boom") == QUEUED
+    assert store.claim(max_per_client=1) is None  # still backing off
+    assert store.get(job_id)["next_run_at"] > store.get(job_id)["created_at"]
+
+    with store._connect() as conn:
+        conn.execute("UPDATE jobs SET next_run_at = 0 WHERE id = ?", (job_id,))
+    assert store.claim(max_per_client=1)["attempts"] == 2
+    assert store.get(job_id)["status"] == RUNNING
+    assert store.fail(job_id, "boom again") == FAILED
+
+
+def test_only_expired_leases_are_requeued(tmp_path: Path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    live = store.submit("convert_to_pdf", "/docs/live.docx")
+    dead = store.submit("convert_to_pdf", "/docs/dead.docx")
+    assert store.claim(max_per_client=2)["owner_pid"] == os.getpid()
+    store.claim(max_per_client=2)
+
+    # Another process starting up leaves the live job alone
+    with store._connect() as conn:
+        conn.execute("UPDATE jobs SET lease_expires_at = 0 WHERE id = ?", (dead,))
+    assert store.requeue_expired() == 1
+    assert store.get(live)["status"] == RUNNING
+    assert store.get(dead)["status"] == QUEUED
+
+    assert store.renew_leases([live]) == 1
+    assert store.get(live)["lease_expires_at"] > time.time()
+
+
+def test_queue_uses_runner_status_not_message(tmp_path: Path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    ok = store.submit("convert_to_pdf", "/docs/ok.docx")
+    bad = store.submit("convert_to_pdf", "/docs/bad.docx", max_attempts=1)
+
+    def runner(job, report_progress):
+        if job["id"] == bad:
+            raise ConversionFailed("Document was not converted successfully")
+        return "Done"
+
+    queue = JobQueue(store, runner, workers=1, poll_interval=0.05)
+    queue.start()
+    deadline = time.time() + 10
+    while store.count(QUEUED) + store.count(RUNNING) and time.time() < deadline:
+        time.sleep(0.05)
+    queue.stop(timeout=5)
+
+    assert store.get(ok)["status"] == SUCCEEDED and store.get(ok)["result"] == "Done"
+    assert store.get(bad)["status"] == FAILED
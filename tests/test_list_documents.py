@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+from docx import Document
+
+from word_document_server.core.catalog import DocumentCatalog, list_documents
+from word_document_server.tools.document_tools import list_available_documents
+
+
+def _document(path: Path, title: str, words: str = "one two"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = Document()
+    doc.core_properties.title = title
+    doc.add_paragraph(words)
+    doc.save(path)
+
+
+def test_listing_recurses_filters_and_pages_without_gaps(tmp_path: Path):
+    for n in range(7):
+        _document(tmp_path / f"team{n % 2}" / f"report{n}.docx", f"Report {n}")
+    _document(tmp_path / "UPPER.DOCX", "Upper")
+    (tmp_path / "notes.txt").write_text("not a document")
+    (tmp_path / "~$report0.docx").write_bytes(b"lock")
+
+    assert json.loads(asyncio.run(list_available_documents(str(tmp_path))))["total"] == 1
+
+    names, cursor = [], None
+    while True:
+        page = json.loads(asyncio.run(list_available_documents(str(tmp_path), recursive=True,
+                                                               cursor=cursor, limit=3)))
+        names += [document["name"] for document in page["documents"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == ["report0.docx", "report1.docx", "report2.docx", "report3.docx",
+                     "report4.docx", "report5.docx", "report6.docx", "UPPER.DOCX"]
+
+    team1 = list_documents(str(tmp_path), recursive=True, pattern="team1/*")
+    assert [d["name"] for d in team1["documents"]] == ["report1.docx", "report3.docx", "report5.docx"]
+
+
+def test_metadata_cache_only_rereads_changed_documents(tmp_path: Path, monkeypatch):
+    from word_document_server.core import catalog as catalog_module
+
+    for n in range(3):
+        _document(tmp_path / f"doc{n}.docx", f"Doc {n}")
+    catalog = DocumentCatalog(str(tmp_path / "catalog.sqlite3"))
+    reads = []
+    original = catalog_module.read_document_record
+    monkeypatch.setattr(catalog_module, "read_document_record",
+                        lambda path: reads.append(os.path.basename(path)) or original(path))
+
+    first = list_documents(str(tmp_path), catalog=catalog)
+    assert [d["title"] for d in first["documents"]] == ["Doc 0", "Doc 1", "Doc 2"]
+    assert len(reads) == 3
+
+    reads.clear()
+    _document(tmp_path / "doc1.docx", "Doc 1 revised", "one two three four")
+    second = list_documents(str(tmp_path), catalog=catalog)
+    assert reads == ["doc1.docx"]
+    assert second["documents"][1]["title"] == "Doc 1 revised"
+    assert second["documents"][1]["word_count"] == 4
+
+
+def test_catalog_query_filters_by_metadata_and_tracks_changes(tmp_path: Path):
+    catalog = DocumentCatalog(str(tmp_path / "catalog.sqlite3"))
+    root = tmp_path / "docs"
+    for n, author in enumerate(["Ana", "Ben", "ana"]):
+        path = root / f"q{n}" / f"report{n}.docx"
+        path.parent.mkdir(parents=True)
+        doc = Document()
+        doc.core_properties.author = author
+        doc.add_heading(f"Quarter {n}", 1)
+        doc.add_paragraph("word " * (10 * (n + 1)))
+        doc.save(path)
+
+    assert catalog.crawl(str(root)) == {"scanned": 3, "updated": 3, "removed": 0, "errors": 0}
+    result = catalog.query(root=str(root), author="ANA", min_words=20, sort_by="word_count", descending=True)
+    assert [d["word_count"] for d in result["documents"]] == [32]
+    assert result["documents"][0]["heading_count"] == 1
+
+    os.remove(root / "q1" / "report1.docx")
+    assert catalog.crawl(str(root)) == {"scanned": 2, "updated": 0, "removed": 1, "errors": 0}
+    assert catalog.query(root=str(root), modified_before="2000-01-01")["total"] == 0
+    assert catalog.query(root=str(root / "q2"))["total"] == 1
@@ -0,0 +1,98 @@
+import asyncio
+import io
+import json
+import re
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from word_document_server.core.tables import set_cell_border
+from word_document_server.core.optimize import optimize_part
+from word_document_server.tools.document_tools import optimize_document
+
+
+def _png() -> bytes:
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    header = struct.pack(">IIBBBBB", 2, 2, 8, 2, 0, 0, 0)
+    pixels = zlib.compress(b"\x00" + b"\xff\x00\x00" * 2 + b"\x00" + b"\x00\x00\xff" * 2)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", pixels) + chunk(b"IEND", b"")
+
+
+PNG = _png()
+
+
+def _bloated(path: Path):
+    doc = Document()
+    paragraph = doc.add_paragraph()
+    for word in ("Quarterly ", "revenue ", "grew"):
+        run = paragraph.add_run(word)
+        run.bold = True
+        run._r.set(qn("w:rsidR"), "00A1B2C3")
+    paragraph.add_run(" fast")
+    cell = doc.add_table(rows=1, cols=1).cell(0, 0)
+    set_cell_border(cell, top=True, bottom=True, val="double")
+    # What repeated border edits used to leave behind
+    cell._tc.tcPr.append(OxmlElement("w:tcBorders"))
+    doc.add_picture(io.BytesIO(PNG))
+    doc.save(path)
+
+    # Store the picture twice under different names, as copy/paste between documents does
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as out:
+        for item in src.infolist():
+            data = src.read(item)
+            if item.filename == "word/_rels/document.xml.rels":
+                image_rel = re.search(rb'<Relationship [^>]*Target="media/image1.png"[^>]*/>', data).group(0)
+                copy = image_rel.replace(b"media/image1.png", b"media/image2.png")
+                copy = re.sub(rb'Id="[^"]+"', b'Id="rIdCopy"', copy)
+                data = data.replace(b"</Relationships>", copy + b"</Relationships>")
+            out.writestr(item, data)
+        out.writestr("word/media/image2.png", PNG)
+    path.write_bytes(buffer.getvalue())
+
+
+def test_optimize_document_compacts_without_changing_content(tmp_path: Path):
+    source = tmp_path / "bloated.docx"
+    target = tmp_path / "optimized.docx"
+    _bloated(source)
+
+    report = json.loads(asyncio.run(optimize_document(str(source), str(target))))
+    assert report["runs_merged"] == 2
+    assert report["rsids_removed"] >= 3
+    assert report["duplicate_properties_removed"] >= 1
+    assert report["media_deduplicated"] == 1
+    assert report["document_xml_size"]["after"] < report["document_xml_size"]["before"]
+
+    doc = Document(str(target))
+    runs = doc.paragraphs[0].runs
+    assert [(run.text, run.bold) for run in runs] == [("Quarterly revenue grew", True), (" fast", None)]
+    borders = doc.tables[0].cell(0, 0)._tc.tcPr.findall(qn("w:tcBorders"))
+    assert len(borders) == 1
+    assert [side.get(qn("w:val")) for side in borders[0]] == ["double", "double"]
+    with zipfile.ZipFile(target) as zf:
+        assert [name for name in zf.namelist() if name.startswith("word/media/")] == ["word/media/image1.png"]
+        assert b"image2.png" not in zf.read("word/_rels/document.xml.rels")
+        assert b"rsid" not in zf.read("word/document.xml")
+
+
+def test_optimize_part_keeps_previous_properties_of_tracked_changes():
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    xml = (f'<w:document xmlns:w="{w}"><w:body><w:p><w:pPr><w:jc w:val="center"/>'
+           '<w:pPrChange w:id="1" w:author="A"><w:pPr/></w:pPrChange></w:pPr>'
+           '<w:r><w:rPr><w:b/><w:rPrChange w:id="2" w:author="A"><w:rPr/></w:rPrChange></w:rPr>'
+           '<w:t>Bold now</w:t></w:r><w:r><w:rPr/><w:t> plain</w:t></w:r></w:p></w:body></w:document>')
+    stats = {key: 0 for key in ("rsids_removed", "proofing_marks_removed", "duplicate_properties_removed",
+                                "empty_properties_removed", "runs_merged")}
+
+    result = optimize_part(xml.encode("utf-8"), stats).decode("utf-8")
+
+    assert "<w:pPrChange w:id=\"1\" w:author=\"A\"><w:pPr/></w:pPrChange>" in result
+    assert "<w:rPrChange w:id=\"2\" w:author=\"A\"><w:rPr/></w:rPrChange>" in result
+    # The empty rPr of the plain run still goes
+    assert stats["empty_properties_removed"] == 1
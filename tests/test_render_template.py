@@ -0,0 +1,93 @@
+import asyncio
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+from docx import Document
+
+from word_document_server.core.mailmerge import compile_part
+from word_document_server.tools.document_tools import render_template_batch
+
+
+def _template(path: Path):
+    doc = Document()
+    paragraph = doc.add_paragraph("Dear ")
+    # Word often stores a typed placeholder in several runs
+    paragraph.add_run("{{cust")
+    paragraph.add_run("omer.name}}")
+    paragraph.add_run(",")
+    doc.add_paragraph("{{#vip}}")
+    doc.add_paragraph("Thank you for being a VIP customer.")
+    doc.add_paragraph("{{/vip}}")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Item"
+    table.cell(0, 1).text = "Qty"
+    table.cell(1, 0).text = "{{#lines}}{{item}}"
+    table.cell(1, 1).text = "{{qty}}{{/lines}}"
+    doc.add_paragraph("Ship to: {{address}}")
+    doc.save(path)
+
+
+def test_render_template_batch(tmp_path):
+    template = tmp_path / "letter.docx"
+    _template(template)
+    records = [
+        {"id": "A1", "customer": {"name": "Ann & Co"}, "vip": True, "address": "1 Main St\nSpringfield",
+         "lines": [{"item": "Pens", "qty": 3}, {"item": "Ink", "qty": 1}]},
+        {"id": "B2", "customer": {"name": "Bob"}, "vip": False, "address": "", "lines": []},
+        {"customer": {"name": "No id"}},
+    ]
+
+    result = json.loads(asyncio.run(render_template_batch(
+        str(template), records, str(tmp_path / "out" / "{id}.docx"), max_workers=1)))
+
+    assert result["succeeded"] == 2 and result["failed"] == 1
+    assert "id" in result["results"][2]["error"]
+
+    first = Document(str(tmp_path / "out" / "A1.docx"))
+    texts = [p.text for p in first.paragraphs]
+    assert texts == ["Dear Ann & Co,", "Thank you for being a VIP customer.", "Ship to: 1 Main St\nSpringfield"]
+    assert [[c.text for c in row.cells] for row in first.tables[0].rows] == [
+        ["Item", "Qty"], ["Pens", "3"], ["Ink", "1"]]
+
+    second = Document(str(tmp_path / "out" / "B2.docx"))
+    assert [p.text for p in second.paragraphs] == ["Dear Bob,", "Ship to: "]
+    assert len(second.tables[0].rows) == 1
+
+    # Parts without placeholders are copied from the template unchanged
+    with zipfile.ZipFile(template) as source, zipfile.ZipFile(tmp_path / "out" / "A1.docx") as output:
+        assert output.read("word/styles.xml") == source.read("word/styles.xml")
+
+
+def test_render_template_inline_sections(tmp_path):
+    template = tmp_path / "inline.docx"
+    doc = Document()
+    doc.add_paragraph("Dear {{name}}{{#vip}}, valued member{{/vip}}!")
+    paragraph = doc.add_paragraph("Items: {{#items}}")
+    paragraph.add_run("{{.}}").bold = True
+    paragraph.add_run("; {{/items}}{{^items}}none{{/items}}")
+    doc.save(template)
+    records = [{"id": "vip", "name": "Ann", "vip": True, "items": ["pens", "ink"]},
+               {"id": "plain", "name": "Bob", "vip": False, "items": []}]
+
+    result = json.loads(asyncio.run(render_template_batch(
+        str(template), records, str(tmp_path / "{id}.docx"), max_workers=1)))
+
+    assert result["succeeded"] == 2
+    vip = Document(str(tmp_path / "vip.docx"))
+    assert [p.text for p in vip.paragraphs] == ["Dear Ann, valued member!", "Items: pens; ink; "]
+    assert [run.bold for run in vip.paragraphs[1].runs if run.text in ("pens", "ink")] == [True, True]
+    plain = Document(str(tmp_path / "plain.docx"))
+    assert [p.text for p in plain.paragraphs] == ["Dear Bob!", "Items: none"]
+
+
+def test_render_template_rejects_section_across_paragraphs(tmp_path):
+    template = tmp_path / "broken.docx"
+    doc = Document()
+    doc.add_paragraph("Intro {{#vip}} text")
+    doc.add_paragraph("more {{/vip}}")
+    doc.save(template)
+
+    with zipfile.ZipFile(template) as package, pytest.raises(ValueError, match="vip"):
+        compile_part(package.read("word/document.xml"))
@@ -0,0 +1,52 @@
+from docx import Document
+
+from word_document_server.utils.document_utils import (
+    delete_block_under_header, replace_block_between_manual_anchors, replace_paragraph_block_below_header
+)
+
+
+def _document(path):
+    doc = Document()
+    doc.add_heading("Scope", 1)
+    doc.add_paragraph("Old text")
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "old table"
+    doc.add_paragraph("More old text")
+    doc.add_heading("Budget", 1)
+    doc.add_paragraph("Keep me")
+    doc.save(path)
+
+
+def test_replace_block_below_header_replaces_tables_too(tmp_path):
+    path = tmp_path / "plan.docx"
+    _document(path)
+
+    message = replace_paragraph_block_below_header(str(path), "scope", ["First", "Second\tcolumn"], None, "List Bullet")
+
+    assert "removed 3 elements" in message
+    doc = Document(str(path))
+    assert [p.text for p in doc.paragraphs] == ["Scope", "First", "Second\tcolumn", "Budget", "Keep me"]
+    assert doc.paragraphs[1].style.name == "List Bullet"
+    assert len(doc.tables) == 0
+
+
+def test_replace_block_between_manual_anchors(tmp_path):
+    path = tmp_path / "plan.docx"
+    _document(path)
+
+    message = replace_block_between_manual_anchors(str(path), "Old text", ["New"], end_anchor_text="Budget")
+
+    assert "removed 2 elements" in message
+    doc = Document(str(path))
+    assert [p.text for p in doc.paragraphs] == ["Scope", "Old text", "New", "Budget", "Keep me"]
+    assert doc.paragraphs[2].style.name == "Normal"
+
+
+def test_delete_block_under_header(tmp_path):
+    path = tmp_path / "plan.docx"
+    _document(path)
+    doc = Document(str(path))
+
+    header, removed = delete_block_under_header(doc, "Budget")
+
+    assert removed == 1 and header is doc.paragraphs[-1]._p
+    assert delete_block_under_header(doc, "Missing") == (None, 0)
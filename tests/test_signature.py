@@ -0,0 +1,47 @@
+import asyncio
+import zipfile
+from pathlib import Path
+
+from docx import Document
+
+from word_document_server.core.protection import build_package_manifest, compare_package_manifest
+from word_document_server.tools.protection_tools import add_digital_signature, verify_document
+
+
+def test_signature_detects_table_edits_and_names_the_part(tmp_path: Path):
+    path = tmp_path / "contract.docx"
+    doc = Document()
+    doc.add_paragraph("Terms")
+    doc.add_table(rows=1, cols=2).cell(0, 1).text = "100 EUR"
+    doc.save(path)
+
+    assert "added" in asyncio.run(add_digital_signature(str(path), "Ana", "Approval"))
+    assert "signature is valid" in asyncio.run(verify_document(str(path)))
+
+    # Paragraph text is unchanged; only a table cell differs
+    doc = Document(str(path))
+    doc.tables[0].cell(0, 1).text = "900 EUR"
+    doc.save(path)
+    message = asyncio.run(verify_document(str(path)))
+    assert "modified since it was signed by Ana" in message
+    assert "word/document.xml" in message
+
+
+def test_manifest_comparison_only_rehashes_changed_parts(tmp_path: Path):
+    path = tmp_path / "package.docx"
+    Document().save(path)
+    manifest = build_package_manifest(str(path))
+    assert compare_package_manifest(str(path), manifest)["rehashed"] == 0
+
+    with zipfile.ZipFile(path) as zf:
+        parts = {info.filename: zf.read(info) for info in zf.infolist()}
+    parts["word/styles.xml"] += b" "
+    parts["customXml/extra.xml"] = b"<x/>"
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+
+    changes = compare_package_manifest(str(path), manifest)
+    assert changes["modified"] == ["word/styles.xml"]
+    assert changes["added"] == ["customXml/extra.xml"]
+    assert changes["rehashed"] == 1 and not changes["root_matches"]
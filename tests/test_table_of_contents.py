@@ -0,0 +1,36 @@
+import asyncio
+import zipfile
+
+from docx import Document
+
+from word_document_server.tools.content_tools import add_table_of_contents
+
+
+def test_add_table_of_contents_keeps_document(tmp_path):
+    path = tmp_path / "report.docx"
+    doc = Document()
+    doc.add_heading("Introduction", 1)
+    doc.add_paragraph().add_run("Bold body text").bold = True
+    doc.add_heading("Background & scope", 2)
+    doc.add_heading("Details", 4)
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "cell"
+    doc.save(path)
+
+    message = asyncio.run(add_table_of_contents(str(path), "Contents", 3))
+    assert "2 entries" in message
+
+    doc = Document(str(path))
+    xml = zipfile.ZipFile(path).read("word/document.xml").decode("utf-8")
+    assert 'TOC \\o "1-3" \\h \\z \\u' in xml
+    assert xml.index("docPartGallery") < xml.index("Bold body text")
+    # The entries live in the content control; the page break paragraph follows it
+    assert [p.text for p in doc.paragraphs] == ["", "Introduction", "Bold body text", "Background & scope", "Details"]
+    assert doc.paragraphs[2].runs[0].bold
+    assert doc.tables[0].cell(0, 0).text == "cell"
+    assert doc.styles["toc 2"].paragraph_format.left_indent is not None
+
+    # Running it again replaces the table of contents instead of adding a second one
+    asyncio.run(add_table_of_contents(str(path), "Contents", 1))
+    xml = zipfile.ZipFile(path).read("word/document.xml").decode("utf-8")
+    assert xml.count("docPartGallery") == 1
+    assert 'TOC \\o "1-1"' in xml and xml.count("Background &amp; scope") == 1
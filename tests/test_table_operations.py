@@ -0,0 +1,151 @@
+import asyncio
+from pathlib import Path
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from word_document_server.tools.format_tools import apply_table_operations
+
+
+def _make_table_docx(path: Path) -> None:
+    doc = Document()
+    table = doc.add_table(rows=3, cols=3)
+    for r in range(3):
+        for c in range(3):
+            table.cell(r, c).text = f"{r}{c}"
+    doc.save(path)
+
+
+def test_apply_table_operations_in_one_save(tmp_path: Path):
+    path = tmp_path / "table.docx"
+    _make_table_docx(path)
+
+    ops = [
+        {"op": "format_text", "start_row": 0, "start_col": 0, "end_row": 0, "end_col": 2, "bold": True},
+        {"op": "shading", "row": 1, "col": 1, "fill_color": "#D9E2F3"},
+        {"op": "merge", "start_row": 2, "start_col": 0, "end_row": 2, "end_col": 1},
+        {"op": "alignment", "row": 2, "col": 0, "horizontal": "center", "vertical": "bottom"},
+    ]
+    result_msg = asyncio.run(apply_table_operations(str(path), 0, ops))
+
+    assert "successfully" in result_msg
+    table = Document(str(path)).tables[0]
+    assert all(table.cell(0, c).paragraphs[0].runs[0].bold for c in range(3))
+    assert table.cell(1, 1)._tc.tcPr.find(qn("w:shd")).get(qn("w:fill")) == "D9E2F3"
+    assert table.cell(2, 0)._tc is table.cell(2, 1)._tc
+    assert table.cell(2, 0)._tc.tcPr.find(qn("w:vAlign")).get(qn("w:val")) == "bottom"
+
+
+def test_apply_table_operations_rejects_batch_with_invalid_op(tmp_path: Path):
+    path = tmp_path / "table.docx"
+    _make_table_docx(path)
+    before = path.read_bytes()
+
+    ops = [
+        {"op": "shading", "row": 0, "col": 0, "fill_color": "FF0000"},
+        {"op": "shading", "row": 5, "col": 0, "fill_color": "FF0000"},
+    ]
+    result_msg = asyncio.run(apply_table_operations(str(path), 0, ops))
+
+    assert result_msg.startswith("Invalid operation 1")
+    assert path.read_bytes() == before
+
+
+def test_apply_table_operations_rejects_merge_across_merged_cells(tmp_path: Path, capsys):
+    path = tmp_path / "table.docx"
+    _make_table_docx(path)
+    before = path.read_bytes()
+
+    ops = [
+        {"op": "shading", "row": 0, "col": 0, "fill_color": "FF0000"},
+        {"op": "merge", "start_row": 1, "start_col": 0, "end_row": 1, "end_col": 1},
+        {"op": "merge", "start_row": 0, "start_col": 1, "end_row": 2, "end_col": 1},
+    ]
+    result_msg = asyncio.run(apply_table_operations(str(path), 0, ops))
+
+    assert result_msg.startswith("Invalid operation 2: cannot merge (0,1) to (2,1)")
+    assert "No changes were made" in result_msg
+    assert path.read_bytes() == before
+    assert capsys.readouterr().out == ""
+
+
+def test_add_table_from_csv_builds_styled_header(tmp_path: Path):
+    from word_document_server.tools.content_tools import add_table_from_data
+
+    path = tmp_path / "report.docx"
+    Document().save(path)
+    csv_path = tmp_path / "sales.csv"
+    csv_path.write_text("Region,Sales\nNorth,42\nSouth,<7>\n", encoding="utf-8")
+
+    result_msg = asyncio.run(add_table_from_data(str(path), csv_path=str(csv_path),
+                                                 col_widths=[100, 60], header_fill="D9E2F3"))
+
+    assert "(3x2) added successfully" in result_msg
+    table = Document(str(path)).tables[0]
+    assert [c.text for c in table.rows[2].cells] == ["South", "<7>"]
+    assert table.cell(0, 1).paragraphs[0].runs[0].bold
+    assert table.rows[0]._tr.trPr.find(qn("w:tblHeader")) is not None
+    assert table.cell(0, 0)._tc.tcPr.find(qn("w:shd")).get(qn("w:fill")) == "D9E2F3"
+    assert table.cell(1, 0).width == 100 * 12700
+
+
+def test_add_table_from_csv_keeps_line_breaks_and_tabs(tmp_path: Path):
+    from word_document_server.tools.content_tools import add_table_from_data
+
+    path = tmp_path / "report.docx"
+    Document().save(path)
+    csv_path = tmp_path / "notes.csv"
+    csv_path.write_text('Item,Notes\nPens,"Blue\r\nRed\tBlack"\n', encoding="utf-8")
+
+    asyncio.run(add_table_from_data(str(path), csv_path=str(csv_path)))
+
+    cell = Document(str(path)).tables[0].cell(1, 1)
+    run = cell.paragraphs[0].runs[0]._r
+    assert [child.tag.split("}")[1] for child in run if child.tag != qn("w:rPr")] == ["t", "br", "t", "tab", "t"]
+    assert cell.text == "Blue\nRed\tBlack"
+
+
+def test_table_grid_tracks_merges_and_new_rows():
+    from word_document_server.core.tables import get_table_grid, merge_cells
+
+    table = Document().add_table(rows=3, cols=3)
+    assert len(get_table_grid(table).row_cells(2)) == 3
+
+    assert merge_cells(table, 0, 0, 1, 1)
+    grid = get_table_grid(table)
+    assert grid.cell(1, 1) is grid.cell(0, 0)
+    assert grid.span(1, 1) == (0, 0, 2, 2)
+    assert len(grid.row_cells(0)) == 2
+    assert grid.cell(3, 0) is None and grid.cell(0, -1) is None
+
+    table.add_row()
+    assert get_table_grid(table).row_count == 4
+
+    # Merges made directly through python-docx show up as well
+    table.cell(2, 1).merge(table.cell(2, 2))
+    assert len(get_table_grid(table).row_cells(2)) == 2
+
+
+def test_auto_fit_sizes_columns_to_content_within_margins():
+    from word_document_server.core.tables import auto_fit_table
+
+    doc = Document()
+    table = doc.add_table(rows=2, cols=3)
+    table.cell(0, 0).text = "Id"
+    table.cell(0, 1).text = "Description " * 40
+    table.cell(0, 2).text = "Amount"
+    table.cell(1, 0).merge(table.cell(1, 1)).text = "spanning"
+
+    assert auto_fit_table(table)
+
+    section = doc.sections[0]
+    available = (section.page_width - section.left_margin - section.right_margin) / 635  # EMU -> twips
+    grid = [int(col.get(qn("w:w"))) for col in table._tbl.tblGrid.gridCol_lst]
+    assert abs(sum(grid) - available) <= 3
+    assert grid[0] < grid[2] < grid[1]
+    merged_width = table._tbl.tr_lst[1].tc_lst[0].tcPr.find(qn("w:tcW")).get(qn("w:w"))
+    assert int(merged_width) == grid[0] + grid[1]
+    assert table._tbl.tblPr.find(qn("w:tblLayout")).get(qn("w:type")) == "fixed"
+    # tblW and tblLayout sit at their schema positions, not after tblLook
+    tags = [child.tag.split("}")[1] for child in table._tbl.tblPr]
+    assert tags.index("tblW") < tags.index("tblLayout") < tags.index("tblLook")
@@ -0,0 +1,83 @@
+import os
+from pathlib import Path
+
+from docx import Document
+
+from word_document_server.core.catalog import DocumentCatalog
+from word_document_server.core.jobs import JobStore
+from word_document_server.core.watcher import ChangeDebouncer, DocumentWatcher
+
+
+class _Queue:
+    def __init__(self, store):
+        self.store = store
+        self.notified = 0
+
+    def notify(self):
+        self.notified += 1
+
+
+def _save(path: Path, text: str):
+    doc = Document()
+    doc.core_properties.title = text
+    doc.add_paragraph(text)
+    doc.save(path)
+
+
+def test_debouncer_batches_bursts_of_changes(tmp_path: Path):
+    batches = []
+    debouncer = ChangeDebouncer(batches.append, delay=60)
+    debouncer.add([str(tmp_path / "a.docx")])
+    debouncer.add([str(tmp_path / "b.docx"), str(tmp_path / "a.docx")])
+    debouncer.flush()
+    assert batches == [[str(tmp_path / "a.docx"), str(tmp_path / "b.docx")]]
+
+
+def test_polling_watcher_refreshes_catalog_and_queues_preconversions(tmp_path: Path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    report = docs / "report.docx"
+    _save(report, "Draft")
+    catalog = DocumentCatalog(str(tmp_path / "catalog.sqlite3"))
+    catalog.crawl(str(docs))
+    queue = _Queue(JobStore(str(tmp_path / "jobs.sqlite3")))
+
+    watcher = DocumentWatcher([str(docs)], debounce=60, preconvert=["convert_to_markdown"],
+                              use_polling=True, catalog=catalog, job_queue=queue)
+    watcher.observer._snapshot = watcher.observer.snapshot()
+
+    _save(report, "Final")
+    os.utime(report, ns=(1, 1))
+    assert watcher.observer.poll() == [str(report)]
+    watcher.debouncer.flush()
+    assert catalog.query(root=str(docs))["documents"][0]["title"] == "Final"
+    assert queue.store.count("queued") == 1
+
+    # Touching the file changes its mtime but not its content: no new conversion
+    os.utime(report, ns=(2, 2))
+    watcher.observer.poll()
+    watcher.debouncer.flush()
+    assert queue.store.count("queued") == 1
+
+    report.unlink()
+    watcher.observer.poll()
+    watcher.debouncer.flush()
+    assert catalog.query(root=str(docs))["total"] == 0
+
+
+def test_watcher_errors_are_logged_not_printed(tmp_path: Path, capsys, caplog):
+    from word_document_server.core import watcher as watcher_module
+
+    def broken(paths):
+        raise RuntimeError("index unavailable")
+
+    watcher = DocumentWatcher([str(tmp_path)], use_polling=True)
+    watcher_module.register_invalidator(broken)
+    try:
+        watcher.process([str(tmp_path / "a.docx")])
+    finally:
+        watcher_module._invalidators.remove(broken)
+
+    # stdout is the stdio transport's JSON-RPC stream
+    assert capsys.readouterr().out == ""
+    assert "Cache invalidation error: index unavailable" in caplog.text
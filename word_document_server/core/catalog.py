@@ -0,0 +1,523 @@
+"""
+Document listing and metadata catalog for Word Document Server.
+
+Directories are walked with os.scandir, so file sizes and modification times
+come from the directory scan itself instead of one stat call per file.
+Document metadata (core properties, statistics, an outline hash and a
+conversion-cache key) is stored in a local SQLite catalog keyed by path and
+invalidated by size and mtime, so only files that changed since the last
+listing or crawl are opened again, and indexed queries replace opening every
+file.
+"""
+import base64
+import datetime
+import fnmatch
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from word_document_server.core.properties import read_core_properties, read_app_statistics, count_statistics
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.expanduser('~'), '.word_document_server', 'catalog.sqlite3')
+DEFAULT_EXTENSIONS = ('.docx',)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+SORT_KEYS = ('name', 'path', 'size', 'modified')
+
+# Word keeps "~$name.docx" owner files next to open documents; they are not documents
+_LOCK_FILE_PREFIX = '~$'
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+_QUERY_BATCH = 500
+
+QUERY_SORT_KEYS = {
+    'path': 'path',
+    'title': 'title COLLATE NOCASE',
+    'author': 'author COLLATE NOCASE',
+    'modified': 'mtime_ns',
+    'created': 'created',
+    'size': 'size',
+    'word_count': 'word_count',
+    'page_count': 'page_count',
+}
+
+# Rows written per transaction while crawling, so other processes are never locked out for long
+_WRITE_BATCH = 200
+_SCHEMA_VERSION = 2
+_COLUMNS = (
+    'path', 'size', 'mtime_ns', 'title', 'author', 'subject', 'keywords', 'last_modified_by', 'revision',
+    'created', 'modified', 'page_count', 'word_count', 'character_count', 'paragraph_count', 'table_count',
+    'heading_count', 'outline_hash', 'conversion_key', 'error', 'indexed_at',
+)
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS documents (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        title TEXT,
+        author TEXT,
+        subject TEXT,
+        keywords TEXT,
+        last_modified_by TEXT,
+        revision INTEGER,
+        created REAL,
+        modified REAL,
+        page_count INTEGER,
+        word_count INTEGER,
+        character_count INTEGER,
+        paragraph_count INTEGER,
+        table_count INTEGER,
+        heading_count INTEGER,
+        outline_hash TEXT,
+        conversion_key TEXT,
+        error TEXT,
+        indexed_at REAL NOT NULL
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS idx_documents_author ON documents (author COLLATE NOCASE)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_mtime ON documents (mtime_ns)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_words ON documents (word_count)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_outline ON documents (outline_hash)',
+    'CREATE INDEX IF NOT EXISTS idx_documents_conversion ON documents (conversion_key)',
+)
+_UPSERT = (
+    f"INSERT OR REPLACE INTO documents ({', '.join(_COLUMNS)}) "
+    f"VALUES ({', '.join(':' + column for column in _COLUMNS)})"
+)
+
+
+def iter_documents(directory: str, recursive: bool = False, pattern: Optional[str] = None,
+                   extensions: Sequence[str] = DEFAULT_EXTENSIONS) -> Iterator[Dict[str, Any]]:
+    """
+    Yield {path, name, size, mtime_ns} for matching files under directory.
+
+    Extensions are matched case-insensitively. `pattern` is a glob matched
+    against the file name, or against the path relative to directory when it
+    contains a '/'. Symlinked directories are not followed and unreadable
+    subdirectories are skipped.
+    """
+    suffixes = tuple(ext.lower() if ext.startswith('.') else f'.{ext.lower()}' for ext in extensions)
+    match_relative = pattern is not None and '/' in pattern
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            scanner = os.scandir(current)
+        except OSError:
+            if current == directory:
+                raise
+            continue
+        with scanner:
+            for entry in scanner:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    name = entry.name
+                    if name.startswith(_LOCK_FILE_PREFIX) or not name.lower().endswith(suffixes):
+                        continue
+                    if pattern is not None:
+                        target = os.path.relpath(entry.path, directory).replace(os.sep, '/') if match_relative else name
+                        if not fnmatch.fnmatch(target, pattern):
+                            continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield {'path': entry.path, 'name': name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _sort_key(entry: Dict[str, Any], sort_by: str):
+    if sort_by == 'name':
+        return (entry['name'].lower(), entry['path'])
+    if sort_by == 'size':
+        return (entry['size'], entry['path'])
+    if sort_by == 'modified':
+        return (entry['mtime_ns'], entry['path'])
+    return (entry['path'],)
+
+
+def encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str):
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode('ascii'))))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _timestamp(value: str) -> Optional[float]:
+    """Epoch seconds of a core property date, or None if it is missing or malformed."""
+    if not value:
+        return None
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+
+def parse_time(value: Any) -> float:
+    """Epoch seconds from a number or an ISO 8601 date/time string (UTC unless an offset is given)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    timestamp = _timestamp(str(value).strip().replace('Z', '+00:00'))
+    if timestamp is None:
+        raise ValueError(f"Invalid date: {value}")
+    return timestamp
+
+
+def outline_hash(headings: Sequence[Tuple[int, str]]) -> str:
+    """SHA-256 over the (level, text) sequence of a document's headings."""
+    digest = hashlib.sha256()
+    for level, text in headings:
+        digest.update(f"{level}\t{text}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def conversion_key(zf: zipfile.ZipFile) -> str:
+    """
+    Content fingerprint for conversion caches.
+
+    Built from the name, CRC-32 and size of every package part as listed in
+    the zip directory, so no part is decompressed; touching or re-zipping a
+    file without changing its content keeps the same key.
+    """
+    digest = hashlib.sha256()
+    for info in sorted(zf.infolist(), key=lambda item: item.filename):
+        digest.update(f"{info.filename}\0{info.CRC:08x}\0{info.file_size}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def read_document_record(path: str) -> Dict[str, Any]:
+    """
+    Catalog fields of a DOCX file: core properties, statistics, outline hash and conversion key.
+
+    The body is streamed once for the outline and table count; Word's saved
+    statistics from app.xml are preferred over the counted ones.
+    """
+    with zipfile.ZipFile(path) as zf:
+        core = read_core_properties(zf)
+        headings: List[Tuple[int, str]] = []
+        statistics = count_statistics(zf, headings)
+        saved = read_app_statistics(zf)
+        if saved is not None:
+            statistics.update(saved)
+        key = conversion_key(zf)
+    return {
+        'title': core['title'],
+        'author': core['author'],
+        'subject': core['subject'],
+        'keywords': core['keywords'],
+        'last_modified_by': core['last_modified_by'],
+        'revision': core['revision'],
+        'created': _timestamp(core['created']),
+        'modified': _timestamp(core['modified']),
+        'page_count': statistics['page_count'],
+        'word_count': statistics['word_count'],
+        'character_count': statistics['character_count'],
+        'paragraph_count': statistics['paragraph_count'],
+        'table_count': statistics['table_count'],
+        'heading_count': len(headings),
+        'outline_hash': outline_hash(headings),
+        'conversion_key': key,
+    }
+
+
+def _root_range(root: str) -> Tuple[str, str]:
+    # Every path below root sorts between "root/" and "root0" ('0' follows '/' in ASCII)
+    prefix = root.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class DocumentCatalog:
+    """
+    SQLite-backed document catalog, keyed by absolute path and invalidated by size and mtime.
+
+    Every operation uses its own short-lived connection in WAL mode, and
+    writes are made in small IMMEDIATE transactions after the documents have
+    been read, so several server processes can crawl and query the same
+    database concurrently.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if conn.execute('PRAGMA user_version').fetchone()[0] < _SCHEMA_VERSION:
+                    # Only cached data lives here, so older layouts are rebuilt rather than migrated
+                    conn.execute('DROP TABLE IF EXISTS documents')
+                    conn.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, conn, paths: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        rows = {}
+        for start in range(0, len(paths), _QUERY_BATCH):
+            batch = paths[start:start + _QUERY_BATCH]
+            query = f"SELECT * FROM documents WHERE path IN ({','.join('?' * len(batch))})"
+            for row in conn.execute(query, batch):
+                rows[row['path']] = dict(row)
+        return rows
+
+    def _index(self, conn, entries: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Read and store the given (absolute path) entries, committing every _WRITE_BATCH rows."""
+        rows = []
+        for start in range(0, len(entries), _WRITE_BATCH):
+            batch = []
+            for entry in entries[start:start + _WRITE_BATCH]:
+                row = dict.fromkeys(_COLUMNS)
+                row.update(path=entry['path'], size=entry['size'], mtime_ns=entry['mtime_ns'],
+                           indexed_at=time.time())
+                try:
+                    row.update(read_document_record(entry['path']))
+                except Exception as e:
+                    # Remembered until the file changes, so broken files are not reopened on every listing
+                    row['error'] = str(e)
+                batch.append(row)
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(_UPSERT, batch)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            rows.extend(batch)
+        return rows
+
+    def metadata(self, entries: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the catalog row for each entry from iter_documents, keyed by the entry's path.
+
+        Entries whose size or mtime differ from the stored row (or that have
+        no row) are read from disk and written back first.
+        """
+        entries = [dict(entry, key=os.path.abspath(entry['path'])) for entry in entries]
+        with self._connect() as conn:
+            stored = self.lookup(conn, [entry['key'] for entry in entries])
+            stale = [dict(entry, path=entry['key']) for entry in entries
+                     if not _is_current(stored.get(entry['key']), entry)]
+            for row in self._index(conn, stale):
+                stored[row['path']] = row
+        return {entry['path']: stored[entry['key']] for entry in entries}
+
+    def refresh_paths(self, paths: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Re-index specific files (e.g. reported by a filesystem watcher).
+
+        Rows of paths that no longer exist are deleted. Returns the current
+        row of every path that still exists, keyed by absolute path.
+        """
+        entries, missing = [], []
+        for path in {os.path.abspath(path) for path in paths}:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                missing.append(path)
+                continue
+            entries.append({'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+        if missing:
+            with self._connect() as conn:
+                conn.executemany('DELETE FROM documents WHERE path = ?', [(path,) for path in missing])
+        return self.metadata(entries)
+
+    def crawl(self, root: str, recursive: bool = True, extensions: Sequence[str] = DEFAULT_EXTENSIONS,
+              progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+        """
+        Bring the catalog up to date with the documents under root.
+
+        Only new or changed files are opened; rows of files that no longer
+        exist under root are removed.
+
+        Returns:
+            Counts of scanned, updated, removed and unreadable documents
+        """
+        root = os.path.abspath(root)
+        entries = list(iter_documents(root, recursive, extensions=extensions))
+        low, high = _root_range(root)
+        with self._connect() as conn:
+            stored = {row['path']: row for row in conn.execute(
+                'SELECT path, size, mtime_ns, indexed_at FROM documents WHERE path >= ? AND path < ?', (low, high))}
+            seen = {entry['path'] for entry in entries}
+            if not recursive:
+                # Rows from subdirectories are outside this crawl
+                stored = {path: row for path, row in stored.items() if os.path.dirname(path) == root}
+            stale = [entry for entry in entries if not _is_current(stored.get(entry['path']), entry)]
+            updated = []
+            for start in range(0, len(stale), _WRITE_BATCH):
+                updated.extend(self._index(conn, stale[start:start + _WRITE_BATCH]))
+                if progress_callback is not None:
+                    progress_callback(len(updated), len(stale))
+            removed = [path for path in stored if path not in seen]
+            if removed:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.executemany('DELETE FROM documents WHERE path = ?', [(path,) for path in removed])
+                    conn.execute('COMMIT')
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+        return {
+            'scanned': len(entries),
+            'updated': len(updated),
+            'removed': len(removed),
+            'errors': sum(1 for row in updated if row['error']),
+        }
+
+    def query(self, root: Optional[str] = None, author: Optional[str] = None,
+              title_contains: Optional[str] = None, keywords_contains: Optional[str] = None,
+              modified_after: Any = None, modified_before: Any = None,
+              min_words: Optional[int] = None, max_words: Optional[int] = None,
+              min_pages: Optional[int] = None, max_pages: Optional[int] = None,
+              outline_hash: Optional[str] = None, sort_by: str = 'path', descending: bool = False,
+              limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> Dict[str, Any]:
+        """
+        Filter and sort catalogued documents.
+
+        `modified_after`/`modified_before` apply to the file modification
+        time (epoch seconds or ISO 8601). Author matching ignores case; the
+        *_contains filters are case-insensitive substring matches.
+
+        Returns:
+            Dictionary with the matching rows for this page and the total match count
+        """
+        if sort_by not in QUERY_SORT_KEYS:
+            raise ValueError(f"Invalid sort_by: {sort_by}. Expected one of {', '.join(QUERY_SORT_KEYS)}")
+        clauses = ['error IS NULL']
+        params: List[Any] = []
+        if root is not None:
+            low, high = _root_range(os.path.abspath(root))
+            clauses.append('path >= ? AND path < ?')
+            params += [low, high]
+        if author is not None:
+            clauses.append('author = ? COLLATE NOCASE')
+            params.append(author)
+        for column, value in (('title', title_contains), ('keywords', keywords_contains)):
+            if value is not None:
+                clauses.append(f"instr(lower({column}), lower(?)) > 0")
+                params.append(value)
+        for column, operator, value in (('mtime_ns', '>=', modified_after), ('mtime_ns', '<', modified_before)):
+            if value is not None:
+                clauses.append(f'{column} {operator} ?')
+                params.append(int(parse_time(value) * 1e9))
+        for column, operator, value in (('word_count', '>=', min_words), ('word_count', '<=', max_words),
+                                        ('page_count', '>=', min_pages), ('page_count', '<=', max_pages)):
+            if value is not None:
+                clauses.append(f'{column} {operator} ?')
+                params.append(int(value))
+        if outline_hash is not None:
+            clauses.append('outline_hash = ?')
+            params.append(outline_hash)
+        where = ' AND '.join(clauses)
+        order = 'DESC' if descending else 'ASC'
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        with self._connect() as conn:
+            total = conn.execute(f'SELECT COUNT(*) FROM documents WHERE {where}', params).fetchone()[0]
+            rows = conn.execute(
+                f'SELECT * FROM documents WHERE {where} ORDER BY {QUERY_SORT_KEYS[sort_by]} {order}, path {order} '
+                'LIMIT ? OFFSET ?', params + [limit, max(0, int(offset))]
+            ).fetchall()
+        return {'total': total, 'documents': [catalog_row_to_dict(dict(row)) for row in rows]}
+
+
+def _is_current(row: Optional[Dict[str, Any]], entry: Dict[str, Any]) -> bool:
+    return row is not None and row['size'] == entry['size'] and row['mtime_ns'] == entry['mtime_ns']
+
+
+def catalog_row_to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a catalog row."""
+    document = {key: row[key] for key in _COLUMNS if key not in ('mtime_ns', 'indexed_at', 'error')}
+    document['file_modified'] = row['mtime_ns'] / 1e9
+    return document
+
+
+def list_documents(directory: str, recursive: bool = False, pattern: Optional[str] = None,
+                   extensions: Sequence[str] = DEFAULT_EXTENSIONS, sort_by: str = 'name',
+                   descending: bool = False, cursor: Optional[str] = None,
+                   limit: int = DEFAULT_PAGE_SIZE,
+                   catalog: Optional[DocumentCatalog] = None) -> Dict[str, Any]:
+    """
+    One page of the documents under directory.
+
+    Pages are keyed on the sort value of their last entry, so files added or
+    removed between calls do not shift later pages. Metadata is looked up
+    in `catalog` (when given) for the entries on the returned page only.
+
+    Returns:
+        Dictionary with the page entries, the total match count and the
+        cursor of the next page (None on the last page)
+    """
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"Invalid sort_by: {sort_by}. Expected one of {', '.join(SORT_KEYS)}")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    entries = list(iter_documents(directory, recursive, pattern, extensions))
+    keyed = sorted(((_sort_key(entry, sort_by), entry) for entry in entries),
+                   key=lambda item: item[0], reverse=descending)
+    if cursor:
+        after = decode_cursor(cursor)
+        keyed = [item for item in keyed if (item[0] < after if descending else item[0] > after)]
+    page = keyed[:limit]
+    next_cursor = encode_cursor(page[-1][0]) if len(keyed) > limit else None
+
+    documents = []
+    cached = catalog.metadata(entry for _, entry in page) if catalog is not None else {}
+    for _, entry in page:
+        document = {
+            'path': entry['path'],
+            'name': entry['name'],
+            'size': entry['size'],
+            'modified': entry['mtime_ns'] / 1e9,
+        }
+        row = cached.get(entry['path'])
+        if row is not None:
+            for key in ('title', 'author', 'word_count', 'page_count', 'error'):
+                if key != 'error' or row[key]:
+                    document[key] = row[key]
+        documents.append(document)
+    return {'total': len(entries), 'documents': documents, 'next_cursor': next_cursor}
+
+
+_catalog: Optional[DocumentCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_document_catalog() -> DocumentCatalog:
+    """
+    Return the process-wide document catalog, creating it on first use.
+
+    The database path is configured with MCP_CATALOG_DB.
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = DocumentCatalog(os.getenv('MCP_CATALOG_DB', DEFAULT_CATALOG_PATH))
+    return _catalog
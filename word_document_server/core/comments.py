@@ -2,13 +2,57 @@
 Core comment extraction functionality for Word documents.
 
 This module provides low-level functions to extract and process comments
-from Word documents using the python-docx library.
+from Word documents. A CommentIndex is built in one pass over comments.xml,
+commentsExtended.xml and the comment markers in the document body, and is
+cached per file version so repeated queries are dictionary lookups.
+
+Batches of new comments and resolution changes are written directly to the
+package XML: each part is parsed and serialized once per batch.
 """
+import copy
 import datetime
-from typing import Dict, List, Optional, Any
+import os
+import random
+import zipfile
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Any
 from docx import Document
 from docx.document import Document as DocumentType
+from docx.oxml.ns import qn
 from docx.text.paragraph import Paragraph
+from lxml import etree
+
+from word_document_server.core.ooxml import (
+    load_relationships, parse_part, iter_body_blocks, paragraph_text, run_text,
+    serialize_part, add_package_part, rewrite_package, DOCUMENT_PART, W_NS, MC_NS
+)
+
+W14_NS = 'http://schemas.microsoft.com/office/word/2010/wordml'
+W15_NS = 'http://schemas.microsoft.com/office/word/2012/wordml'
+
+_W_COMMENT = qn('w:comment')
+_W_ID = qn('w:id')
+_W_P = qn('w:p')
+_W_T = qn('w:t')
+_W_TBL = qn('w:tbl')
+_RANGE_START = qn('w:commentRangeStart')
+_RANGE_END = qn('w:commentRangeEnd')
+_REFERENCE = qn('w:commentReference')
+_PARA_ID = f'{{{W14_NS}}}paraId'
+_COMMENT_EX = f'{{{W15_NS}}}commentEx'
+_W_R = qn('w:r')
+_W_RPR = qn('w:rPr')
+_W_PPR = qn('w:pPr')
+_W_BODY = qn('w:body')
+
+COMMENTS_PART = 'word/comments.xml'
+COMMENTS_EXTENDED_PART = 'word/commentsExtended.xml'
+COMMENTS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments'
+COMMENTS_EXTENDED_REL = 'http://schemas.microsoft.com/office/2011/relationships/commentsExtended'
+COMMENTS_CT = 'application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml'
+COMMENTS_EXTENDED_CT = 'application/vnd.openxmlformats-officedocument.wordprocessingml.commentsExtended+xml'
+# Containers whose runs belong to the paragraph's own text
+_RUN_CONTAINERS = (qn('w:hyperlink'), qn('w:ins'), qn('w:smartTag'), qn('w:customXml'), qn('w:fldSimple'))
 
 
 def extract_all_comments(doc: DocumentType) -> List[Dict[str, Any]]:
@@ -25,24 +69,7 @@ def extract_all_comments(doc: DocumentType) -> List[Dict[str, Any]]:
     
     # Access the document's comment part if it exists
     try:
-        # Get the document part
-        document_part = doc.part
-        
-        # Find comments part through relationships
-        comments_part = None
-        for rel_id, rel in document_part.rels.items():
-            if 'comments' in rel.reltype and 'comments' == rel.reltype.split('/')[-1]:
-                comments_part = rel.target_part
-                break
-        
-        if comments_part:
-            # Extract comments from the comments part using proper xpath syntax
-            comment_elements = comments_part.element.xpath('.//w:comment')
-            
-            for idx, comment_element in enumerate(comment_elements):
-                comment_data = extract_comment_data(comment_element, idx)
-                if comment_data:
-                    comments.append(comment_data)
+        comments = CommentIndex.from_document(doc).comments
         
         # If no comments found, try alternative approach
         if not comments:
@@ -114,9 +141,8 @@ def extract_comment_data(comment_element, index: int) -> Optional[Dict[str, Any]
             except:
                 date = date_str
         
-        # Extract comment text
-        text_elements = comment_element.xpath('.//w:t')
-        text = ''.join(elem.text or '' for elem in text_elements)
+        # Extract comment text, one line per paragraph
+        text = '\n'.join(paragraph_text(p) for p in comment_element.iter(_W_P))
         
         return {
             'id': f'comment_{index + 1}',
@@ -125,9 +151,13 @@ def extract_comment_data(comment_element, index: int) -> Optional[Dict[str, Any]
             'initials': initials,
             'date': date,
             'text': text.strip(),
-            'paragraph_index': None,  # Will be filled if we can determine it
+            'paragraph_index': None,  # Filled in from the body markers by CommentIndex
             'in_table': False,
-            'reference_text': ''
+            'table_index': None,
+            'reference_text': '',
+            'parent_id': None,
+            'replies': [],
+            'resolved': False
         }
     
     except Exception as e:
@@ -207,4 +237,575 @@ def get_comments_for_paragraph(comments: List[Dict[str, Any]], paragraph_index:
     Returns:
         Comments for the specified paragraph
     """
-    return [c for c in comments if c.get('paragraph_index') == paragraph_index]
\ No newline at end of file
+    return [c for c in comments if c.get('paragraph_index') == paragraph_index]
+
+
+class CommentIndex:
+    """
+    All comments of a document with their anchors, threads and lookup tables.
+
+    Comments anchored to body paragraphs carry the index of the first
+    paragraph (matching Document.paragraphs) and are listed under every
+    paragraph their range covers; comments inside tables carry the table
+    index instead. reference_text is the text between commentRangeStart and
+    commentRangeEnd. Replies (from commentsExtended.xml) have a parent_id,
+    and their parents list them in replies.
+    """
+
+    def __init__(self):
+        self.comments: List[Dict[str, Any]] = []
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_author: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_paragraph: Dict[int, List[Dict[str, Any]]] = {}
+        self.paragraph_count = 0
+        # Text of the paragraphs that have comments, for context in query results
+        self.paragraph_texts: Dict[int, str] = {}
+        self._paragraphs_of: Dict[str, List[int]] = {}
+
+    @classmethod
+    def build(cls, comments_root, extended_root, body_blocks: Iterable) -> 'CommentIndex':
+        """
+        Build an index from the comments part, the optional commentsExtended
+        part and the top-level elements of the document body.
+        """
+        index = cls()
+        para_ids = {}
+        if comments_root is not None:
+            for position, element in enumerate(comments_root.iterchildren(_W_COMMENT)):
+                comment = extract_comment_data(element, position)
+                if comment is None:
+                    continue
+                index.comments.append(comment)
+                index.by_id[comment['comment_id']] = comment
+                paragraphs = list(element.iter(_W_P))
+                # commentsExtended refers to a comment by the paraId of its last paragraph
+                if paragraphs and paragraphs[-1].get(_PARA_ID):
+                    para_ids[paragraphs[-1].get(_PARA_ID)] = comment
+        index._read_anchors(body_blocks)
+        if extended_root is not None:
+            index._read_threads(extended_root, para_ids)
+        for comment in index.comments:
+            index.by_author.setdefault(comment['author'].lower(), []).append(comment)
+        return index
+
+    def _read_anchors(self, body_blocks: Iterable) -> None:
+        open_ranges: Dict[str, List[str]] = {}
+        anchored = set()
+        paragraph_index = table_index = -1
+        covered: Dict[str, List[int]] = {}
+        for block in body_blocks:
+            if block.tag == _W_P:
+                paragraph_index += 1
+                location = (paragraph_index, None)
+            elif block.tag == _W_TBL:
+                table_index += 1
+                location = (None, table_index)
+            else:
+                location = (None, None)
+            for ranges in covered.values():
+                if location[0] is not None:
+                    ranges.append(location[0])
+            for node in block.iter(_W_P, _W_T, _RANGE_START, _RANGE_END, _REFERENCE):
+                tag = node.tag
+                if tag == _W_T:
+                    for parts in open_ranges.values():
+                        parts.append(node.text or '')
+                elif tag == _W_P:
+                    for parts in open_ranges.values():
+                        if parts and parts[-1] != '\n':
+                            parts.append('\n')
+                elif tag == _RANGE_START:
+                    comment_id = node.get(_W_ID)
+                    open_ranges[comment_id] = []
+                    covered[comment_id] = [location[0]] if location[0] is not None else []
+                    self._anchor(comment_id, location)
+                    anchored.add(location[0])
+                elif tag == _RANGE_END:
+                    comment_id = node.get(_W_ID)
+                    parts = open_ranges.pop(comment_id, None)
+                    comment = self.by_id.get(comment_id)
+                    if parts is not None and comment is not None:
+                        comment['reference_text'] = ''.join(parts).strip()
+                    self._cover(comment_id, covered.pop(comment_id, []))
+                elif tag == _REFERENCE:
+                    comment_id = node.get(_W_ID)
+                    comment = self.by_id.get(comment_id)
+                    # A comment without a range is anchored where its reference mark is
+                    if comment is not None and comment['paragraph_index'] is None and not comment['in_table'] \
+                            and comment_id not in covered:
+                        self._anchor(comment_id, location)
+                        self._cover(comment_id, [location[0]] if location[0] is not None else [])
+                        anchored.add(location[0])
+            if location[0] is not None and location[0] in anchored:
+                self.paragraph_texts[location[0]] = paragraph_text(block)
+        # Ranges that were never closed run to the end of the document
+        for comment_id, ranges in covered.items():
+            self._cover(comment_id, ranges)
+        self.paragraph_count = paragraph_index + 1
+
+    def _anchor(self, comment_id: str, location) -> None:
+        comment = self.by_id.get(comment_id)
+        if comment is None:
+            return
+        comment['paragraph_index'], comment['table_index'] = location
+        comment['in_table'] = location[1] is not None
+
+    def _cover(self, comment_id: str, paragraph_indices: List[int]) -> None:
+        comment = self.by_id.get(comment_id)
+        if comment is None:
+            return
+        paragraph_indices = list(dict.fromkeys(paragraph_indices))
+        self._paragraphs_of[comment_id] = paragraph_indices
+        for paragraph_index in paragraph_indices:
+            self.by_paragraph.setdefault(paragraph_index, []).append(comment)
+
+    def _read_threads(self, extended_root, para_ids: Dict[str, Dict[str, Any]]) -> None:
+        for entry in extended_root.iter(_COMMENT_EX):
+            comment = para_ids.get(entry.get(f'{{{W15_NS}}}paraId'))
+            if comment is None:
+                continue
+            comment['resolved'] = entry.get(f'{{{W15_NS}}}done') == '1'
+            parent = para_ids.get(entry.get(f'{{{W15_NS}}}paraIdParent'))
+            if parent is None or parent is comment:
+                continue
+            comment['parent_id'] = parent['comment_id']
+            parent['replies'].append(comment['comment_id'])
+            # Replies usually share their parent's range; inherit it when they have none
+            if comment['paragraph_index'] is None and not comment['in_table']:
+                for key in ('paragraph_index', 'in_table', 'table_index', 'reference_text'):
+                    comment[key] = parent[key]
+                self._cover(comment['comment_id'], self._paragraphs_of.get(parent['comment_id'], []))
+
+    @classmethod
+    def from_document(cls, doc: DocumentType) -> 'CommentIndex':
+        """Build an index from an open python-docx Document."""
+        comments_root = extended_root = None
+        for rel in doc.part.rels.values():
+            if rel.is_external:
+                continue
+            kind = rel.reltype.rsplit('/', 1)[-1]
+            if kind == 'comments':
+                comments_root = getattr(rel.target_part, 'element', None)
+                if comments_root is None:
+                    comments_root = etree.fromstring(rel.target_part.blob)
+            elif kind == 'commentsExtended':
+                extended_root = etree.fromstring(rel.target_part.blob)
+        return cls.build(comments_root, extended_root, doc.element.body.iterchildren())
+
+    def for_author(self, author: str) -> List[Dict[str, Any]]:
+        return self.by_author.get(author.lower(), [])
+
+    def for_paragraph(self, paragraph_index: int) -> List[Dict[str, Any]]:
+        return self.by_paragraph.get(paragraph_index, [])
+
+    def thread(self, comment_id: str) -> List[Dict[str, Any]]:
+        """A comment followed by all of its replies, depth first."""
+        comment = self.by_id.get(comment_id)
+        if comment is None:
+            return []
+        result = [comment]
+        for reply_id in comment['replies']:
+            result.extend(self.thread(reply_id))
+        return result
+
+
+def load_comment_index(docx_path: str) -> CommentIndex:
+    """Build a CommentIndex straight from a DOCX file without loading it with python-docx."""
+    with zipfile.ZipFile(docx_path) as zf:
+        comments_root = extended_root = None
+        for rel in load_relationships(zf).values():
+            if rel['external']:
+                continue
+            kind = rel['type'].rsplit('/', 1)[-1]
+            if kind == 'comments':
+                comments_root = parse_part(zf, rel['target'])
+            elif kind == 'commentsExtended':
+                extended_root = parse_part(zf, rel['target'])
+        return CommentIndex.build(comments_root, extended_root, iter_body_blocks(zf))
+
+
+@lru_cache(maxsize=32)
+def _cached_comment_index(path: str, mtime_ns: int, size: int) -> CommentIndex:
+    return load_comment_index(path)
+
+
+def get_comment_index(docx_path: str) -> CommentIndex:
+    """
+    Return the CommentIndex of a file, reusing it until the file changes.
+
+    The cache key includes the modification time and size, so an edited
+    document is re-indexed on the next query. Returned comment dictionaries
+    are shared and must not be modified.
+    """
+    stat = os.stat(docx_path)
+    return _cached_comment_index(os.path.abspath(docx_path), stat.st_mtime_ns, stat.st_size)
+
+
+def read_paragraph_text(docx_path: str, paragraph_index: int) -> Optional[str]:
+    """Text of one body paragraph, streamed from the file; None if the index is out of range."""
+    with zipfile.ZipFile(docx_path) as zf:
+        current = -1
+        for block in iter_body_blocks(zf):
+            if block.tag == _W_P:
+                current += 1
+                if current == paragraph_index:
+                    return paragraph_text(block)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Writing comments
+# ---------------------------------------------------------------------------
+
+def _w(tag: str) -> str:
+    return f'{{{W_NS}}}{tag}'
+
+
+def _paragraph_runs(p) -> List:
+    """Runs that make up a paragraph's own text, in order (text boxes excluded)."""
+    runs = []
+    for child in p:
+        if child.tag == _W_R:
+            runs.append(child)
+        elif child.tag in _RUN_CONTAINERS:
+            runs.extend(_paragraph_runs(child))
+    return runs
+
+
+def _split_run(run, offset: int):
+    """
+    Split a w:r element so that its first `offset` characters (as counted by
+    run_text) stay in it and the rest move to a new run inserted after it.
+    Returns the new run, or None if offset falls at either end.
+    """
+    if offset <= 0 or offset >= len(run_text(run)):
+        return None
+    tail = etree.Element(_W_R)
+    rPr = run.find(_W_RPR)
+    if rPr is not None:
+        tail.append(copy.deepcopy(rPr))
+    position = 0
+    moving = False
+    for child in list(run):
+        if child.tag == _W_RPR:
+            continue
+        if moving:
+            tail.append(child)
+            continue
+        length = len(run_text([child]))
+        if position + length <= offset:
+            position += length
+            if position == offset:
+                moving = True
+            continue
+        # The split point is inside this w:t
+        keep = offset - position
+        second = copy.deepcopy(child)
+        child.text, second.text = child.text[:keep], child.text[keep:]
+        for node in (child, second):
+            node.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+        tail.append(second)
+        moving = True
+    run.addnext(tail)
+    return tail
+
+
+def _select_runs(p, anchor_text: Optional[str]):
+    """
+    Return (first run, last run) covering anchor_text in paragraph p, splitting
+    runs at the match boundaries; (None, None) anchors the whole paragraph.
+    """
+    if not anchor_text:
+        return None, None
+    runs = _paragraph_runs(p)
+    texts = [run_text(run) for run in runs]
+    start = ''.join(texts).find(anchor_text)
+    if start < 0:
+        raise ValueError(f"anchor_text '{anchor_text}' not found in paragraph")
+    end = start + len(anchor_text)
+    first = last = None
+    position = 0
+    for run, text in zip(runs, texts):
+        run_start, run_end = position, position + len(text)
+        position = run_end
+        if run_end <= start or run_start >= end or not text:
+            continue
+        if run_start < start:
+            run = _split_run(run, start - run_start)
+            run_start = start
+        if run_end > end:
+            _split_run(run, end - run_start)
+        if first is None:
+            first = run
+        last = run
+    return first, last
+
+
+def _top_level(element, p):
+    """The ancestor of element (or element itself) that is a direct child of p."""
+    while element.getparent() is not p:
+        element = element.getparent()
+    return element
+
+
+def _reference_run(comment_id: str):
+    run = etree.Element(_W_R)
+    reference = etree.SubElement(run, _REFERENCE)
+    reference.set(_W_ID, comment_id)
+    return run
+
+
+def _marker(tag: str, comment_id: str):
+    element = etree.Element(tag)
+    element.set(_W_ID, comment_id)
+    return element
+
+
+def _anchor_paragraphs(start_p, end_p, comment_id: str, anchor_text: Optional[str]) -> None:
+    """Insert the range markers and the reference run for a comment."""
+    first, last = _select_runs(start_p, anchor_text)
+    range_start = _marker(_RANGE_START, comment_id)
+    range_end = _marker(_RANGE_END, comment_id)
+    if first is not None:
+        first.addprevious(range_start)
+        last.addnext(range_end)
+        _top_level(range_end, end_p).addnext(_reference_run(comment_id))
+        return
+    pPr = start_p.find(_W_PPR)
+    if pPr is not None:
+        pPr.addnext(range_start)
+    else:
+        start_p.insert(0, range_start)
+    end_p.append(range_end)
+    end_p.append(_reference_run(comment_id))
+
+
+def _new_para_id(used: set) -> str:
+    # w14:paraId values must be below 0x80000000
+    while True:
+        value = f'{random.randint(1, 0x7FFFFFFF):08X}'
+        if value not in used:
+            used.add(value)
+            return value
+
+
+def _comment_element(comment_id: str, text: str, author: str, initials: str, date: str, used_ids: set):
+    comment = etree.Element(_W_COMMENT)
+    comment.set(_W_ID, comment_id)
+    comment.set(_w('author'), author)
+    comment.set(_w('date'), date)
+    if initials:
+        comment.set(_w('initials'), initials)
+    lines = text.split('\n')
+    for number, line in enumerate(lines):
+        p = etree.SubElement(comment, _W_P)
+        p.set(_PARA_ID, _new_para_id(used_ids))
+        if number == 0:
+            annotation = etree.SubElement(p, _W_R)
+            etree.SubElement(annotation, _w('annotationRef'))
+        run = etree.SubElement(p, _W_R)
+        t = etree.SubElement(run, _W_T)
+        t.text = line
+        t.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+    return comment
+
+
+def _last_para_id(comment, used_ids: set) -> str:
+    paragraphs = list(comment.iter(_W_P))
+    if not paragraphs:
+        paragraphs = [etree.SubElement(comment, _W_P)]
+    para_id = paragraphs[-1].get(_PARA_ID)
+    if not para_id:
+        para_id = _new_para_id(used_ids)
+        paragraphs[-1].set(_PARA_ID, para_id)
+    return para_id
+
+
+class _CommentParts:
+    """comments.xml and commentsExtended.xml of a package, loaded for editing."""
+
+    def __init__(self, zf: zipfile.ZipFile):
+        self.zf = zf
+        rels = load_relationships(zf)
+        self.comments_name = self.extended_name = None
+        for rel in rels.values():
+            kind = rel['type'].rsplit('/', 1)[-1]
+            if not rel['external'] and kind == 'comments':
+                self.comments_name = rel['target']
+            elif not rel['external'] and kind == 'commentsExtended':
+                self.extended_name = rel['target']
+        self.comments = parse_part(zf, self.comments_name) if self.comments_name else None
+        self.extended = parse_part(zf, self.extended_name) if self.extended_name else None
+        if self.comments is None:
+            self.comments = etree.Element(_w('comments'), nsmap={'w': W_NS, 'w14': W14_NS, 'mc': MC_NS})
+            self.comments.set(f'{{{MC_NS}}}Ignorable', 'w14')
+        self.by_id = {c.get(_W_ID): c for c in self.comments.iterchildren(_W_COMMENT)}
+        self.used_para_ids = {p.get(_PARA_ID) for p in self.comments.iter(_W_P) if p.get(_PARA_ID)}
+        self.extended_changed = False
+
+    def next_id(self) -> int:
+        ids = [int(value) for value in self.by_id if value and value.lstrip('-').isdigit()]
+        return max(ids, default=-1) + 1
+
+    def comment_ex(self, comment):
+        """The w15:commentEx entry of a comment, created if needed."""
+        if self.extended is None:
+            self.extended = etree.Element(f'{{{W15_NS}}}commentsEx', nsmap={'w15': W15_NS, 'mc': MC_NS})
+            self.extended.set(f'{{{MC_NS}}}Ignorable', 'w15')
+        para_id = _last_para_id(comment, self.used_para_ids)
+        for entry in self.extended.iter(_COMMENT_EX):
+            if entry.get(f'{{{W15_NS}}}paraId') == para_id:
+                return entry
+        entry = etree.SubElement(self.extended, _COMMENT_EX)
+        entry.set(f'{{{W15_NS}}}paraId', para_id)
+        entry.set(f'{{{W15_NS}}}done', '0')
+        return entry
+
+    def save(self, replacements: Dict[str, bytes]) -> None:
+        if self.comments_name is None:
+            self.comments_name = COMMENTS_PART
+            add_package_part(self.zf, replacements, COMMENTS_PART, COMMENTS_CT, COMMENTS_REL)
+        replacements[self.comments_name] = serialize_part(self.comments)
+        if self.extended is not None and self.extended_changed:
+            if self.extended_name is None:
+                self.extended_name = COMMENTS_EXTENDED_PART
+                add_package_part(self.zf, replacements, COMMENTS_EXTENDED_PART,
+                                 COMMENTS_EXTENDED_CT, COMMENTS_EXTENDED_REL)
+            replacements[self.extended_name] = serialize_part(self.extended)
+
+
+def _find_markers(root) -> Dict[str, Dict[str, Any]]:
+    """Locate the range markers and reference run of every comment in the document."""
+    markers: Dict[str, Dict[str, Any]] = {}
+    for node in root.iter(_RANGE_START, _RANGE_END, _REFERENCE):
+        entry = markers.setdefault(node.get(_W_ID), {})
+        if node.tag == _RANGE_START:
+            entry['start'] = node
+        elif node.tag == _RANGE_END:
+            entry['end'] = node
+        else:
+            entry['reference'] = node.getparent()
+    return markers
+
+
+def add_comments(docx_path: str, specs: List[Dict[str, Any]], output_path: Optional[str] = None) -> List[str]:
+    """
+    Add many comments to a DOCX file with one parse and one write of each part.
+
+    Each spec has paragraph_index, text and optionally author, initials,
+    anchor_text (a substring of the paragraph to anchor to; default: the
+    whole paragraph), end_paragraph_index (to span several paragraphs) or
+    reply_to (id of an existing comment to answer; the reply shares its
+    range). Specs must already be validated with validate_comment_specs.
+
+    Returns:
+        The ids of the new comments, in spec order
+    """
+    with zipfile.ZipFile(docx_path) as zf:
+        document = parse_part(zf, DOCUMENT_PART)
+        body = document.find(_W_BODY)
+        paragraphs = list(body.iterchildren(_W_P))
+        parts = _CommentParts(zf)
+        markers = _find_markers(document) if any(spec.get('reply_to') is not None for spec in specs) else {}
+        next_id = parts.next_id()
+        date = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        new_ids = []
+        for spec in specs:
+            comment_id = str(next_id)
+            next_id += 1
+            comment = _comment_element(comment_id, spec['text'], spec.get('author') or 'Reviewer',
+                                       spec.get('initials') or '', date, parts.used_para_ids)
+            parts.comments.append(comment)
+            parts.by_id[comment_id] = comment
+            reply_to = spec.get('reply_to')
+            if reply_to is not None:
+                parent = parts.by_id[str(reply_to)]
+                entry = parts.comment_ex(comment)
+                entry.set(f'{{{W15_NS}}}paraIdParent', _last_para_id(parent, parts.used_para_ids))
+                parts.comment_ex(parent)
+                parts.extended_changed = True
+                found = markers.get(str(reply_to), {})
+                if 'start' in found and 'end' in found:
+                    found['start'].addnext(_marker(_RANGE_START, comment_id))
+                    found['end'].addnext(_marker(_RANGE_END, comment_id))
+                if 'reference' in found:
+                    found['reference'].addnext(_reference_run(comment_id))
+                else:
+                    paragraphs[-1].append(_reference_run(comment_id))
+            else:
+                start = paragraphs[spec['paragraph_index']]
+                end_index = spec.get('end_paragraph_index')
+                end = paragraphs[end_index] if end_index is not None else start
+                _anchor_paragraphs(start, end, comment_id, spec.get('anchor_text'))
+            new_ids.append(comment_id)
+
+        replacements = {DOCUMENT_PART: serialize_part(document)}
+        parts.save(replacements)
+    rewrite_package(docx_path, replacements, output_path)
+    return new_ids
+
+
+def validate_comment_specs(docx_path: str, specs: Any) -> List[Dict[str, Any]]:
+    """
+    Check a batch of comment specs against a document before anything is written.
+
+    Raises:
+        ValueError: naming the first invalid spec
+    """
+    if not isinstance(specs, list) or not specs:
+        raise ValueError('comments must be a non-empty list')
+    index = get_comment_index(docx_path)
+    normalized = []
+    for position, spec in enumerate(specs):
+        prefix = f'Invalid comment {position}'
+        if not isinstance(spec, dict):
+            raise ValueError(f'{prefix}: each comment must be an object')
+        text = spec.get('text')
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f'{prefix}: text must be a non-empty string')
+        spec = dict(spec)
+        if spec.get('reply_to') is not None:
+            spec['reply_to'] = str(spec['reply_to'])
+            if spec['reply_to'] not in index.by_id:
+                raise ValueError(f"{prefix}: comment {spec['reply_to']} to reply to does not exist")
+            normalized.append(spec)
+            continue
+        try:
+            spec['paragraph_index'] = int(spec.get('paragraph_index'))
+            if spec.get('end_paragraph_index') is not None:
+                spec['end_paragraph_index'] = int(spec['end_paragraph_index'])
+        except (TypeError, ValueError):
+            raise ValueError(f'{prefix}: paragraph_index must be an integer')
+        first = spec['paragraph_index']
+        last = spec.get('end_paragraph_index')
+        last = first if last is None else last
+        if not 0 <= first <= last < index.paragraph_count:
+            raise ValueError(f"{prefix}: paragraph range is outside the document's "
+                             f"{index.paragraph_count} paragraphs")
+        if spec.get('anchor_text') and spec.get('end_paragraph_index') not in (None, spec['paragraph_index']):
+            raise ValueError(f'{prefix}: anchor_text can only be used within a single paragraph')
+        normalized.append(spec)
+    return normalized
+
+
+def resolve_comments(docx_path: str, comment_ids: List[str], resolved: bool = True,
+                     output_path: Optional[str] = None) -> int:
+    """
+    Mark comments as resolved (done) or reopen them, rewriting only the comment parts.
+
+    Returns:
+        Number of comments updated
+    """
+    with zipfile.ZipFile(docx_path) as zf:
+        parts = _CommentParts(zf)
+        missing = [comment_id for comment_id in comment_ids if str(comment_id) not in parts.by_id]
+        if missing:
+            raise ValueError(f"Comments not found: {', '.join(str(m) for m in missing)}")
+        for comment_id in comment_ids:
+            entry = parts.comment_ex(parts.by_id[str(comment_id)])
+            entry.set(f'{{{W15_NS}}}done', '1' if resolved else '0')
+        parts.extended_changed = True
+        replacements: Dict[str, bytes] = {}
+        parts.save(replacements)
+    rewrite_package(docx_path, replacements, output_path)
+    return len(comment_ids)
@@ -0,0 +1,645 @@
+"""
+Structural comparison of two Word documents.
+
+Each document is streamed once into a list of block signatures: the kind,
+style and text of every top-level paragraph and content control, and the
+cell texts of every table. Blocks are interned to integers and aligned with
+a patience diff (blocks that occur once in both documents anchor the
+alignment) and Myers' O(ND) algorithm between anchors, so unchanged runs of
+a long document cost one dictionary lookup per block. Only blocks left
+unmatched are examined closer: similar blocks are paired as modifications
+and their text is diffed word by word, tables row by row and cell by cell.
+
+A redline copy of the revised document can be written with the differences
+as tracked changes (w:ins/w:del), so Word shows them with its usual review
+tools.
+"""
+import copy
+import re
+import zipfile
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timezone
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from docx.oxml.ns import qn
+from lxml import etree
+
+from word_document_server.core.ooxml import (
+    W_NS, R_NS, DOCUMENT_PART, iter_body_blocks, load_style_names, get_style_id, paragraph_text, child_element,
+    parse_part, serialize_part, rewrite_package, BODY_BLOCK_TAGS
+)
+from word_document_server.core.table_export import iter_table_rows, cell_text
+
+# Edits Myers' algorithm may spend on one stretch between anchors before it is treated as rewritten
+MAX_EDIT_DISTANCE = 2000
+# How far ahead an unmatched block looks for a similar block to pair with
+_PAIR_WINDOW = 8
+_SIMILARITY = 0.5
+
+_W_P = qn('w:p')
+_W_R = qn('w:r')
+_W_T = qn('w:t')
+_W_TAB = qn('w:tab')
+_W_BR = qn('w:br')
+_W_CR = qn('w:cr')
+_W_TBL = qn('w:tbl')
+_W_TBL_PR = qn('w:tblPr')
+_W_TBL_STYLE = qn('w:tblStyle')
+_W_TR = qn('w:tr')
+_W_TC = qn('w:tc')
+_W_TC_PR = qn('w:tcPr')
+_W_TR_PR = qn('w:trPr')
+_W_TBL_PR_EX = qn('w:tblPrEx')
+_W_P_PR = qn('w:pPr')
+_W_R_PR = qn('w:rPr')
+_W_SECT_PR = qn('w:sectPr')
+_W_P_PR_CHANGE = qn('w:pPrChange')
+_W_INS = qn('w:ins')
+_W_DEL = qn('w:del')
+_W_DEL_TEXT = qn('w:delText')
+_W_INSTR_TEXT = qn('w:instrText')
+_W_DEL_INSTR_TEXT = qn('w:delInstrText')
+_W_HYPERLINK = qn('w:hyperlink')
+_W_ID = qn('w:id')
+_W_VAL = qn('w:val')
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+_W14_NS = 'http://schemas.microsoft.com/office/word/2010/wordml'
+
+_TOKEN_RE = re.compile(r'\w+|\s+|[^\w\s]')
+# Paragraph children and run children that an inline redline can rebuild without losing content
+_SIMPLE_PARAGRAPH_CHILDREN = {_W_P_PR, _W_R, qn('w:bookmarkStart'), qn('w:bookmarkEnd'), qn('w:proofErr')}
+_SIMPLE_RUN_CHILDREN = {_W_R_PR, _W_T, _W_TAB, _W_BR, _W_CR, qn('w:lastRenderedPageBreak')}
+# Elements that point into the old package (relationships, comments, notes) cannot be copied into the new one
+_DANGLING = {qn('w:commentRangeStart'), qn('w:commentRangeEnd'), qn('w:commentReference'),
+             qn('w:footnoteReference'), qn('w:endnoteReference'), qn('w:bookmarkStart'), qn('w:bookmarkEnd'),
+             qn('w:drawing'), qn('w:pict'), qn('w:object'), _W_SECT_PR}
+
+
+class Block(NamedTuple):
+    """Signature of a top-level block; equal blocks have equal signatures."""
+    kind: str
+    style: Optional[str]
+    text: str
+    rows: Optional[Tuple[Tuple[str, ...], ...]] = None
+
+
+def block_signature(element, style_names: Dict[str, str]) -> Block:
+    """Signature of a w:p, w:tbl or w:sdt element."""
+    if element.tag == _W_P:
+        style_id = get_style_id(element)
+        return Block('paragraph', style_names.get(style_id, style_id), paragraph_text(element))
+    if element.tag == _W_TBL:
+        style_id = None
+        tbl_pr = child_element(element, _W_TBL_PR)
+        if tbl_pr is not None:
+            style = child_element(tbl_pr, _W_TBL_STYLE)
+            style_id = style.get(_W_VAL) if style is not None else None
+        rows = tuple(tuple(row) for row in iter_table_rows(element))
+        return Block('table', style_names.get(style_id, style_id), _rows_text(rows), rows)
+    return Block('content_control', None, '\n'.join(paragraph_text(p) for p in element.iter(_W_P)))
+
+
+def _rows_text(rows) -> str:
+    return '\n'.join(' | '.join(row) for row in rows)
+
+
+def read_signatures(docx_path: str) -> List[Block]:
+    """Signatures of the top-level blocks of a document, read in one streaming pass."""
+    with zipfile.ZipFile(docx_path) as zf:
+        style_names = load_style_names(zf)
+        return [block_signature(block, style_names) for block in iter_body_blocks(zf)]
+
+
+def _myers(a: Sequence[int], b: Sequence[int], max_cost: int) -> Optional[List[Tuple[int, int]]]:
+    """Matched (i, j) pairs of a shortest edit script, or None if it needs more than max_cost edits."""
+    n, m = len(a), len(b)
+    offset = max_cost + 1
+    v = [0] * (2 * offset + 1)
+    trace = []
+    for d in range(min(n + m, max_cost) + 1):
+        # Only diagonals -d..d are reachable in round d; keep that window for the backtrack
+        trace.append(v[offset - d - 1:offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace: List[List[int]], x: int, y: int) -> List[Tuple[int, int]]:
+    matches = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+
+        def at(diagonal):
+            return v[diagonal + d + 1]
+
+        if k == -d or (k != d and at(k - 1) < at(k + 1)):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = at(prev_k)
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        x, y = prev_x, prev_y
+    matches.reverse()
+    return matches
+
+
+def _unique_anchors(a: Sequence[int], b: Sequence[int], alo: int, ahi: int, blo: int, bhi: int) -> List[Tuple[int, int]]:
+    """Longest increasing run of (i, j) pairs of items that occur exactly once in both ranges."""
+    count_a = Counter(a[alo:ahi])
+    count_b = Counter(b[blo:bhi])
+    position_b = {b[j]: j for j in range(blo, bhi) if count_b[b[j]] == 1}
+    pairs = [(i, position_b[a[i]]) for i in range(alo, ahi)
+             if count_a[a[i]] == 1 and a[i] in position_b]
+    if not pairs:
+        return []
+    # Patience sorting: longest increasing subsequence of the j positions
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for n, (_, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(n)
+        else:
+            tails[pile] = j
+            tail_index[pile] = n
+        previous[n] = tail_index[pile - 1] if pile else -1
+    result = []
+    n = tail_index[-1]
+    while n != -1:
+        result.append(pairs[n])
+        n = previous[n]
+    result.reverse()
+    return result
+
+
+def match_sequences(a: Sequence[int], b: Sequence[int], max_cost: int = MAX_EDIT_DISTANCE) -> List[Tuple[int, int]]:
+    """Matched (i, j) index pairs of two integer sequences, in increasing order."""
+    matches = []
+    ranges = [(0, len(a), 0, len(b))]
+    while ranges:
+        alo, ahi, blo, bhi = ranges.pop()
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            start_a, start_b = alo, blo
+            for i, j in anchors:
+                ranges.append((start_a, i, start_b, j))
+                matches.append((i, j))
+                start_a, start_b = i + 1, j + 1
+            ranges.append((start_a, ahi, start_b, bhi))
+            continue
+        found = _myers(a[alo:ahi], b[blo:bhi], max_cost)
+        # Too many edits: leave the stretch unmatched and let pairing treat it as rewritten
+        for i, j in found or ():
+            matches.append((alo + i, blo + j))
+    matches.sort()
+    return matches
+
+
+def similar_text(old: str, new: str) -> bool:
+    if old == new:
+        return True
+    if not old or not new:
+        return False
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    # The quick ratios are upper bounds: cheap rejects, never proof of similarity
+    return (matcher.real_quick_ratio() >= _SIMILARITY and matcher.quick_ratio() >= _SIMILARITY
+            and matcher.ratio() >= _SIMILARITY)
+
+
+def align(old: Sequence[Hashable], new: Sequence[Hashable],
+          similar: Callable[[int, int], bool]) -> List[Tuple[str, Optional[int], Optional[int]]]:
+    """
+    Align two sequences into ('equal' | 'modify', i, j), ('delete', i, None) and ('insert', None, j) steps.
+
+    Equal items are matched exactly; between matches, an old item is paired
+    with the first of the next few unmatched new items it is `similar` to.
+    """
+    ids: Dict[Hashable, int] = {}
+    a = [ids.setdefault(item, len(ids)) for item in old]
+    b = [ids.setdefault(item, len(ids)) for item in new]
+    steps = []
+    i = j = 0
+    for match_i, match_j in match_sequences(a, b) + [(len(a), len(b))]:
+        while i < match_i:
+            partner = next((n for n in range(j, min(match_j, j + _PAIR_WINDOW)) if similar(i, n)), None)
+            if partner is None:
+                steps.append(('delete', i, None))
+            else:
+                steps.extend(('insert', None, n) for n in range(j, partner))
+                steps.append(('modify', i, partner))
+                j = partner + 1
+            i += 1
+        steps.extend(('insert', None, n) for n in range(j, match_j))
+        if match_i < len(a):
+            steps.append(('equal', match_i, match_j))
+        i, j = match_i + 1, match_j + 1
+    return steps
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text)
+
+
+def text_diff(old: str, new: str) -> List[Tuple[str, str]]:
+    """(op, text) segments turning old into new, op being 'equal', 'delete' or 'insert'; diffed word by word."""
+    old_tokens, new_tokens = _tokens(old), _tokens(new)
+    segments = []
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, old_tokens, new_tokens, autojunk=False).get_opcodes():
+        if op == 'equal':
+            segments.append(('equal', ''.join(old_tokens[i1:i2])))
+            continue
+        if i2 > i1:
+            segments.append(('delete', ''.join(old_tokens[i1:i2])))
+        if j2 > j1:
+            segments.append(('insert', ''.join(new_tokens[j1:j2])))
+    return segments
+
+
+def _table_changes(old_rows, new_rows) -> List[Dict[str, Any]]:
+    changes = []
+    steps = align(old_rows, new_rows,
+                  lambda i, j: similar_text(' | '.join(old_rows[i]), ' | '.join(new_rows[j])))
+    for op, i, j in steps:
+        if op == 'insert':
+            changes.append({'type': 'inserted', 'new_row': j, 'cells': list(new_rows[j])})
+        elif op == 'delete':
+            changes.append({'type': 'deleted', 'old_row': i, 'cells': list(old_rows[i])})
+        elif op == 'modify':
+            old_row, new_row = old_rows[i], new_rows[j]
+            cells = []
+            for column in range(max(len(old_row), len(new_row))):
+                before = old_row[column] if column < len(old_row) else None
+                after = new_row[column] if column < len(new_row) else None
+                if before != after:
+                    cells.append({'column': column, 'old': before, 'new': after})
+            changes.append({'type': 'modified', 'old_row': i, 'new_row': j, 'cells': cells})
+    return changes
+
+
+def describe_changes(old_blocks: List[Block], new_blocks: List[Block],
+                     steps: List[Tuple[str, Optional[int], Optional[int]]],
+                     limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Turn alignment steps into the change list reported to clients, stopping after `limit` changes."""
+    changes = []
+    for op, i, j in steps:
+        if op == 'equal':
+            continue
+        if limit is not None and len(changes) >= limit:
+            break
+        if op == 'insert':
+            block = new_blocks[j]
+            changes.append({'type': 'inserted', 'kind': block.kind, 'new_index': j,
+                            'style': block.style, 'text': block.text})
+        elif op == 'delete':
+            block = old_blocks[i]
+            changes.append({'type': 'deleted', 'kind': block.kind, 'old_index': i,
+                            'style': block.style, 'text': block.text})
+        else:
+            old, new = old_blocks[i], new_blocks[j]
+            change: Dict[str, Any] = {'type': 'modified', 'kind': new.kind, 'old_index': i, 'new_index': j}
+            if old.style != new.style:
+                change['style'] = {'old': old.style, 'new': new.style}
+            if old.kind == 'table':
+                change['rows'] = _table_changes(old.rows, new.rows)
+            elif old.text != new.text:
+                change['diff'] = [{'op': op, 'text': text} for op, text in text_diff(old.text, new.text)]
+            changes.append(change)
+    return changes
+
+
+def _similar_blocks(old: Sequence[Block], new: Sequence[Block]) -> Callable[[int, int], bool]:
+    return lambda i, j: old[i].kind == new[j].kind and similar_text(old[i].text, new[j].text)
+
+
+class _Redline:
+    """Writes tracked-change markup into the revised document tree."""
+
+    def __init__(self, root, author: str, old_styles: Dict[str, str], new_styles: Dict[str, str]):
+        self.author = author
+        self.date = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        self.old_styles = old_styles
+        self.new_styles = new_styles
+        # Revision ids share one id space with comments and bookmarks
+        ids = [int(value) for value in root.xpath('//@w:id', namespaces={'w': W_NS}) if value.lstrip('-').isdigit()]
+        self.next_id = max(ids, default=0) + 1
+
+    def _revision(self, tag: str):
+        element = _element(tag)
+        element.set(_W_ID, str(self.next_id))
+        element.set(qn('w:author'), self.author)
+        element.set(qn('w:date'), self.date)
+        self.next_id += 1
+        return element
+
+    def _mark_paragraph(self, p, tag: str) -> None:
+        for run in [run for run in p.iter(_W_R) if run.getparent().tag not in (_W_INS, _W_DEL)]:
+            wrapper = self._revision(tag)
+            run.addprevious(wrapper)
+            wrapper.append(run)
+            if tag == _W_DEL:
+                for node in run:
+                    if node.tag == _W_T:
+                        node.tag = _W_DEL_TEXT
+                    elif node.tag == _W_INSTR_TEXT:
+                        node.tag = _W_DEL_INSTR_TEXT
+        p_pr = _ensure_first(p, _W_P_PR)
+        r_pr = child_element(p_pr, _W_R_PR)
+        if r_pr is None:
+            r_pr = _element(_W_R_PR)
+            # The paragraph mark properties precede sectPr and pPrChange
+            anchor = child_element(p_pr, _W_SECT_PR)
+            if anchor is None:
+                anchor = child_element(p_pr, _W_P_PR_CHANGE)
+            if anchor is not None:
+                anchor.addprevious(r_pr)
+            else:
+                p_pr.append(r_pr)
+        # Revision marks come before any formatting of the paragraph mark
+        r_pr.insert(0, self._revision(tag))
+
+    def mark(self, element, tag: str) -> None:
+        """Mark a block (paragraph, table or content control) as inserted or deleted."""
+        for p in ([element] if element.tag == _W_P else list(element.iter(_W_P))):
+            self._mark_paragraph(p, tag)
+        for tr in ([element] if element.tag == _W_TR else list(element.iter(_W_TR))):
+            tr_pr = child_element(tr, _W_TR_PR)
+            if tr_pr is None:
+                tr_pr = _element(_W_TR_PR)
+                tbl_pr_ex = child_element(tr, _W_TBL_PR_EX)
+                if tbl_pr_ex is not None:
+                    tbl_pr_ex.addnext(tr_pr)
+                else:
+                    tr.insert(0, tr_pr)
+            tr_pr.append(self._revision(tag))
+
+    def deleted_copy(self, element):
+        """Copy of an old block, stripped of references into the old package and marked deleted."""
+        element = copy.deepcopy(element)
+        for node in list(element.iter()):
+            if node.tag in _DANGLING and node.getparent() is not None:
+                node.getparent().remove(node)
+        for link in list(element.iter(_W_HYPERLINK)):
+            for child in list(link):
+                link.addprevious(child)
+            link.getparent().remove(link)
+        for node in element.iter():
+            for name in [name for name in node.attrib
+                         if name.startswith(f'{{{R_NS}}}') or name.startswith(f'{{{_W14_NS}}}')]:
+                del node.attrib[name]
+        self.mark(element, _W_DEL)
+        return element
+
+    def apply(self, container, old: List, new: List, steps) -> None:
+        """Apply alignment steps between old and new blocks (children of `container`) as tracked changes."""
+        last = None
+        for op, i, j in steps:
+            if op == 'equal':
+                last = new[j]
+            elif op == 'insert':
+                self.mark(new[j], _W_INS)
+                last = new[j]
+            elif op == 'delete':
+                removed = self.deleted_copy(old[i])
+                if last is not None:
+                    last.addnext(removed)
+                else:
+                    # Cell properties stay the first child of a cell
+                    first = container[0] if len(container) else None
+                    container.insert(1 if first is not None and first.tag == _W_TC_PR else 0, removed)
+                last = removed
+            else:
+                self.modify(old[i], new[j])
+                last = new[j]
+
+    def replace(self, old, new) -> None:
+        new.addprevious(self.deleted_copy(old))
+        self.mark(new, _W_INS)
+
+    def modify(self, old, new) -> None:
+        if old.tag == new.tag == _W_P and self.paragraph(old, new):
+            return
+        if old.tag == new.tag == _W_TBL:
+            self.table(old, new)
+            return
+        self.replace(old, new)
+
+    def paragraph(self, old, new) -> bool:
+        """Redline a paragraph in place, word by word; False if it holds content that cannot be rebuilt."""
+        if not (_is_simple(old) and _is_simple(new)):
+            return False
+        old_chars, new_chars = _styled_chars(old), _styled_chars(new)
+        old_text = ''.join(char for char, _ in old_chars)
+        new_text = ''.join(char for char, _ in new_chars)
+        runs = []
+        old_pos = new_pos = 0
+        for op, text in text_diff(old_text, new_text):
+            if op == 'delete':
+                runs.append(self._revision(_W_DEL))
+                runs[-1].extend(_build_runs(old_chars[old_pos:old_pos + len(text)], deleted=True))
+                old_pos += len(text)
+                continue
+            built = _build_runs(new_chars[new_pos:new_pos + len(text)])
+            if op == 'insert':
+                runs.append(self._revision(_W_INS))
+                runs[-1].extend(built)
+            else:
+                runs.extend(built)
+                old_pos += len(text)
+            new_pos += len(text)
+        for child in list(new):
+            if child.tag == _W_R:
+                new.remove(child)
+        new.extend(runs)
+        old_style, new_style = get_style_id(old), get_style_id(new)
+        if self.old_styles.get(old_style, old_style) != self.new_styles.get(new_style, new_style):
+            self._style_change(old, new)
+        return True
+
+    def _style_change(self, old, new) -> None:
+        old_p_pr = child_element(old, _W_P_PR)
+        previous = copy.deepcopy(old_p_pr) if old_p_pr is not None else _element(_W_P_PR)
+        for child in list(previous):
+            if child.tag in (_W_R_PR, _W_SECT_PR, _W_P_PR_CHANGE):
+                previous.remove(child)
+        change = self._revision(_W_P_PR_CHANGE)
+        change.append(previous)
+        _ensure_first(new, _W_P_PR).append(change)
+
+    def table(self, old, new) -> None:
+        old_rows, new_rows = _own(old, _W_TR, _W_TBL), _own(new, _W_TR, _W_TBL)
+        old_keys = [tuple(cell_text(tc) for tc in _own(tr, _W_TC, _W_TR)) for tr in old_rows]
+        new_keys = [tuple(cell_text(tc) for tc in _own(tr, _W_TC, _W_TR)) for tr in new_rows]
+        steps = align(old_keys, new_keys,
+                      lambda i, j: similar_text(' | '.join(old_keys[i]), ' | '.join(new_keys[j])))
+        last = None
+        for op, i, j in steps:
+            if op == 'equal':
+                last = new_rows[j]
+            elif op == 'insert':
+                self.mark(new_rows[j], _W_INS)
+                last = new_rows[j]
+            elif op == 'delete':
+                removed = self.deleted_copy(old_rows[i])
+                if last is not None:
+                    last.addnext(removed)
+                else:
+                    new_rows[0].addprevious(removed)
+                last = removed
+            else:
+                old_cells, new_cells = _own(old_rows[i], _W_TC, _W_TR), _own(new_rows[j], _W_TC, _W_TR)
+                if len(old_cells) == len(new_cells):
+                    for old_tc, new_tc, old_key, new_key in zip(old_cells, new_cells, old_keys[i], new_keys[j]):
+                        if old_key != new_key:
+                            self.cell(old_tc, new_tc)
+                else:
+                    self.replace(old_rows[i], new_rows[j])
+                last = new_rows[j]
+
+    def cell(self, old, new) -> None:
+        old_blocks = [child for child in old if child.tag in BODY_BLOCK_TAGS]
+        new_blocks = [child for child in new if child.tag in BODY_BLOCK_TAGS]
+        old_sigs = [block_signature(block, self.old_styles) for block in old_blocks]
+        new_sigs = [block_signature(block, self.new_styles) for block in new_blocks]
+        self.apply(new, old_blocks, new_blocks, align(old_sigs, new_sigs, _similar_blocks(old_sigs, new_sigs)))
+
+
+def _element(tag: str):
+    return etree.Element(tag)
+
+
+def _ensure_first(parent, tag: str):
+    child = child_element(parent, tag)
+    if child is None:
+        child = _element(tag)
+        parent.insert(0, child)
+    return child
+
+
+def _own(parent, tag: str, owner_tag: str) -> List:
+    """`tag` descendants of parent whose nearest `owner_tag` ancestor is parent (skips nested tables)."""
+    return [node for node in parent.iter(tag) if next(node.iterancestors(owner_tag)) is parent]
+
+
+def _is_simple(p) -> bool:
+    return all(child.tag in _SIMPLE_PARAGRAPH_CHILDREN for child in p) and \
+        all(node.tag in _SIMPLE_RUN_CHILDREN for run in p.iterchildren(_W_R) for node in run)
+
+
+def _styled_chars(p) -> List[Tuple[str, Any]]:
+    """(character, w:rPr) pairs of a simple paragraph, matching paragraph_text character for character."""
+    chars = []
+    for run in p.iterchildren(_W_R):
+        r_pr = child_element(run, _W_R_PR)
+        for node in run:
+            if node.tag == _W_T:
+                chars.extend((char, r_pr) for char in node.text or '')
+            elif node.tag == _W_TAB:
+                chars.append(('\t', r_pr))
+            elif node.tag == _W_BR:
+                chars.append(('\n', r_pr))
+    return chars
+
+
+def _build_runs(chars: List[Tuple[str, Any]], deleted: bool = False) -> List:
+    runs = []
+    text_tag = _W_DEL_TEXT if deleted else _W_T
+    for char, r_pr in chars:
+        if not runs or runs[-1][0] is not r_pr:
+            run = _element(_W_R)
+            if r_pr is not None:
+                run.append(copy.deepcopy(r_pr))
+            runs.append((r_pr, run))
+        run = runs[-1][1]
+        if char == '\t':
+            run.append(_element(_W_TAB))
+        elif char == '\n':
+            run.append(_element(_W_BR))
+        else:
+            last = run[-1] if len(run) else None
+            if last is None or last.tag != text_tag:
+                last = _element(text_tag)
+                last.set(_XML_SPACE, 'preserve')
+                last.text = ''
+                run.append(last)
+            last.text += char
+    return [run for _, run in runs]
+
+
+def write_redline(old_path: str, new_path: str, steps, output_path: str, author: str) -> None:
+    """Write a copy of the revised document with the aligned differences as tracked changes."""
+    with zipfile.ZipFile(old_path) as zf:
+        old_root = parse_part(zf, DOCUMENT_PART)
+        old_styles = load_style_names(zf)
+    with zipfile.ZipFile(new_path) as zf:
+        new_root = parse_part(zf, DOCUMENT_PART)
+        new_styles = load_style_names(zf)
+    old_body, new_body = old_root.find(qn('w:body')), new_root.find(qn('w:body'))
+    old_blocks = [child for child in old_body if child.tag in BODY_BLOCK_TAGS]
+    new_blocks = [child for child in new_body if child.tag in BODY_BLOCK_TAGS]
+    _Redline(new_root, author, old_styles, new_styles).apply(new_body, old_blocks, new_blocks, steps)
+    rewrite_package(new_path, {DOCUMENT_PART: serialize_part(new_root)}, output_path)
+
+
+def compare_documents(old_path: str, new_path: str, redline_path: Optional[str] = None,
+                      author: str = 'Compare', limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compare two documents block by block.
+
+    Only the first `limit` changes are described (and text-diffed); the
+    summary always counts all of them.
+
+    Returns:
+        Dict with a summary (block counts and the number of inserted,
+        deleted and modified blocks), the list of changes and whether it
+        was truncated. Indices are positions among the top-level blocks
+        (paragraphs, tables and content controls) of the original and
+        revised document.
+    """
+    old_blocks = read_signatures(old_path)
+    new_blocks = read_signatures(new_path)
+    steps = align(old_blocks, new_blocks, _similar_blocks(old_blocks, new_blocks))
+    counts = Counter(op for op, _, _ in steps)
+    if redline_path:
+        write_redline(old_path, new_path, steps, redline_path, author)
+    changes = describe_changes(old_blocks, new_blocks, steps, limit)
+    return {
+        'summary': {
+            'original_blocks': len(old_blocks),
+            'revised_blocks': len(new_blocks),
+            'unchanged': counts['equal'],
+            'inserted': counts['insert'],
+            'deleted': counts['delete'],
+            'modified': counts['modify'],
+        },
+        'changes': changes,
+        'truncated': len(changes) < len(steps) - counts['equal'],
+    }
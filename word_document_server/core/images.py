@@ -0,0 +1,138 @@
+"""
+Image preparation for pictures inserted by Word Document Server.
+
+Pictures are embedded at the resolution they are displayed at rather than
+byte-for-byte: an image wider than its display width needs at `dpi` is
+downscaled, camera EXIF rotation is applied, and the result is re-encoded
+(optimized JPEG for photos, optimized PNG for everything lossless). Pillow is
+an optional dependency; without it images are embedded unchanged.
+
+python-docx reuses an image part whose bytes hash equal to the inserted
+image, and re-encoding is deterministic, so inserting the same picture at the
+same size again never adds another media part. A picture whose original bytes
+are already embedded is reused as-is.
+"""
+import hashlib
+import io
+from typing import Any, Dict, Optional, Tuple
+
+from docx.shared import Inches, Length
+
+DEFAULT_DPI = 220
+DEFAULT_JPEG_QUALITY = 85
+
+# Formats stored as they are: animation and vector data would be lost by re-encoding
+_KEEP_FORMATS = {'GIF', 'WMF', 'EMF', 'SVG'}
+_EXIF_ORIENTATION = 0x0112
+
+
+def _existing_image_part(doc, sha1: str):
+    for image_part in doc.part.package.image_parts:
+        if image_part.sha1 == sha1:
+            return image_part
+    return None
+
+
+def text_width(doc) -> Optional[Length]:
+    """Width between the margins of the document's last section, if it is known."""
+    section = doc.sections[-1]
+    if section.page_width is None or section.left_margin is None or section.right_margin is None:
+        return None
+    return Length(section.page_width - section.left_margin - section.right_margin)
+
+
+def prepare_image(data: bytes, display_width: Optional[Length], dpi: int = DEFAULT_DPI,
+                  quality: int = DEFAULT_JPEG_QUALITY) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Downscale and re-encode image bytes for display at `display_width`.
+
+    When display_width is None the image's own size (from its DPI
+    metadata) is used. The original bytes are returned unchanged when
+    Pillow is not installed, the format is kept as-is, or re-encoding would
+    neither shrink nor resize the image.
+
+    Returns:
+        (image bytes, info) where info holds the original and final pixel
+        sizes and byte counts
+    """
+    info: Dict[str, Any] = {'original_bytes': len(data), 'bytes': len(data), 'resized': False}
+    try:
+        from PIL import Image, ImageOps  # type: ignore
+    except ImportError:
+        return data, info
+
+    with Image.open(io.BytesIO(data)) as source:
+        fmt = source.format
+        info['original_pixels'] = info['pixels'] = source.size
+        if fmt in _KEEP_FORMATS or getattr(source, 'n_frames', 1) > 1:
+            return data, info
+        # Orientation 1 (or none) means the pixels are already upright
+        rotated = source.getexif().get(_EXIF_ORIENTATION, 1) != 1
+        image = ImageOps.exif_transpose(source)
+
+        if display_width is None:
+            source_dpi = (source.info.get('dpi') or (72, 72))[0] or 72
+            display_inches = image.width / float(source_dpi)
+        else:
+            display_inches = display_width / Inches(1)
+        target_width = max(1, round(display_inches * dpi))
+        if image.width > target_width:
+            target_height = max(1, round(image.height * target_width / image.width))
+            image = image.resize((target_width, target_height), Image.LANCZOS)
+            info['resized'] = True
+
+        out = io.BytesIO()
+        options = {'optimize': True}
+        if display_inches:
+            # Pixels per inch that keep the display size when the image is inserted without a width
+            options['dpi'] = (image.width / display_inches,) * 2
+        if fmt == 'JPEG':
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.save(out, 'JPEG', quality=quality, progressive=True, **options)
+        else:
+            # Everything else is stored losslessly
+            if image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P', '1'):
+                image = image.convert('RGBA')
+            image.save(out, 'PNG', **options)
+    result = out.getvalue()
+    if not info['resized'] and not rotated and len(result) >= len(data):
+        return data, info
+    info['pixels'] = image.size
+    info['bytes'] = len(result)
+    return result, info
+
+
+def add_picture(doc, image_path: str, width: Optional[Length] = None, dpi: int = DEFAULT_DPI,
+                quality: int = DEFAULT_JPEG_QUALITY, optimize: bool = True):
+    """
+    Add a picture to the end of a document through the image pipeline.
+
+    Without an explicit width the picture keeps its natural size, capped at
+    the text width of the last section.
+
+    Returns:
+        (InlineShape, info) where info describes the embedded image and
+        whether an existing media part was reused
+    """
+    with open(image_path, 'rb') as f:
+        data = f.read()
+    info: Dict[str, Any] = {'original_bytes': len(data), 'bytes': len(data), 'resized': False}
+    if optimize and _existing_image_part(doc, hashlib.sha1(data).hexdigest()) is None:
+        if width is None:
+            natural, limit = _natural_width(data), text_width(doc)
+            if natural is not None and limit is not None and natural > limit:
+                width = limit
+        data, info = prepare_image(data, width, dpi, quality)
+    info['reused'] = _existing_image_part(doc, hashlib.sha1(data).hexdigest()) is not None
+    shape = doc.add_picture(io.BytesIO(data), width=width)
+    return shape, info
+
+
+def _natural_width(data: bytes) -> Optional[Length]:
+    """Display width python-docx gives an image inserted without a width."""
+    from docx.image.image import Image as DocxImage
+    try:
+        return DocxImage.from_blob(data).width
+    except Exception:
+        return None
@@ -0,0 +1,369 @@
+"""
+Persistent conversion job queue for Word Document Server.
+
+Jobs are stored in a local SQLite database so they survive server restarts.
+A bounded pool of worker threads claims queued jobs by priority, keeps any
+single client from occupying every worker, and retries failed conversions
+with exponential backoff.
+
+Several server processes may share the database. A claimed job carries the
+pid of its process and a lease that the process renews while the job runs;
+only jobs whose lease has expired (their process died or hung) are put back
+on the queue.
+"""
+import asyncio
+import inspect
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Set
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser('~'), '.word_document_server', 'jobs.sqlite3')
+DEFAULT_PRIORITY = 5
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 300.0
+LEASE_DURATION = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    conversion TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    output_path TEXT,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    progress REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    next_run_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner_pid INTEGER,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority, next_run_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_client ON jobs (client_id, status);
+"""
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff before retry number `attempt` (1-based): 2s, 4s, 8s, ... capped at 5 minutes."""
+    return min(RETRY_BASE_DELAY * (2 ** (attempt - 1)), RETRY_MAX_DELAY)
+
+
+class JobStore:
+    """SQLite-backed storage and scheduling for conversion jobs."""
+
+    def __init__(self, db_path: str, lease_duration: float = LEASE_DURATION):
+        self.db_path = db_path
+        self.lease_duration = lease_duration
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            # Databases created before leases were introduced
+            for column, kind in (('owner_pid', 'INTEGER'), ('lease_expires_at', 'REAL')):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {kind}')
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived autocommit connection per operation keeps the store safe to share between threads
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, conversion: str, input_path: str, output_path: Optional[str] = None,
+               priority: int = DEFAULT_PRIORITY, client_id: str = 'default', max_attempts: int = 3) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, client_id, conversion, input_path, output_path, priority, status, '
+                'max_attempts, created_at, next_run_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, client_id, conversion, input_path, output_path, int(priority), QUEUED,
+                 max(1, int(max_attempts)), now, now)
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def claim(self, max_per_client: int) -> Optional[Dict[str, Any]]:
+        """
+        Atomically move the next runnable job to 'running' and return it.
+
+        Higher priority wins; among equal priorities the client with the fewest
+        running jobs goes first, and clients already at max_per_client wait.
+        The job is leased to this process for lease_duration seconds; jobs
+        whose lease has expired are requeued first.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._requeue_expired(conn, now)
+                row = conn.execute(
+                    'SELECT j.* FROM jobs j '
+                    'LEFT JOIN (SELECT client_id, COUNT(*) AS running FROM jobs WHERE status = ? '
+                    '           GROUP BY client_id) r ON r.client_id = j.client_id '
+                    'WHERE j.status = ? AND j.next_run_at <= ? AND COALESCE(r.running, 0) < ? '
+                    'ORDER BY j.priority DESC, COALESCE(r.running, 0) ASC, j.created_at ASC LIMIT 1',
+                    (RUNNING, QUEUED, now, max_per_client)
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        'UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, progress = NULL, '
+                        'owner_pid = ?, lease_expires_at = ? WHERE id = ?',
+                        (RUNNING, now, os.getpid(), now + self.lease_duration, row['id'])
+                    )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        if row is None:
+            return None
+        job = dict(row)
+        job['attempts'] += 1
+        job['status'] = RUNNING
+        job['owner_pid'] = os.getpid()
+        job['lease_expires_at'] = now + self.lease_duration
+        return job
+
+    def next_wakeup(self) -> Optional[float]:
+        """Return when the earliest queued job becomes runnable, or None if nothing is queued."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT MIN(next_run_at) FROM jobs WHERE status = ?', (QUEUED,)).fetchone()
+        return row[0]
+
+    def set_progress(self, job_id: str, progress: float) -> None:
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET progress = ?, lease_expires_at = ? WHERE id = ?',
+                         (progress, time.time() + self.lease_duration, job_id))
+
+    def renew_leases(self, job_ids: List[str]) -> int:
+        """Extend the leases of running jobs owned by this process (the worker heartbeat)."""
+        if not job_ids:
+            return 0
+        placeholders = ', '.join('?' * len(job_ids))
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f'UPDATE jobs SET lease_expires_at = ? WHERE status = ? AND owner_pid = ? AND id IN ({placeholders})',
+                (time.time() + self.lease_duration, RUNNING, os.getpid(), *job_ids)
+            )
+            return cursor.rowcount
+
+    def complete(self, job_id: str, result: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = NULL, progress = 1.0, finished_at = ? WHERE id = ?',
+                (SUCCEEDED, result, time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str) -> str:
+        """Record a failed attempt; requeue with backoff or mark the job failed. Returns the new status."""
+        job = self.get(job_id)
+        if job is None:
+            return FAILED
+        with self._connect() as conn:
+            if job['attempts'] < job['max_attempts']:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, next_run_at = ? WHERE id = ?',
+                    (QUEUED, error, time.time() + retry_delay(job['attempts']), job_id)
+                )
+                return QUEUED
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                (FAILED, error, time.time(), job_id)
+            )
+        return FAILED
+
+    @staticmethod
+    def _requeue_expired(conn, now: float) -> int:
+        cursor = conn.execute(
+            'UPDATE jobs SET status = ?, next_run_at = ?, owner_pid = NULL, lease_expires_at = NULL '
+            'WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)',
+            (QUEUED, now, RUNNING, now)
+        )
+        return cursor.rowcount
+
+    def requeue_expired(self) -> int:
+        """Put running jobs whose lease has expired (their process died) back on the queue."""
+        with self._connect() as conn:
+            return self._requeue_expired(conn, time.time())
+
+    def count(self, status: str) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (status,)).fetchone()[0]
+
+
+class JobQueue:
+    """A bounded pool of worker threads draining a JobStore."""
+
+    def __init__(self, store: JobStore, runner: Callable[[Dict[str, Any], Callable[[float], None]], str],
+                 workers: int = 2, max_per_client: Optional[int] = None, poll_interval: float = 1.0):
+        self.store = store
+        self.runner = runner
+        self.workers = max(1, workers)
+        # Leave at least one worker free for other clients when there is more than one
+        self.max_per_client = max_per_client or max(1, self.workers - 1)
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        # Ids of the jobs this queue's workers are running, kept alive by the heartbeat thread
+        self._active: Set[str] = set()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self.store.requeue_expired()
+            self._stop.clear()
+            for n in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'conversion-worker-{n}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat, name='conversion-heartbeat', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        with self._lock:
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job has been submitted."""
+        self._wakeup.set()
+
+    def _idle_wait(self) -> None:
+        timeout = self.poll_interval
+        next_run = self.store.next_wakeup()
+        if next_run is not None:
+            timeout = min(timeout, max(0.0, next_run - time.time()))
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.store.lease_duration / 3):
+            try:
+                self.store.renew_leases(list(self._active))
+            except sqlite3.OperationalError:
+                pass
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim(self.max_per_client)
+            except sqlite3.OperationalError:
+                job = None
+            if job is None:
+                self._idle_wait()
+                continue
+            self._active.add(job['id'])
+            try:
+                result = self.runner(job, lambda value, job_id=job['id']: self.store.set_progress(job_id, value))
+            except Exception as e:
+                self.store.fail(job['id'], str(e) or type(e).__name__)
+            else:
+                self.store.complete(job['id'], result)
+            finally:
+                self._active.discard(job['id'])
+            # Another job may now be runnable for the client that just finished
+            self._wakeup.set()
+
+
+class ConversionFailed(Exception):
+    """A queued conversion did not produce its output; the message is the tool's reply."""
+
+
+def run_conversion(job: Dict[str, Any], report_progress: Callable[[float], None]) -> str:
+    """
+    Run a conversion job by calling the matching convert_* tool.
+
+    Returns the tool's message; raises ConversionFailed when the tool did not
+    return a ConversionResult.
+    """
+    from word_document_server.tools import extended_document_tools
+    func = getattr(extended_document_tools, job['conversion'], None)
+    if func is None or not job['conversion'].startswith('convert_'):
+        raise ConversionFailed(f"Unknown conversion: {job['conversion']}")
+    kwargs = {}
+    if 'progress_callback' in inspect.signature(func).parameters:
+        kwargs['progress_callback'] = lambda done, total, message=None: report_progress(done / total if total else 1.0)
+    result = asyncio.run(func(job['input_path'], job['output_path'], **kwargs))
+    if not isinstance(result, extended_document_tools.ConversionResult):
+        raise ConversionFailed(result or 'Conversion returned no result')
+    return result
+
+
+def available_conversions() -> List[str]:
+    """Names of the conversion tools that can be queued."""
+    from word_document_server.tools import extended_document_tools
+    return sorted(name for name, value in vars(extended_document_tools).items()
+                  if name.startswith('convert_') and inspect.iscoroutinefunction(value))
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue(start: bool = True) -> JobQueue:
+    """
+    Return the process-wide job queue, creating it on first use.
+
+    Configured with MCP_JOB_DB (database path) and MCP_JOB_WORKERS (worker count).
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            store = JobStore(os.getenv('MCP_JOB_DB', DEFAULT_DB_PATH))
+            _queue = JobQueue(store, run_conversion, workers=int(os.getenv('MCP_JOB_WORKERS', '2')))
+    if start:
+        _queue.start()
+    return _queue
+
+
+def job_to_dict(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job row."""
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'conversion': job['conversion'],
+        'input_path': job['input_path'],
+        'output_path': job['output_path'],
+        'client_id': job['client_id'],
+        'priority': job['priority'],
+        'attempts': job['attempts'],
+        'max_attempts': job['max_attempts'],
+        'progress': job['progress'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'next_run_at': job['next_run_at'] if job['status'] == QUEUED else None,
+    }
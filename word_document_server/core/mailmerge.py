@@ -0,0 +1,442 @@
+"""
+Template rendering (mail merge) for Word Document Server.
+
+Templates use mustache-style tags typed anywhere in the document body,
+headers, footers and notes:
+
+- {{name}} or {{customer.name}} is replaced by the value from the record
+- a paragraph holding only {{#items}} ... a paragraph holding only {{/items}}
+  is a block section: kept once when the value is truthy, repeated for each
+  element when it is a list, and dropped otherwise; {{^items}} inverts it
+- a section opened and closed in different rows of a table repeats (or
+  hides) those whole rows, e.g. {{#lines}} in the first cell of a row and
+  {{/lines}} in its last cell makes one row per element of `lines`
+- a section opened and closed inside the same paragraph applies to the
+  text in between; sections placed any other way are rejected when the
+  template is compiled
+
+Inside a section, names are looked up in the current list element first,
+then in the enclosing scopes; {{.}} is the element itself.
+
+A template is compiled once: placeholders that Word split across runs are
+joined into a single run, and each templated part is serialized and cut
+into literal XML fragments and slots. Rendering a record is then string
+concatenation. Every output starts as a byte copy of a base package that
+already holds all untouched parts, and only the rendered parts are
+appended, so nothing else is re-read or re-compressed per record.
+"""
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from lxml import etree
+from docx.oxml.ns import qn
+
+from word_document_server.core.ooxml import W_NS, DOCUMENT_PART, escape_xml_text, serialize_part
+from word_document_server.utils.file_utils import atomic_output
+
+_W_P = qn('w:p')
+_W_T = qn('w:t')
+_W_TR = qn('w:tr')
+_W_TC = qn('w:tc')
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+_W14_NS = 'http://schemas.microsoft.com/office/word/2010/wordml'
+# Paragraph ids must stay unique, and repeated content would duplicate them; Word regenerates them
+_PARAGRAPH_IDS = (f'{{{_W14_NS}}}paraId', f'{{{_W14_NS}}}textId')
+
+_TAG_RE = re.compile(r'\{\{\s*([#^/]?)\s*([\w.\-]+|\.)\s*\}\}')
+_PI_TARGET = 'mail-merge'
+_COMPILED_RE = re.compile(r'<\?mail-merge ([#^/])(\S+)\?>|\{\{\s*([\w.\-]+|\.)\s*\}\}')
+_TEMPLATED_PART_RE = re.compile(r'^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$')
+_UNSAFE_FILENAME_RE = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+_CHUNK_SIZE = 100
+
+
+def _own_texts(p) -> List:
+    """w:t elements of a paragraph, excluding those of paragraphs nested in it (text boxes)."""
+    return [t for t in p.iter(_W_T) if next(t.iterancestors(_W_P)) is p]
+
+
+def _join_split_tags(p) -> None:
+    """Move every tag whose text Word split over several w:t elements into the first of them."""
+    texts = _own_texts(p)
+    if len(texts) < 2:
+        return
+    offsets = []
+    position = 0
+    for t in texts:
+        offsets.append(position)
+        position += len(t.text or '')
+    full = ''.join(t.text or '' for t in texts)
+
+    def node_at(index):
+        n = len(offsets) - 1
+        while offsets[n] > index:
+            n -= 1
+        return n
+
+    # Last match first, so earlier offsets stay valid
+    for match in reversed(list(_TAG_RE.finditer(full))):
+        first, last = node_at(match.start()), node_at(match.end() - 1)
+        if first == last:
+            continue
+        head = texts[first]
+        head.text = (head.text or '')[:match.start() - offsets[first]] + match.group(0)
+        head.set(_XML_SPACE, 'preserve')
+        for t in texts[first + 1:last]:
+            t.text = ''
+        tail = texts[last]
+        tail.text = (tail.text or '')[match.end() - offsets[last]:]
+        tail.set(_XML_SPACE, 'preserve')
+
+
+def _section_tags(element) -> List[Tuple[Any, re.Match]]:
+    """(w:t, match) for each section tag ({{#x}}, {{^x}}, {{/x}}) under element."""
+    found = []
+    for t in element.iter(_W_T):
+        for match in _TAG_RE.finditer(t.text or ''):
+            if match.group(1):
+                found.append((t, match))
+    return found
+
+
+def _remove_tag(t, match) -> None:
+    t.text = t.text.replace(match.group(0), '', 1)
+    t.set(_XML_SPACE, 'preserve')
+
+
+def _marker(kind: str, name: str):
+    return etree.ProcessingInstruction(_PI_TARGET, f'{kind}{name}')
+
+
+def _mark_row_sections(root) -> None:
+    """Turn section tags that open and close in different table rows into markers around the rows."""
+    for tr in list(root.iter(_W_TR)):
+        for t, match in _section_tags(tr):
+            kind, name = match.group(1), match.group(2)
+            cell = next(t.iterancestors(_W_TC))
+            # Its counterpart in the same cell makes it an inline or block section instead
+            counterparts = ('#', '^') if kind == '/' else ('/',)
+            if any(m.group(2) == name and m.group(1) in counterparts for _, m in _section_tags(cell)):
+                continue
+            _remove_tag(t, match)
+            if kind == '/':
+                tr.addnext(_marker('/', name))
+            else:
+                tr.addprevious(_marker(kind, name))
+
+
+def _mark_block_sections(root) -> None:
+    """Turn paragraphs consisting of a single section tag into markers."""
+    for p in list(root.iter(_W_P)):
+        match = _TAG_RE.fullmatch(''.join(t.text or '' for t in _own_texts(p)).strip())
+        if match and match.group(1) and p.getparent() is not None:
+            p.getparent().replace(p, _marker(match.group(1), match.group(2)))
+
+
+def _split_at_section_tags(t) -> None:
+    """Replace the section tags in the text of a w:t with markers inside it."""
+    text = t.text
+    tail, position = None, 0
+    for match in _TAG_RE.finditer(text):
+        if not match.group(1):
+            continue
+        marker = _marker(match.group(1), match.group(2))
+        t.append(marker)
+        if tail is None:
+            t.text = text[:match.start()]
+        else:
+            tail.tail = text[position:match.start()]
+        tail, position = marker, match.end()
+    if tail is not None:
+        tail.tail = text[position:]
+        t.set(_XML_SPACE, 'preserve')
+
+
+def _mark_inline_sections(root) -> None:
+    """
+    Turn section tags left inside paragraph text into markers at their position in the text.
+
+    Such a section must open and close in the same paragraph, in runs with
+    the same parent, so that dropping or repeating it keeps the XML balanced.
+    """
+    for p in list(root.iter(_W_P)):
+        texts = _own_texts(p)
+        open_sections: List[Tuple[Any, str]] = []
+        tagged: Dict[Any, None] = {}
+        for t in texts:
+            for match in _TAG_RE.finditer(t.text or ''):
+                kind, name = match.group(1), match.group(2)
+                if not kind:
+                    continue
+                tagged[t] = None
+                if kind != '/':
+                    open_sections.append((t, name))
+                    continue
+                if not open_sections or open_sections[-1][1] != name:
+                    raise ValueError(f"Section {{{{/{name}}}}} has no matching opening tag in its paragraph; "
+                                     f"sections must open and close in the same paragraph, on paragraphs "
+                                     f"of their own, or in different table rows")
+                opening, _ = open_sections.pop()
+                if opening.getparent().getparent() is not t.getparent().getparent():
+                    raise ValueError(f"Section {{{{#{name}}}}} opens and closes at different levels of its "
+                                     f"paragraph (for example inside and outside a hyperlink)")
+        if open_sections:
+            raise ValueError(f"Section {{{{#{open_sections[-1][1]}}}}} is not closed in its paragraph; "
+                             f"sections must open and close in the same paragraph, on paragraphs "
+                             f"of their own, or in different table rows")
+        for t in tagged:
+            _split_at_section_tags(t)
+
+
+def compile_part(data: bytes) -> Optional[Tuple[list, str]]:
+    """
+    Compile one part into (nodes, WordprocessingML prefix), or None if it holds no tags.
+
+    Nodes are literal strings, ('slot', name, in_text) and
+    ('section', name, inverted, children).
+    """
+    root = etree.fromstring(data)
+    for p in root.iter(_W_P):
+        _join_split_tags(p)
+    if not any(_TAG_RE.search(t.text or '') for t in root.iter(_W_T)):
+        return None
+    for element in root.iter():
+        for name in _PARAGRAPH_IDS:
+            element.attrib.pop(name, None)
+    _mark_row_sections(root)
+    _mark_block_sections(root)
+    _mark_inline_sections(root)
+    xml = serialize_part(root).decode('utf-8')
+
+    prefix = {uri: key for key, uri in root.nsmap.items()}.get(W_NS, 'w')
+    text_open = (f'<{prefix}:t>', f'<{prefix}:t ')
+    text_close = f'</{prefix}:t>'
+    in_text = False
+    stack: List[Tuple[Optional[str], list]] = [(None, [])]
+    position = 0
+    for match in _COMPILED_RE.finditer(xml):
+        literal = xml[position:match.start()]
+        position = match.end()
+        if literal:
+            stack[-1][1].append(literal)
+            opened = max(literal.rfind(text_open[0]), literal.rfind(text_open[1]))
+            closed = literal.rfind(text_close)
+            if opened != closed:
+                in_text = opened > closed
+        kind, name = match.group(1), match.group(2)
+        if kind is None:
+            stack[-1][1].append(('slot', match.group(3), in_text))
+        elif kind == '/':
+            if stack[-1][0] != name:
+                raise ValueError(f"Section {{{{/{name}}}}} does not close the innermost open section "
+                                 f"({stack[-1][0] or 'none'})")
+            stack.pop()
+        else:
+            section = ('section', name, kind == '^', [])
+            stack[-1][1].append(section)
+            stack.append((name, section[3]))
+    if len(stack) > 1:
+        raise ValueError(f"Section {{{{#{stack[-1][0]}}}}} is never closed")
+    if position < len(xml):
+        stack[0][1].append(xml[position:])
+    return stack[0][1], prefix
+
+
+def _lookup(scopes: Sequence[Any], name: str) -> Any:
+    if name == '.':
+        return scopes[-1]
+    head, *rest = name.split('.')
+    for scope in reversed(scopes):
+        if isinstance(scope, dict) and head in scope:
+            value = scope[head]
+            for key in rest:
+                value = value.get(key) if isinstance(value, dict) else None
+            return value
+    return None
+
+
+def _render(nodes: list, scopes: List[Any], out: List[str], text_break: str) -> None:
+    for node in nodes:
+        if isinstance(node, str):
+            out.append(node)
+        elif node[0] == 'slot':
+            value = _lookup(scopes, node[1])
+            text = escape_xml_text('' if value is None else str(value))
+            if node[2]:
+                out.append(text.replace('\n', text_break))
+            else:
+                out.append(text.replace('"', '&quot;'))
+        else:
+            _, name, inverted, children = node
+            value = _lookup(scopes, name)
+            if inverted:
+                if not value:
+                    _render(children, scopes, out, text_break)
+            elif isinstance(value, (list, tuple)):
+                for item in value:
+                    _render(children, scopes + [item], out, text_break)
+            elif value:
+                _render(children, scopes + [value] if isinstance(value, dict) else scopes, out, text_break)
+
+
+def render_part(nodes: list, record: Dict[str, Any], prefix: str = 'w') -> bytes:
+    out: List[str] = []
+    _render(nodes, [record], out, f'</{prefix}:t><{prefix}:br/><{prefix}:t xml:space="preserve">')
+    return ''.join(out).encode('utf-8')
+
+
+class CompiledTemplate:
+    """A template split into a base package of untouched parts and compiled templated parts."""
+
+    def __init__(self, template_path: str, work_dir: str):
+        self.parts: Dict[str, list] = {}
+        self.prefixes: Dict[str, str] = {}
+        self.base_path = os.path.join(work_dir, 'base.docx')
+        with zipfile.ZipFile(template_path) as zf:
+            if DOCUMENT_PART not in zf.namelist():
+                raise ValueError("Template has no word/document.xml")
+            for name in zf.namelist():
+                if _TEMPLATED_PART_RE.match(name):
+                    compiled = compile_part(zf.read(name))
+                    if compiled is not None:
+                        self.parts[name], self.prefixes[name] = compiled
+            with zipfile.ZipFile(self.base_path, 'w', zipfile.ZIP_DEFLATED) as base:
+                for item in zf.infolist():
+                    if item.filename in self.parts:
+                        continue
+                    with zf.open(item) as source, base.open(item, 'w') as dest:
+                        shutil.copyfileobj(source, dest, 1 << 20)
+
+    def render(self, record: Dict[str, Any], output_path: str) -> None:
+        """Write the document for one record."""
+        rendered = {name: render_part(nodes, record, self.prefixes[name]) for name, nodes in self.parts.items()}
+        directory = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(directory, exist_ok=True)
+        with atomic_output(output_path) as temp_path:
+            shutil.copyfile(self.base_path, temp_path)
+            with zipfile.ZipFile(temp_path, 'a', zipfile.ZIP_DEFLATED) as zf:
+                for name, data in rendered.items():
+                    zf.writestr(name, data)
+
+
+def load_records(source: Any) -> List[Dict[str, Any]]:
+    """
+    Records given inline (a list of objects) or as a .csv (header row), .jsonl or .json file path.
+
+    CSV values are strings; an empty cell counts as false in sections.
+    """
+    if isinstance(source, list):
+        records = source
+    elif isinstance(source, str):
+        extension = os.path.splitext(source)[1].lower()
+        if extension == '.csv':
+            with open(source, encoding='utf-8-sig', newline='') as f:
+                records = list(csv.DictReader(f))
+        elif extension == '.jsonl':
+            with open(source, encoding='utf-8') as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        elif extension == '.json':
+            with open(source, encoding='utf-8') as f:
+                records = json.load(f)
+        else:
+            raise ValueError(f"Unsupported records file: {source}. Use .csv, .jsonl or .json")
+    else:
+        raise ValueError("records must be a list of objects or a path to a .csv, .jsonl or .json file")
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        raise ValueError("Every record must be an object")
+    return records
+
+
+class _PathFields(dict):
+    def __missing__(self, key):
+        raise KeyError(f"output_pattern field '{key}' is not in the record")
+
+
+def output_path_for(pattern: str, record: Dict[str, Any], index: int) -> str:
+    """
+    Format output_pattern for one record; {index} is the 1-based record number.
+
+    String values have path separators and characters Windows forbids in
+    file names replaced by '_', so a record cannot write outside the pattern.
+    """
+    fields = _PathFields({key: _UNSAFE_FILENAME_RE.sub('_', value) if isinstance(value, str) else value
+                          for key, value in record.items()})
+    fields['index'] = index
+    path = pattern.format_map(fields)
+    return path if path.lower().endswith('.docx') else path + '.docx'
+
+
+_worker_template: Optional[CompiledTemplate] = None
+
+
+def _init_worker(template: CompiledTemplate) -> None:
+    global _worker_template
+    _worker_template = template
+
+
+def _render_chunk(jobs: List[Tuple[int, Dict[str, Any], str]],
+                  template: Optional[CompiledTemplate] = None) -> List[Dict[str, Any]]:
+    template = template or _worker_template
+    results = []
+    for index, record, path in jobs:
+        try:
+            template.render(record, path)
+            results.append({'index': index, 'path': path, 'success': True})
+        except Exception as e:
+            results.append({'index': index, 'path': path, 'success': False, 'error': str(e)})
+    return results
+
+
+def render_documents(template_path: str, records: List[Dict[str, Any]], output_pattern: str,
+                     max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Render one document per record, yielding a result per record as it finishes.
+
+    The template is compiled once in this process and handed to each worker
+    process once; records go to the workers in chunks. Records whose output
+    path cannot be formatted, or repeats an earlier record's path, fail
+    without affecting the others.
+    """
+    jobs = []
+    seen: Dict[str, int] = {}
+    for index, record in enumerate(records, start=1):
+        try:
+            path = output_path_for(output_pattern, record, index)
+        except (KeyError, ValueError, IndexError) as e:
+            yield {'index': index, 'path': None, 'success': False, 'error': str(e).strip('"')}
+            continue
+        key = os.path.abspath(path)
+        if key in seen:
+            yield {'index': index, 'path': path, 'success': False,
+                   'error': f"Output path already used by record {seen[key]}"}
+            continue
+        seen[key] = index
+        jobs.append((index, record, path))
+    if not jobs:
+        return
+
+    with tempfile.TemporaryDirectory(prefix='mail-merge-') as work_dir:
+        template = CompiledTemplate(template_path, work_dir)
+        workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+        chunk_size = max(1, min(_CHUNK_SIZE, len(jobs) // (workers * 4) or 1))
+        chunks = [jobs[start:start + chunk_size] for start in range(0, len(jobs), chunk_size)]
+        if workers <= 1:
+            for chunk in chunks:
+                yield from _render_chunk(chunk, template)
+            return
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template,)) as pool:
+            futures = {pool.submit(_render_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    yield from future.result()
+                except Exception as e:
+                    # e.g. a worker process died; only its chunk is affected
+                    for index, _, path in futures[future]:
+                        yield {'index': index, 'path': path, 'success': False, 'error': str(e) or type(e).__name__}
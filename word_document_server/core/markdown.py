@@ -0,0 +1,738 @@
+"""
+Direct DOCX <-> Markdown conversion for Word Document Server.
+
+The writer walks word/document.xml once with a streaming parser and emits
+GitHub-flavored Markdown block by block, so no intermediate HTML or
+python-docx object model is ever built. The builder goes the other way: it
+tokenizes Markdown itself and generates the body markup in bulk, so no
+LibreOffice or HTML round trip is needed.
+"""
+import os
+import re
+import zipfile
+from typing import Dict, List, Optional, TextIO, Tuple
+from docx.oxml.ns import qn
+
+from word_document_server.core.ooxml import (
+    load_relationships, load_style_names, load_numbering_formats, parse_part,
+    get_style_id, get_heading_level, iter_body_blocks, paragraph_text, escape_xml_text,
+    run_format, run_text, iter_run_objects, is_code_style, ListTracker, PLAIN_FORMAT, R_NS
+)
+
+_MD_ESCAPE_RE = re.compile(r'([\\`*_\[\]])')
+_LINE_START_RE = re.compile(r'^(\s*)(?:([#>+\-])|(\d+)([.)]))(\s)')
+_PLAIN = PLAIN_FORMAT
+
+
+def _escape(text: str) -> str:
+    return _MD_ESCAPE_RE.sub(r'\\\1', text)
+
+
+def _escape_line_start(match) -> str:
+    indent, marker, number, delimiter, space = match.groups()
+    if marker:
+        return f"{indent}\\{marker}{space}"
+    return f"{indent}{number}\\{delimiter}{space}"
+
+
+def _wrap(text: str, fmt: Tuple[bool, bool, bool, bool]) -> str:
+    bold, italic, strike, code = fmt
+    if not text.strip():
+        return text
+    # Emphasis markers must hug the text, so keep surrounding spaces outside
+    stripped = text.strip()
+    lead = text[:len(text) - len(text.lstrip())]
+    trail = text[len(text.rstrip()):]
+    if code:
+        fence = '``' if '`' in stripped else '`'
+        return f"{lead}{fence}{stripped}{fence}{trail}"
+    stripped = _escape(stripped)
+    if strike:
+        stripped = f"~~{stripped}~~"
+    if italic:
+        stripped = f"*{stripped}*"
+    if bold:
+        stripped = f"**{stripped}**"
+    return f"{lead}{stripped}{trail}"
+
+
+class MarkdownWriter:
+    """Single-pass WordprocessingML to GitHub-flavored Markdown emitter."""
+
+    def __init__(self, zf: zipfile.ZipFile, out: TextIO, media_dir: Optional[str] = None,
+                 media_link_prefix: str = ''):
+        self.zf = zf
+        self.out = out
+        self.media_dir = media_dir
+        self.media_link_prefix = media_link_prefix
+        self.rels = load_relationships(zf)
+        self.style_names = load_style_names(zf)
+        self.lists = ListTracker(load_numbering_formats(zf))
+        self.footnote_refs: List[str] = []
+        self.endnote_refs: List[str] = []
+        self.prev_kind: Optional[str] = None
+        self.in_code = False
+        self.extracted_media: Dict[str, str] = {}
+        self.block_count = 0
+        self.pending_text_boxes: List = []
+        # (numId, bullet?) of the last list item at each level, to keep adjacent lists apart
+        self.list_keys: Dict[int, Tuple[Optional[str], bool]] = {}
+
+    # -- output -----------------------------------------------------------
+
+    def _emit(self, text: str, kind: str, separate: bool = False) -> None:
+        if self.in_code and kind != 'code':
+            self.out.write('\n```')
+            self.in_code = False
+        if kind != 'list':
+            self.list_keys.clear()
+        if self.prev_kind is not None:
+            tight = kind == self.prev_kind and kind in ('list', 'quote', 'code') and not separate
+            self.out.write('\n' if tight else '\n\n')
+        if kind == 'code' and not self.in_code:
+            self.out.write('```\n')
+            self.in_code = True
+        self.out.write(text)
+        self.prev_kind = kind
+        self.block_count += 1
+
+    # -- inline content ---------------------------------------------------
+
+    def _image(self, drawing) -> str:
+        alt = ''
+        doc_pr = next(drawing.iter('{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}docPr'), None)
+        if doc_pr is not None:
+            alt = doc_pr.get('descr') or doc_pr.get('title') or doc_pr.get('name') or ''
+        blip = next(drawing.iter('{http://schemas.openxmlformats.org/drawingml/2006/main}blip'), None)
+        if blip is None:
+            return ''
+        rel = self.rels.get(blip.get(f'{{{R_NS}}}embed'))
+        if rel is None or rel['external']:
+            return f"![{_escape(alt)}]({rel['target'] if rel else ''})"
+        target = rel['target']
+        link = self.extracted_media.get(target)
+        if link is None:
+            link = target
+            if self.media_dir:
+                os.makedirs(self.media_dir, exist_ok=True)
+                file_name = os.path.basename(target)
+                with open(os.path.join(self.media_dir, file_name), 'wb') as f:
+                    f.write(self.zf.read(target))
+                link = f"{self.media_link_prefix}{file_name}"
+            self.extracted_media[target] = link
+        return f"![{_escape(alt)}]({link.replace(' ', '%20')})"
+
+    def _collect_segments(self, container, segments: List[Tuple[str, tuple]]) -> None:
+        for child in container:
+            tag = child.tag
+            if tag == qn('w:r'):
+                fmt = run_format(child.find(qn('w:rPr')), self.style_names)
+                text = run_text(child)
+                if text:
+                    segments.append((text, fmt))
+                for special in iter_run_objects(child):
+                    if special.tag == qn('w:footnoteReference'):
+                        self.footnote_refs.append(special.get(qn('w:id')))
+                        segments.append((f"[^{special.get(qn('w:id'))}]", None))
+                    elif special.tag == qn('w:endnoteReference'):
+                        self.endnote_refs.append(special.get(qn('w:id')))
+                        segments.append((f"[^e{special.get(qn('w:id'))}]", None))
+                    elif special.tag in (qn('w:drawing'), qn('w:pict')):
+                        image = self._image(special)
+                        if image:
+                            segments.append((image, None))
+                        # Text boxes become blocks after the anchoring paragraph
+                        self.pending_text_boxes.extend(special.iter(qn('w:txbxContent')))
+            elif tag == qn('w:hyperlink'):
+                inner: List[Tuple[str, tuple]] = []
+                self._collect_segments(child, inner)
+                label = self._render_segments(inner)
+                rel = self.rels.get(child.get(f'{{{R_NS}}}id'))
+                anchor = child.get(qn('w:anchor'))
+                url = rel['target'] if rel else (f"#{anchor}" if anchor else '')
+                segments.append((f"[{label}]({url})" if url and label else label, None))
+            elif tag in (qn('w:ins'), qn('w:smartTag'), qn('w:fldSimple'), qn('w:customXml')):
+                self._collect_segments(child, segments)
+            elif tag == qn('w:sdt'):
+                content = child.find(qn('w:sdtContent'))
+                if content is not None:
+                    self._collect_segments(content, segments)
+
+    @staticmethod
+    def _render_segments(segments: List[Tuple[str, tuple]]) -> str:
+        # Merge adjacent runs with identical formatting to avoid "**a****b**"
+        merged: List[List] = []
+        for text, fmt in segments:
+            if merged and fmt is not None and merged[-1][1] == fmt:
+                merged[-1][0] += text
+            else:
+                merged.append([text, fmt])
+        return ''.join(text if fmt is None else _wrap(text, fmt) for text, fmt in merged)
+
+    def _inline(self, p) -> str:
+        segments: List[Tuple[str, tuple]] = []
+        self._collect_segments(p, segments)
+        return self._render_segments(segments)
+
+    # -- blocks -----------------------------------------------------------
+
+    def _list_prefix(self, p, style_name: str) -> Optional[Tuple[str, bool]]:
+        """
+        Marker for a list paragraph and whether a blank line must precede it, or None.
+
+        A list of another type or numbering at the same level starts a new
+        list; without the blank line renderers would merge the two.
+        """
+        item = self.lists.next_item(p, style_name)
+        if item is None:
+            return None
+        level, fmt, count = item
+        key = (self.lists.last_list, fmt == 'bullet')
+        previous = self.list_keys.get(level)
+        separate = previous is not None and previous != key
+        self.list_keys[level] = key
+        for deeper in [n for n in self.list_keys if n > level]:
+            del self.list_keys[deeper]
+        indent = '  ' * level
+        return (f"{indent}- " if fmt == 'bullet' else f"{indent}{count}. "), separate
+
+    def write_paragraph(self, p) -> None:
+        style_name = self.style_names.get(get_style_id(p) or '', '')
+        lowered = style_name.lower()
+        if is_code_style(lowered):
+            self._emit(paragraph_text(p), 'code')
+            return
+        text = self._inline(p).strip()
+        if not text:
+            return
+        level = get_heading_level(style_name)
+        if level:
+            self.lists.counters.clear()
+            self._emit(f"{'#' * level} {text}", 'heading')
+            return
+        item = self._list_prefix(p, style_name)
+        if item is not None:
+            prefix, separate = item
+            self._emit(prefix + text.replace('\n', '  \n' + ' ' * len(prefix)), 'list', separate)
+            return
+        self.lists.counters.clear()
+        text = text.replace('\n', '  \n')
+        if 'quote' in lowered:
+            self._emit('> ' + text.replace('\n', '\n> '), 'quote')
+            return
+        # Keep literal "1. " / "# " paragraph starts from turning into markup
+        self._emit(_LINE_START_RE.sub(_escape_line_start, text), 'paragraph')
+
+    def _cell_text(self, tc) -> str:
+        lines = []
+        for p in tc.iter(qn('w:p')):
+            text = self._inline(p).strip()
+            if text:
+                lines.append(text.replace('\n', '<br>'))
+        return '<br>'.join(lines).replace('|', '\\|')
+
+    def write_table(self, tbl) -> None:
+        rows: List[List[str]] = []
+        for tr in tbl.iterchildren(qn('w:tr')):
+            row: List[str] = []
+            for tc in tr.iterchildren(qn('w:tc')):
+                tcPr = tc.find(qn('w:tcPr'))
+                span = 1
+                continued = False
+                if tcPr is not None:
+                    grid_span = tcPr.find(qn('w:gridSpan'))
+                    if grid_span is not None:
+                        span = int(grid_span.get(qn('w:val'), '1'))
+                    v_merge = tcPr.find(qn('w:vMerge'))
+                    continued = v_merge is not None and v_merge.get(qn('w:val'), 'continue') == 'continue'
+                row.append('' if continued else self._cell_text(tc))
+                row.extend([''] * (span - 1))
+            rows.append(row)
+        if not rows:
+            return
+        width = max(len(row) for row in rows)
+        lines = []
+        for i, row in enumerate(rows):
+            row = row + [''] * (width - len(row))
+            lines.append('| ' + ' | '.join(row) + ' |')
+            if i == 0:
+                lines.append('|' + '|'.join([' --- '] * width) + '|')
+        self.lists.counters.clear()
+        self._emit('\n'.join(lines), 'table')
+
+    def write_block(self, block) -> None:
+        if block.tag == qn('w:p'):
+            self.write_paragraph(block)
+            text_boxes, self.pending_text_boxes = self.pending_text_boxes, []
+            for text_box in text_boxes:
+                for child in text_box:
+                    self.write_block(child)
+        elif block.tag == qn('w:tbl'):
+            self.write_table(block)
+        elif block.tag == qn('w:sdt'):
+            content = block.find(qn('w:sdtContent'))
+            if content is not None:
+                for child in content:
+                    self.write_block(child)
+
+    def _write_notes(self, part_name: str, tag: str, ids: List[str], label_prefix: str) -> None:
+        if not ids:
+            return
+        root = parse_part(self.zf, part_name)
+        if root is None:
+            return
+        notes = {note.get(qn('w:id')): note for note in root.iter(qn(tag))}
+        for note_id in dict.fromkeys(ids):
+            note = notes.get(note_id)
+            if note is None:
+                continue
+            text = ' '.join(t for t in (self._inline(p).strip() for p in note.iter(qn('w:p'))) if t)
+            self._emit(f"[^{label_prefix}{note_id}]: {text}", 'note')
+
+    def write(self) -> int:
+        """Write the whole document and return the number of emitted blocks."""
+        for block in iter_body_blocks(self.zf):
+            self.write_block(block)
+        self._write_notes('word/footnotes.xml', 'w:footnote', self.footnote_refs, '')
+        self._write_notes('word/endnotes.xml', 'w:endnote', self.endnote_refs, 'e')
+        if self.in_code:
+            self.out.write('\n```')
+            self.in_code = False
+        if self.prev_kind is not None:
+            self.out.write('\n')
+        return self.block_count
+
+
+def convert_docx_to_markdown(docx_path: str, output_path: str, extract_media: bool = True) -> Dict[str, int]:
+    """
+    Convert a DOCX file to Markdown, streaming the result to output_path.
+
+    Args:
+        docx_path: Path to the source Word document
+        output_path: Path of the Markdown file to write
+        extract_media: If True, embedded images are written to a "<name>_media"
+                       folder next to the output and linked relatively
+
+    Returns:
+        Dictionary with the number of blocks and images written
+    """
+    media_dir = None
+    prefix = ''
+    if extract_media:
+        stem = os.path.splitext(os.path.basename(output_path))[0]
+        media_dir = os.path.join(os.path.dirname(output_path), f"{stem}_media")
+        prefix = f"{stem}_media/"
+    with zipfile.ZipFile(docx_path) as zf, open(output_path, 'w', encoding='utf-8') as out:
+        writer = MarkdownWriter(zf, out, media_dir=media_dir, media_link_prefix=prefix)
+        blocks = writer.write()
+    return {'blocks': blocks, 'images': len(writer.extracted_media)}
+
+
+# ---------------------------------------------------------------------------
+# Markdown to DOCX
+# ---------------------------------------------------------------------------
+
+_FENCE_RE = re.compile(r'^\s{0,3}(`{3,}|~{3,})\s*([^`\s]*)')
+_HEADING_RE = re.compile(r'^\s{0,3}(#{1,6})(?:\s+(.*?))?(?:\s+#+)?\s*$')
+_HR_RE = re.compile(r'^\s{0,3}([-*_])(?:\s*\1){2,}\s*$')
+_LIST_ITEM_RE = re.compile(r'^(\s*)([-*+]|\d{1,9}[.)])(?:\s+(.*)|$)')
+_QUOTE_RE = re.compile(r'^\s{0,3}>\s?(.*)$')
+_TABLE_SEP_RE = re.compile(r'^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$')
+_INLINE_RE = re.compile(
+    r'(?P<code>`+)(?P<code_text>.+?)(?P=code)'
+    r'|!\[(?P<img_alt>[^\]]*)\]\((?P<img_src><[^>]*>|[^)\s]+)(?:\s+"[^"]*")?\)'
+    r'|\[(?P<link_text>(?:[^\[\]]|\[[^\]]*\])+)\]\((?P<link_href><[^>]*>|[^)\s]+)(?:\s+"[^"]*")?\)'
+    r'|<(?P<autolink>(?:https?|mailto):[^>\s]+)>'
+    r'|\*\*(?P<strong_text>[^\s*](?:.*?[^\s])?)\*\*'
+    r'|(?<!\w)__(?P<strong_text2>[^\s_](?:.*?[^\s])?)__(?!\w)'
+    r'|~~(?P<strike_text>.+?)~~'
+    r'|\*(?P<em_text>[^\s*](?:.*?[^\s*])?)\*'
+    r'|(?<!\w)_(?P<em_text2>[^\s_](?:.*?[^\s_])?)_(?!\w)'
+    r'|\\(?P<escaped>[!-/:-@\[-`{-~])'
+    r'|(?P<br>\n)'
+)
+_CODE_FONT = '<w:rFonts w:ascii="Consolas" w:hAnsi="Consolas" w:cs="Consolas"/>'
+_EMU_PER_TWIP = 635
+
+
+def _xml_attr(text: str) -> str:
+    return escape_xml_text(text).replace('"', '&quot;')
+
+
+def _split_table_row(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    cells, current, i = [], [], 0
+    while i < len(line):
+        if line[i] == '\\' and i + 1 < len(line) and line[i + 1] == '|':
+            current.append('|')
+            i += 2
+            continue
+        if line[i] == '|':
+            cells.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(line[i])
+        i += 1
+    cells.append(''.join(current).strip())
+    return cells
+
+
+def parse_markdown_blocks(lines: List[str]) -> List[tuple]:
+    """
+    Split Markdown source into block tokens.
+
+    Returns:
+        List of tuples: ('heading', level, text), ('paragraph', text),
+        ('quote', text), ('code', language, lines), ('hr',),
+        ('table', alignments, rows) and ('list_item', list_no, ordered, level, text)
+    """
+    blocks = []
+    paragraph: List[str] = []
+    list_no = 0
+    list_indents: List[int] = []
+    list_marker = ''
+    in_list = False
+    i = 0
+
+    def flush_paragraph():
+        if paragraph:
+            text = ''
+            for n, line in enumerate(paragraph):
+                hard_break = line.endswith('  ') or line.endswith('\\')
+                line = line.rstrip()
+                if hard_break and line.endswith('\\'):
+                    line = line[:-1]
+                text += line.strip()
+                if n < len(paragraph) - 1:
+                    text += '\n' if hard_break else ' '
+            blocks.append(('paragraph', text))
+            paragraph.clear()
+
+    while i < len(lines):
+        line = lines[i].rstrip('\r\n').replace('\t', '    ')
+        stripped = line.strip()
+
+        fence = _FENCE_RE.match(line)
+        if fence:
+            flush_paragraph()
+            in_list = False
+            marker = fence.group(1)
+            code_lines = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(marker):
+                code_lines.append(lines[i].rstrip('\r\n'))
+                i += 1
+            blocks.append(('code', fence.group(2), code_lines))
+            i += 1
+            continue
+
+        if not stripped:
+            flush_paragraph()
+            if in_list:
+                # A blank line only ends the list if the next line is not part of it
+                j = i + 1
+                while j < len(lines) and not lines[j].strip():
+                    j += 1
+                if j >= len(lines) or not (_LIST_ITEM_RE.match(lines[j]) or lines[j].startswith('  ')):
+                    in_list = False
+            i += 1
+            continue
+
+        heading = _HEADING_RE.match(line)
+        if heading:
+            flush_paragraph()
+            in_list = False
+            blocks.append(('heading', len(heading.group(1)), heading.group(2) or ''))
+            i += 1
+            continue
+
+        if _HR_RE.match(line):
+            flush_paragraph()
+            in_list = False
+            blocks.append(('hr',))
+            i += 1
+            continue
+
+        if '|' in line and i + 1 < len(lines) and '|' in lines[i + 1] and '-' in lines[i + 1] \
+                and _TABLE_SEP_RE.match(lines[i + 1]):
+            flush_paragraph()
+            in_list = False
+            alignments = []
+            for spec in _split_table_row(lines[i + 1]):
+                spec = spec.strip()
+                if spec.startswith(':') and spec.endswith(':'):
+                    alignments.append('center')
+                elif spec.endswith(':'):
+                    alignments.append('right')
+                elif spec.startswith(':'):
+                    alignments.append('left')
+                else:
+                    alignments.append(None)
+            rows = [_split_table_row(line)]
+            i += 2
+            while i < len(lines) and lines[i].strip() and '|' in lines[i]:
+                rows.append(_split_table_row(lines[i]))
+                i += 1
+            blocks.append(('table', alignments, rows))
+            continue
+
+        quote = _QUOTE_RE.match(line)
+        if quote:
+            flush_paragraph()
+            in_list = False
+            quoted = []
+            while i < len(lines):
+                quote = _QUOTE_RE.match(lines[i])
+                if not quote:
+                    break
+                quoted.append(quote.group(1))
+                i += 1
+            for block in parse_markdown_blocks(quoted):
+                if block[0] in ('paragraph', 'heading'):
+                    blocks.append(('quote', block[-1]))
+                else:
+                    blocks.append(block)
+            continue
+
+        item = _LIST_ITEM_RE.match(line)
+        if item and (in_list or not paragraph):
+            flush_paragraph()
+            indent = len(item.group(1))
+            marker = item.group(2)[-1]
+            if not in_list or (indent <= list_indents[0] and marker != list_marker):
+                # A new list, or a top-level item whose marker type starts another one
+                list_no += 1
+                list_indents = [indent]
+                list_marker = marker
+                in_list = True
+            elif indent > list_indents[-1]:
+                list_indents.append(indent)
+            else:
+                while len(list_indents) > 1 and indent < list_indents[-1]:
+                    list_indents.pop()
+            ordered = item.group(2)[0].isdigit()
+            blocks.append(('list_item', list_no, ordered, min(len(list_indents) - 1, 8), item.group(3) or ''))
+            i += 1
+            continue
+
+        if in_list and blocks and blocks[-1][0] == 'list_item' and not paragraph:
+            # Lazy continuation of the previous list item
+            kind, number, ordered, level, text = blocks[-1]
+            blocks[-1] = (kind, number, ordered, level, f"{text} {stripped}".strip())
+            i += 1
+            continue
+
+        in_list = False
+        paragraph.append(line)
+        i += 1
+
+    flush_paragraph()
+    return blocks
+
+
+class DocxMarkdownBuilder:
+    """Render Markdown block tokens as WordprocessingML into a python-docx Document."""
+
+    def __init__(self, doc, base_dir: str = '.'):
+        self.doc = doc
+        self.base_dir = base_dir
+        self.image_count = 0
+        section = doc.sections[0]
+        self.content_width = section.page_width - section.left_margin - section.right_margin
+        self.style_ids: Dict[str, Optional[str]] = {}
+        self.list_nums: Dict[Tuple[int, bool], int] = {}
+        # (index of the paragraph in the generated body, numId, level)
+        self.numbered: List[Tuple[int, int, int]] = []
+
+    def _style_id(self, name: str) -> Optional[str]:
+        if name not in self.style_ids:
+            try:
+                self.style_ids[name] = self.doc.styles[name].style_id
+            except KeyError:
+                self.style_ids[name] = None
+        return self.style_ids[name]
+
+    def _hyperlink_open(self, href: str) -> str:
+        if href.startswith('#'):
+            return f'<w:hyperlink w:anchor="{_xml_attr(href[1:])}">'
+        from docx.opc.constants import RELATIONSHIP_TYPE as RT
+        r_id = self.doc.part.relate_to(href, RT.HYPERLINK, is_external=True)
+        return f'<w:hyperlink r:id="{r_id}">'
+
+    @staticmethod
+    def _run(text: str, fmt: Tuple[bool, bool, bool, bool], link: bool = False) -> str:
+        if not text:
+            return ''
+        bold, italic, strike, code = fmt
+        rpr = ''.join((
+            _CODE_FONT if code else '',
+            '<w:b/>' if bold else '',
+            '<w:i/>' if italic else '',
+            '<w:strike/>' if strike else '',
+            '<w:color w:val="0563C1"/><w:u w:val="single"/>' if link else '',
+        ))
+        rpr = f'<w:rPr>{rpr}</w:rPr>' if rpr else ''
+        pieces = []
+        for n, chunk in enumerate(text.split('\t')):
+            if n:
+                pieces.append('<w:tab/>')
+            if chunk:
+                pieces.append(f'<w:t xml:space="preserve">{escape_xml_text(chunk)}</w:t>')
+        return f'<w:r>{rpr}{"".join(pieces)}</w:r>'
+
+    def _image(self, src: str, alt: str) -> Optional[str]:
+        src = src.strip('<>')
+        if re.match(r'^[a-z][a-z0-9+.-]*:', src, re.IGNORECASE) and not src.lower().startswith('file:'):
+            return None
+        from urllib.parse import unquote
+        path = unquote(src[5:] if src.lower().startswith('file:') else src)
+        if not os.path.isabs(path):
+            path = os.path.join(self.base_dir, path)
+        if not os.path.isfile(path):
+            return None
+        try:
+            from lxml import etree
+            _, image = self.doc.part.get_or_add_image(path)
+            width, _ = image.scaled_dimensions(None, None)
+            inline = self.doc.part.new_pic_inline(
+                path, width=min(width, self.content_width) if width > self.content_width else None, height=None
+            )
+            inline.docPr.set('descr', alt)
+        except Exception:
+            return None
+        self.image_count += 1
+        return f'<w:r><w:drawing>{etree.tostring(inline, encoding="unicode")}</w:drawing></w:r>'
+
+    def inline(self, text: str, fmt: Tuple[bool, bool, bool, bool] = _PLAIN, link: bool = False) -> str:
+        """Render inline Markdown (emphasis, code, links, images) as w:r markup."""
+        bold, italic, strike, code = fmt
+        out = []
+        pos = 0
+        for match in _INLINE_RE.finditer(text):
+            out.append(self._run(text[pos:match.start()], fmt, link))
+            pos = match.end()
+            group = match.lastgroup
+            if match.group('code') is not None:
+                out.append(self._run(match.group('code_text').strip(), (bold, italic, strike, True), link))
+            elif group == 'img_src':
+                picture = self._image(match.group('img_src'), match.group('img_alt'))
+                out.append(picture if picture else self._run(match.group('img_alt'), fmt, link))
+            elif group == 'link_href':
+                inner = self.inline(match.group('link_text'), fmt, link=True)
+                out.append(f'{self._hyperlink_open(match.group("link_href").strip("<>"))}{inner}</w:hyperlink>')
+            elif group == 'autolink':
+                href = match.group('autolink')
+                out.append(f'{self._hyperlink_open(href)}{self._run(href, fmt, True)}</w:hyperlink>')
+            elif group in ('strong_text', 'strong_text2'):
+                out.append(self.inline(match.group(group), (True, italic, strike, code), link))
+            elif group == 'strike_text':
+                out.append(self.inline(match.group(group), (bold, italic, True, code), link))
+            elif group in ('em_text', 'em_text2'):
+                out.append(self.inline(match.group(group), (bold, True, strike, code), link))
+            elif group == 'escaped':
+                out.append(self._run(match.group('escaped'), fmt, link))
+            elif group == 'br':
+                out.append('<w:r><w:br/></w:r>')
+        out.append(self._run(text[pos:], fmt, link))
+        return ''.join(out)
+
+    def _paragraph(self, style_name: Optional[str], runs: str, ppr_extra: str = '') -> str:
+        style_id = self._style_id(style_name) if style_name else None
+        ppr = (f'<w:pStyle w:val="{style_id}"/>' if style_id else '') + ppr_extra
+        ppr = f'<w:pPr>{ppr}</w:pPr>' if ppr else ''
+        return f'<w:p>{ppr}{runs}</w:p>'
+
+    def _table(self, alignments: List[Optional[str]], rows: List[List[str]]) -> str:
+        from word_document_server.core.tables import build_table_xml
+        col_count = max(len(row) for row in rows)
+        col_width = int(self.content_width / _EMU_PER_TWIP / max(col_count, 1))
+        rendered = [
+            [self.inline(cell, (True, False, False, False) if r == 0 else _PLAIN) for cell in row]
+            for r, row in enumerate(rows)
+        ]
+        return build_table_xml(
+            rendered, header_row=True, style_id=self._style_id('Table Grid'),
+            col_widths=[col_width] * col_count, col_alignments=alignments, rich=True
+        )
+
+    def _list_num(self, list_no: int, ordered: bool) -> int:
+        from word_document_server.utils.document_utils import ensure_list_numbering
+        key = (list_no, ordered)
+        if key not in self.list_nums:
+            if ordered:
+                self.list_nums[key] = ensure_list_numbering(self.doc, 'number', restart=True)
+            else:
+                self.list_nums[key] = ensure_list_numbering(self.doc, 'bullet')
+        return self.list_nums[key]
+
+    def render(self, blocks: List[tuple]) -> List[str]:
+        """Render block tokens to a list of top-level body element markup strings."""
+        body = []
+        for block in blocks:
+            kind = block[0]
+            if kind == 'heading':
+                body.append(self._paragraph(f'Heading {block[1]}', self.inline(block[2])))
+            elif kind == 'paragraph':
+                body.append(self._paragraph(None, self.inline(block[1])))
+            elif kind == 'quote':
+                body.append(self._paragraph('Quote', self.inline(block[1])))
+            elif kind == 'code':
+                code_lines = block[2] or ['']
+                for line in code_lines:
+                    body.append(self._paragraph('macro', self._run(line, (False, False, False, True))))
+            elif kind == 'hr':
+                body.append(self._paragraph(None, '', '<w:pBdr><w:bottom w:val="single" w:sz="6" '
+                                                      'w:space="1" w:color="auto"/></w:pBdr>'))
+            elif kind == 'table':
+                body.append(self._table(block[1], block[2]))
+            elif kind == 'list_item':
+                _, list_no, ordered, level, text = block
+                self.numbered.append((len(body), self._list_num(list_no, ordered), level))
+                body.append(self._paragraph('List Paragraph', self.inline(text)))
+        return body
+
+    def build(self, blocks: List[tuple]) -> int:
+        """Render the blocks and append them to the document body in one parse."""
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import nsdecls
+        from docx.text.paragraph import Paragraph
+        from word_document_server.utils.document_utils import add_bullet_numbering
+
+        markup = self.render(blocks)
+        fragment = parse_xml(f'<w:body {nsdecls("w", "r")}>{"".join(markup)}</w:body>')
+        elements = list(fragment)
+        body = self.doc.element.body
+        sect_pr = body.find(qn('w:sectPr'))
+        index = body.index(sect_pr) if sect_pr is not None else len(body)
+        body[index:index] = elements
+        for position, num_id, level in self.numbered:
+            add_bullet_numbering(Paragraph(elements[position], self.doc._body), num_id, level)
+        return len(elements)
+
+
+def convert_markdown_to_docx_file(markdown_path: str, output_path: str) -> Dict[str, int]:
+    """
+    Convert a Markdown file to DOCX natively, without LibreOffice.
+
+    Relative image paths are resolved against the Markdown file's folder.
+
+    Args:
+        markdown_path: Path to the source Markdown file
+        output_path: Path of the DOCX file to write
+
+    Returns:
+        Dictionary with the number of blocks and images written
+    """
+    from docx import Document
+
+    with open(markdown_path, 'r', encoding='utf-8-sig') as f:
+        lines = f.read().splitlines()
+    doc = Document()
+    builder = DocxMarkdownBuilder(doc, base_dir=os.path.dirname(os.path.abspath(markdown_path)))
+    blocks = builder.build(parse_markdown_blocks(lines))
+    doc.save(output_path)
+    return {'blocks': blocks, 'images': builder.image_count}
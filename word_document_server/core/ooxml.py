@@ -0,0 +1,418 @@
+"""
+Low-level OOXML package helpers for Word Document Server.
+
+These helpers read parts straight from the DOCX zip container with lxml so
+that converters and indexers can walk a document without building the
+python-docx object model.
+"""
+import posixpath
+import re
+import shutil
+import zipfile
+from typing import Dict, Iterator, Optional, Tuple
+from lxml import etree
+from docx.oxml.ns import qn
+
+from word_document_server.utils.file_utils import atomic_output
+
+# Namespace definitions
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+MC_NS = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+
+DOCUMENT_PART = 'word/document.xml'
+CONTENT_TYPES_PART = '[Content_Types].xml'
+
+# Tags of the block-level elements that can appear directly under w:body
+BODY_BLOCK_TAGS = (qn('w:p'), qn('w:tbl'), qn('w:sdt'))
+
+_W_BODY = qn('w:body')
+_W_T = qn('w:t')
+_W_TAB = qn('w:tab')
+_W_BR = qn('w:br')
+_W_VAL = qn('w:val')
+_W_TCPR = qn('w:tcPr')
+_W_TRPR = qn('w:trPr')
+_W_GRID_SPAN = qn('w:gridSpan')
+_W_VMERGE = qn('w:vMerge')
+_W_GRID_BEFORE = qn('w:gridBefore')
+_W_GRID_AFTER = qn('w:gridAfter')
+
+# Style names that mark monospaced/code text
+CODE_STYLE_HINTS = ('code', 'macro', 'preformatted', 'source')
+
+# Run formatting flags: (bold, italic, strike, code)
+PLAIN_FORMAT = (False, False, False, False)
+
+# Characters that are not allowed anywhere in an XML 1.0 document
+INVALID_XML_CHARS_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def escape_xml_text(text: str) -> str:
+    """Escape text for use in element content, dropping characters XML cannot hold."""
+    return INVALID_XML_CHARS_RE.sub('', text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def read_part(zf: zipfile.ZipFile, name: str) -> Optional[bytes]:
+    """Return the raw bytes of a package part, or None if it is missing."""
+    try:
+        return zf.read(name)
+    except KeyError:
+        return None
+
+
+def parse_part(zf: zipfile.ZipFile, name: str):
+    """Parse a package part into an lxml element, or None if it is missing."""
+    data = read_part(zf, name)
+    if data is None:
+        return None
+    return etree.fromstring(data)
+
+
+def rels_part_name(part_name: str) -> str:
+    """Return the relationships part name for a part, e.g. word/_rels/document.xml.rels."""
+    directory, base = posixpath.split(part_name)
+    return posixpath.join(directory, '_rels', f'{base}.rels')
+
+
+def load_relationships(zf: zipfile.ZipFile, part_name: str = DOCUMENT_PART) -> Dict[str, Dict[str, str]]:
+    """
+    Load the relationships of a part.
+
+    Args:
+        zf: Open DOCX zip file
+        part_name: Source part whose relationships should be read
+
+    Returns:
+        Mapping of relationship id to {'type', 'target', 'external'}, where
+        internal targets are resolved to package part names.
+    """
+    root = parse_part(zf, rels_part_name(part_name))
+    rels = {}
+    if root is None:
+        return rels
+    base_dir = posixpath.dirname(part_name)
+    for rel in root.iter(f'{{{REL_NS}}}Relationship'):
+        target = rel.get('Target', '')
+        external = rel.get('TargetMode') == 'External'
+        if not external:
+            if target.startswith('/'):
+                target = target.lstrip('/')
+            else:
+                target = posixpath.normpath(posixpath.join(base_dir, target))
+        rels[rel.get('Id')] = {
+            'type': rel.get('Type', ''),
+            'target': target,
+            'external': external,
+        }
+    return rels
+
+
+def load_style_names(zf: zipfile.ZipFile) -> Dict[str, str]:
+    """Map paragraph/character style ids to their display names."""
+    root = parse_part(zf, 'word/styles.xml')
+    styles = {}
+    if root is None:
+        return styles
+    for style in root.iter(qn('w:style')):
+        style_id = style.get(qn('w:styleId'))
+        name_el = style.find(qn('w:name'))
+        if style_id:
+            styles[style_id] = name_el.get(qn('w:val')) if name_el is not None else style_id
+    return styles
+
+
+def load_numbering_formats(zf: zipfile.ZipFile) -> Dict[Tuple[str, int], str]:
+    """
+    Resolve list formats from numbering.xml.
+
+    Returns:
+        Mapping of (numId, ilvl) to the w:numFmt value ('bullet', 'decimal', ...)
+    """
+    root = parse_part(zf, 'word/numbering.xml')
+    formats = {}
+    if root is None:
+        return formats
+    abstract_formats = {}
+    for abstract in root.iter(qn('w:abstractNum')):
+        levels = {}
+        for lvl in abstract.iter(qn('w:lvl')):
+            fmt = lvl.find(qn('w:numFmt'))
+            levels[int(lvl.get(qn('w:ilvl'), '0'))] = fmt.get(qn('w:val')) if fmt is not None else 'decimal'
+        abstract_formats[abstract.get(qn('w:abstractNumId'))] = levels
+    for num in root.iter(qn('w:num')):
+        abstract_id = num.find(qn('w:abstractNumId'))
+        if abstract_id is None:
+            continue
+        for ilvl, fmt in abstract_formats.get(abstract_id.get(qn('w:val')), {}).items():
+            formats[(num.get(qn('w:numId')), ilvl)] = fmt
+    return formats
+
+
+class ListTracker:
+    """
+    Number list paragraphs in reading order.
+
+    Counters are kept per (numId, level); deeper levels restart whenever a
+    shallower item of the same list appears.
+    """
+
+    def __init__(self, numbering_formats: Dict[Tuple[str, int], str]):
+        self.numbering = numbering_formats
+        self.counters: Dict[Tuple[str, int], int] = {}
+        # numId (or list style name) of the item returned last
+        self.last_list: Optional[str] = None
+
+    def next_item(self, p, style_name: str) -> Optional[Tuple[int, str, int]]:
+        """
+        Advance the counters for a paragraph.
+
+        Returns:
+            (level, numFmt, count) for list paragraphs (w:numPr or a
+            "List Bullet"/"List Number" style), otherwise None
+        """
+        pPr = p.find(qn('w:pPr'))
+        num_pr = pPr.find(qn('w:numPr')) if pPr is not None else None
+        if num_pr is not None:
+            num_id_el = num_pr.find(qn('w:numId'))
+            ilvl_el = num_pr.find(qn('w:ilvl'))
+            num_id = num_id_el.get(qn('w:val')) if num_id_el is not None else None
+            level = int(ilvl_el.get(qn('w:val'), '0')) if ilvl_el is not None else 0
+            if num_id in (None, '0'):
+                return None
+            fmt = self.numbering.get((num_id, level), 'bullet')
+        else:
+            lowered = (style_name or '').lower()
+            if lowered.startswith('list bullet'):
+                fmt = 'bullet'
+            elif lowered.startswith('list number'):
+                fmt = 'decimal'
+            else:
+                return None
+            num_id = style_name
+            suffix = lowered.split()[-1]
+            level = int(suffix) - 1 if suffix.isdigit() else 0
+        for key in [k for k in self.counters if k[0] == num_id and k[1] > level]:
+            del self.counters[key]
+        count = self.counters.get((num_id, level), 0) + 1
+        self.counters[(num_id, level)] = count
+        self.last_list = num_id
+        return level, fmt, count
+
+
+def get_style_id(p) -> Optional[str]:
+    """Return the w:pStyle value of a w:p element, if any."""
+    pPr = p.find(qn('w:pPr'))
+    if pPr is not None:
+        pStyle = pPr.find(qn('w:pStyle'))
+        if pStyle is not None:
+            return pStyle.get(qn('w:val'))
+    return None
+
+
+def get_heading_level(style_name: Optional[str]) -> Optional[int]:
+    """Return the heading level for styles such as 'Heading 2' or 'Title'."""
+    if not style_name:
+        return None
+    lowered = style_name.lower()
+    if lowered == 'title':
+        return 1
+    if lowered.startswith('heading'):
+        try:
+            return max(1, min(int(lowered[len('heading'):].strip()), 9))
+        except ValueError:
+            return None
+    return None
+
+
+def is_code_style(style_name: Optional[str]) -> bool:
+    """Return True for style names such as 'Code', 'HTML Preformatted' or 'macro'."""
+    lowered = (style_name or '').lower()
+    return any(hint in lowered for hint in CODE_STYLE_HINTS)
+
+
+def run_format(rPr, style_names: Dict[str, str]) -> Tuple[bool, bool, bool, bool]:
+    """Return the (bold, italic, strike, code) flags of a run's w:rPr."""
+    if rPr is None:
+        return PLAIN_FORMAT
+
+    def on(tag):
+        el = rPr.find(qn(tag))
+        return el is not None and el.get(qn('w:val'), 'true') not in ('0', 'false', 'none')
+
+    code = False
+    r_style = rPr.find(qn('w:rStyle'))
+    if r_style is not None:
+        code = is_code_style(style_names.get(r_style.get(qn('w:val')), ''))
+    fonts = rPr.find(qn('w:rFonts'))
+    if fonts is not None and (fonts.get(qn('w:ascii')) or '').lower() in ('consolas', 'courier new', 'courier'):
+        code = True
+    return on('w:b'), on('w:i'), on('w:strike') or on('w:dstrike'), code
+
+
+def run_text(run) -> str:
+    """Return the text of a w:r element; tabs and line breaks become \\t and \\n."""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == qn('w:t'):
+            parts.append(child.text or '')
+        elif tag == qn('w:tab'):
+            parts.append('\t')
+        elif tag in (qn('w:br'), qn('w:cr')):
+            if child.get(qn('w:type')) not in ('page', 'column'):
+                parts.append('\n')
+        elif tag == qn('w:noBreakHyphen'):
+            parts.append('-')
+    return ''.join(parts)
+
+
+def iter_run_objects(run) -> Iterator:
+    """Yield the children of a w:r, unwrapping mc:AlternateContent to a single branch."""
+    for child in run:
+        if child.tag == f'{{{MC_NS}}}AlternateContent':
+            # Prefer the first mc:Choice; the VML fallback duplicates it
+            choice = child.find(f'{{{MC_NS}}}Choice')
+            if choice is None:
+                choice = child.find(f'{{{MC_NS}}}Fallback')
+            if choice is not None:
+                yield from choice
+        else:
+            yield child
+
+
+def paragraph_text(p) -> str:
+    """Concatenate the visible text of a w:p element (tabs and breaks included)."""
+    parts = []
+    for node in p.iter(_W_T, _W_TAB, _W_BR):
+        tag = node.tag
+        if tag == _W_T:
+            parts.append(node.text or '')
+        elif tag == _W_TAB:
+            parts.append('\t')
+        else:
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def child_element(parent, tag: str):
+    """First child of parent with the given tag, or None."""
+    # Property elements come first; a plain loop avoids lxml's Python-level find()
+    for child in parent:
+        if child.tag == tag:
+            return child
+    return None
+
+
+def cell_merge(tc) -> Tuple[int, bool]:
+    """Return (gridSpan, is vMerge continuation) of a w:tc element."""
+    span = 1
+    continued = False
+    tcPr = tc[0] if len(tc) else None
+    if tcPr is not None and tcPr.tag == _W_TCPR:
+        for prop in tcPr:
+            if prop.tag == _W_GRID_SPAN:
+                span = max(1, int(prop.get(_W_VAL, '1')))
+            elif prop.tag == _W_VMERGE:
+                continued = prop.get(_W_VAL, 'continue') == 'continue'
+    return span, continued
+
+
+def row_grid_skip(tr) -> Tuple[int, int]:
+    """Return (gridBefore, gridAfter) of a w:tr element: empty grid columns around its cells."""
+    before = after = 0
+    trPr = child_element(tr, _W_TRPR)
+    if trPr is not None:
+        for prop in trPr:
+            if prop.tag == _W_GRID_BEFORE:
+                before = int(prop.get(_W_VAL, '0'))
+            elif prop.tag == _W_GRID_AFTER:
+                after = int(prop.get(_W_VAL, '0'))
+    return before, after
+
+
+def iter_body_blocks(zf: zipfile.ZipFile, part_name: str = DOCUMENT_PART) -> Iterator:
+    """
+    Stream the top-level blocks (w:p, w:tbl, w:sdt) of the document body.
+
+    The body is parsed incrementally; each yielded element is complete and
+    is cleared after the caller moves on, so memory stays proportional to
+    the largest single block rather than the whole document.
+    """
+    with zf.open(part_name) as stream:
+        # Let lxml filter events down to block elements; runs and cells never reach Python
+        for _, elem in etree.iterparse(stream, events=('end',), tag=BODY_BLOCK_TAGS):
+            body = elem.getparent()
+            if body is None or body.tag != _W_BODY:
+                continue
+            yield elem
+            # Free the processed block and anything before it
+            elem.clear()
+            while elem.getprevious() is not None:
+                del body[0]
+
+
+def serialize_part(root) -> bytes:
+    """Serialize a part's root element the way Word writes it."""
+    return etree.tostring(root, encoding='UTF-8', xml_declaration=True, standalone=True)
+
+
+def add_package_part(zf: zipfile.ZipFile, replacements: Dict[str, bytes], part_name: str,
+                     content_type: str, rel_type: str, source_part: str = DOCUMENT_PART) -> None:
+    """
+    Register a new part in a package being rewritten.
+
+    Adds the content type override and a relationship from source_part to
+    the updated parts in `replacements` (reading the current versions from
+    zf when they have not been changed yet). The part data itself must be
+    put in `replacements` by the caller.
+    """
+    types_xml = replacements.get(CONTENT_TYPES_PART) or zf.read(CONTENT_TYPES_PART)
+    types_root = etree.fromstring(types_xml)
+    if not any(node.get('PartName') == f'/{part_name}' for node in types_root.iter(f'{{{CT_NS}}}Override')):
+        override = etree.SubElement(types_root, f'{{{CT_NS}}}Override')
+        override.set('PartName', f'/{part_name}')
+        override.set('ContentType', content_type)
+        replacements[CONTENT_TYPES_PART] = serialize_part(types_root)
+
+    rels_name = rels_part_name(source_part)
+    rels_xml = replacements.get(rels_name) or read_part(zf, rels_name)
+    rels_root = etree.fromstring(rels_xml) if rels_xml else etree.Element(f'{{{REL_NS}}}Relationships', nsmap={None: REL_NS})
+    target = posixpath.relpath(part_name, posixpath.dirname(source_part))
+    existing = rels_root.findall(f'{{{REL_NS}}}Relationship')
+    if any(rel.get('Type') == rel_type and rel.get('Target') == target for rel in existing):
+        return
+    ids = {rel.get('Id') for rel in existing}
+    number = len(ids) + 1
+    while f'rId{number}' in ids:
+        number += 1
+    rel = etree.SubElement(rels_root, f'{{{REL_NS}}}Relationship')
+    rel.set('Id', f'rId{number}')
+    rel.set('Type', rel_type)
+    rel.set('Target', target)
+    replacements[rels_name] = serialize_part(rels_root)
+
+
+def rewrite_package(path: str, replacements: Dict[str, bytes], output_path: Optional[str] = None) -> None:
+    """
+    Write a copy of a DOCX package with some parts replaced or added.
+
+    Unchanged parts are streamed across without being parsed. The result is
+    written to a temporary file next to the target and moved into place, so
+    a failure never leaves a half-written document behind.
+    """
+    with atomic_output(output_path or path) as temp_path:
+        with zipfile.ZipFile(path) as zin, zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+            names = set()
+            for item in zin.infolist():
+                names.add(item.filename)
+                if item.filename in replacements:
+                    zout.writestr(item, replacements[item.filename], compress_type=zipfile.ZIP_DEFLATED)
+                    continue
+                with zin.open(item) as source, zout.open(item, 'w', force_zip64=item.file_size > 0x7FFFFFFF) as dest:
+                    shutil.copyfileobj(source, dest, 1 << 20)
+            for name, data in replacements.items():
+                if name not in names:
+                    zout.writestr(name, data, compress_type=zipfile.ZIP_DEFLATED)
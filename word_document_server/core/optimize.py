@@ -0,0 +1,301 @@
+"""
+DOCX compaction for Word Document Server.
+
+Repeated edits leave documents larger and slower to parse than they need to
+be: formatting splits text into many runs with identical properties, edits
+repeat property elements, and Word stores revision ids (rsids) and proofing
+marks on almost every element. optimize_document rewrites the WordprocessingML
+parts without that overhead, points duplicate media at a single copy,
+optionally recompresses images and re-deflates the package.
+"""
+import hashlib
+import io
+import os
+import posixpath
+import time
+import zipfile
+from typing import Any, Dict, Optional
+
+from lxml import etree
+from docx.oxml.ns import qn
+
+from word_document_server.core.ooxml import (
+    W_NS, REL_NS, CT_NS, DOCUMENT_PART, CONTENT_TYPES_PART, serialize_part
+)
+from word_document_server.core.tables import BORDER_ORDER
+from word_document_server.utils.file_utils import atomic_output
+
+DEFAULT_COMPRESSION_LEVEL = 9
+SETTINGS_PART = 'word/settings.xml'
+MEDIA_PREFIX = 'word/media/'
+
+_W_R = qn('w:r')
+_W_T = qn('w:t')
+_W_RPR = qn('w:rPr')
+_W_PROOF_ERR = qn('w:proofErr')
+_W_RSIDS = qn('w:rsids')
+_W_RSID = qn('w:rsid')
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+_W_PREFIX = f'{{{W_NS}}}'
+
+# Property containers whose children may each appear once; sectPr is excluded (it repeats header references)
+_SINGLE_CHILD_CONTAINERS = {qn(f'w:{tag}') for tag in (
+    'rPr', 'pPr', 'tcPr', 'trPr', 'tblPr', 'numPr', 'tcBorders', 'tblBorders', 'pBdr', 'tcMar', 'tblCellMar')}
+_BORDER_CONTAINERS = {qn('w:tcBorders'), qn('w:tblBorders'), qn('w:pBdr')}
+_BORDER_RANK = {qn(f'w:{side}'): rank for rank, side in enumerate(BORDER_ORDER)}
+# Property elements that say nothing when they have no children or attributes
+_DROPPABLE_WHEN_EMPTY = {qn(f'w:{tag}') for tag in ('rPr', 'pPr', 'tcPr', 'trPr', 'tcBorders', 'tblBorders', 'pBdr')}
+# Tracked property changes hold the previous properties as a required child, empty when there were none
+_PROPERTY_CHANGES = {qn(f'w:{tag}') for tag in ('rPrChange', 'pPrChange', 'tcPrChange', 'trPrChange')}
+_RECOMPRESSIBLE = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG'}
+_PARSE_SAMPLES = 3
+
+
+def _is_content_part(name: str) -> bool:
+    """WordprocessingML parts that carry runs and properties (body, headers, notes, styles, ...)."""
+    return (name.startswith('word/') and name.endswith('.xml') and name.count('/') == 1
+            and name != SETTINGS_PART)
+
+
+def _strip_revision_data(root, stats: Dict[str, int]) -> None:
+    """Remove rsid attributes, w:rsid style elements and w:proofErr marks."""
+    for element in list(root.iter(_W_PROOF_ERR, _W_RSID)):
+        if element.tag == _W_PROOF_ERR:
+            stats['proofing_marks_removed'] += 1
+        else:
+            stats['rsids_removed'] += 1
+        element.getparent().remove(element)
+    for element in root.iter():
+        for name in [name for name in element.attrib if name.startswith(_W_PREFIX + 'rsid')]:
+            del element.attrib[name]
+            stats['rsids_removed'] += 1
+
+
+def _clean_properties(root, stats: Dict[str, int]) -> None:
+    """Drop repeated children of property containers (the last one wins) and empty containers."""
+    for container in list(root.iter(*_SINGLE_CHILD_CONTAINERS)):
+        seen = {}
+        for child in list(container):
+            if not isinstance(child.tag, str):
+                continue
+            if child.tag in seen:
+                earlier = seen[child.tag]
+                if child.tag in _SINGLE_CHILD_CONTAINERS:
+                    # Repeated containers (e.g. two w:tcBorders) are merged; containers are visited
+                    # parent-first, so the merged children are deduplicated when `earlier` comes up
+                    earlier.extend(list(child))
+                    earlier.attrib.update(child.attrib)
+                    container.remove(child)
+                    stats['duplicate_properties_removed'] += 1
+                    continue
+                container.remove(earlier)
+                stats['duplicate_properties_removed'] += 1
+            seen[child.tag] = child
+        if container.tag in _BORDER_CONTAINERS:
+            sides = sorted(container, key=lambda side: _BORDER_RANK.get(side.tag, len(_BORDER_RANK)))
+            container[:] = sides
+    # Innermost first, so a container left empty by its children is dropped too
+    for element in reversed(list(root.iter(*_DROPPABLE_WHEN_EMPTY))):
+        parent = element.getparent()
+        if len(element) == 0 and not element.attrib and parent is not None and parent.tag not in _PROPERTY_CHANGES:
+            parent.remove(element)
+            stats['empty_properties_removed'] += 1
+
+
+def _text_run_key(run) -> Optional[bytes]:
+    """Serialized rPr of a run that holds only text (and properties), else None."""
+    properties = None
+    has_text = False
+    for child in run:
+        if child.tag == _W_RPR and properties is None and not has_text:
+            properties = child
+        elif child.tag == _W_T:
+            has_text = True
+        else:
+            return None
+    if not has_text or run.attrib:
+        return None
+    return etree.tostring(properties) if properties is not None else b''
+
+
+def _coalesce_runs(root, stats: Dict[str, int]) -> None:
+    """Merge adjacent text-only runs that have identical run properties."""
+    for parent in {run.getparent() for run in root.iter(_W_R)}:
+        previous = previous_key = None
+        for child in list(parent):
+            key = _text_run_key(child) if child.tag == _W_R else None
+            if key is not None and key == previous_key:
+                texts = [t for t in child if t.tag == _W_T]
+                target = [t for t in previous if t.tag == _W_T][-1]
+                target.text = (target.text or '') + ''.join(t.text or '' for t in texts)
+                if target.text != target.text.strip():
+                    target.set(_XML_SPACE, 'preserve')
+                parent.remove(child)
+                stats['runs_merged'] += 1
+                continue
+            previous, previous_key = (child, key) if key is not None else (None, None)
+
+
+def optimize_part(data: bytes, stats: Dict[str, int]) -> bytes:
+    """Compact one WordprocessingML part."""
+    root = etree.fromstring(data)
+    _strip_revision_data(root, stats)
+    _clean_properties(root, stats)
+    _coalesce_runs(root, stats)
+    return serialize_part(root)
+
+
+def _optimize_settings(data: bytes, stats: Dict[str, int]) -> bytes:
+    root = etree.fromstring(data)
+    for rsids in root.findall(_W_RSIDS):
+        stats['rsids_removed'] += len(rsids)
+        root.remove(rsids)
+    return serialize_part(root)
+
+
+def _recompress_image(data: bytes, fmt: str, quality: int) -> Optional[bytes]:
+    """Re-encode an image with Pillow; None if Pillow is missing or the result is not smaller."""
+    try:
+        from PIL import Image  # type: ignore
+    except ImportError:
+        return None
+    with Image.open(io.BytesIO(data)) as image:
+        out = io.BytesIO()
+        if fmt == 'JPEG':
+            image.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+        else:
+            image.save(out, 'PNG', optimize=True)
+    result = out.getvalue()
+    return result if len(result) < len(data) else None
+
+
+def _deduplicate_media(zf: zipfile.ZipFile, parts: Dict[str, bytes], stats: Dict[str, int]) -> set:
+    """
+    Point relationships at one copy of each distinct media file.
+
+    Returns the names of the now unreferenced duplicate parts; updated
+    relationship and content type parts are stored in `parts`.
+    """
+    canonical: Dict[str, str] = {}
+    duplicates: Dict[str, str] = {}
+    for info in zf.infolist():
+        if not info.filename.startswith(MEDIA_PREFIX):
+            continue
+        digest = hashlib.sha256(zf.read(info)).hexdigest()
+        if digest in canonical:
+            duplicates[info.filename] = canonical[digest]
+        else:
+            canonical[digest] = info.filename
+    if not duplicates:
+        return set()
+
+    for name in zf.namelist():
+        if not name.endswith('.rels'):
+            continue
+        # word/_rels/document.xml.rels -> targets are relative to word/
+        source_dir = posixpath.dirname(posixpath.dirname(name))
+        root = etree.fromstring(parts.get(name) or zf.read(name))
+        changed = False
+        for rel in root.iter(f'{{{REL_NS}}}Relationship'):
+            if rel.get('TargetMode') == 'External':
+                continue
+            target = rel.get('Target', '')
+            resolved = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(source_dir, target))
+            if resolved in duplicates:
+                rel.set('Target', posixpath.relpath(duplicates[resolved], source_dir or '.'))
+                changed = True
+        if changed:
+            parts[name] = serialize_part(root)
+
+    types_root = etree.fromstring(parts.get(CONTENT_TYPES_PART) or zf.read(CONTENT_TYPES_PART))
+    for override in list(types_root.iter(f'{{{CT_NS}}}Override')):
+        if override.get('PartName', '').lstrip('/') in duplicates:
+            types_root.remove(override)
+    parts[CONTENT_TYPES_PART] = serialize_part(types_root)
+    stats['media_deduplicated'] = len(duplicates)
+    return set(duplicates)
+
+
+def _parse_seconds(data: Optional[bytes]) -> Optional[float]:
+    """Best of a few lxml parses of a part, in seconds."""
+    if data is None:
+        return None
+    best = None
+    for _ in range(_PARSE_SAMPLES):
+        start = time.perf_counter()
+        etree.fromstring(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def optimize_document(docx_path: str, output_path: Optional[str] = None,
+                      image_quality: Optional[int] = None,
+                      compression_level: int = DEFAULT_COMPRESSION_LEVEL) -> Dict[str, Any]:
+    """
+    Write a compacted copy of a DOCX file (in place when output_path is None).
+
+    Args:
+        docx_path: Source document
+        output_path: Where to write the result
+        image_quality: JPEG quality (1-95) for recompressing images with Pillow;
+            PNGs are re-encoded losslessly. None leaves images untouched.
+        compression_level: Deflate level (0-9) for every part
+
+    Returns:
+        Report with sizes, parse times of word/document.xml and counts of
+        each optimization applied
+    """
+    if not 0 <= compression_level <= 9:
+        raise ValueError("compression_level must be between 0 and 9")
+    if image_quality is not None and not 1 <= image_quality <= 95:
+        raise ValueError("image_quality must be between 1 and 95")
+
+    stats = dict.fromkeys(('runs_merged', 'rsids_removed', 'proofing_marks_removed', 'duplicate_properties_removed',
+                           'empty_properties_removed', 'media_deduplicated', 'media_recompressed'), 0)
+    original_size = os.path.getsize(docx_path)
+    parts: Dict[str, bytes] = {}
+    with zipfile.ZipFile(docx_path) as zf:
+        original_document = zf.read(DOCUMENT_PART)
+        for name in zf.namelist():
+            if _is_content_part(name):
+                parts[name] = optimize_part(zf.read(name), stats)
+            elif name == SETTINGS_PART:
+                parts[name] = _optimize_settings(zf.read(name), stats)
+        dropped = _deduplicate_media(zf, parts, stats)
+        if image_quality is not None:
+            for name in zf.namelist():
+                fmt = _RECOMPRESSIBLE.get(posixpath.splitext(name)[1].lower())
+                if name.startswith(MEDIA_PREFIX) and fmt and name not in dropped:
+                    try:
+                        smaller = _recompress_image(zf.read(name), fmt, image_quality)
+                    except Exception:
+                        # Images Pillow cannot decode are kept as they are
+                        smaller = None
+                    if smaller is not None:
+                        parts[name] = smaller
+                        stats['media_recompressed'] += 1
+
+        with atomic_output(output_path or docx_path) as temp_path:
+            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=compression_level) as zout:
+                for info in zf.infolist():
+                    if info.filename in dropped:
+                        continue
+                    data = parts[info.filename] if info.filename in parts else zf.read(info)
+                    item = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                    item.compress_type = zipfile.ZIP_DEFLATED if compression_level else zipfile.ZIP_STORED
+                    item.external_attr = info.external_attr
+                    zout.writestr(item, data, compresslevel=compression_level)
+
+    optimized_size = os.path.getsize(output_path or docx_path)
+    before, after = _parse_seconds(original_document), _parse_seconds(parts.get(DOCUMENT_PART))
+    return {
+        'original_size': original_size,
+        'optimized_size': optimized_size,
+        'saved_bytes': original_size - optimized_size,
+        'saved_percent': round(100.0 * (original_size - optimized_size) / original_size, 1) if original_size else 0.0,
+        'document_xml_size': {'before': len(original_document), 'after': len(parts[DOCUMENT_PART])},
+        'parse_ms': {'before': round(before * 1000, 2), 'after': round(after * 1000, 2)},
+        **stats,
+    }
+
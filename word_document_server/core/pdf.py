@@ -0,0 +1,436 @@
+"""
+Native DOCX to PDF rendering for Word Document Server.
+
+Body blocks are streamed from word/document.xml and turned into reportlab
+flowables one page-sized batch at a time, so PDFs can be produced on any
+platform without LibreOffice or Microsoft Word and without holding the
+whole document in memory.
+"""
+import io
+import re
+import zipfile
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from docx.oxml.ns import qn
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import (
+    Image, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle, XPreformatted
+)
+
+from word_document_server.core.ooxml import (
+    DOCUMENT_PART, R_NS, ListTracker, escape_xml_text, get_heading_level, get_style_id, is_code_style,
+    iter_body_blocks, iter_run_objects, load_numbering_formats, load_relationships, load_style_names,
+    run_format, run_text
+)
+
+_EMU_PER_POINT = 12700
+_TWIPS_PER_POINT = 20
+_DEFAULT_PAGE = (612.0, 792.0)  # US Letter, as in python-docx's default template
+_DEFAULT_MARGINS = (72.0, 90.0, 72.0, 90.0)  # top, right, bottom, left
+_CJK_FONT = 'STSong-Light'
+_ALIGNMENTS = {'center': TA_CENTER, 'right': TA_RIGHT, 'end': TA_RIGHT, 'both': TA_JUSTIFY,
+               'distribute': TA_JUSTIFY}
+_SECT_PR_RE = re.compile(rb'<w:sectPr\b.*?</w:sectPr>', re.DOTALL)
+_ATTR_RE = re.compile(rb'w:(\w+)="(-?\d+)"')
+_DRAWING_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+_WP_NS = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+# CJK radicals through unified ideographs, Hangul syllables, compatibility ideographs, full/half-width forms
+_CJK_RE = re.compile('[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]+')
+
+
+@lru_cache(maxsize=1)
+def _cjk_font() -> str:
+    """Register the built-in CJK font once per process and return its name."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.lib.fonts import addMapping
+    pdfmetrics.registerFont(UnicodeCIDFont(_CJK_FONT))
+    for bold in (0, 1):
+        for italic in (0, 1):
+            addMapping(_CJK_FONT, bold, italic, _CJK_FONT)
+    return _CJK_FONT
+
+
+@lru_cache(maxsize=1)
+def _base_styles():
+    return getSampleStyleSheet()
+
+
+@lru_cache(maxsize=None)
+def _style(kind: str, level: int = 0, alignment: Optional[str] = None) -> ParagraphStyle:
+    """Return a cached paragraph style: 'body', 'heading', 'code', 'quote' or 'list'."""
+    sheet = _base_styles()
+    if kind == 'heading':
+        parent = sheet[f'Heading{min(max(level, 1), 6)}']
+    elif kind == 'code':
+        parent = sheet['Code']
+    else:
+        parent = sheet['Normal']
+    options = {'parent': parent, 'spaceAfter': 6}
+    if kind == 'quote':
+        options.update(leftIndent=24, rightIndent=24, fontName='Helvetica-Oblique', textColor=colors.HexColor('#404040'))
+    elif kind == 'list':
+        options.update(leftIndent=18 * (level + 1), bulletIndent=18 * level + 4, spaceAfter=2)
+    elif kind == 'code':
+        options.update(spaceAfter=0, spaceBefore=0, leftIndent=12)
+    if alignment in _ALIGNMENTS:
+        options['alignment'] = _ALIGNMENTS[alignment]
+    else:
+        options.setdefault('alignment', TA_LEFT)
+    return ParagraphStyle(f'docx-{kind}-{level}-{alignment}', **options)
+
+
+def _cjk_markup(markup: str) -> str:
+    """Set the CJK font on the CJK spans of escaped text only; the rest keeps the style's font."""
+    return _CJK_RE.sub(lambda m: f'<font face="{_cjk_font()}">{m.group(0)}</font>', markup)
+
+
+def _list_label(fmt: str, count: int) -> str:
+    if fmt == 'bullet':
+        return '•'
+    if fmt in ('lowerLetter', 'upperLetter'):
+        label = ''
+        n = count
+        while n > 0:
+            n, rem = divmod(n - 1, 26)
+            label = chr(ord('a') + rem) + label
+        return f"{label.upper() if fmt == 'upperLetter' else label}."
+    if fmt in ('lowerRoman', 'upperRoman'):
+        numerals = [(1000, 'm'), (900, 'cm'), (500, 'd'), (400, 'cd'), (100, 'c'), (90, 'xc'),
+                    (50, 'l'), (40, 'xl'), (10, 'x'), (9, 'ix'), (5, 'v'), (4, 'iv'), (1, 'i')]
+        label, n = '', count
+        for value, numeral in numerals:
+            while n >= value:
+                label += numeral
+                n -= value
+        return f"{label.upper() if fmt == 'upperRoman' else label}."
+    return f"{count}."
+
+
+def read_page_setup(zf: zipfile.ZipFile) -> Tuple[Tuple[float, float], Tuple[float, float, float, float]]:
+    """
+    Read the page size and margins (in points) of the document's final section.
+
+    The body-level w:sectPr is always the last element of document.xml, so only
+    a rolling tail of the decompressed stream is kept instead of parsing the part.
+    """
+    tail = b''
+    with zf.open(DOCUMENT_PART) as stream:
+        for chunk in iter(lambda: stream.read(1 << 16), b''):
+            tail = (tail + chunk)[-16384:]
+    matches = _SECT_PR_RE.findall(tail)
+    if not matches:
+        return _DEFAULT_PAGE, _DEFAULT_MARGINS
+    sect_pr = matches[-1]
+    size, margins = _DEFAULT_PAGE, _DEFAULT_MARGINS
+    pg_sz = re.search(rb'<w:pgSz\b[^>]*>', sect_pr)
+    if pg_sz:
+        attrs = {k.decode(): int(v) / _TWIPS_PER_POINT for k, v in _ATTR_RE.findall(pg_sz.group(0))}
+        if attrs.get('w') and attrs.get('h'):
+            size = (attrs['w'], attrs['h'])
+    pg_mar = re.search(rb'<w:pgMar\b[^>]*>', sect_pr)
+    if pg_mar:
+        attrs = {k.decode(): int(v) / _TWIPS_PER_POINT for k, v in _ATTR_RE.findall(pg_mar.group(0))}
+        margins = tuple(abs(attrs.get(side, default)) for side, default in
+                        zip(('top', 'right', 'bottom', 'left'), _DEFAULT_MARGINS))
+    return size, margins
+
+
+class _FlowableStream(list):
+    """
+    A list that refills itself from a batch iterator whenever it runs low.
+
+    reportlab's build loop checks len(flowables) before consuming each item
+    from the front, so the story never holds more than a couple of batches.
+    """
+
+    def __init__(self, batches: Iterator[list], low_water: int = 8):
+        super().__init__()
+        self._batches = batches
+        self._low_water = low_water
+
+    def __len__(self):
+        while self._batches is not None and list.__len__(self) < self._low_water:
+            try:
+                self.extend(next(self._batches))
+            except StopIteration:
+                self._batches = None
+        return list.__len__(self)
+
+
+class PdfRenderer:
+    """Converts streamed WordprocessingML body blocks into reportlab flowables."""
+
+    def __init__(self, zf: zipfile.ZipFile, frame_width: float, frame_height: float):
+        self.zf = zf
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.rels = load_relationships(zf)
+        self.style_names = load_style_names(zf)
+        self.lists = ListTracker(load_numbering_formats(zf))
+        self.block_count = 0
+        self.image_count = 0
+
+    # -- inline content ---------------------------------------------------
+
+    def _image(self, drawing) -> Optional[Image]:
+        blip = next(drawing.iter(f'{{{_DRAWING_NS}}}blip'), None)
+        if blip is None:
+            return None
+        rel = self.rels.get(blip.get(f'{{{R_NS}}}embed'))
+        if rel is None or rel['external']:
+            return None
+        extent = next(drawing.iter(f'{{{_WP_NS}}}extent'), None)
+        try:
+            data = self.zf.read(rel['target'])
+            if extent is not None:
+                width = int(extent.get('cx')) / _EMU_PER_POINT
+                height = int(extent.get('cy')) / _EMU_PER_POINT
+            else:
+                from reportlab.lib.utils import ImageReader
+                width, height = ImageReader(io.BytesIO(data)).getSize()
+            scale = min(1.0, self.frame_width / width, (self.frame_height - 12) / height)
+            image = Image(io.BytesIO(data), width=width * scale, height=height * scale)
+        except Exception:
+            # Vector formats such as EMF/WMF cannot be drawn by reportlab
+            return None
+        self.image_count += 1
+        return image
+
+    def _run_markup(self, run, extras: List) -> str:
+        rPr = run.find(qn('w:rPr'))
+        bold, italic, strike, code = run_format(rPr, self.style_names)
+        pieces = []
+        text = run_text(run)
+        if text:
+            markup = _cjk_markup(escape_xml_text(text)).replace('\n', '<br/>').replace('\t', '&nbsp;' * 4)
+            if code:
+                markup = f'<font face="Courier">{markup}</font>'
+            if rPr is not None:
+                underline = rPr.find(qn('w:u'))
+                if underline is not None and underline.get(qn('w:val')) not in (None, 'none'):
+                    markup = f'<u>{markup}</u>'
+                vert = rPr.find(qn('w:vertAlign'))
+                if vert is not None and vert.get(qn('w:val')) in ('superscript', 'subscript'):
+                    tag = 'super' if vert.get(qn('w:val')) == 'superscript' else 'sub'
+                    markup = f'<{tag}>{markup}</{tag}>'
+            if strike:
+                markup = f'<strike>{markup}</strike>'
+            if italic:
+                markup = f'<i>{markup}</i>'
+            if bold:
+                markup = f'<b>{markup}</b>'
+            pieces.append(markup)
+        for special in iter_run_objects(run):
+            tag = special.tag
+            if tag in (qn('w:footnoteReference'), qn('w:endnoteReference')):
+                pieces.append(f"<super>{special.get(qn('w:id'))}</super>")
+            elif tag == qn('w:br') and special.get(qn('w:type')) == 'page':
+                extras.append(PageBreak())
+            elif tag in (qn('w:drawing'), qn('w:pict')):
+                image = self._image(special)
+                if image is not None:
+                    extras.append(image)
+                for content in special.iter(qn('w:txbxContent')):
+                    for block in content:
+                        extras.extend(self.block_flowables(block))
+        return ''.join(pieces)
+
+    def _markup(self, container, extras: List) -> str:
+        parts = []
+        for child in container:
+            tag = child.tag
+            if tag == qn('w:r'):
+                parts.append(self._run_markup(child, extras))
+            elif tag == qn('w:hyperlink'):
+                label = self._markup(child, extras)
+                rel = self.rels.get(child.get(f'{{{R_NS}}}id'))
+                if rel and rel['external'] and label:
+                    href = escape_xml_text(rel['target']).replace('"', '&quot;')
+                    parts.append(f'<a href="{href}" color="blue">{label}</a>')
+                else:
+                    parts.append(label)
+            elif tag in (qn('w:ins'), qn('w:smartTag'), qn('w:fldSimple'), qn('w:customXml')):
+                parts.append(self._markup(child, extras))
+            elif tag == qn('w:sdt'):
+                content = child.find(qn('w:sdtContent'))
+                if content is not None:
+                    parts.append(self._markup(content, extras))
+        return ''.join(parts)
+
+    # -- blocks -----------------------------------------------------------
+
+    def paragraph_flowables(self, p) -> List:
+        flowables: List = []
+        extras: List = []
+        style_name = self.style_names.get(get_style_id(p) or '', '')
+        pPr = p.find(qn('w:pPr'))
+        alignment = None
+        if pPr is not None:
+            if pPr.find(qn('w:pageBreakBefore')) is not None:
+                flowables.append(PageBreak())
+            jc = pPr.find(qn('w:jc'))
+            alignment = jc.get(qn('w:val')) if jc is not None else None
+
+        markup = self._markup(p, extras)
+        heading = get_heading_level(style_name)
+        item = self.lists.next_item(p, style_name)
+        lowered = style_name.lower()
+        if not markup.strip():
+            if not extras:
+                flowables.append(Spacer(1, 12))
+        elif heading:
+            flowables.append(Paragraph(markup, _style('heading', heading, alignment)))
+        elif item is not None:
+            level, fmt, count = item
+            flowables.append(Paragraph(markup, _style('list', min(level, 8), alignment),
+                                       bulletText=_list_label(fmt, count)))
+        elif is_code_style(lowered):
+            flowables.append(XPreformatted(markup, _style('code')))
+        elif 'quote' in lowered:
+            flowables.append(Paragraph(markup, _style('quote', 0, alignment)))
+        else:
+            flowables.append(Paragraph(markup, _style('body', 0, alignment)))
+        flowables.extend(extras)
+        return flowables
+
+    def _cell_flowables(self, tc) -> List:
+        content = []
+        for child in tc:
+            content.extend(self.block_flowables(child))
+        return content or ['']
+
+    def table_flowable(self, tbl) -> Optional[Table]:
+        grid = tbl.find(qn('w:tblGrid'))
+        widths = [int(col.get(qn('w:w'), '0') or 0) / _TWIPS_PER_POINT
+                  for col in (grid.findall(qn('w:gridCol')) if grid is not None else [])]
+        data: List[List] = []
+        commands = [('GRID', (0, 0), (-1, -1), 0.5, colors.grey), ('VALIGN', (0, 0), (-1, -1), 'TOP')]
+        merge_starts: Dict[int, int] = {}
+        # (column, first row) -> [last row, column span] for every merged area
+        spans: Dict[Tuple[int, int], List[int]] = {}
+        header_rows = 0
+        for r, tr in enumerate(tbl.findall(qn('w:tr'))):
+            trPr = tr.find(qn('w:trPr'))
+            if trPr is not None and trPr.find(qn('w:tblHeader')) is not None and header_rows == r:
+                header_rows += 1
+            row: List = []
+            for tc in tr.findall(qn('w:tc')):
+                tcPr = tc.find(qn('w:tcPr'))
+                span, v_merge, fill = 1, None, None
+                if tcPr is not None:
+                    grid_span = tcPr.find(qn('w:gridSpan'))
+                    span = int(grid_span.get(qn('w:val'), '1')) if grid_span is not None else 1
+                    merge = tcPr.find(qn('w:vMerge'))
+                    v_merge = (merge.get(qn('w:val')) or 'continue') if merge is not None else None
+                    shd = tcPr.find(qn('w:shd'))
+                    fill = shd.get(qn('w:fill')) if shd is not None else None
+                c = len(row)
+                if v_merge == 'continue' and c in merge_starts:
+                    row.append('')
+                    spans[(c, merge_starts[c])][0] = r
+                else:
+                    row.append(self._cell_flowables(tc))
+                    if v_merge == 'restart':
+                        merge_starts[c] = r
+                    else:
+                        merge_starts.pop(c, None)
+                    if span > 1 or v_merge == 'restart':
+                        spans[(c, r)] = [r, span]
+                    if fill and re.fullmatch(r'[0-9A-Fa-f]{6}', fill):
+                        commands.append(('BACKGROUND', (c, r), (c + span - 1, r), colors.HexColor(f'#{fill}')))
+                row.extend([''] * (span - 1))
+            data.append(row)
+        for (c, first), (last, span) in spans.items():
+            if last > first or span > 1:
+                commands.append(('SPAN', (c, first), (c + span - 1, last)))
+        if not data:
+            return None
+        col_count = max(len(widths), max(len(row) for row in data))
+        for row in data:
+            row.extend([''] * (col_count - len(row)))
+        widths = (widths + [0] * col_count)[:col_count]
+        if not all(widths):
+            widths = [self.frame_width / col_count] * col_count
+        total = sum(widths)
+        if total > self.frame_width:
+            widths = [w * self.frame_width / total for w in widths]
+        # Narrow columns cannot hold the default 6pt padding on each side
+        padding = min(6.0, max(0.0, (min(widths) - 1) / 2))
+        if padding < 6.0:
+            commands.extend([('LEFTPADDING', (0, 0), (-1, -1), padding),
+                             ('RIGHTPADDING', (0, 0), (-1, -1), padding)])
+        table = Table(data, colWidths=widths, repeatRows=header_rows)
+        table.setStyle(TableStyle(commands))
+        return table
+
+    def block_flowables(self, block) -> List:
+        tag = block.tag
+        if tag == qn('w:p'):
+            return self.paragraph_flowables(block)
+        if tag == qn('w:tbl'):
+            table = self.table_flowable(block)
+            return [table, Spacer(1, 6)] if table is not None else []
+        if tag == qn('w:sdt'):
+            content = block.find(qn('w:sdtContent'))
+            flowables = []
+            for child in (content if content is not None else []):
+                flowables.extend(self.block_flowables(child))
+            return flowables
+        return []
+
+    def _estimate_height(self, flowable) -> float:
+        if isinstance(flowable, Paragraph):
+            chars_per_line = max(self.frame_width / 5.5, 1)
+            return (len(flowable.getPlainText()) / chars_per_line + 1) * flowable.style.leading
+        if isinstance(flowable, Table):
+            return len(flowable._cellvalues) * 18
+        if isinstance(flowable, (Image, Spacer)):
+            return flowable.drawHeight if isinstance(flowable, Image) else flowable.height
+        return 14
+
+    def batches(self, blocks: Iterator) -> Iterator[List]:
+        """Group the flowables of streamed body blocks into roughly page-sized batches."""
+        batch: List = []
+        height = 0.0
+        for block in blocks:
+            self.block_count += 1
+            for flowable in self.block_flowables(block):
+                batch.append(flowable)
+                height += self._estimate_height(flowable)
+            if height >= self.frame_height:
+                yield batch
+                batch, height = [], 0.0
+        if batch:
+            yield batch
+
+
+def render_docx_to_pdf(docx_path: str, output_path: str) -> Dict[str, int]:
+    """
+    Render a DOCX file to PDF with reportlab, streaming the document body.
+
+    Supports headings, lists, tables (with merged cells and shading), block
+    quotes, code paragraphs, hyperlinks, page breaks and embedded raster images.
+
+    Args:
+        docx_path: Path to the source Word document
+        output_path: Path of the PDF file to write
+
+    Returns:
+        Dictionary with the number of blocks, images and pages written
+    """
+    with zipfile.ZipFile(docx_path) as zf:
+        (page_width, page_height), (top, right, bottom, left) = read_page_setup(zf)
+        pdf = SimpleDocTemplate(
+            output_path, pagesize=(page_width, page_height),
+            topMargin=top, rightMargin=right, bottomMargin=bottom, leftMargin=left,
+        )
+        renderer = PdfRenderer(zf, pdf.width, pdf.height)
+        story = _FlowableStream(renderer.batches(iter_body_blocks(zf)))
+        if not len(story):
+            story.append(Spacer(1, 1))
+        pdf.build(story)
+    return {'blocks': renderer.block_count, 'images': renderer.image_count, 'pages': pdf.page}
@@ -0,0 +1,152 @@
+"""
+Streaming plain text to DOCX conversion for Word Document Server.
+
+Large log and text files are read in chunks and written as pre-serialized
+paragraph markup straight into the word/document.xml stream of the output
+zip, so memory use stays flat regardless of the input size and no
+python-docx object graph is built.
+"""
+import codecs
+import os
+import zipfile
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from word_document_server.core.ooxml import DOCUMENT_PART, escape_xml_text
+
+CHUNK_SIZE = 1 << 20
+_BODY_OPEN = b'<w:body>'
+_SECT_PR = b'<w:sectPr'
+
+
+@lru_cache(maxsize=1)
+def _template() -> Tuple[Tuple[Tuple[str, bytes], ...], bytes, bytes]:
+    """
+    Load python-docx's default template once.
+
+    Returns:
+        (other parts, document.xml head up to and including <w:body>,
+         document.xml tail from the section properties to the end)
+    """
+    import docx
+    path = os.path.join(os.path.dirname(docx.__file__), 'templates', 'default.docx')
+    with zipfile.ZipFile(path) as zf:
+        parts = tuple((name, zf.read(name)) for name in zf.namelist() if name != DOCUMENT_PART)
+        document = zf.read(DOCUMENT_PART)
+    head_end = document.index(_BODY_OPEN) + len(_BODY_OPEN)
+    return parts, document[:head_end], document[document.index(_SECT_PR, head_end):]
+
+
+def _paragraph_xml(line: str) -> str:
+    line = escape_xml_text(line.rstrip('\r'))
+    if not line:
+        return '<w:p/>'
+    if '\t' not in line:
+        return f'<w:p><w:r><w:t xml:space="preserve">{line}</w:t></w:r></w:p>'
+    pieces = [f'<w:t xml:space="preserve">{chunk}</w:t>' if chunk else '' for chunk in line.split('\t')]
+    return f'<w:p><w:r>{"<w:tab/>".join(pieces)}</w:r></w:p>'
+
+
+def part_output_path(output_path: str, part_number: int) -> str:
+    """Return the file name of the n-th (1-based) output part: report.docx, report_part2.docx, ..."""
+    if part_number == 1:
+        return output_path
+    base, ext = os.path.splitext(output_path)
+    return f"{base}_part{part_number}{ext}"
+
+
+class _DocxPartWriter:
+    """Writes one DOCX file whose document.xml is streamed paragraph by paragraph."""
+
+    def __init__(self, path: str):
+        parts, self._head, self._tail = _template()
+        self.path = path
+        self.paragraphs = 0
+        self._zf = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+        for name, data in parts:
+            self._zf.writestr(name, data)
+        self._stream = self._zf.open(DOCUMENT_PART, 'w', force_zip64=True)
+        self._stream.write(self._head)
+
+    def write(self, fragments: List[str]) -> None:
+        self._stream.write(''.join(fragments).encode('utf-8'))
+        self.paragraphs += len(fragments)
+
+    def close(self) -> None:
+        self._stream.write(self._tail)
+        self._stream.close()
+        self._zf.close()
+
+    def abort(self) -> None:
+        try:
+            self._stream.close()
+            self._zf.close()
+        finally:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def stream_text_to_docx(input_path: str, output_path: str, max_paragraphs_per_part: Optional[int] = None,
+                        encoding: str = 'utf-8', chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Convert a text file to DOCX, one paragraph per line, yielding progress.
+
+    Args:
+        input_path: Path to the source text file
+        output_path: Path of the DOCX file to write
+        max_paragraphs_per_part: If set, start a new output file (report_part2.docx,
+                                 ...) whenever the current one holds this many paragraphs
+        encoding: Text encoding of the input; undecodable bytes are replaced
+        chunk_size: Number of bytes read per step
+
+    Yields:
+        Progress dictionaries with 'bytes_read', 'total_bytes', 'paragraphs'
+        and 'parts' (the output files written so far), once per chunk and
+        once more when the conversion is complete.
+    """
+    if max_paragraphs_per_part is not None and max_paragraphs_per_part < 1:
+        raise ValueError("max_paragraphs_per_part must be a positive integer")
+
+    total_bytes = os.path.getsize(input_path)
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    writer = _DocxPartWriter(output_path)
+    parts = [output_path]
+    paragraphs = 0
+    bytes_read = 0
+    pending = ''
+
+    def emit(lines: List[str]) -> None:
+        nonlocal writer, paragraphs
+        while lines:
+            room = len(lines)
+            if max_paragraphs_per_part:
+                if writer.paragraphs >= max_paragraphs_per_part:
+                    writer.close()
+                    writer = _DocxPartWriter(part_output_path(output_path, len(parts) + 1))
+                    parts.append(writer.path)
+                room = max_paragraphs_per_part - writer.paragraphs
+            batch, lines = lines[:room], lines[room:]
+            writer.write([_paragraph_xml(line) for line in batch])
+            paragraphs += len(batch)
+
+    try:
+        with open(input_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                final = not chunk
+                text = pending + decoder.decode(chunk, final=final)
+                lines = text.split('\n')
+                pending = lines.pop()
+                if final and pending:
+                    lines.append(pending)
+                emit(lines)
+                bytes_read += len(chunk)
+                if final:
+                    break
+                yield {'bytes_read': bytes_read, 'total_bytes': total_bytes,
+                       'paragraphs': paragraphs, 'parts': list(parts)}
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    yield {'bytes_read': bytes_read, 'total_bytes': total_bytes, 'paragraphs': paragraphs, 'parts': list(parts)}
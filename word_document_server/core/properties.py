@@ -0,0 +1,213 @@
+"""
+Document property and statistics reading for Word Document Server.
+
+Core properties come from docProps/core.xml and the statistics Word saves
+(pages, words, characters, paragraphs) from docProps/app.xml, both read
+straight from the zip. The document body is only walked when app.xml has no
+usable statistics; python-docx keeps the all-zero values of its template, so
+those count as missing.
+"""
+import datetime
+import re
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from docx.oxml.ns import qn
+
+from word_document_server.core.ooxml import (
+    parse_part, iter_body_blocks, paragraph_text, load_style_names, get_style_id, get_heading_level,
+    W_NS, DOCUMENT_PART
+)
+
+CORE_PART = 'docProps/core.xml'
+APP_PART = 'docProps/app.xml'
+
+_CP_NS = 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties'
+_DC_NS = 'http://purl.org/dc/elements/1.1/'
+_DCTERMS_NS = 'http://purl.org/dc/terms/'
+_EP_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/extended-properties'
+
+_CORE_FIELDS = (
+    ('title', f'{{{_DC_NS}}}title'),
+    ('author', f'{{{_DC_NS}}}creator'),
+    ('subject', f'{{{_DC_NS}}}subject'),
+    ('keywords', f'{{{_CP_NS}}}keywords'),
+    ('created', f'{{{_DCTERMS_NS}}}created'),
+    ('modified', f'{{{_DCTERMS_NS}}}modified'),
+    ('last_modified_by', f'{{{_CP_NS}}}lastModifiedBy'),
+    ('revision', f'{{{_CP_NS}}}revision'),
+)
+_APP_FIELDS = (
+    ('page_count', 'Pages'),
+    ('word_count', 'Words'),
+    ('character_count', 'Characters'),
+    ('paragraph_count', 'Paragraphs'),
+)
+
+_W_P = qn('w:p')
+_W_TBL = qn('w:tbl')
+_W_BR = qn('w:br')
+_W_TYPE = qn('w:type')
+_W_SECT_PR = qn('w:sectPr')
+_W_PPR = qn('w:pPr')
+_W_VAL = qn('w:val')
+_W_NS_DECL = re.compile(rb'xmlns:(\w+)="' + re.escape(W_NS.encode()) + rb'"')
+_SCAN_CHUNK = 1 << 20
+
+
+def _format_date(value: str) -> str:
+    # Same rendering as str() of python-docx's datetime values
+    try:
+        return str(datetime.datetime.fromisoformat(value))
+    except ValueError:
+        return value
+
+
+def read_core_properties(zf: zipfile.ZipFile) -> Dict[str, Any]:
+    """Title, author, dates and revision from docProps/core.xml."""
+    root = parse_part(zf, CORE_PART)
+    values = {}
+    if root is not None:
+        for child in root:
+            values[child.tag] = (child.text or '').strip()
+    properties: Dict[str, Any] = {}
+    for key, tag in _CORE_FIELDS:
+        value = values.get(tag, '')
+        if key in ('created', 'modified') and value:
+            value = _format_date(value)
+        properties[key] = value
+    try:
+        properties['revision'] = int(properties['revision'] or 0)
+    except ValueError:
+        properties['revision'] = 0
+    return properties
+
+
+def read_app_statistics(zf: zipfile.ZipFile) -> Optional[Dict[str, int]]:
+    """
+    Pages, words, characters and paragraphs as last saved by Word.
+
+    Returns None when app.xml is missing, incomplete, or holds only zeros.
+    """
+    root = parse_part(zf, APP_PART)
+    if root is None:
+        return None
+    values = {child.tag: (child.text or '').strip() for child in root}
+    statistics = {}
+    for key, name in _APP_FIELDS:
+        try:
+            statistics[key] = int(values[f'{{{_EP_NS}}}{name}'])
+        except (KeyError, ValueError):
+            return None
+    if not any(statistics[key] for key in ('word_count', 'character_count', 'paragraph_count')):
+        return None
+    return statistics
+
+
+def count_tables(zf: zipfile.ZipFile) -> int:
+    """
+    Count top-level tables (as in Document.tables) by scanning the raw XML.
+
+    Only table start and end tags are matched, so this costs little more
+    than decompressing word/document.xml.
+    """
+    count = depth = 0
+    pattern = None
+    pending = b''
+    with zf.open(DOCUMENT_PART) as part:
+        while True:
+            chunk = part.read(_SCAN_CHUNK)
+            if pattern is None:
+                declared = _W_NS_DECL.search(chunk)
+                prefix = re.escape(declared.group(1) if declared else b'w')
+                pattern = re.compile(b'<(/?)' + prefix + rb':tbl[\s>]')
+            buffer = pending + chunk
+            # Tags can straddle chunks; the tail is matched again with the next chunk
+            cutoff = len(buffer) - 8 if chunk else len(buffer)
+            for match in pattern.finditer(buffer, 0, len(buffer)):
+                if match.start() >= cutoff:
+                    break
+                if match.group(1):
+                    depth -= 1
+                else:
+                    if depth == 0:
+                        count += 1
+                    depth += 1
+            pending = buffer[cutoff:]
+            if not chunk:
+                return count
+
+
+def count_statistics(zf: zipfile.ZipFile, headings: Optional[List[Tuple[int, str]]] = None) -> Dict[str, int]:
+    """
+    Count pages, words, characters and paragraphs by streaming the document body.
+
+    Words and characters follow Word's rules (characters exclude whitespace,
+    paragraphs are the non-empty ones, tables included). The page count is
+    an estimate from explicit page and section breaks. When a `headings`
+    list is given, (level, text) of each top-level heading paragraph is
+    appended to it during the same pass.
+    """
+    words = characters = paragraphs = breaks = 0
+    tables = 0
+    levels: Dict[Optional[str], Optional[int]] = {None: None}
+    style_names = None
+    for block in iter_body_blocks(zf):
+        if block.tag == _W_TBL:
+            tables += 1
+        elif headings is not None and block.tag == _W_P:
+            style_id = get_style_id(block)
+            if style_id not in levels:
+                # Built-in ids ("Heading2", "Title") resolve directly; styles.xml is only parsed for other ids
+                level = get_heading_level(style_id)
+                if level is None:
+                    if style_names is None:
+                        style_names = load_style_names(zf)
+                    level = get_heading_level(style_names.get(style_id))
+                levels[style_id] = level
+            if levels[style_id] is not None:
+                headings.append((levels[style_id], paragraph_text(block).strip()))
+        for p in ([block] if block.tag == _W_P else block.iter(_W_P)):
+            text = paragraph_text(p)
+            tokens = text.split()
+            if tokens:
+                paragraphs += 1
+                words += len(tokens)
+                characters += sum(len(token) for token in tokens)
+        for br in block.iter(_W_BR):
+            if br.get(_W_TYPE) == 'page':
+                breaks += 1
+        if block.tag == _W_P:
+            pPr = block.find(_W_PPR)
+            sect = pPr.find(_W_SECT_PR) if pPr is not None else None
+            if sect is not None:
+                kind = sect.find(_W_TYPE)
+                if kind is None or kind.get(_W_VAL) != 'continuous':
+                    breaks += 1
+    return {
+        'page_count': breaks + 1,
+        'word_count': words,
+        'character_count': characters,
+        'paragraph_count': paragraphs,
+        'table_count': tables,
+    }
+
+
+def get_package_properties(doc_path: str) -> Dict[str, Any]:
+    """
+    Core properties and statistics of a DOCX file without building python-docx objects.
+
+    'statistics_source' tells whether the counts are Word's saved values
+    ('app.xml') or were counted from the body ('counted').
+    """
+    with zipfile.ZipFile(doc_path) as zf:
+        properties = read_core_properties(zf)
+        statistics = read_app_statistics(zf)
+        if statistics is not None:
+            properties.update(statistics)
+            properties['table_count'] = count_tables(zf)
+            properties['statistics_source'] = 'app.xml'
+        else:
+            properties.update(count_statistics(zf))
+            properties['statistics_source'] = 'counted'
+    return properties
@@ -5,8 +5,12 @@ import os
 import json
 import hashlib
 import datetime
+import zipfile
 from typing import Dict, List, Tuple, Optional, Any
 
+MANIFEST_ALGORITHM = "sha256"
+_HASH_CHUNK_SIZE = 1 << 20
+
 
 def add_protection_info(doc_path: str, protection_type: str, password_hash: str, 
                         sections: Optional[List[str]] = None, 
@@ -50,38 +54,19 @@ def add_protection_info(doc_path: str, protection_type: str, password_hash: str,
         
         # Apply actual document encryption if raw_password is provided
         if protection_type == "password" and raw_password:
-            import msoffcrypto
-            import tempfile
-            import shutil
-            
-            # Create a temporary file for the encrypted output
-            temp_fd, temp_path = tempfile.mkstemp(suffix='.docx')
-            os.close(temp_fd)
-            
+            from word_document_server.core.encryption import encrypt_document
+
             try:
-                # Open the document
-                with open(doc_path, 'rb') as f:
-                    office_file = msoffcrypto.OfficeFile(f)
-                    
-                    # Encrypt with password
-                    office_file.load_key(password=raw_password)
-                    
-                    # Write the encrypted file to the temp path
-                    with open(temp_path, 'wb') as out_file:
-                        office_file.encrypt(out_file)
-                
-                # Replace original with encrypted version
-                shutil.move(temp_path, doc_path)
-                
+                # Streams into a temporary file that replaces the original when complete
+                encrypt_document(doc_path, raw_password)
+
                 # Update metadata to note that true encryption was applied
                 protection_data["true_encryption"] = True
                 with open(metadata_path, 'w') as f:
                     json.dump(protection_data, f, indent=2)
-                    
+
             except Exception as e:
                 print(f"Encryption error: {str(e)}")
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
                 return False
         
         return True
@@ -165,14 +150,112 @@ def is_section_editable(doc_path: str, section_name: str) -> bool:
         return False
 
 
-def create_signature_info(doc, signer_name: str, reason: Optional[str] = None) -> Dict[str, Any]:
+def hash_part(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> str:
+    """SHA-256 of one package part's uncompressed content, read in chunks."""
+    digest = hashlib.sha256()
+    with zf.open(info) as part:
+        for chunk in iter(lambda: part.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def merkle_root(part_hashes: Dict[str, str]) -> str:
+    """
+    Merkle root over (part name, part hash) leaves in name order.
+
+    Leaves and inner nodes use distinct prefixes so one cannot stand in for the other.
+    """
+    level = [hashlib.sha256(b"\x00" + name.encode("utf-8") + b"\x00" + bytes.fromhex(part_hashes[name])).digest()
+             for name in sorted(part_hashes)]
+    if not level:
+        return hashlib.sha256(b"").hexdigest()
+    while len(level) > 1:
+        paired = [hashlib.sha256(b"\x01" + level[n] + level[n + 1]).digest() for n in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0].hex()
+
+
+def build_package_manifest(doc_path: str) -> Dict[str, Any]:
+    """
+    Hash every part of a DOCX package separately.
+
+    Returns:
+        Dictionary with the hash algorithm, per-part hash, CRC-32 and size,
+        and the Merkle root over all parts
+    """
+    parts = {}
+    with zipfile.ZipFile(doc_path) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            parts[info.filename] = {
+                "hash": hash_part(zf, info),
+                "crc": info.CRC,
+                "size": info.file_size,
+            }
+    return {
+        "algorithm": MANIFEST_ALGORITHM,
+        "parts": parts,
+        "root": merkle_root({name: part["hash"] for name, part in parts.items()}),
+    }
+
+
+def compare_package_manifest(doc_path: str, manifest: Dict[str, Any], full: bool = False) -> Dict[str, Any]:
+    """
+    Compare a package with a manifest from build_package_manifest.
+
+    Parts whose CRC-32 and size still match the manifest are taken as
+    unchanged without being read; only the others are re-hashed (all parts
+    when full is True).
+
+    Returns:
+        Dictionary with the modified, added and removed part names, how many
+        parts were re-hashed, and whether the Merkle root still matches
+    """
+    signed = manifest.get("parts", {})
+    current = {}
+    modified, added = [], []
+    rehashed = 0
+    with zipfile.ZipFile(doc_path) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            name = info.filename
+            entry = signed.get(name)
+            if entry is None:
+                added.append(name)
+                continue
+            if not full and entry.get("crc") == info.CRC and entry.get("size") == info.file_size:
+                current[name] = entry["hash"]
+                continue
+            current[name] = hash_part(zf, info)
+            rehashed += 1
+            if current[name] != entry["hash"]:
+                modified.append(name)
+    removed = sorted(set(signed) - set(current) - set(added))
+    return {
+        "modified": sorted(modified),
+        "added": sorted(added),
+        "removed": removed,
+        "rehashed": rehashed,
+        # Catches a manifest whose part entries were edited without updating the root
+        "root_matches": (not modified and not added and not removed
+                         and merkle_root(current) == manifest.get("root")),
+    }
+
+
+def create_signature_info(doc_path: str, signer_name: str, reason: Optional[str] = None,
+                          signature_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Create signature information for a document.
     
     Args:
-        doc: Document object
+        doc_path: Path to the saved document to sign
         signer_name: Name of the person signing the document
         reason: Optional reason for signing
+        signature_id: Optional identifier shown in the document's signature block
         
     Returns:
         Dictionary containing signature information
@@ -185,27 +268,26 @@ def create_signature_info(doc, signer_name: str, reason: Optional[str] = None) -
     
     if reason:
         signature_info["reason"] = reason
+    if signature_id:
+        signature_info["signature_id"] = signature_id
     
-    # Generate a simple signature hash based on document content and metadata
-    text_content = "\n".join([p.text for p in doc.paragraphs])
-    content_hash = hashlib.sha256(text_content.encode()).hexdigest()
-    signature_info["content_hash"] = content_hash
+    # Every package part is hashed, so tables, headers, footnotes and media are covered
+    signature_info["manifest"] = build_package_manifest(doc_path)
     
     return signature_info
 
 
-def verify_signature(doc_path: str) -> Tuple[bool, str]:
+def verify_signature(doc_path: str, full: bool = False) -> Tuple[bool, str]:
     """
     Verify a document's digital signature.
     
     Args:
         doc_path: Path to the document
+        full: Re-hash every part instead of only those whose CRC or size changed
         
     Returns:
         Tuple of (is_valid, message)
     """
-    from docx import Document
-    
     base_path, _ = os.path.splitext(doc_path)
     metadata_path = f"{base_path}.protection"
     
@@ -220,23 +302,38 @@ def verify_signature(doc_path: str) -> Tuple[bool, str]:
         if protection_data.get("type") != "signature":
             return False, f"Document is protected with {protection_data.get('type')} protection, not a signature"
         
-        # Get the original content hash
         signature_info = protection_data.get("signature", {})
-        original_hash = signature_info.get("content_hash")
+        signer = signature_info.get("signer")
+        manifest = signature_info.get("manifest")
         
-        if not original_hash:
-            return False, "Invalid signature: missing content hash"
+        if not manifest:
+            if signature_info.get("content_hash"):
+                return _verify_text_signature(doc_path, signature_info)
+            return False, "Invalid signature: missing package manifest"
         
-        # Calculate current content hash
-        doc = Document(doc_path)
-        text_content = "\n".join([p.text for p in doc.paragraphs])
-        current_hash = hashlib.sha256(text_content.encode()).hexdigest()
+        changes = compare_package_manifest(doc_path, manifest, full=full)
+        details = []
+        for label in ("modified", "added", "removed"):
+            if changes[label]:
+                details.append(f"{label}: {', '.join(changes[label])}")
+        if details:
+            return False, f"Document has been modified since it was signed by {signer} ({'; '.join(details)})"
+        if not changes["root_matches"]:
+            return False, "Invalid signature: manifest does not match its root hash"
         
-        # Compare hashes
-        if current_hash != original_hash:
-            return False, f"Document has been modified since it was signed by {signature_info.get('signer')}"
-        
-        return True, f"Document signature is valid. Signed by {signature_info.get('signer')} on {signature_info.get('timestamp')}"
+        return True, f"Document signature is valid. Signed by {signer} on {signature_info.get('timestamp')}"
     
     except Exception as e:
         return False, f"Error verifying signature: {str(e)}"
+
+
+def _verify_text_signature(doc_path: str, signature_info: Dict[str, Any]) -> Tuple[bool, str]:
+    """Check a signature made before package manifests, which hashed only the paragraph text."""
+    from docx import Document
+    
+    doc = Document(doc_path)
+    text_content = "\n".join([p.text for p in doc.paragraphs])
+    current_hash = hashlib.sha256(text_content.encode()).hexdigest()
+    if current_hash != signature_info.get("content_hash"):
+        return False, f"Document has been modified since it was signed by {signature_info.get('signer')}"
+    return True, f"Document signature is valid. Signed by {signature_info.get('signer')} on {signature_info.get('timestamp')}"
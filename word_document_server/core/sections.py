@@ -0,0 +1,233 @@
+"""
+Heading index and section editing for Word Document Server.
+
+The headings of a document (top-level paragraphs with a Heading style) are
+read in one streaming pass over the body and cached per file version, so
+tools that navigate by heading do not walk the document again while it is
+unchanged.
+
+Sections are edited on the body element directly: one pass over its
+children lists the blocks (paragraphs, tables and content controls) with
+their text and style, a section is a range of that list, and replacing it
+removes and inserts elements in place. The document is parsed once and
+the package written once, whatever the size of the section.
+"""
+import os
+import zipfile
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from docx.oxml.ns import qn
+from lxml import etree
+
+from word_document_server.core.ooxml import (
+    DOCUMENT_PART, BODY_BLOCK_TAGS, iter_body_blocks, paragraph_text, load_style_names, get_style_id,
+    get_heading_level, parse_part, serialize_part, rewrite_package
+)
+
+_W_P = qn('w:p')
+_W_R = qn('w:r')
+_W_T = qn('w:t')
+_W_TAB = qn('w:tab')
+_W_BR = qn('w:br')
+_W_SDT = qn('w:sdt')
+_W_VAL = qn('w:val')
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+_TOC_GALLERY = qn('w:docPartGallery')
+
+# Style name prefixes of paragraphs that end a section: any heading level, localized titles, TOC entries
+SECTION_BOUNDARY_STYLES = ('heading', 'título', 'toc')
+
+
+class Heading(NamedTuple):
+    """A heading paragraph of the document body."""
+    block_index: int
+    paragraph_index: int
+    level: int
+    text: str
+    style: str
+
+
+def read_headings(docx_path: str) -> Tuple[Heading, ...]:
+    """
+    Stream the headings of a document.
+
+    block_index counts every top-level block (paragraphs, tables and
+    content controls); paragraph_index matches Document.paragraphs.
+    """
+    headings = []
+    levels: Dict[Optional[str], Optional[Tuple[int, str]]] = {None: None}
+    with zipfile.ZipFile(docx_path) as zf:
+        style_names = None
+        paragraph_index = -1
+        for block_index, block in enumerate(iter_body_blocks(zf)):
+            if block.tag != _W_P:
+                continue
+            paragraph_index += 1
+            style_id = get_style_id(block)
+            if style_id not in levels:
+                # Built-in ids ("Heading2", "Title") resolve directly; styles.xml is only parsed for other ids
+                level = get_heading_level(style_id)
+                name = style_id
+                if level is None:
+                    if style_names is None:
+                        style_names = load_style_names(zf)
+                    name = style_names.get(style_id, style_id)
+                    level = get_heading_level(name)
+                elif style_id == 'Title':
+                    name = 'Title'
+                else:
+                    name = f'Heading {level}'
+                levels[style_id] = (level, name) if level is not None else None
+            if levels[style_id] is not None:
+                level, name = levels[style_id]
+                text = paragraph_text(block).replace('\t', ' ').replace('\n', ' ').strip()
+                headings.append(Heading(block_index, paragraph_index, level, text, name))
+    return tuple(headings)
+
+
+@lru_cache(maxsize=32)
+def _cached_headings(path: str, mtime_ns: int, size: int) -> Tuple[Heading, ...]:
+    return read_headings(path)
+
+
+def get_heading_index(docx_path: str) -> Tuple[Heading, ...]:
+    """Return the headings of a file, reusing them until the file changes (mtime or size)."""
+    stat = os.stat(docx_path)
+    return _cached_headings(os.path.abspath(docx_path), stat.st_mtime_ns, stat.st_size)
+
+
+class BodyBlock(NamedTuple):
+    """A top-level block of the body: the element, its stripped text and paragraph style name."""
+    element: Any
+    text: str
+    style: Optional[str]
+
+
+def scan_body(body, style_names: Dict[str, str]) -> List[BodyBlock]:
+    """List the blocks of a w:body element in one pass; tables and content controls have no text or style."""
+    blocks = []
+    for child in body:
+        if child.tag == _W_P:
+            style_id = get_style_id(child)
+            blocks.append(BodyBlock(child, paragraph_text(child).strip(), style_names.get(style_id, style_id)))
+        elif child.tag in BODY_BLOCK_TAGS:
+            blocks.append(BodyBlock(child, '', None))
+    return blocks
+
+
+def is_section_boundary(block: BodyBlock) -> bool:
+    """True for heading and TOC paragraphs and for a table of contents content control."""
+    if block.element.tag == _W_SDT:
+        return any(gallery.get(_W_VAL) == 'Table of Contents' for gallery in block.element.iter(_TOC_GALLERY))
+    return bool(block.style) and block.style.lower().startswith(SECTION_BOUNDARY_STYLES)
+
+
+def find_block(blocks: Sequence[BodyBlock], match: Callable[[BodyBlock], bool], start: int = 0) -> Optional[int]:
+    """Index of the first paragraph block from `start` on that `match` accepts."""
+    for index in range(start, len(blocks)):
+        if blocks[index].element.tag == _W_P and match(blocks[index]):
+            return index
+    return None
+
+
+def section_end(blocks: Sequence[BodyBlock], header_index: int,
+                is_end: Callable[[BodyBlock], bool] = is_section_boundary) -> int:
+    """Index of the block that ends the section under header_index (len(blocks) at the end of the body)."""
+    for index in range(header_index + 1, len(blocks)):
+        if is_end(blocks[index]):
+            return index
+    return len(blocks)
+
+
+def replace_blocks(blocks: Sequence[BodyBlock], start: int, end: int, new_elements: Sequence) -> int:
+    """
+    Replace blocks[start:end] with new_elements, inserted after blocks[start - 1].
+
+    Returns the number of blocks removed. The list itself is not updated.
+    """
+    anchor = blocks[start - 1].element
+    for block in blocks[start:end]:
+        block.element.getparent().remove(block.element)
+    for element in new_elements:
+        anchor.addnext(element)
+        anchor = element
+    return end - start
+
+
+def resolve_paragraph_style(styles, name: Optional[str]) -> Optional[str]:
+    """
+    Style id for a paragraph style name (or id), None for the default paragraph style.
+
+    Raises ValueError when the document has no such paragraph style.
+    """
+    if styles is None:
+        return None
+    by_name, by_id, default = {}, set(), None
+    for style in styles.iter(qn('w:style')):
+        if style.get(qn('w:type')) != 'paragraph':
+            continue
+        style_id = style.get(qn('w:styleId'))
+        style_name = style.find(qn('w:name'))
+        by_id.add(style_id)
+        if style_name is not None:
+            by_name.setdefault(style_name.get(_W_VAL, '').lower(), style_id)
+        if style.get(qn('w:default')) in ('1', 'true', 'on'):
+            default = style_id
+    if not name:
+        return None
+    style_id = by_name.get(name.lower()) or (name if name in by_id else None)
+    if style_id is None:
+        raise ValueError(f"Style '{name}' not found in document")
+    # Like python-docx, the default style is applied by leaving pStyle out
+    return None if style_id == default else style_id
+
+
+def build_paragraph(text: str, style_id: Optional[str] = None):
+    """A w:p element holding text; tabs and line breaks become w:tab and w:br."""
+    p = etree.Element(_W_P)
+    if style_id:
+        p_pr = etree.SubElement(p, qn('w:pPr'))
+        etree.SubElement(p_pr, qn('w:pStyle')).set(_W_VAL, style_id)
+    if text:
+        run = etree.SubElement(p, _W_R)
+        for line_number, line in enumerate(str(text).split('\n')):
+            if line_number:
+                etree.SubElement(run, _W_BR)
+            for part_number, part in enumerate(line.split('\t')):
+                if part_number:
+                    etree.SubElement(run, _W_TAB)
+                if part:
+                    t = etree.SubElement(run, _W_T)
+                    t.text = part
+                    t.set(_XML_SPACE, 'preserve')
+    return p
+
+
+class BodyEditor:
+    """
+    Loads word/document.xml of a file once for section edits and writes the package once on save.
+
+    Only the document part is parsed; every other part is copied unchanged.
+    """
+
+    def __init__(self, docx_path: str):
+        self.path = docx_path
+        with zipfile.ZipFile(docx_path) as zf:
+            self.root = parse_part(zf, DOCUMENT_PART)
+            self.styles = parse_part(zf, 'word/styles.xml')
+            self.style_names = load_style_names(zf)
+        self.body = self.root.find(qn('w:body'))
+        self.blocks = scan_body(self.body, self.style_names)
+
+    def paragraphs(self, texts: Sequence[str], style: Optional[str] = None) -> List:
+        style_id = resolve_paragraph_style(self.styles, style)
+        return [build_paragraph(text, style_id) for text in texts]
+
+    def replace(self, start: int, end: int, new_elements: Sequence) -> int:
+        removed = replace_blocks(self.blocks, start, end, new_elements)
+        self.blocks[start:end] = scan_body(new_elements, self.style_names)
+        return removed
+
+    def save(self) -> None:
+        rewrite_package(self.path, {DOCUMENT_PART: serialize_part(self.root)})
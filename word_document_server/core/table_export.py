@@ -0,0 +1,249 @@
+"""
+Table data export for Word Document Server.
+
+Tables are read straight from word/document.xml with the streaming body
+parser, so exporting never builds python-docx row and cell proxies (whose
+cost grows with rows x columns on every access). Merged cells are expanded
+onto the full grid: the text of a horizontally (gridSpan) or vertically
+(vMerge) merged cell is repeated in every grid cell it covers, so each
+exported row has one value per column.
+"""
+import csv
+import json
+import os
+import re
+import zipfile
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from docx.oxml.ns import qn
+
+from word_document_server.core.ooxml import (
+    iter_body_blocks, paragraph_text, child_element, cell_merge, row_grid_skip
+)
+
+EXPORT_FORMATS = {'csv': '.csv', 'jsonl': '.jsonl', 'npy': '.npy', 'arrow': '.arrow'}
+
+_W_P = qn('w:p')
+_W_TR = qn('w:tr')
+_W_TC = qn('w:tc')
+_W_SDT = qn('w:sdt')
+_W_SDT_CONTENT = qn('w:sdtContent')
+_W_TBL = qn('w:tbl')
+
+_INT_RE = re.compile(r'^[+-]?\d+$')
+_FLOAT_RE = re.compile(r'^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$')
+
+
+def _iter_content(parent, tag: str) -> Iterator:
+    """Yield `tag` children of parent, looking through content controls (w:sdt)."""
+    for child in parent:
+        if child.tag == tag:
+            yield child
+        elif child.tag == _W_SDT:
+            content = child_element(child, _W_SDT_CONTENT)
+            if content is not None:
+                yield from _iter_content(content, tag)
+
+
+def cell_text(tc) -> str:
+    """Text of a w:tc element, one line per paragraph."""
+    # Merging cells leaves empty paragraphs behind; they are not part of the value
+    return '\n'.join(paragraph_text(p) for p in tc.iter(_W_P)).strip('\n')
+
+
+def iter_table_rows(tbl) -> Iterator[List[str]]:
+    """
+    Yield each row of a w:tbl element as a list of strings on the table grid.
+
+    Cells merged with gridSpan or vMerge repeat the text of the merged cell;
+    rows shorter than the grid (gridBefore/gridAfter) are padded with ''.
+    """
+    above: Dict[int, str] = {}
+    for tr in _iter_content(tbl, _W_TR):
+        before, after = row_grid_skip(tr)
+        row = [''] * before
+        for tc in _iter_content(tr, _W_TC):
+            span, continued = cell_merge(tc)
+            start = len(row)
+            if continued:
+                row.extend(above.get(start + n, '') for n in range(span))
+            else:
+                row.extend([cell_text(tc)] * span)
+            for n in range(start, len(row)):
+                above[n] = row[n]
+        row.extend([''] * after)
+        yield row
+
+
+def iter_document_tables(docx_path: str, table_indices: Optional[Sequence[int]] = None) -> Iterator[Tuple[int, object]]:
+    """
+    Stream (index, w:tbl element) pairs for the top-level tables of a document.
+
+    Indices match Document.tables. Parsing stops once every requested table
+    has been seen.
+    """
+    wanted = set(table_indices) if table_indices is not None else None
+    index = -1
+    with zipfile.ZipFile(docx_path) as zf:
+        for block in iter_body_blocks(zf):
+            if block.tag != _W_TBL:
+                continue
+            index += 1
+            if wanted is None or index in wanted:
+                yield index, block
+                if wanted is not None:
+                    wanted.discard(index)
+                    if not wanted:
+                        return
+
+
+def column_names(header: Optional[List[str]], width: int) -> List[str]:
+    """Unique, non-empty column names taken from a header row."""
+    names: List[str] = []
+    seen = set()
+    for n in range(width):
+        name = ' '.join((header[n] if header and n < len(header) else '').split()) or f"column_{n + 1}"
+        candidate, suffix = name, 2
+        while candidate in seen:
+            candidate = f"{name}_{suffix}"
+            suffix += 1
+        seen.add(candidate)
+        names.append(candidate)
+    return names
+
+
+def infer_column_type(values: List[str]) -> str:
+    """Classify a column as 'int', 'float' or 'str'; empty cells do not affect the result."""
+    kind = None
+    for value in values:
+        value = value.strip()
+        if not value:
+            continue
+        if _INT_RE.match(value):
+            kind = kind or 'int'
+        elif _FLOAT_RE.match(value):
+            kind = 'float'
+        else:
+            return 'str'
+    return kind or 'str'
+
+
+def _pad(row: List[str], width: int) -> List[str]:
+    return row + [''] * (width - len(row)) if len(row) < width else row
+
+
+def _typed_columns(rows: List[List[str]], header: bool):
+    width = max((len(row) for row in rows), default=0)
+    names = column_names(rows[0] if header and rows else None, width)
+    body = rows[1:] if header else rows
+    columns = [[row[n] if n < len(row) else '' for row in body] for n in range(width)]
+    return names, columns, [infer_column_type(column) for column in columns]
+
+
+def write_csv(rows: Iterator[List[str]], path: str, delimiter: str = ',') -> Tuple[int, int]:
+    count = width = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+            width = max(width, len(row))
+    return count, width
+
+
+def write_jsonl(rows: Iterator[List[str]], path: str, header: bool = True) -> Tuple[int, int]:
+    count = width = 0
+    names = None
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            width = max(width, len(row))
+            if header and names is None:
+                names = column_names(row, len(row))
+                continue
+            if names is not None:
+                record = dict(zip(names, _pad(row, len(names))))
+                # Cells beyond the header (ragged grids) keep generated names
+                for n in range(len(names), len(row)):
+                    record[f"column_{n + 1}"] = row[n]
+            else:
+                record = row
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count, width
+
+
+def write_npy(rows: Iterator[List[str]], path: str, header: bool = True) -> Tuple[int, int]:
+    """Write a NumPy structured array with one typed field per column."""
+    import numpy as np  # type: ignore
+
+    names, columns, types = _typed_columns(list(rows), header)
+    fields = []
+    data = []
+    for name, column, kind in zip(names, columns, types):
+        if kind == 'int' and all(value.strip() for value in column):
+            fields.append((name, 'i8'))
+            data.append([int(value) for value in column])
+        elif kind in ('int', 'float'):
+            fields.append((name, 'f8'))
+            data.append([float(value) if value.strip() else np.nan for value in column])
+        else:
+            fields.append((name, f"U{max([1] + [len(value) for value in column])}"))
+            data.append(column)
+    array = np.empty(len(columns[0]) if columns else 0, dtype=fields)
+    for (name, _), values in zip(fields, data):
+        array[name] = values
+    with open(path, 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    return len(array), len(fields)
+
+
+def write_arrow(rows: Iterator[List[str]], path: str, header: bool = True) -> Tuple[int, int]:
+    """Write an Arrow IPC file; empty numeric cells become nulls."""
+    import pyarrow as pa  # type: ignore
+
+    names, columns, types = _typed_columns(list(rows), header)
+    arrays = []
+    for column, kind in zip(columns, types):
+        if kind == 'int':
+            arrays.append(pa.array([int(v) if v.strip() else None for v in column], type=pa.int64()))
+        elif kind == 'float':
+            arrays.append(pa.array([float(v) if v.strip() else None for v in column], type=pa.float64()))
+        else:
+            arrays.append(pa.array(column, type=pa.string()))
+    table = pa.table(arrays, names=names)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return table.num_rows, table.num_columns
+
+
+def export_document_tables(docx_path: str, output_dir: str, fmt: str = 'csv',
+                           table_indices: Optional[Sequence[int]] = None,
+                           header: bool = True) -> Dict[str, object]:
+    """
+    Export tables of a DOCX file, one output file per table.
+
+    Files are named "<document>_table<index><ext>" inside output_dir.
+
+    Returns:
+        Dictionary with the exported tables (index, path, rows, columns) and
+        any requested indices that the document does not contain
+    """
+    extension = EXPORT_FORMATS[fmt]
+    stem = os.path.splitext(os.path.basename(docx_path))[0]
+    exported = []
+    for index, tbl in iter_document_tables(docx_path, table_indices):
+        path = os.path.join(output_dir, f"{stem}_table{index}{extension}")
+        rows = iter_table_rows(tbl)
+        if fmt == 'csv':
+            count, width = write_csv(rows, path)
+        elif fmt == 'jsonl':
+            count, width = write_jsonl(rows, path, header)
+        elif fmt == 'npy':
+            count, width = write_npy(rows, path, header)
+        else:
+            count, width = write_arrow(rows, path, header)
+        exported.append({'index': index, 'path': path, 'rows': count, 'columns': width})
+    found = {table['index'] for table in exported}
+    missing = sorted(set(table_indices) - found) if table_indices is not None else []
+    return {'tables': exported, 'missing_indices': missing}
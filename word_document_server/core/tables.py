@@ -7,36 +7,78 @@ from docx.oxml import parse_xml
 from docx.shared import RGBColor, Inches, Cm, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_CELL_VERTICAL_ALIGNMENT
+from docx.section import Section
+from docx.table import _Cell
+import unicodedata
+from functools import lru_cache
+
+from word_document_server.core.ooxml import paragraph_text, cell_merge, row_grid_skip, child_element
+
+_W_TR = qn("w:tr")
+_W_TC = qn("w:tc")
+_W_P = qn("w:p")
+_W_B = qn("w:b")
+_W_SZ = qn("w:sz")
+_W_VAL = qn("w:val")
+_W_TCW = qn("w:tcW")
+_WIDE = ("W", "F")
+_W_TC_BORDERS = qn("w:tcBorders")
+# Schema order of border sides inside w:tcBorders / w:tblBorders / w:pBdr
+BORDER_ORDER = ('top', 'start', 'left', 'bottom', 'end', 'right', 'insideH', 'insideV', 'between', 'bar',
+                'tl2br', 'tr2bl')
+# Elements that follow w:tcBorders inside w:tcPr
+_TC_BORDERS_SUCCESSORS = tuple(qn(f"w:{tag}") for tag in (
+    'shd', 'noWrap', 'tcMar', 'textDirection', 'tcFitText', 'vAlign', 'hideMark',
+    'headers', 'cellIns', 'cellDel', 'cellMerge', 'tcPrChange'))
+# Elements that follow w:tblW inside w:tblPr
+_TBL_W_SUCCESSORS = tuple(qn(f"w:{tag}") for tag in (
+    'jc', 'tblCellSpacing', 'tblInd', 'tblBorders', 'shd', 'tblLayout', 'tblCellMar', 'tblLook',
+    'tblCaption', 'tblDescription', 'tblPrChange'))
 
 
 def set_cell_border(cell, **kwargs):
     """
     Set cell border properties.
     
+    Setting a side again replaces its border instead of adding another one.
+    
     Args:
         cell: The cell to modify
         **kwargs: Border properties (top, bottom, left, right, val, color)
     """
     tc = cell._tc
     tcPr = tc.get_or_add_tcPr()
+    tcBorders = tcPr.find(_W_TC_BORDERS)
     
     # Create border elements
-    for key, value in kwargs.items():
-        if key in ['top', 'left', 'bottom', 'right']:
-            tag = 'w:{}'.format(key)
-            
-            element = OxmlElement(tag)
-            element.set(qn('w:val'), kwargs.get('val', 'single'))
-            element.set(qn('w:sz'), kwargs.get('sz', '4'))
-            element.set(qn('w:space'), kwargs.get('space', '0'))
-            element.set(qn('w:color'), kwargs.get('color', 'auto'))
-            
-            tcBorders = tcPr.first_child_found_in("w:tcBorders")
-            if tcBorders is None:
-                tcBorders = OxmlElement('w:tcBorders')
-                tcPr.append(tcBorders)
-                
-            tcBorders.append(element)
+    for key in BORDER_ORDER:
+        if key not in kwargs:
+            continue
+        if tcBorders is None:
+            tcBorders = OxmlElement('w:tcBorders')
+            _insert_before(tcPr, tcBorders, _TC_BORDERS_SUCCESSORS)
+        
+        element = OxmlElement('w:{}'.format(key))
+        element.set(qn('w:val'), kwargs.get('val', 'single'))
+        element.set(qn('w:sz'), kwargs.get('sz', '4'))
+        element.set(qn('w:space'), kwargs.get('space', '0'))
+        element.set(qn('w:color'), kwargs.get('color', 'auto'))
+        
+        existing = tcBorders.find(qn('w:{}'.format(key)))
+        if existing is not None:
+            tcBorders.replace(existing, element)
+        else:
+            later = [qn('w:{}'.format(side)) for side in BORDER_ORDER[BORDER_ORDER.index(key) + 1:]]
+            _insert_before(tcBorders, element, later)
+
+
+def _insert_before(parent, element, successors) -> None:
+    """Insert element ahead of the first child whose tag is in successors (schema order)."""
+    for child in parent:
+        if child.tag in successors:
+            child.addprevious(element)
+            return
+    parent.append(element)
 
 
 def apply_table_style(table, has_header_row=False, border_style=None, shading=None):
@@ -54,9 +96,9 @@ def apply_table_style(table, has_header_row=False, border_style=None, shading=No
     """
     try:
         # Format header row if requested
-        if has_header_row and table.rows:
-            header_row = table.rows[0]
-            for cell in header_row.cells:
+        grid = get_table_grid(table)
+        if has_header_row and grid.row_count:
+            for cell in grid.row_cells(0):
                 for paragraph in cell.paragraphs:
                     if paragraph.runs:
                         for run in paragraph.runs:
@@ -73,29 +115,28 @@ def apply_table_style(table, has_header_row=False, border_style=None, shading=No
             val = val_map.get(border_style.lower(), 'single')
             
             # Apply to all cells
-            for row in table.rows:
-                for cell in row.cells:
-                    set_cell_border(
-                        cell,
-                        top=True,
-                        bottom=True,
-                        left=True,
-                        right=True,
-                        val=val,
-                        color="000000"
-                    )
+            for cell in grid.iter_cells():
+                set_cell_border(
+                    cell,
+                    top=True,
+                    bottom=True,
+                    left=True,
+                    right=True,
+                    val=val,
+                    color="000000"
+                )
         
         # Apply cell shading if specified
         if shading:
             for i, row_colors in enumerate(shading):
-                if i >= len(table.rows):
+                if i >= grid.row_count:
                     break
                 for j, color in enumerate(row_colors):
-                    if j >= len(table.rows[i].cells):
+                    cell = grid.cell(i, j)
+                    if cell is None:
                         break
                     try:
                         # Apply shading to cell
-                        cell = table.rows[i].cells[j]
                         shading_elm = parse_xml(f'<w:shd {nsdecls("w")} w:fill="{color}"/>')
                         cell._tc.get_or_add_tcPr().append(shading_elm)
                     except:
@@ -119,7 +160,8 @@ def copy_table(source_table, target_doc):
         The new table in the target document
     """
     # Create a new table with the same dimensions
-    new_table = target_doc.add_table(rows=len(source_table.rows), cols=len(source_table.columns))
+    source_grid = get_table_grid(source_table)
+    new_table = target_doc.add_table(rows=source_grid.row_count, cols=source_grid.col_count)
     
     # Try to apply the same style
     try:
@@ -133,11 +175,14 @@ def copy_table(source_table, target_doc):
             pass
     
     # Copy cell contents
-    for i, row in enumerate(source_table.rows):
-        for j, cell in enumerate(row.cells):
+    target_grid = get_table_grid(new_table)
+    for i, row in enumerate(source_grid.rows):
+        for j, cell in enumerate(row):
+            if cell is None or target_grid.cell(i, j) is None:
+                continue
             for paragraph in cell.paragraphs:
                 if paragraph.text:
-                    new_table.cell(i, j).text = paragraph.text
+                    target_grid.cell(i, j).text = paragraph.text
     
     return new_table
 
@@ -210,9 +255,10 @@ def apply_alternating_row_shading(table, color1="FFFFFF", color2="F2F2F2"):
         True if successful, False otherwise
     """
     try:
-        for i, row in enumerate(table.rows):
+        grid = get_table_grid(table)
+        for i in range(grid.row_count):
             fill_color = color1 if i % 2 == 0 else color2
-            for cell in row.cells:
+            for cell in grid.row_cells(i):
                 set_cell_shading(cell, fill_color=fill_color)
         return True
     except Exception as e:
@@ -233,8 +279,9 @@ def highlight_header_row(table, header_color="4472C4", text_color="FFFFFF"):
         True if successful, False otherwise
     """
     try:
-        if table.rows:
-            for cell in table.rows[0].cells:
+        grid = get_table_grid(table)
+        if grid.row_count:
+            for cell in grid.row_cells(0):
                 # Apply background shading
                 set_cell_shading(cell, fill_color=header_color)
                 
@@ -273,12 +320,10 @@ def set_cell_shading_by_position(table, row_index, col_index, fill_color, patter
         True if successful, False otherwise
     """
     try:
-        if (0 <= row_index < len(table.rows) and 
-            0 <= col_index < len(table.rows[row_index].cells)):
-            cell = table.rows[row_index].cells[col_index]
-            return set_cell_shading(cell, fill_color=fill_color, pattern=pattern)
-        else:
+        cell = get_table_grid(table).cell(row_index, col_index)
+        if cell is None:
             return False
+        return set_cell_shading(cell, fill_color=fill_color, pattern=pattern)
     except Exception as e:
         print(f"Error setting cell shading by position: {e}")
         return False
@@ -299,23 +344,22 @@ def merge_cells(table, start_row, start_col, end_row, end_col):
         True if successful, False otherwise
     """
     try:
+        grid = get_table_grid(table)
+        
         # Validate indices
-        if (start_row < 0 or start_col < 0 or end_row < 0 or end_col < 0 or
-            start_row >= len(table.rows) or end_row >= len(table.rows) or
-            start_row > end_row or start_col > end_col):
+        if start_row > end_row or start_col > end_col:
             return False
         
-        # Check if all rows have enough columns
+        # Check if all rows have cells at both ends of the range
         for row_idx in range(start_row, end_row + 1):
-            if (start_col >= len(table.rows[row_idx].cells) or 
-                end_col >= len(table.rows[row_idx].cells)):
+            if grid.cell(row_idx, start_col) is None or grid.cell(row_idx, end_col) is None:
                 return False
         
         # Get the start and end cells
-        start_cell = table.cell(start_row, start_col)
-        end_cell = table.cell(end_row, end_col)
+        start_cell = grid.cell(start_row, start_col)
+        end_cell = grid.cell(end_row, end_col)
         
-        # Merge the cells
+        # Merge the cells; this rewrites spans, so callers must build a new grid afterwards
         start_cell.merge(end_cell)
         
         return True
@@ -357,6 +401,98 @@ def merge_cells_vertical(table, col_index, start_row, end_row):
     return merge_cells(table, start_row, col_index, end_row, col_index)
 
 
+class TableGrid:
+    """
+    Logical layout grid of a table, resolved once.
+
+    Maps every (row, col) grid position to the _Cell of the w:tc element that
+    covers it, so merged areas share one cell object. table.cell() and
+    row.cells recompute the whole table on every call; looking cells up here
+    is constant time. Positions left empty by w:gridBefore/w:gridAfter map to
+    None.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = []
+        for tr in table._tbl.iterchildren(_W_TR):
+            above = self.rows[-1] if self.rows else []
+            row = [None] * row_grid_skip(tr)[0]
+            for tc in tr.iterchildren(_W_TC):
+                col = len(row)
+                span, continued = cell_merge(tc)
+                if continued and col < len(above) and above[col] is not None:
+                    row.extend(above[col:col + span])
+                else:
+                    row.extend([_Cell(tc, table)] * span)
+            self.rows.append(row)
+        self.row_count = len(self.rows)
+        grid = table._tbl.find(qn('w:tblGrid'))
+        grid_cols = len(grid) if grid is not None else 0
+        self.col_count = max([grid_cols] + [len(row) for row in self.rows])
+        for row in self.rows:
+            row.extend([None] * (self.col_count - len(row)))
+
+    def cell(self, row, col):
+        """Cell covering (row, col), or None if the position is outside the table or empty."""
+        if 0 <= row < self.row_count and 0 <= col < self.col_count:
+            return self.rows[row][col]
+        return None
+
+    def row_cells(self, row):
+        """Distinct cells of a row, left to right."""
+        return _distinct(self.rows[row])
+
+    def column_cells(self, col):
+        """Distinct cells of a column, top to bottom."""
+        return _distinct(row[col] for row in self.rows)
+
+    def iter_cells(self):
+        """Every distinct cell of the table once, in reading order."""
+        return iter(_distinct(cell for row in self.rows for cell in row))
+
+    def span(self, row, col):
+        """
+        Return (origin_row, origin_col, row_span, col_span) of the cell covering (row, col).
+        """
+        cell = self.cell(row, col)
+        if cell is None:
+            return None
+        origin_row = row
+        while origin_row > 0 and self.rows[origin_row - 1][col] is cell:
+            origin_row -= 1
+        origin_col = col
+        while origin_col > 0 and self.rows[row][origin_col - 1] is cell:
+            origin_col -= 1
+        end_row = row
+        while end_row + 1 < self.row_count and self.rows[end_row + 1][col] is cell:
+            end_row += 1
+        end_col = col
+        while end_col + 1 < self.col_count and self.rows[row][end_col + 1] is cell:
+            end_col += 1
+        return origin_row, origin_col, end_row - origin_row + 1, end_col - origin_col + 1
+
+
+def _distinct(cells):
+    seen = set()
+    result = []
+    for cell in cells:
+        if cell is not None and id(cell) not in seen:
+            seen.add(id(cell))
+            result.append(cell)
+    return result
+
+
+def get_table_grid(table):
+    """
+    Build the TableGrid of a table.
+
+    The grid is a snapshot: callers build it once per operation and pass it
+    along, and build a new one after adding rows or columns or merging cells.
+    """
+    return TableGrid(table)
+
+
 def set_cell_alignment(cell, horizontal="left", vertical="top"):
     """
     Set text alignment within a cell.
@@ -422,12 +558,10 @@ def set_cell_alignment_by_position(table, row_index, col_index, horizontal="left
         True if successful, False otherwise
     """
     try:
-        if (0 <= row_index < len(table.rows) and 
-            0 <= col_index < len(table.rows[row_index].cells)):
-            cell = table.rows[row_index].cells[col_index]
-            return set_cell_alignment(cell, horizontal, vertical)
-        else:
+        cell = get_table_grid(table).cell(row_index, col_index)
+        if cell is None:
             return False
+        return set_cell_alignment(cell, horizontal, vertical)
     except Exception as e:
         print(f"Error setting cell alignment by position: {e}")
         return False
@@ -446,16 +580,15 @@ def set_table_alignment(table, horizontal="left", vertical="top"):
         True if successful, False otherwise
     """
     try:
-        for row in table.rows:
-            for cell in row.cells:
-                set_cell_alignment(cell, horizontal, vertical)
+        for cell in get_table_grid(table).iter_cells():
+            set_cell_alignment(cell, horizontal, vertical)
         return True
     except Exception as e:
         print(f"Error setting table alignment: {e}")
         return False
 
 
-def set_column_width(table, col_index, width, width_type="dxa"):
+def set_column_width(table, col_index, width, width_type="dxa", grid=None):
     """
     Set the width of a specific column in a table.
     
@@ -464,13 +597,16 @@ def set_column_width(table, col_index, width, width_type="dxa"):
         col_index: Column index (0-based)
         width: Column width value
         width_type: Width type ("dxa" for points*20, "pct" for percentage*50, "auto")
+        grid: TableGrid of the table, if the caller already built one
         
     Returns:
         True if successful, False otherwise
     """
     try:
+        grid = grid or get_table_grid(table)
+        
         # Validate column index
-        if col_index < 0 or col_index >= len(table.columns):
+        if col_index < 0 or col_index >= grid.col_count:
             return False
         
         # Convert width based on type
@@ -489,23 +625,21 @@ def set_column_width(table, col_index, width, width_type="dxa"):
         else:
             width_value = str(width)
         
-        # Iterate through all rows and set width for cells in the specified column
-        for row in table.rows:
-            if col_index < len(row.cells):
-                cell = row.cells[col_index]
-                tc_pr = cell._tc.get_or_add_tcPr()
-                
-                # Remove existing width
-                existing_width = tc_pr.find(qn('w:tcW'))
-                if existing_width is not None:
-                    tc_pr.remove(existing_width)
-                
-                # Create new width element
-                width_element = OxmlElement('w:tcW')
-                width_element.set(qn('w:w'), width_value)
-                width_element.set(qn('w:type'), width_type)
-                
-                tc_pr.append(width_element)
+        # Set width for every cell in the specified column
+        for cell in grid.column_cells(col_index):
+            tc_pr = cell._tc.get_or_add_tcPr()
+            
+            # Remove existing width
+            existing_width = tc_pr.find(qn('w:tcW'))
+            if existing_width is not None:
+                tc_pr.remove(existing_width)
+            
+            # Create new width element
+            width_element = OxmlElement('w:tcW')
+            width_element.set(qn('w:w'), width_value)
+            width_element.set(qn('w:type'), width_type)
+            
+            tc_pr.append(width_element)
         
         return True
         
@@ -543,10 +677,11 @@ def set_column_widths(table, widths, width_type="dxa"):
         True if successful, False otherwise
     """
     try:
+        grid = get_table_grid(table)
         for col_index, width in enumerate(widths):
-            if col_index >= len(table.columns):
+            if col_index >= grid.col_count:
                 break
-            if not set_column_width(table, col_index, width, width_type):
+            if not set_column_width(table, col_index, width, width_type, grid):
                 return False
         return True
     except Exception as e:
@@ -611,40 +746,212 @@ def set_table_width(table, width, width_type="dxa"):
         return False
 
 
-def auto_fit_table(table):
+# Word's default left + right cell margins (2 x 108 twips), in points
+_CELL_PADDING_PT = 10.8
+_DEFAULT_TEXT_WIDTH_PT = 468.0  # 8.5in Letter page minus 1in margins
+
+
+@lru_cache(maxsize=65536)
+def _text_width(text, bold, size):
+    """Width of a line of text in points, using Helvetica metrics; wide East Asian characters are 1em."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    font = "Helvetica-Bold" if bold else "Helvetica"
+    if text.isascii():
+        return stringWidth(text, font, size)
+    narrow = []
+    wide = 0
+    for ch in text:
+        if unicodedata.east_asian_width(ch) in _WIDE:
+            wide += 1
+        else:
+            narrow.append(ch)
+    return stringWidth("".join(narrow), font, size) + wide * size
+
+
+def _default_font_size(table):
+    """Font size of body text in points: the Normal style, then document defaults, then 11pt."""
+    styles = table.part.styles
+    try:
+        size = styles["Normal"].font.size
+        if size is not None:
+            return size.pt
+    except KeyError:
+        pass
+    sz = styles.element.find(qn("w:docDefaults") + "/" + qn("w:rPrDefault") + "/" + qn("w:rPr") + "/" + qn("w:sz"))
+    if sz is not None:
+        return int(sz.get(qn("w:val"))) / 2
+    return 11.0
+
+
+def _measure_cell(tc, default_size):
+    """
+    Return (minimum, preferred) content width of a cell in points.
+
+    The minimum is the widest unbreakable word, the preferred width the
+    widest line; both include the default cell margins.
+    """
+    size = 0
+    bold = False
+    paragraphs = []
+    for node in tc.iter(_W_P, _W_B, _W_SZ):
+        if node.tag == _W_P:
+            paragraphs.append(node)
+        elif node.tag == _W_B:
+            bold = bold or node.get(_W_VAL, "true") not in ("0", "false")
+        elif node.get(_W_VAL, "").isdigit():
+            size = max(size, int(node.get(_W_VAL)) / 2)
+    size = size or default_size
+    min_width = max_width = 0.0
+    for p in paragraphs:
+        for line in paragraph_text(p).split("\n"):
+            if not line.strip():
+                continue
+            max_width = max(max_width, _text_width(line, bold, size))
+            for word in line.split():
+                # Text made of wide characters can break between any two of them
+                if word.isascii() or not all(unicodedata.east_asian_width(ch) in _WIDE for ch in word):
+                    width = _text_width(word, bold, size)
+                else:
+                    width = size
+                min_width = max(min_width, width)
+    return min_width + _CELL_PADDING_PT, max_width + _CELL_PADDING_PT
+
+
+def _available_width(table):
+    """Text width in points of the section that contains the table."""
+    sect_pr = table._tbl.xpath("following::w:sectPr[1]")
+    if not sect_pr:
+        return _DEFAULT_TEXT_WIDTH_PT
+    section = Section(sect_pr[0], table.part)
+    if section.page_width is None:
+        return _DEFAULT_TEXT_WIDTH_PT
+    width = section.page_width - (section.left_margin or 0) - (section.right_margin or 0)
+    return width / 12700 if width > 0 else _DEFAULT_TEXT_WIDTH_PT
+
+
+def _spread(values, first, last, needed):
+    """Grow values[first:last + 1] evenly so that together they reach `needed`."""
+    missing = needed - sum(values[first:last + 1])
+    if missing > 0:
+        share = missing / (last - first + 1)
+        for col in range(first, last + 1):
+            values[col] += share
+
+
+def solve_column_widths(min_widths, max_widths, available):
+    """
+    Distribute the available width between columns (all values in points).
+
+    Columns get their preferred width when everything fits; otherwise each
+    column keeps its minimum and the remaining space is shared in proportion
+    to how much more each column would like. If even the minimums do not fit,
+    they are scaled down to the available width.
+    """
+    total_min = sum(min_widths)
+    total_max = sum(max_widths)
+    if total_max <= available:
+        return list(max_widths)
+    if total_min >= available:
+        scale = available / total_min if total_min else 0
+        return [width * scale for width in min_widths]
+    ratio = (available - total_min) / (total_max - total_min)
+    return [low + (high - low) * ratio for low, high in zip(min_widths, max_widths)]
+
+
+def calculate_column_widths(table, max_width=None):
+    """
+    Measure table content and compute a width per grid column.
+
+    Args:
+        table: The table to measure
+        max_width: Maximum table width in points (default: the section's text width)
+
+    Returns:
+        Tuple of (column widths in points, measured cells as
+        (cell, first column, last column) tuples)
     """
-    Set table to auto-fit columns based on content.
+    grid = get_table_grid(table)
+    default_size = _default_font_size(table)
+    min_widths = [_CELL_PADDING_PT] * grid.col_count
+    max_widths = [_CELL_PADDING_PT] * grid.col_count
+    cells = []
+    spanned = []
+    seen = set()
+    # One pass over the grid: each run of identical cells in a row is one cell
+    for row in grid.rows:
+        col = 0
+        while col < grid.col_count:
+            cell = row[col]
+            last = col
+            while last + 1 < grid.col_count and row[last + 1] is cell:
+                last += 1
+            if cell is not None and id(cell) not in seen:
+                seen.add(id(cell))
+                cells.append((cell, col, last))
+                low, high = _measure_cell(cell._tc, default_size)
+                if col == last:
+                    min_widths[col] = max(min_widths[col], low)
+                    max_widths[col] = max(max_widths[col], high)
+                else:
+                    spanned.append((col, last, low, high))
+            col = last + 1
+    # Cells spanning several columns widen those columns only if they do not fit already
+    for first, last, low, high in spanned:
+        _spread(min_widths, first, last, low)
+        _spread(max_widths, first, last, high)
+    available = max_width if max_width else _available_width(table)
+    return solve_column_widths(min_widths, max_widths, available), cells
+
+
+def auto_fit_table(table, max_width=None):
+    """
+    Size table columns to their content.
+
+    Text in every cell is measured with cached font metrics, and the
+    resulting widths are written as explicit w:gridCol and w:tcW values with
+    a fixed layout, so the table fits the page margins and renders the same
+    in Word, LibreOffice and the built-in PDF renderer.
     
     Args:
         table: The table to modify
+        max_width: Optional maximum table width in points (default: the page text width)
         
     Returns:
         True if successful, False otherwise
     """
     try:
-        # Get table element and properties
+        widths, cells = calculate_column_widths(table, max_width)
+        twips = [int(round(width * 20)) for width in widths]
         tbl = table._tbl
         
-        # Get or create table properties
-        tbl_pr = tbl.find(qn('w:tblPr'))
-        if tbl_pr is None:
-            tbl_pr = OxmlElement('w:tblPr')
-            tbl.insert(0, tbl_pr)
-        
-        # Remove existing layout
-        existing_layout = tbl_pr.find(qn('w:tblLayout'))
-        if existing_layout is not None:
-            tbl_pr.remove(existing_layout)
-        
-        # Create auto layout element
-        layout_element = OxmlElement('w:tblLayout')
-        layout_element.set(qn('w:type'), 'autofit')
-        
-        tbl_pr.append(layout_element)
-        
-        # Set all column widths to auto
-        for col_index in range(len(table.columns)):
-            set_column_width(table, col_index, 0, "auto")
+        # Table width and fixed layout, each at its place in the tblPr sequence
+        tbl_pr = tbl.tblPr
+        tbl_w = tbl_pr.find(qn("w:tblW"))
+        if tbl_w is None:
+            tbl_w = OxmlElement("w:tblW")
+            _insert_before(tbl_pr, tbl_w, _TBL_W_SUCCESSORS)
+        tbl_w.set(qn("w:w"), str(sum(twips)))
+        tbl_w.set(qn("w:type"), "dxa")
+        tbl_pr.get_or_add_tblLayout().set(qn("w:type"), "fixed")
+        
+        # Grid columns
+        tbl_grid = tbl.tblGrid
+        grid_cols = tbl_grid.gridCol_lst
+        for _ in range(len(twips) - len(grid_cols)):
+            tbl_grid.append(OxmlElement("w:gridCol"))
+        for grid_col, width in zip(tbl_grid.gridCol_lst, twips):
+            grid_col.set(qn("w:w"), str(width))
+        
+        # Cell widths, covering every column a cell spans
+        w_attr, type_attr = qn("w:w"), qn("w:type")
+        for cell, first, last in cells:
+            tc_pr = cell._tc.get_or_add_tcPr()
+            tc_w = child_element(tc_pr, _W_TCW)
+            if tc_w is None:
+                tc_w = tc_pr.get_or_add_tcW()
+            tc_w.set(w_attr, str(sum(twips[first:last + 1])))
+            tc_w.set(type_attr, "dxa")
         
         return True
         
@@ -761,13 +1068,11 @@ def format_cell_text_by_position(table, row_index, col_index, text_content=None,
         True if successful, False otherwise
     """
     try:
-        if (0 <= row_index < len(table.rows) and 
-            0 <= col_index < len(table.rows[row_index].cells)):
-            cell = table.rows[row_index].cells[col_index]
-            return format_cell_text(cell, text_content, bold, italic, underline, 
-                                   color, font_size, font_name)
-        else:
+        cell = get_table_grid(table).cell(row_index, col_index)
+        if cell is None:
             return False
+        return format_cell_text(cell, text_content, bold, italic, underline, 
+                               color, font_size, font_name)
     except Exception as e:
         print(f"Error formatting cell text by position: {e}")
         return False
@@ -855,12 +1160,176 @@ def set_cell_padding_by_position(table, row_index, col_index, top=None, bottom=N
         True if successful, False otherwise
     """
     try:
-        if (0 <= row_index < len(table.rows) and 
-            0 <= col_index < len(table.rows[row_index].cells)):
-            cell = table.rows[row_index].cells[col_index]
-            return set_cell_padding(cell, top, bottom, left, right, unit)
-        else:
+        cell = get_table_grid(table).cell(row_index, col_index)
+        if cell is None:
             return False
+        return set_cell_padding(cell, top, bottom, left, right, unit)
     except Exception as e:
         print(f"Error setting cell padding by position: {e}")
         return False
+
+
+_CELL_ALIGNMENTS = {"left": "left", "center": "center", "right": "right", "justify": "both"}
+_TEXT_BREAK = '</w:t><w:br/><w:t xml:space="preserve">'
+_TEXT_TAB = '</w:t><w:tab/><w:t xml:space="preserve">'
+
+
+@lru_cache(maxsize=64)
+def _row_template(col_count, col_widths, col_alignments, run_properties, cell_properties):
+    """
+    Pre-serialize the markup around each cell value of a row.
+
+    Returns:
+        Tuple of (prefix, suffix, empty cell) strings per column; a row is then
+        just '<w:tr>' + prefix + value + suffix ... + '</w:tr>'.
+    """
+    template = []
+    for col in range(col_count):
+        width = col_widths[col] if col < len(col_widths) else None
+        align = _CELL_ALIGNMENTS.get(col_alignments[col]) if col < len(col_alignments) and col_alignments[col] else None
+        tc_w = f'<w:tcW w:w="{width}" w:type="dxa"/>' if width else '<w:tcW w:w="0" w:type="auto"/>'
+        ppr = f'<w:pPr><w:jc w:val="{align}"/></w:pPr>' if align else ''
+        prefix = f'<w:tc><w:tcPr>{tc_w}{cell_properties}</w:tcPr><w:p>{ppr}'
+        empty = f'{prefix}</w:p></w:tc>'
+        if run_properties is not None:
+            prefix += f'<w:r>{run_properties}<w:t xml:space="preserve">'
+            suffix = '</w:t></w:r></w:p></w:tc>'
+        else:
+            suffix = '</w:p></w:tc>'
+        template.append((prefix, suffix, empty))
+    return tuple(template)
+
+
+def build_table_xml(rows, header_row=False, style_id="TableGrid", col_widths=None,
+                    col_alignments=None, rich=False, col_count=None, header_fill=None,
+                    header_text_color=None):
+    """
+    Build the WordprocessingML for a whole table as a single string.
+
+    Generating the markup in one go and parsing it once is much cheaper than
+    growing a table cell by cell through python-docx. The markup around each
+    cell is cached per column layout, so each row costs one string join.
+
+    Args:
+        rows: Iterable of rows, each a list of cell values. A list is scanned for
+              its widest row; other iterables use the first row's width
+        header_row: Style the first row as a repeating header (bold, optional fill/color)
+        style_id: Table style id (e.g. "TableGrid"), or None for no style
+        col_widths: Optional list of column widths in twentieths of a point
+        col_alignments: Optional list of "left"/"center"/"right"/"justify" per column
+        rich: If True, cell values are pre-rendered w:r markup instead of plain text
+        col_count: Number of columns; extra values are dropped and short rows padded
+        header_fill: Optional hex background color for the header row, e.g. "D9E2F3"
+        header_text_color: Optional hex text color for the header row
+
+    Returns:
+        The w:tbl element markup (without namespace declarations)
+    """
+    from itertools import chain
+    from xml.sax.saxutils import escape as xml_escape
+    from word_document_server.core.ooxml import escape_xml_text
+
+    if isinstance(rows, (list, tuple)):
+        row_iter = iter(rows)
+        if col_count is None:
+            col_count = max((len(row) for row in rows), default=0)
+    else:
+        row_iter = iter(rows)
+        first = next(row_iter, None)
+        if first is not None:
+            row_iter = chain([first], row_iter)
+            if col_count is None:
+                col_count = len(first)
+        col_count = col_count or 0
+    widths = tuple(int(w) for w in (col_widths or []))
+    alignments = tuple(col_alignments or [])
+
+    body_rpr = None if rich else ''
+    header_rpr = None
+    if not rich:
+        header_rpr = '<w:rPr><w:b/>' + (f'<w:color w:val="{header_text_color}"/>' if header_text_color else '') + '</w:rPr>'
+    header_tcpr = f'<w:shd w:val="clear" w:color="auto" w:fill="{header_fill}"/>' if header_fill else ''
+    body_template = _row_template(col_count, widths, alignments, body_rpr, '')
+    header_template = _row_template(col_count, widths, alignments, header_rpr, header_tcpr)
+
+    parts = ['<w:tbl><w:tblPr>']
+    if style_id:
+        parts.append(f'<w:tblStyle w:val="{xml_escape(style_id)}"/>')
+    if widths:
+        parts.append(f'<w:tblW w:w="{sum(widths)}" w:type="dxa"/><w:tblLayout w:type="fixed"/>')
+    else:
+        parts.append('<w:tblW w:w="0" w:type="auto"/>')
+    parts.append('<w:tblLook w:val="04A0" w:firstRow="1" w:lastRow="0" w:firstColumn="1" '
+                 'w:lastColumn="0" w:noHBand="0" w:noVBand="1"/></w:tblPr><w:tblGrid>')
+    for col in range(col_count):
+        width = widths[col] if col < len(widths) else None
+        parts.append(f'<w:gridCol w:w="{width}"/>' if width else '<w:gridCol/>')
+    parts.append('</w:tblGrid>')
+
+    for row_index, row in enumerate(row_iter):
+        is_header = header_row and row_index == 0
+        template = header_template if is_header else body_template
+        if len(row) != col_count:
+            row = (list(row) + [''] * col_count)[:col_count]
+        parts.append('<w:tr><w:trPr><w:tblHeader/></w:trPr>' if is_header else '<w:tr>')
+        for (prefix, suffix, empty), value in zip(template, row):
+            if value is None or value == '':
+                # Empty cells get an empty paragraph rather than an empty run
+                parts.append(empty)
+            elif rich:
+                parts.append(f'{prefix}{value}{suffix}')
+            else:
+                text = escape_xml_text(str(value))
+                if '\n' in text or '\t' in text or '\r' in text:
+                    # Line breaks and tabs are elements of the run, not characters of w:t
+                    text = (text.replace('\r\n', '\n').replace('\r', '\n')
+                            .replace('\n', _TEXT_BREAK).replace('\t', _TEXT_TAB))
+                parts.append(f'{prefix}{text}{suffix}')
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+    return ''.join(parts)
+
+
+def iter_csv_rows(path, delimiter=",", encoding="utf-8-sig"):
+    """Stream rows from a CSV file."""
+    import csv
+    with open(path, newline="", encoding=encoding) as f:
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def iter_jsonl_rows(path, encoding="utf-8"):
+    """
+    Stream rows from a JSON-lines file.
+
+    Each line is either a JSON array (one row) or an object; for objects the
+    keys of the first object become a header row and fix the column order.
+    """
+    import json
+    columns = None
+    with open(path, encoding=encoding) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                if columns is None:
+                    columns = list(record.keys())
+                    yield columns
+                yield ["" if record.get(key) is None else record.get(key) for key in columns]
+            elif isinstance(record, list):
+                yield record
+            else:
+                raise ValueError(f"Line {line_number}: expected a JSON array or object")
+
+
+def insert_table_xml(doc, tbl_xml):
+    """
+    Parse table markup from build_table_xml and append it to the end of the document body.
+
+    Returns:
+        The inserted w:tbl element
+    """
+    tbl = parse_xml(tbl_xml.replace('<w:tbl>', f'<w:tbl {nsdecls("w")}>', 1))
+    doc.element.body._insert_tbl(tbl)
+    return tbl
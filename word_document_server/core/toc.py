@@ -0,0 +1,154 @@
+"""
+Table of contents insertion for Word Document Server.
+
+The table of contents is a real Word field (TOC \\o "1-N") inside a "Table
+of Contents" content control, pre-populated with one entry per heading
+from the cached heading index. It is spliced into the raw bytes of
+word/document.xml at the start of the body, so the rest of the document
+(formatting, images, notes) is never parsed or rebuilt; a table of contents
+inserted earlier is replaced in place. The field is marked dirty, so Word
+fills in page numbers and links the next time the document is opened.
+"""
+import re
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+from docx.oxml.ns import qn
+from lxml import etree
+
+from word_document_server.core.ooxml import (
+    DOCUMENT_PART, escape_xml_text, parse_part, serialize_part, rewrite_package
+)
+from word_document_server.core.sections import Heading, get_heading_index
+
+STYLES_PART = 'word/styles.xml'
+
+_BODY_RE = re.compile(rb'<(\w+):body(?:\s[^>]*)?>')
+# Word indents each level of its built-in TOC styles by 11pt
+_LEVEL_INDENT = 220
+
+
+def _style_xml(prefix: str, style_id: str, text: str) -> str:
+    return f'<{prefix}:pPr><{prefix}:pStyle {prefix}:val="{style_id}"/></{prefix}:pPr>' \
+           f'<{prefix}:r><{prefix}:t xml:space="preserve">{escape_xml_text(text)}</{prefix}:t></{prefix}:r>'
+
+
+def build_toc_xml(prefix: str, headings: List[Heading], title: Optional[str], max_level: int,
+                  style_ids: Dict[str, str]) -> bytes:
+    """The content control holding the TOC field and its entries."""
+    w = prefix
+    parts = [f'<{w}:sdt><{w}:sdtPr><{w}:docPartObj><{w}:docPartGallery {w}:val="Table of Contents"/>'
+             f'<{w}:docPartUnique/></{w}:docPartObj></{w}:sdtPr><{w}:sdtContent>']
+    if title:
+        parts.append(f'<{w}:p>{_style_xml(w, style_ids["toc heading"], title)}</{w}:p>')
+    field_start = (f'<{w}:r><{w}:fldChar {w}:fldCharType="begin" {w}:dirty="true"/></{w}:r>'
+                   f'<{w}:r><{w}:instrText xml:space="preserve"> TOC \\o "1-{max_level}" \\h \\z \\u </{w}:instrText></{w}:r>'
+                   f'<{w}:r><{w}:fldChar {w}:fldCharType="separate"/></{w}:r>')
+    for number, heading in enumerate(headings):
+        entry = _style_xml(w, style_ids[f'toc {heading.level}'], heading.text)
+        if number == 0:
+            # The field result starts inside the first entry, after its paragraph properties
+            properties_end = entry.index(f'</{w}:pPr>') + len(f'</{w}:pPr>')
+            entry = entry[:properties_end] + field_start + entry[properties_end:]
+        parts.append(f'<{w}:p>{entry}</{w}:p>')
+    parts.append(f'<{w}:p><{w}:r><{w}:fldChar {w}:fldCharType="end"/></{w}:r></{w}:p>')
+    parts.append(f'</{w}:sdtContent></{w}:sdt>')
+    return ''.join(parts).encode('utf-8')
+
+
+def find_toc(xml: bytes, prefix: str) -> Optional[Tuple[int, int]]:
+    """Byte span of the first "Table of Contents" content control in document XML, if any."""
+    p = re.escape(prefix.encode())
+    gallery = re.search(rb'<' + p + rb':docPartGallery\s+' + p + rb':val="Table of Contents"', xml)
+    if gallery is None:
+        return None
+    # The gallery sits in the sdtPr of its control, so the nearest control start before it is the control
+    start = max(xml.rfind(b'<' + prefix.encode() + b':sdt>', 0, gallery.start()),
+                xml.rfind(b'<' + prefix.encode() + b':sdt ', 0, gallery.start()))
+    if start < 0:
+        return None
+    depth = 0
+    for tag in re.finditer(rb'<(/?)' + p + rb':sdt(?=[\s>])', xml[start:]):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            end = xml.index(b'>', start + tag.end()) + 1
+            return start, end
+    return None
+
+
+def _ensure_toc_styles(styles, max_level: int) -> Tuple[Dict[str, str], bool]:
+    """Ids of the "TOC Heading" and "toc N" paragraph styles, adding the missing ones to styles.xml."""
+    ids = {}
+    for style in styles.iter(qn('w:style')):
+        name = style.find(qn('w:name'))
+        if name is not None and style.get(qn('w:type')) == 'paragraph':
+            ids.setdefault(name.get(qn('w:val'), '').lower(), style.get(qn('w:styleId')))
+    existing = set(ids.values())
+    changed = False
+    wanted = [('toc heading', 'TOCHeading', 'TOC Heading')] + \
+             [(f'toc {level}', f'TOC{level}', f'toc {level}') for level in range(1, max_level + 1)]
+    for key, style_id, name in wanted:
+        if key in ids:
+            continue
+        style = etree.SubElement(styles, qn('w:style'))
+        style.set(qn('w:type'), 'paragraph')
+        style.set(qn('w:styleId'), style_id)
+        etree.SubElement(style, qn('w:name')).set(qn('w:val'), name)
+        based_on = 'Heading1' if key == 'toc heading' and 'Heading1' in existing else 'Normal'
+        if based_on in existing:
+            etree.SubElement(style, qn('w:basedOn')).set(qn('w:val'), based_on)
+            etree.SubElement(style, qn('w:next')).set(qn('w:val'), 'Normal')
+        etree.SubElement(style, qn('w:uiPriority')).set(qn('w:val'), '39')
+        etree.SubElement(style, qn('w:unhideWhenUsed'))
+        p_pr = etree.SubElement(style, qn('w:pPr'))
+        if key == 'toc heading':
+            # Keeps the title itself out of the table of contents
+            etree.SubElement(p_pr, qn('w:outlineLvl')).set(qn('w:val'), '9')
+        else:
+            etree.SubElement(p_pr, qn('w:spacing')).set(qn('w:after'), '100')
+            level = int(key.split()[1])
+            if level > 1:
+                etree.SubElement(p_pr, qn('w:ind')).set(qn('w:left'), str(_LEVEL_INDENT * (level - 1)))
+        ids[key] = style_id
+        changed = True
+    return ids, changed
+
+
+def insert_table_of_contents(docx_path: str, title: Optional[str] = 'Table of Contents', max_level: int = 3) -> int:
+    """
+    Insert (or replace) the table of contents at the start of a document.
+
+    Returns:
+        The number of entries; 0 when the document has no headings up to
+        max_level, in which case it is left unchanged
+    """
+    headings = [heading for heading in get_heading_index(docx_path)
+                if heading.style != 'Title' and heading.level <= max_level and heading.text]
+    if not headings:
+        return 0
+    with zipfile.ZipFile(docx_path) as zf:
+        xml = zf.read(DOCUMENT_PART)
+        styles = parse_part(zf, STYLES_PART)
+    body = _BODY_RE.search(xml)
+    if body is None:
+        raise ValueError("word/document.xml has no body")
+    prefix = body.group(1).decode()
+
+    replacements = {}
+    if styles is not None:
+        style_ids, changed = _ensure_toc_styles(styles, max_level)
+        if changed:
+            replacements[STYLES_PART] = serialize_part(styles)
+    else:
+        style_ids = {'toc heading': 'TOCHeading', **{f'toc {n}': f'TOC{n}' for n in range(1, max_level + 1)}}
+
+    toc = build_toc_xml(prefix, headings, title, max_level, style_ids)
+    span = find_toc(xml, prefix)
+    if span is not None:
+        replacements[DOCUMENT_PART] = xml[:span[0]] + toc + xml[span[1]:]
+    else:
+        # A new table of contents gets a page of its own
+        page_break = f'<{prefix}:p><{prefix}:r><{prefix}:br {prefix}:type="page"/></{prefix}:r></{prefix}:p>'
+        replacements[DOCUMENT_PART] = xml[:body.end()] + toc + page_break.encode() + xml[body.end():]
+    rewrite_package(docx_path, replacements)
+    return len(headings)
@@ -0,0 +1,323 @@
+"""
+Filesystem watcher for Word Document Server.
+
+Documents edited outside the server make cached data stale. The watcher
+follows the configured directories, using inotify/FSEvents/ReadDirectoryChanges
+through the optional `watchdog` package when it is installed and a polling
+scan otherwise, and collects changed paths until they have been quiet for a
+debounce interval. Each batch then invalidates in-process caches, refreshes
+the document catalog and, when configured, queues low-priority conversions
+so derived copies (for example a Markdown export) stay up to date.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from word_document_server.core.catalog import DEFAULT_EXTENSIONS, iter_documents
+
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_POLL_INTERVAL = 5.0
+# Pre-conversions run behind every job submitted with the default priority (5)
+PRECONVERT_PRIORITY = 0
+PRECONVERT_CLIENT = 'watcher'
+
+_WRITE_EVENTS = ('created', 'modified', 'moved', 'deleted', 'closed')
+
+# The watcher runs in background threads next to the stdio transport, so it reports through logging (stderr)
+logger = logging.getLogger(__name__)
+
+_invalidators: List[Callable[[List[str]], None]] = []
+
+
+def register_invalidator(callback: Callable[[List[str]], None]) -> None:
+    """Call `callback(paths)` with the absolute paths of every batch of changed documents."""
+    if callback not in _invalidators:
+        _invalidators.append(callback)
+
+
+def _matches(path: str, suffixes: Sequence[str]) -> bool:
+    name = os.path.basename(path)
+    return not name.startswith('~$') and name.lower().endswith(tuple(suffixes))
+
+
+class ChangeDebouncer:
+    """
+    Collects changed paths and hands them over once no new change arrived for `delay` seconds.
+
+    A path that keeps changing is still flushed after `max_delay`, so a file
+    being written continuously cannot postpone its batch forever.
+    """
+
+    def __init__(self, callback: Callable[[List[str]], None], delay: float = DEFAULT_DEBOUNCE,
+                 max_delay: Optional[float] = None):
+        self.callback = callback
+        self.delay = delay
+        self.max_delay = max_delay if max_delay is not None else delay * 10
+        self._pending: Dict[str, float] = {}
+        self._first_seen: Optional[float] = None
+        self._last_seen = 0.0
+        self._condition = threading.Condition()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, paths: Iterable[str]) -> None:
+        now = time.monotonic()
+        with self._condition:
+            for path in paths:
+                self._pending[os.path.abspath(path)] = now
+            if self._pending:
+                if self._first_seen is None:
+                    self._first_seen = now
+                self._last_seen = now
+                self._condition.notify()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name='document-watcher-debounce', daemon=True)
+            self._thread.start()
+
+    def stop(self, flush: bool = False) -> None:
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._condition:
+            paths = sorted(self._pending)
+            self._pending.clear()
+            self._first_seen = None
+        if paths:
+            self.callback(paths)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._stop:
+                    return
+                if self._first_seen is None:
+                    self._condition.wait()
+                    continue
+                due = min(self._last_seen + self.delay, self._first_seen + self.max_delay)
+                remaining = due - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+            self.flush()
+
+
+class PollingObserver:
+    """Detects changes by comparing (size, mtime) snapshots of the watched directories."""
+
+    def __init__(self, directories: Sequence[str], on_change: Callable[[List[str]], None],
+                 extensions: Sequence[str] = DEFAULT_EXTENSIONS, interval: float = DEFAULT_POLL_INTERVAL):
+        self.directories = list(directories)
+        self.on_change = on_change
+        self.extensions = extensions
+        self.interval = interval
+        self._snapshot: Dict[str, tuple] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def snapshot(self) -> Dict[str, tuple]:
+        state = {}
+        for directory in self.directories:
+            try:
+                for entry in iter_documents(directory, recursive=True, extensions=self.extensions):
+                    state[os.path.abspath(entry['path'])] = (entry['size'], entry['mtime_ns'])
+            except OSError:
+                # A watched directory that disappears is reported through its files
+                continue
+        return state
+
+    def poll(self) -> List[str]:
+        """Rescan once and report paths that were added, changed or removed since the last scan."""
+        current = self.snapshot()
+        changed = [path for path, state in current.items() if self._snapshot.get(path) != state]
+        changed += [path for path in self._snapshot if path not in current]
+        self._snapshot = current
+        if changed:
+            self.on_change(changed)
+        return changed
+
+    def start(self) -> None:
+        self._snapshot = self.snapshot()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='document-watcher-poll', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+
+def _native_observer(directories: Sequence[str], on_change: Callable[[List[str]], None],
+                     extensions: Sequence[str]):
+    """A watchdog observer for the directories, or None when watchdog is not installed."""
+    try:
+        from watchdog.events import FileSystemEventHandler  # type: ignore
+        from watchdog.observers import Observer  # type: ignore
+    except ImportError:
+        return None
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            # Newer watchdog versions also report reads ("opened", "closed_no_write")
+            if event.is_directory or event.event_type not in _WRITE_EVENTS:
+                return
+            paths = [event.src_path, getattr(event, 'dest_path', '')]
+            paths = [os.fsdecode(path) for path in paths if path]
+            paths = [path for path in paths if _matches(path, extensions)]
+            if paths:
+                on_change(paths)
+
+    observer = Observer()
+    handler = _Handler()
+    for directory in directories:
+        observer.schedule(handler, directory, recursive=True)
+    return observer
+
+
+class DocumentWatcher:
+    """
+    Watches directories for changed documents and processes them in debounced batches.
+
+    Each batch goes to the registered invalidators, refreshes the catalog
+    rows of the changed paths, and queues the configured `preconvert`
+    conversions for documents whose content (conversion key) changed.
+    """
+
+    def __init__(self, directories: Sequence[str], debounce: float = DEFAULT_DEBOUNCE,
+                 preconvert: Sequence[str] = (), extensions: Sequence[str] = DEFAULT_EXTENSIONS,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, use_polling: bool = False,
+                 catalog=None, job_queue=None):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.extensions = tuple(ext.lower() if ext.startswith('.') else f'.{ext.lower()}' for ext in extensions)
+        self.preconvert = list(preconvert)
+        self.catalog = catalog
+        self.job_queue = job_queue
+        self.debouncer = ChangeDebouncer(self.process, debounce)
+        self._converted: Dict[tuple, str] = {}
+        self.observer = None if use_polling else _native_observer(self.directories, self.debouncer.add,
+                                                                  self.extensions)
+        self.backend = 'native' if self.observer is not None else 'polling'
+        if self.observer is None:
+            self.observer = PollingObserver(self.directories, self.debouncer.add, self.extensions, poll_interval)
+
+    def start(self) -> None:
+        self.debouncer.start()
+        self.observer.start()
+
+    def stop(self) -> None:
+        self.observer.stop()
+        if self.backend == 'native':
+            self.observer.join()
+        self.debouncer.stop()
+
+    def process(self, paths: List[str]) -> None:
+        """Handle one debounced batch of changed (or removed) document paths."""
+        for invalidate in list(_invalidators):
+            try:
+                invalidate(paths)
+            except Exception as e:
+                logger.warning("Cache invalidation error: %s", e)
+        rows = {}
+        if self.catalog is not None:
+            try:
+                rows = self.catalog.refresh_paths(paths)
+            except Exception as e:
+                logger.warning("Catalog refresh error: %s", e)
+        if self.preconvert and self.job_queue is not None:
+            self._queue_conversions(paths, rows)
+
+    def _queue_conversions(self, paths: List[str], rows: Dict[str, dict]) -> None:
+        submitted = False
+        for path in paths:
+            if not os.path.isfile(path):
+                for conversion in self.preconvert:
+                    self._converted.pop((path, conversion), None)
+                continue
+            key = (rows.get(path) or {}).get('conversion_key') or ''
+            for conversion in self.preconvert:
+                # Saving without changing the content (or touching the file) keeps the key; no new conversion
+                if key and self._converted.get((path, conversion)) == key:
+                    continue
+                self.job_queue.store.submit(conversion, path, None, priority=PRECONVERT_PRIORITY,
+                                            client_id=PRECONVERT_CLIENT)
+                self._converted[(path, conversion)] = key
+                submitted = True
+        if submitted:
+            self.job_queue.notify()
+
+
+def _invalidate_comment_index(paths: List[str]) -> None:
+    from word_document_server.core.comments import _cached_comment_index
+    # Entries are keyed by mtime, so they are never served stale; clearing frees the memory they hold
+    _cached_comment_index.cache_clear()
+
+
+def _invalidate_heading_index(paths: List[str]) -> None:
+    from word_document_server.core.sections import _cached_headings
+    _cached_headings.cache_clear()
+
+
+register_invalidator(_invalidate_comment_index)
+register_invalidator(_invalidate_heading_index)
+
+
+_watcher: Optional[DocumentWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def start_watcher_from_env() -> Optional[DocumentWatcher]:
+    """
+    Start the process-wide watcher if MCP_WATCH_DIRS is set.
+
+    MCP_WATCH_DIRS lists directories separated by os.pathsep;
+    MCP_WATCH_DEBOUNCE (seconds, default 2) sets the quiet period,
+    MCP_WATCH_POLL_INTERVAL (seconds, default 5) the polling fallback rate,
+    MCP_WATCH_POLLING=1 forces polling, and MCP_WATCH_PRECONVERT is a
+    comma-separated list of conversion tools (e.g. "convert_to_markdown")
+    queued for every changed document.
+    """
+    global _watcher
+    directories = [directory for directory in os.getenv('MCP_WATCH_DIRS', '').split(os.pathsep) if directory]
+    if not directories:
+        return None
+    with _watcher_lock:
+        if _watcher is not None:
+            return _watcher
+        from word_document_server.core.catalog import get_document_catalog
+        from word_document_server.core.jobs import available_conversions, get_job_queue
+
+        missing = [directory for directory in directories if not os.path.isdir(directory)]
+        if missing:
+            raise ValueError(f"Watched directories do not exist: {', '.join(missing)}")
+        preconvert = [name.strip() for name in os.getenv('MCP_WATCH_PRECONVERT', '').split(',') if name.strip()]
+        unknown = sorted(set(preconvert) - set(available_conversions()))
+        if unknown:
+            raise ValueError(f"Unknown conversions in MCP_WATCH_PRECONVERT: {', '.join(unknown)}")
+        _watcher = DocumentWatcher(
+            directories,
+            debounce=float(os.getenv('MCP_WATCH_DEBOUNCE', str(DEFAULT_DEBOUNCE))),
+            preconvert=preconvert,
+            poll_interval=float(os.getenv('MCP_WATCH_POLL_INTERVAL', str(DEFAULT_POLL_INTERVAL))),
+            use_polling=os.getenv('MCP_WATCH_POLLING', '') == '1',
+            catalog=get_document_catalog(),
+            job_queue=get_job_queue() if preconvert else None,
+        )
+        _watcher.start()
+    return _watcher
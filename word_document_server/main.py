@@ -1,6 +1,7 @@
+import logging
 import os
 import sys
-from typing import Optional
+from typing import Any, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -8,8 +9,10 @@ print("Loading configuration from .env file...")
 load_dotenv()
 # Set required environment variable for FastMCP 2.8.1+
 os.environ.setdefault('FASTMCP_LOG_LEVEL', 'INFO')
-from fastmcp import FastMCP
-from word_document_server.tools import extended_document_tools
+from fastmcp import FastMCP, Context
+from word_document_server.tools import extended_document_tools, job_tools, format_tools, comment_tools, content_tools, document_tools, protection_tools
+from word_document_server.core.jobs import DEFAULT_DB_PATH, get_job_queue
+from word_document_server.core.watcher import start_watcher_from_env
 from word_document_server.tools.content_tools import replace_paragraph_block_below_header_tool
 from word_document_server.tools.content_tools import replace_block_between_manual_anchors_tool
 
@@ -64,6 +67,22 @@ def setup_logging(debug_mode):
         )
 
 
+def _package_logger():
+    """
+    Logger of the word_document_server package, writing to stderr.
+
+    Background threads (the document watcher) log through it; stdout carries
+    the JSON-RPC stream of the stdio transport and must not be written to.
+    """
+    logger = logging.getLogger('word_document_server')
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    return logger
+
+
 # Initialize FastMCP server
 mcp = FastMCP("Word Document Server")
 
@@ -130,9 +149,14 @@ def register_tools():
         return extended_document_tools.convert_markdown_to_docx(input_path, output_path)
 
     @mcp.tool()
-    def convert_txt_to_docx(input_path: str, output_path: str = None):
-        """Convert a TXT document to DOCX (.docx)."""
-        return extended_document_tools.convert_txt_to_docx(input_path, output_path)
+    async def convert_txt_to_docx(input_path: str, output_path: str = None,
+                                  max_paragraphs_per_part: int = None, ctx: Context = None):
+        """Convert a TXT document to DOCX (.docx), streaming large files and reporting progress.
+        Set max_paragraphs_per_part to split very large inputs into several .docx files."""
+        return await extended_document_tools.convert_txt_to_docx(
+            input_path, output_path, max_paragraphs_per_part,
+            progress_callback=ctx.report_progress if ctx is not None else None
+        )
 
     @mcp.tool()
     def convert_odt_to_docx(input_path: str, output_path: str = None):
@@ -168,6 +192,23 @@ def register_tools():
     async def convert_doc_to_pdf(input_path: str, output_path: Optional[str] = None) -> str:
         return await extended_document_tools.convert_doc_to_pdf(input_path, output_path)
 
+    @mcp.tool()
+    def submit_conversion(conversion: str, input_path: str, output_path: str = None,
+                          priority: int = 5, client_id: str = "default", max_attempts: int = 3):
+        """Queue a conversion (e.g. "convert_to_pdf") to run in the background and return a job id.
+        Higher priority runs first; client_id shares workers fairly between clients."""
+        return job_tools.submit_conversion(conversion, input_path, output_path, priority, client_id, max_attempts)
+
+    @mcp.tool()
+    def get_job_status(job_id: str):
+        """Get the status, progress and attempts of a queued conversion job."""
+        return job_tools.get_job_status(job_id)
+
+    @mcp.tool()
+    def get_job_result(job_id: str):
+        """Get the result of a finished conversion job."""
+        return job_tools.get_job_result(job_id)
+
     @mcp.tool()
     def replace_block_below_header(filename: str, header_text: str, new_paragraphs: list, detect_block_end_fn=None):
         """Reemplaza el bloque de párrafos debajo de un encabezado, evitando modificar TOC."""
@@ -178,6 +219,65 @@ def register_tools():
         """Replace all content between start_anchor_text and end_anchor_text (or next logical header if not provided)."""
         return replace_block_between_manual_anchors_tool(filename, start_anchor_text, new_paragraphs, end_anchor_text, match_fn, new_paragraph_style)
 
+    # Protection tools
+    @mcp.tool()
+    async def protect_documents_batch(paths: list, password: str, recursive: bool = False,
+                                      max_workers: int = None, ctx: Context = None):
+        """Password-protect many documents (files and/or folders of .docx) in parallel, reporting per-file progress."""
+        return await protection_tools.protect_documents_batch(
+            paths, password, recursive, max_workers,
+            progress_callback=ctx.report_progress if ctx is not None else None
+        )
+
+    @mcp.tool()
+    async def unprotect_documents_batch(paths: list, password: str, recursive: bool = False,
+                                        max_workers: int = None, ctx: Context = None):
+        """Remove password protection from many documents (files and/or folders of .docx) in parallel."""
+        return await protection_tools.unprotect_documents_batch(
+            paths, password, recursive, max_workers,
+            progress_callback=ctx.report_progress if ctx is not None else None
+        )
+
+    # Document tools
+    @mcp.tool()
+    def list_available_documents(directory: str = ".", recursive: bool = False, pattern: str = None,
+                                 extensions: list = None, sort_by: str = "name", descending: bool = False,
+                                 cursor: str = None, limit: int = 100, include_metadata: bool = False):
+        """List Word documents in a directory with filtering, sorting and cursor pagination."""
+        return document_tools.list_available_documents(directory, recursive, pattern, extensions, sort_by,
+                                                       descending, cursor, limit, include_metadata)
+
+    @mcp.tool()
+    def query_documents(root: str, refresh: bool = True, author: str = None, title_contains: str = None,
+                        keywords_contains: str = None, modified_after: str = None, modified_before: str = None,
+                        min_words: int = None, max_words: int = None, min_pages: int = None, max_pages: int = None,
+                        sort_by: str = "path", descending: bool = False, limit: int = 100, offset: int = 0):
+        """Find documents under a directory by author, title, keywords, dates and size using the metadata catalog."""
+        return document_tools.query_documents(root, refresh, author, title_contains, keywords_contains,
+                                              modified_after, modified_before, min_words, max_words,
+                                              min_pages, max_pages, sort_by, descending, limit, offset)
+
+    @mcp.tool()
+    def optimize_document(filename: str, output_filename: str = None, image_quality: int = None,
+                          compression_level: int = 9):
+        """Shrink a document: merge identical runs, drop rsids, duplicate properties and duplicate media, recompress."""
+        return document_tools.optimize_document(filename, output_filename, image_quality, compression_level)
+
+    @mcp.tool()
+    def compare_documents(original_filename: str, revised_filename: str, redline_filename: str = None,
+                          author: str = "Compare", limit: int = 500):
+        """Compare two document versions: structured change list with word-level diffs, optional redline DOCX."""
+        return document_tools.compare_documents(original_filename, revised_filename, redline_filename, author, limit)
+
+    @mcp.tool()
+    async def render_template_batch(template: str, records: Any, output_pattern: str,
+                                    max_workers: int = None, ctx: Context = None):
+        """Mail merge: render one document per record (list, .csv, .jsonl or .json) from a {{placeholder}} template."""
+        return await document_tools.render_template_batch(
+            template, records, output_pattern, max_workers,
+            progress_callback=ctx.report_progress if ctx is not None else None
+        )
+
     # Comment tools
     @mcp.tool()
     def get_all_comments(filename: str):
@@ -193,6 +293,17 @@ def register_tools():
     def get_comments_for_paragraph(filename: str, paragraph_index: int):
         """Extract comments for a specific paragraph in a Word document."""
         return comment_tools.get_comments_for_paragraph(filename, paragraph_index)
+
+    @mcp.tool()
+    def add_comments_batch(filename: str, comments: list):
+        """Add many comments (with optional anchor text, ranges and replies) to a Word document in one save."""
+        return comment_tools.add_comments_batch(filename, comments)
+
+    @mcp.tool()
+    def resolve_comments_batch(filename: str, comment_ids: list, resolved: bool = True):
+        """Mark comments as resolved, or reopen them, in one save."""
+        return comment_tools.resolve_comments_batch(filename, comment_ids, resolved)
+
     # New table column width tools
     @mcp.tool()
     def set_table_column_width(filename: str, table_index: int, col_index: int, 
@@ -213,9 +324,9 @@ def register_tools():
         return format_tools.set_table_width(filename, table_index, width, width_type)
 
     @mcp.tool()
-    def auto_fit_table_columns(filename: str, table_index: int):
-        """Set table columns to auto-fit based on content."""
-        return format_tools.auto_fit_table_columns(filename, table_index)
+    def auto_fit_table_columns(filename: str, table_index: int, max_width: float = None):
+        """Size table columns to their content so the table fits the page margins (max_width in points)."""
+        return format_tools.auto_fit_table_columns(filename, table_index, max_width)
 
     # New table cell text formatting and padding tools
     @mcp.tool()
@@ -227,6 +338,28 @@ def register_tools():
         return format_tools.format_table_cell_text(filename, table_index, row_index, col_index,
                                                    text_content, bold, italic, underline, color, font_size, font_name)
 
+    @mcp.tool()
+    def export_tables(filename: str, format: str = "csv", table_indices: list = None,
+                      output_dir: str = None, header: bool = True):
+        """Export table data to CSV, JSON lines, NumPy (.npy) or Arrow IPC files, one file per table.
+        Merged cells are expanded so every row has one value per column."""
+        return document_tools.export_tables(filename, format, table_indices, output_dir, header)
+
+    @mcp.tool()
+    def add_table_from_data(filename: str, rows: list = None, csv_path: str = None, jsonl_path: str = None,
+                            header: bool = True, col_widths: list = None, header_fill: str = None,
+                            header_text_color: str = None, delimiter: str = ",", style: str = "Table Grid"):
+        """Add a large table in one step from rows, a CSV file or a JSON-lines file.
+        Supports a styled repeating header row and column widths in points."""
+        return content_tools.add_table_from_data(filename, rows, csv_path, jsonl_path, header, col_widths,
+                                                 header_fill, header_text_color, delimiter, style)
+
+    @mcp.tool()
+    def apply_table_operations(filename: str, table_index: int, ops: list):
+        """Apply many table cell edits (format_text, shading, alignment, padding, merge) with one load and save.
+        Each op is {"op": ..., "row": r, "col": c, ...} or targets a range with start_row/start_col/end_row/end_col."""
+        return format_tools.apply_table_operations(filename, table_index, ops)
+
     @mcp.tool()
     def set_table_cell_padding(filename: str, table_index: int, row_index: int, col_index: int,
                                top: float = None, bottom: float = None, left: float = None, 
@@ -247,6 +380,20 @@ def run_server():
     
     # Register all tools
     register_tools()
+
+    # Resume conversion jobs persisted by a previous run
+    job_db = os.getenv('MCP_JOB_DB', DEFAULT_DB_PATH)
+    if os.path.exists(job_db):
+        get_job_queue()
+
+    # Keep caches, the catalog and pre-converted copies in sync with edits made outside the server
+    logger = _package_logger()
+    try:
+        watcher = start_watcher_from_env()
+        if watcher is not None:
+            logger.info("Watching %s for document changes (%s)", ', '.join(watcher.directories), watcher.backend)
+    except Exception as e:
+        logger.warning("Document watcher not started: %s", e)
     
     # Print startup information
     transport_type = config['transport']
@@ -8,26 +8,28 @@ to clients through the Model Context Protocol.
 # Document tools
 from word_document_server.tools.document_tools import (
     create_document, get_document_info, get_document_text, 
-    get_document_outline, list_available_documents, 
-    copy_document, merge_documents
+    get_document_outline, export_tables, list_available_documents, 
+    query_documents, copy_document, merge_documents, optimize_document,
+    render_template_batch, compare_documents
 )
 
 # Content tools
 from word_document_server.tools.content_tools import (
-    add_heading, add_paragraph, add_table, add_picture,
+    add_heading, add_paragraph, add_table, add_table_from_data, add_picture,
     add_page_break, add_table_of_contents, delete_paragraph,
     search_and_replace
 )
 
 # Format tools
 from word_document_server.tools.format_tools import (
-    format_text, create_custom_style, format_table
+    format_text, create_custom_style, format_table, apply_table_operations
 )
 
 # Protection tools
 from word_document_server.tools.protection_tools import (
     protect_document, add_restricted_editing,
-    add_digital_signature, verify_document
+    add_digital_signature, verify_document,
+    protect_documents_batch, unprotect_documents_batch
 )
 
 # Footnote tools
@@ -38,5 +40,11 @@ from word_document_server.tools.footnote_tools import (
 
 # Comment tools
 from word_document_server.tools.comment_tools import (
-    get_all_comments, get_comments_by_author, get_comments_for_paragraph
+    get_all_comments, get_comments_by_author, get_comments_for_paragraph,
+    add_comments_batch, resolve_comments_batch
+)
+
+# Job tools
+from word_document_server.tools.job_tools import (
+    submit_conversion, get_job_status, get_job_result
 )
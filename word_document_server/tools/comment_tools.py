@@ -7,13 +7,14 @@ comments from Word documents through the MCP protocol.
 import os
 import json
 from typing import Dict, List, Optional, Any
-from docx import Document
 
-from word_document_server.utils.file_utils import ensure_docx_extension
+from word_document_server.utils.file_utils import ensure_docx_extension, check_file_writeable
 from word_document_server.core.comments import (
-    extract_all_comments,
-    filter_comments_by_author,
-    get_comments_for_paragraph
+    get_comment_index,
+    read_paragraph_text,
+    validate_comment_specs,
+    add_comments,
+    resolve_comments
 )
 
 
@@ -36,11 +37,8 @@ async def get_all_comments(filename: str) -> str:
         }, indent=2)
     
     try:
-        # Load the document
-        doc = Document(filename)
-        
-        # Extract all comments
-        comments = extract_all_comments(doc)
+        # Comments are indexed once per file version
+        comments = get_comment_index(filename).comments
         
         # Return results
         return json.dumps({
@@ -82,14 +80,8 @@ async def get_comments_by_author(filename: str, author: str) -> str:
         }, indent=2)
     
     try:
-        # Load the document
-        doc = Document(filename)
-        
-        # Extract all comments
-        all_comments = extract_all_comments(doc)
-        
-        # Filter by author
-        author_comments = filter_comments_by_author(all_comments, author)
+        # Look up the author in the cached comment index
+        author_comments = get_comment_index(filename).for_author(author.strip())
         
         # Return results
         return json.dumps({
@@ -132,25 +124,22 @@ async def get_comments_for_paragraph(filename: str, paragraph_index: int) -> str
         }, indent=2)
     
     try:
-        # Load the document
-        doc = Document(filename)
+        index = get_comment_index(filename)
         
         # Check if paragraph index is valid
-        if paragraph_index >= len(doc.paragraphs):
+        if paragraph_index >= index.paragraph_count:
             return json.dumps({
                 'success': False,
-                'error': f'Paragraph index {paragraph_index} is out of range. Document has {len(doc.paragraphs)} paragraphs.'
+                'error': f'Paragraph index {paragraph_index} is out of range. Document has {index.paragraph_count} paragraphs.'
             }, indent=2)
         
-        # Extract all comments
-        all_comments = extract_all_comments(doc)
-        
-        # Filter for the specific paragraph
-        from word_document_server.core.comments import get_comments_for_paragraph as core_get_comments_for_paragraph
-        para_comments = core_get_comments_for_paragraph(all_comments, paragraph_index)
+        # Look up the paragraph in the cached comment index
+        para_comments = index.for_paragraph(paragraph_index)
         
         # Get the paragraph text for context
-        paragraph_text = doc.paragraphs[paragraph_index].text
+        paragraph_text = index.paragraph_texts.get(paragraph_index)
+        if paragraph_text is None:
+            paragraph_text = read_paragraph_text(filename, paragraph_index) or ''
         
         # Return results
         return json.dumps({
@@ -165,4 +154,105 @@ async def get_comments_for_paragraph(filename: str, paragraph_index: int) -> str
         return json.dumps({
             'success': False,
             'error': f'Failed to extract comments: {str(e)}'
-        }, indent=2)
\ No newline at end of file
+        }, indent=2)
+
+
+async def add_comments_batch(filename: str, comments: List[Dict[str, Any]]) -> str:
+    """
+    Add many comments to a Word document in one save.
+    
+    Args:
+        filename: Path to the Word document
+        comments: List of comments, each with paragraph_index and text, and
+            optionally author, initials, anchor_text (substring of the
+            paragraph to anchor to), end_paragraph_index (to span several
+            paragraphs) or reply_to (id of an existing comment to answer)
+        
+    Returns:
+        JSON string with the ids of the new comments
+    """
+    filename = ensure_docx_extension(filename)
+    
+    if not os.path.exists(filename):
+        return json.dumps({
+            'success': False,
+            'error': f'Document {filename} does not exist'
+        }, indent=2)
+    
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return json.dumps({
+            'success': False,
+            'error': f'Cannot modify document: {error_message}'
+        }, indent=2)
+    
+    # Validate the whole batch first so a bad entry leaves the file untouched
+    try:
+        specs = validate_comment_specs(filename, comments)
+    except ValueError as e:
+        return json.dumps({
+            'success': False,
+            'error': f'{str(e)}. No changes were made.'
+        }, indent=2)
+    
+    try:
+        comment_ids = add_comments(filename, specs)
+        return json.dumps({
+            'success': True,
+            'comment_ids': comment_ids,
+            'total_added': len(comment_ids)
+        }, indent=2)
+        
+    except Exception as e:
+        return json.dumps({
+            'success': False,
+            'error': f'Failed to add comments: {str(e)}'
+        }, indent=2)
+
+
+async def resolve_comments_batch(filename: str, comment_ids: List[str], resolved: bool = True) -> str:
+    """
+    Mark comments as resolved, or reopen them, in one save.
+    
+    Args:
+        filename: Path to the Word document
+        comment_ids: Ids of the comments to update
+        resolved: True to resolve the comments, False to reopen them
+        
+    Returns:
+        JSON string with the number of comments updated
+    """
+    filename = ensure_docx_extension(filename)
+    
+    if not os.path.exists(filename):
+        return json.dumps({
+            'success': False,
+            'error': f'Document {filename} does not exist'
+        }, indent=2)
+    
+    if not comment_ids:
+        return json.dumps({
+            'success': False,
+            'error': 'comment_ids cannot be empty'
+        }, indent=2)
+    
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return json.dumps({
+            'success': False,
+            'error': f'Cannot modify document: {error_message}'
+        }, indent=2)
+    
+    try:
+        count = resolve_comments(filename, [str(comment_id) for comment_id in comment_ids], resolved)
+        return json.dumps({
+            'success': True,
+            'resolved': bool(resolved),
+            'total_updated': count
+        }, indent=2)
+        
+    except Exception as e:
+        return json.dumps({
+            'success': False,
+            'error': f'Failed to update comments: {str(e)}'
+        }, indent=2)
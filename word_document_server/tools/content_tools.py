@@ -5,6 +5,7 @@ These tools add various types of content to Word documents,
 including headings, paragraphs, tables, images, and page breaks.
 """
 import os
+import re
 from typing import List, Optional, Dict, Any
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
@@ -12,6 +13,9 @@ from docx.shared import Inches, Pt, RGBColor
 from word_document_server.utils.file_utils import check_file_writeable, ensure_docx_extension
 from word_document_server.utils.document_utils import find_and_replace_text, insert_header_near_text, insert_numbered_list_near_text, insert_line_or_paragraph_near_text, replace_paragraph_block_below_header, replace_block_between_manual_anchors
 from word_document_server.core.styles import ensure_heading_style, ensure_table_style
+from word_document_server.core.tables import build_table_xml, insert_table_xml, iter_csv_rows, iter_jsonl_rows
+from word_document_server.core.images import DEFAULT_DPI, DEFAULT_JPEG_QUALITY, add_picture as insert_picture
+from word_document_server.core.toc import insert_table_of_contents
 
 
 async def add_heading(filename: str, text: str, level: int = 1,
@@ -172,6 +176,13 @@ async def add_paragraph(filename: str, text: str, style: Optional[str] = None,
         return f"Failed to add paragraph: {str(e)}"
 
 
+def _table_style_id(doc, style_name: str = 'Table Grid') -> Optional[str]:
+    try:
+        return doc.styles[style_name].style_id
+    except KeyError:
+        return None
+
+
 async def add_table(filename: str, rows: int, cols: int, data: Optional[List[List[str]]] = None) -> str:
     """Add a table to a Word document.
     
@@ -192,26 +203,21 @@ async def add_table(filename: str, rows: int, cols: int, data: Optional[List[Lis
         # Suggest creating a copy
         return f"Cannot modify document: {error_message}. Consider creating a copy first or creating a new document."
     
+    try:
+        rows = int(rows)
+        cols = int(cols)
+    except (ValueError, TypeError):
+        return "Invalid parameter: rows and cols must be integers"
+    if rows < 1 or cols < 1:
+        return "Invalid parameter: rows and cols must be at least 1"
+    
     try:
         doc = Document(filename)
-        table = doc.add_table(rows=rows, cols=cols)
-        
-        # Try to set the table style
-        try:
-            table.style = 'Table Grid'
-        except KeyError:
-            # If style doesn't exist, add basic borders
-            pass
         
-        # Fill table with data if provided
-        if data:
-            for i, row_data in enumerate(data):
-                if i >= rows:
-                    break
-                for j, cell_text in enumerate(row_data):
-                    if j >= cols:
-                        break
-                    table.cell(i, j).text = str(cell_text)
+        # Generate the whole table at once instead of filling cells one by one
+        table_rows = list((data or [])[:rows])
+        table_rows.extend([[]] * (rows - len(table_rows)))
+        insert_table_xml(doc, build_table_xml(table_rows, style_id=_table_style_id(doc), col_count=cols))
         
         doc.save(filename)
         return f"Table ({rows}x{cols}) added to {filename}"
@@ -219,13 +225,100 @@ async def add_table(filename: str, rows: int, cols: int, data: Optional[List[Lis
         return f"Failed to add table: {str(e)}"
 
 
-async def add_picture(filename: str, image_path: str, width: Optional[float] = None) -> str:
+async def add_table_from_data(filename: str, rows: Optional[List[List[Any]]] = None,
+                              csv_path: Optional[str] = None, jsonl_path: Optional[str] = None,
+                              header: bool = True, col_widths: Optional[List[float]] = None,
+                              header_fill: Optional[str] = None, header_text_color: Optional[str] = None,
+                              delimiter: str = ",", style: str = "Table Grid") -> str:
+    """Add a large table in one step from a list of rows, a CSV file or a JSON-lines file.
+
+    The table markup is generated directly from a cached row template, so
+    tables with hundreds of thousands of cells are added in seconds.
+
+    Args:
+        filename: Path to the Word document
+        rows: 2D array of cell values (use exactly one of rows, csv_path, jsonl_path)
+        csv_path: Path to a CSV file
+        jsonl_path: Path to a JSON-lines file of arrays, or of objects (keys become the header)
+        header: Treat the first row as a bold, repeating header row
+        col_widths: Optional column widths in points
+        header_fill: Optional header background color as hex, e.g. "D9E2F3"
+        header_text_color: Optional header text color as hex, e.g. "FFFFFF"
+        delimiter: CSV field delimiter
+        style: Table style name (default "Table Grid")
+    """
+    filename = ensure_docx_extension(filename)
+
+    sources = [source for source in (rows, csv_path, jsonl_path) if source is not None]
+    if len(sources) != 1:
+        return "Invalid parameter: provide exactly one of rows, csv_path or jsonl_path"
+    for path in (csv_path, jsonl_path):
+        if path is not None and not os.path.exists(path):
+            return f"Data file {path} does not exist"
+    try:
+        widths = [int(round(float(w) * 20)) for w in col_widths] if col_widths else None
+    except (ValueError, TypeError):
+        return "Invalid parameter: col_widths must be a list of numbers (points)"
+    for name, color in (("header_fill", header_fill), ("header_text_color", header_text_color)):
+        if color is not None and not re.fullmatch(r"#?[0-9A-Fa-f]{6}", color):
+            return f"Invalid parameter: {name} must be a hex color such as 'D9E2F3'"
+
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}. Consider creating a copy first."
+
+    try:
+        doc = Document(filename)
+        if rows is not None:
+            source = rows
+        elif csv_path is not None:
+            source = iter_csv_rows(csv_path, delimiter=delimiter)
+        else:
+            source = iter_jsonl_rows(jsonl_path)
+
+        row_count = 0
+
+        def counted(source_rows):
+            nonlocal row_count
+            for row in source_rows:
+                row_count += 1
+                yield row
+
+        tbl_xml = build_table_xml(
+            counted(source), header_row=header, style_id=_table_style_id(doc, style), col_widths=widths,
+            header_fill=header_fill.lstrip('#').upper() if header_fill else None,
+            header_text_color=header_text_color.lstrip('#').upper() if header_text_color else None,
+        )
+        if row_count == 0:
+            return "No rows to add: the data source is empty"
+        tbl = insert_table_xml(doc, tbl_xml)
+        col_count = len(tbl.tblGrid.gridCol_lst)
+
+        doc.save(filename)
+        return f"Table ({row_count}x{col_count}) added successfully to {filename}"
+    except Exception as e:
+        return f"Failed to add table: {str(e)}"
+
+
+async def add_picture(filename: str, image_path: str, width: Optional[float] = None,
+                      dpi: int = DEFAULT_DPI, quality: int = DEFAULT_JPEG_QUALITY, optimize: bool = True) -> str:
     """Add an image to a Word document.
     
+    Unless optimize is False, the image is downscaled to `dpi` at its display
+    width and re-encoded before it is embedded, and an image already in the
+    document is reused instead of being stored again.
+    
     Args:
         filename: Path to the Word document
         image_path: Path to the image file
-        width: Optional width in inches (proportional scaling)
+        width: Optional width in inches (proportional scaling); defaults to the natural size, capped at the text width
+        dpi: Resolution to keep at the display size (default 220)
+        quality: JPEG quality for re-encoded photos (1-95, default 85)
+        optimize: Whether to downscale and re-encode the image
     """
     filename = ensure_docx_extension(filename)
     
@@ -241,6 +334,15 @@ async def add_picture(filename: str, image_path: str, width: Optional[float] = N
     if not os.path.exists(abs_image_path):
         return f"Image file not found: {abs_image_path}"
     
+    # Validate optimization parameters
+    try:
+        dpi = int(dpi)
+        quality = int(quality)
+    except (ValueError, TypeError):
+        return "Invalid parameter: dpi and quality must be integers"
+    if not 1 <= quality <= 95 or dpi <= 0:
+        return "Invalid parameter: quality must be between 1 and 95 and dpi must be positive"
+    
     # Check image file size
     try:
         image_size = os.path.getsize(abs_image_path) / 1024  # Size in KB
@@ -260,12 +362,17 @@ async def add_picture(filename: str, image_path: str, width: Optional[float] = N
         diagnostic = f"Attempting to add image ({abs_image_path}, {image_size:.2f} KB) to document ({abs_filename})"
         
         try:
-            if width:
-                doc.add_picture(abs_image_path, width=Inches(width))
-            else:
-                doc.add_picture(abs_image_path)
+            _, info = insert_picture(doc, abs_image_path, width=Inches(width) if width else None,
+                                     dpi=dpi, quality=quality, optimize=optimize)
             doc.save(abs_filename)
-            return f"Picture {image_path} added to {filename}"
+            if info['reused']:
+                detail = "reused the image already in the document"
+            elif info['bytes'] != info['original_bytes'] or info['resized']:
+                pixels = f"{info['original_pixels'][0]}x{info['original_pixels'][1]} -> {info['pixels'][0]}x{info['pixels'][1]} px, " if info['resized'] else ""
+                detail = f"{pixels}{info['original_bytes'] / 1024:.2f} KB -> {info['bytes'] / 1024:.2f} KB"
+            else:
+                detail = "embedded unchanged"
+            return f"Picture {image_path} added to {filename} ({detail})"
         except Exception as inner_error:
             # More detailed error for the specific operation
             error_type = type(inner_error).__name__
@@ -306,6 +413,10 @@ async def add_page_break(filename: str) -> str:
 async def add_table_of_contents(filename: str, title: str = "Table of Contents", max_level: int = 3) -> str:
     """Add a table of contents to a Word document based on heading styles.
     
+    Inserts a Word TOC field at the start of the document, pre-filled with
+    the headings; a table of contents added earlier is replaced. The rest of
+    the document is left untouched.
+    
     Args:
         filename: Path to the Word document
         title: Optional title for the table of contents
@@ -323,71 +434,13 @@ async def add_table_of_contents(filename: str, title: str = "Table of Contents",
     
     try:
         # Ensure max_level is within valid range
-        max_level = max(1, min(max_level, 9))
-        
-        doc = Document(filename)
+        max_level = max(1, min(int(max_level), 9))
         
-        # Collect headings and their positions
-        headings = []
-        for i, paragraph in enumerate(doc.paragraphs):
-            # Check if paragraph style is a heading
-            if paragraph.style and paragraph.style.name.startswith('Heading '):
-                try:
-                    # Extract heading level from style name
-                    level = int(paragraph.style.name.split(' ')[1])
-                    if level <= max_level:
-                        headings.append({
-                            'level': level,
-                            'text': paragraph.text,
-                            'position': i
-                        })
-                except (ValueError, IndexError):
-                    # Skip if heading level can't be determined
-                    pass
-        
-        if not headings:
+        entries = insert_table_of_contents(filename, title, max_level)
+        if not entries:
             return f"No headings found in document {filename}. Table of contents not created."
         
-        # Create a new document with the TOC
-        toc_doc = Document()
-        
-        # Add title
-        if title:
-            toc_doc.add_heading(title, level=1)
-        
-        # Add TOC entries
-        for heading in headings:
-            # Indent based on level (using tab characters)
-            indent = '    ' * (heading['level'] - 1)
-            toc_doc.add_paragraph(f"{indent}{heading['text']}")
-        
-        # Add page break
-        toc_doc.add_page_break()
-        
-        # Get content from original document
-        for paragraph in doc.paragraphs:
-            p = toc_doc.add_paragraph(paragraph.text)
-            # Copy style if possible
-            try:
-                if paragraph.style:
-                    p.style = paragraph.style.name
-            except:
-                pass
-        
-        # Copy tables
-        for table in doc.tables:
-            # Create a new table with the same dimensions
-            new_table = toc_doc.add_table(rows=len(table.rows), cols=len(table.columns))
-            # Copy cell contents
-            for i, row in enumerate(table.rows):
-                for j, cell in enumerate(row.cells):
-                    for paragraph in cell.paragraphs:
-                        new_table.cell(i, j).text = paragraph.text
-        
-        # Save the new document with TOC
-        toc_doc.save(filename)
-        
-        return f"Table of contents with {len(headings)} entries added to {filename}"
+        return f"Table of contents with {entries} entries added to {filename}. Word fills in page numbers when the document is opened."
     except Exception as e:
         return f"Failed to add table of contents: {str(e)}"
 
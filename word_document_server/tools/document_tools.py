@@ -3,12 +3,18 @@ Document creation and manipulation tools for Word Document Server.
 """
 import os
 import json
+import inspect
 from typing import Dict, List, Optional, Any
 from docx import Document
 
 from word_document_server.utils.file_utils import check_file_writeable, ensure_docx_extension, create_document_copy
 from word_document_server.utils.document_utils import get_document_properties, extract_document_text, get_document_structure, get_document_xml, insert_header_near_text, insert_line_or_paragraph_near_text
 from word_document_server.core.styles import ensure_heading_style, ensure_table_style
+from word_document_server.core.table_export import EXPORT_FORMATS, export_document_tables
+from word_document_server.core.catalog import DEFAULT_EXTENSIONS, get_document_catalog, list_documents
+from word_document_server.core.optimize import DEFAULT_COMPRESSION_LEVEL, optimize_document as optimize_package
+from word_document_server.core.mailmerge import load_records, render_documents
+from word_document_server.core.compare import compare_documents as compare_packages
 
 
 async def create_document(filename: str, title: Optional[str] = None, author: Optional[str] = None) -> str:
@@ -88,32 +94,127 @@ async def get_document_outline(filename: str) -> str:
     return json.dumps(structure, indent=2)
 
 
-async def list_available_documents(directory: str = ".") -> str:
-    """List all .docx files in the specified directory.
+async def export_tables(filename: str, format: str = "csv", table_indices: Optional[List[int]] = None,
+                        output_dir: Optional[str] = None, header: bool = True) -> str:
+    """Export table data from a Word document, one file per table.
+
+    Args:
+        filename: Path to the Word document
+        format: "csv", "jsonl", "npy" (NumPy structured array) or "arrow" (Arrow IPC file)
+        table_indices: Optional list of table indices to export (default: all tables)
+        output_dir: Directory for the exported files (default: the document's directory)
+        header: Treat the first row as column names (jsonl, npy and arrow)
+    """
+    filename = ensure_docx_extension(filename)
+
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+
+    fmt = (format or "csv").lower().lstrip(".")
+    if fmt not in EXPORT_FORMATS:
+        return f"Invalid format '{format}'. Supported formats: {', '.join(EXPORT_FORMATS)}"
+    if table_indices is not None:
+        try:
+            table_indices = [int(i) for i in table_indices]
+        except (ValueError, TypeError):
+            return "Invalid parameter: table_indices must be a list of integers"
+    if fmt == "npy":
+        try:
+            import numpy  # type: ignore  # noqa: F401
+        except ImportError:
+            return "Failed to export tables: numpy is not installed. Please install 'numpy'."
+    elif fmt == "arrow":
+        try:
+            import pyarrow  # type: ignore  # noqa: F401
+        except ImportError:
+            return "Failed to export tables: pyarrow is not installed. Please install 'pyarrow'."
+
+    output_dir = os.path.abspath(output_dir or os.path.dirname(os.path.abspath(filename)))
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        result = export_document_tables(filename, output_dir, fmt, table_indices, header)
+        if not result["tables"] and not result["missing_indices"]:
+            return f"No tables found in {filename}"
+        return json.dumps(result, indent=2, ensure_ascii=False)
+    except Exception as e:
+        return f"Failed to export tables: {str(e)}"
+
+
+async def list_available_documents(directory: str = ".", recursive: bool = False, pattern: Optional[str] = None,
+                                   extensions: Optional[List[str]] = None, sort_by: str = "name",
+                                   descending: bool = False, cursor: Optional[str] = None,
+                                   limit: int = 100, include_metadata: bool = False) -> str:
+    """List Word documents in a directory, one page at a time.
     
     Args:
         directory: Directory to search for Word documents
+        recursive: Whether to include subdirectories
+        pattern: Optional glob matched against file names (or relative paths if it contains '/')
+        extensions: File extensions to include (default: [".docx"], case-insensitive)
+        sort_by: "name", "path", "size" or "modified"
+        descending: Whether to reverse the sort order
+        cursor: "next_cursor" from the previous page
+        limit: Maximum number of documents per page (up to 1000)
+        include_metadata: Whether to add title, author and word count (cached between calls)
     """
     try:
-        if not os.path.exists(directory):
+        if not os.path.isdir(directory):
             return f"Directory {directory} does not exist"
         
-        docx_files = [f for f in os.listdir(directory) if f.endswith('.docx')]
-        
-        if not docx_files:
-            return f"No Word documents found in {directory}"
-        
-        result = f"Found {len(docx_files)} Word documents in {directory}:\n"
-        for file in docx_files:
-            file_path = os.path.join(directory, file)
-            size = os.path.getsize(file_path) / 1024  # KB
-            result += f"- {file} ({size:.2f} KB)\n"
-        
-        return result
+        catalog = get_document_catalog() if include_metadata else None
+        page = list_documents(directory, recursive=recursive, pattern=pattern,
+                              extensions=extensions or DEFAULT_EXTENSIONS, sort_by=sort_by,
+                              descending=descending, cursor=cursor, limit=limit, catalog=catalog)
+        page['directory'] = directory
+        return json.dumps(page, indent=2, ensure_ascii=False)
     except Exception as e:
         return f"Failed to list documents: {str(e)}"
 
 
+async def query_documents(root: str, refresh: bool = True, author: Optional[str] = None,
+                          title_contains: Optional[str] = None, keywords_contains: Optional[str] = None,
+                          modified_after: Optional[str] = None, modified_before: Optional[str] = None,
+                          min_words: Optional[int] = None, max_words: Optional[int] = None,
+                          min_pages: Optional[int] = None, max_pages: Optional[int] = None,
+                          sort_by: str = "path", descending: bool = False,
+                          limit: int = 100, offset: int = 0) -> str:
+    """Find Word documents under a directory by metadata using the document catalog.
+    
+    Args:
+        root: Directory whose documents (recursively) are searched
+        refresh: Whether to re-index new and changed files under root first
+        author: Exact author name (case-insensitive)
+        title_contains: Substring of the title (case-insensitive)
+        keywords_contains: Substring of the keywords (case-insensitive)
+        modified_after: File modified at or after this ISO 8601 date/time
+        modified_before: File modified before this ISO 8601 date/time
+        min_words: Minimum word count
+        max_words: Maximum word count
+        min_pages: Minimum page count
+        max_pages: Maximum page count
+        sort_by: "path", "title", "author", "modified", "created", "size", "word_count" or "page_count"
+        descending: Whether to reverse the sort order
+        limit: Maximum number of documents to return (up to 1000)
+        offset: Number of matching documents to skip
+    """
+    try:
+        if not os.path.isdir(root):
+            return f"Directory {root} does not exist"
+        
+        catalog = get_document_catalog()
+        crawl = catalog.crawl(root) if refresh else None
+        result = catalog.query(root=root, author=author, title_contains=title_contains,
+                               keywords_contains=keywords_contains, modified_after=modified_after,
+                               modified_before=modified_before, min_words=min_words, max_words=max_words,
+                               min_pages=min_pages, max_pages=max_pages, sort_by=sort_by,
+                               descending=descending, limit=limit, offset=offset)
+        if crawl is not None:
+            result['crawl'] = crawl
+        return json.dumps(result, indent=2, ensure_ascii=False)
+    except Exception as e:
+        return f"Failed to query documents: {str(e)}"
+
+
 async def copy_document(source_filename: str, destination_filename: Optional[str] = None) -> str:
     """Create a copy of a Word document.
     
@@ -212,3 +313,141 @@ async def merge_documents(target_filename: str, source_filenames: List[str], add
 async def get_document_xml_tool(filename: str) -> str:
     """Get the raw XML structure of a Word document."""
     return get_document_xml(filename)
+
+
+async def optimize_document(filename: str, output_filename: Optional[str] = None,
+                            image_quality: Optional[int] = None,
+                            compression_level: int = DEFAULT_COMPRESSION_LEVEL) -> str:
+    """Shrink a Word document by removing editing overhead and recompressing it.
+    
+    Merges adjacent runs with identical formatting, removes duplicate and empty
+    property elements, revision ids (rsids) and proofing marks, and stores
+    identical images once.
+    
+    Args:
+        filename: Path to the Word document
+        output_filename: Optional path for the optimized copy (default: optimize in place)
+        image_quality: Optional JPEG quality (1-95) to recompress images with; PNGs are optimized losslessly
+        compression_level: Deflate level 0-9 for the package (default 9)
+    """
+    filename = ensure_docx_extension(filename)
+    if output_filename:
+        output_filename = ensure_docx_extension(output_filename)
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    is_writeable, error_message = check_file_writeable(output_filename or filename)
+    if not is_writeable:
+        return f"Cannot optimize document: {error_message}"
+    
+    try:
+        report = optimize_package(filename, output_filename, image_quality, int(compression_level))
+        report['output'] = output_filename or filename
+        return json.dumps(report, indent=2)
+    except Exception as e:
+        return f"Failed to optimize document: {str(e)}"
+
+
+async def compare_documents(original_filename: str, revised_filename: str,
+                            redline_filename: Optional[str] = None, author: str = "Compare",
+                            limit: int = 500) -> str:
+    """Compare two versions of a Word document.
+    
+    Paragraphs, tables and content controls are matched between the two
+    versions; changed paragraphs are diffed word by word and changed tables
+    row by row and cell by cell.
+    
+    Args:
+        original_filename: Path to the original (older) document
+        revised_filename: Path to the revised (newer) document
+        redline_filename: Optional path for a copy of the revised document with the changes as tracked changes
+        author: Author recorded on the tracked changes of the redline
+        limit: Maximum number of changes listed (the summary counts all of them)
+    """
+    original_filename = ensure_docx_extension(original_filename)
+    revised_filename = ensure_docx_extension(revised_filename)
+    if redline_filename:
+        redline_filename = ensure_docx_extension(redline_filename)
+    
+    for filename in (original_filename, revised_filename):
+        if not os.path.exists(filename):
+            return f"Document {filename} does not exist"
+    
+    if redline_filename:
+        is_writeable, error_message = check_file_writeable(redline_filename)
+        if not is_writeable:
+            return f"Cannot write redline document: {error_message}"
+    
+    try:
+        limit = max(0, int(limit))
+    except (ValueError, TypeError):
+        return "Invalid parameter: limit must be an integer"
+    
+    try:
+        result = compare_packages(original_filename, revised_filename, redline_filename, author, limit)
+        result = {'original': original_filename, 'revised': revised_filename, **result}
+        if redline_filename:
+            result['redline'] = redline_filename
+        return json.dumps(result, indent=2, ensure_ascii=False)
+    except Exception as e:
+        return f"Failed to compare documents: {str(e)}"
+
+
+async def render_template_batch(template: str, records: Any, output_pattern: str,
+                                max_workers: Optional[int] = None, progress_callback=None) -> str:
+    """Render one document per record from a template with {{placeholders}}.
+    
+    The template is compiled once; {{name}} is replaced by the record's value,
+    {{#name}} ... {{/name}} repeats or hides paragraphs, table rows or text
+    for list or conditional values, and {{^name}} ... {{/name}} renders only
+    when the value is empty.
+    
+    Args:
+        template: Path to the template document
+        records: List of objects, or path to a .csv, .jsonl or .json file of records
+        output_pattern: Output path with record fields, e.g. "out/{customer_id}.docx"; {index} is the record number
+        max_workers: Number of worker processes (default: CPU count)
+        progress_callback: Optional callable (or coroutine function) taking
+                           (progress, total, message), e.g. Context.report_progress
+    """
+    template = ensure_docx_extension(template)
+    if not os.path.exists(template):
+        return json.dumps({'success': False, 'error': f'Template {template} does not exist'}, indent=2)
+    if not output_pattern:
+        return json.dumps({'success': False, 'error': 'output_pattern cannot be empty'}, indent=2)
+    if max_workers is not None:
+        try:
+            max_workers = int(max_workers)
+        except (ValueError, TypeError):
+            return json.dumps({'success': False, 'error': 'max_workers must be an integer'}, indent=2)
+        if max_workers < 1:
+            return json.dumps({'success': False, 'error': 'max_workers must be at least 1'}, indent=2)
+    try:
+        records = load_records(records)
+    except Exception as e:
+        return json.dumps({'success': False, 'error': f'Failed to load records: {str(e)}'}, indent=2)
+    
+    results = {}
+    try:
+        for result in render_documents(template, records, output_pattern, max_workers):
+            results[result['index']] = result
+            if progress_callback is not None:
+                status = 'done' if result['success'] else f"failed: {result['error']}"
+                reported = progress_callback(len(results), len(records), f"{result['path'] or result['index']} {status}")
+                if inspect.isawaitable(reported):
+                    await reported
+    except Exception as e:
+        # A template that cannot be compiled fails every record; documents written before an error are kept
+        for index in range(1, len(records) + 1):
+            results.setdefault(index, {'index': index, 'path': None, 'success': False, 'error': str(e)})
+    
+    ordered = [results[index] for index in sorted(results)]
+    succeeded = sum(1 for result in ordered if result['success'])
+    return json.dumps({
+        'success': succeeded == len(ordered) and bool(ordered),
+        'total': len(ordered),
+        'succeeded': succeeded,
+        'failed': len(ordered) - succeeded,
+        'results': ordered
+    }, indent=2)
@@ -5,6 +5,7 @@ These tools provide enhanced document content extraction and search capabilities
 """
 import os
 import json
+import inspect
 import subprocess
 import platform
 import shutil
@@ -63,6 +64,31 @@ async def find_text_in_document(filename: str, text_to_find: str, match_case: bo
         return f"Failed to search for text: {str(e)}"
 
 
+class ConversionResult(str):
+    """
+    Message of a conversion tool that wrote its output file.
+
+    Failures are returned as plain strings, so callers such as the job queue
+    tell the two apart by type instead of by wording.
+    """
+
+
+def _render_pdf_natively(filename: str, output_filename: str, errors: List[str]) -> Optional[str]:
+    """Render with the built-in reportlab engine; record failures in errors and return None."""
+    try:
+        from word_document_server.core.pdf import render_docx_to_pdf
+        stats = render_docx_to_pdf(filename, output_filename)
+        if os.path.exists(output_filename) and os.path.getsize(output_filename) > 0:
+            return ConversionResult(f"Document successfully converted to PDF via built-in reportlab renderer: "
+                    f"{output_filename} ({stats['pages']} pages)")
+        errors.append("reportlab renderer failed to create a valid output file.")
+    except ImportError as e:
+        errors.append(f"reportlab is not installed: {str(e)}")
+    except Exception as e:
+        errors.append(f"reportlab renderer failed: {str(e)}")
+    return None
+
+
 async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -> str:
     """Convert a Word document to PDF format.
     
@@ -112,7 +138,7 @@ async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -
                 from docx2pdf import convert
                 convert(filename, output_filename)
                 if os.path.exists(output_filename) and os.path.getsize(output_filename) > 0:
-                    return f"Document successfully converted to PDF via docx2pdf: {output_filename}"
+                    return ConversionResult(f"Document successfully converted to PDF via docx2pdf: {output_filename}")
                 else:
                     errors.append("docx2pdf was executed but failed to create a valid output file.")
             except ImportError:
@@ -120,42 +146,10 @@ async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -
             except Exception as e:
                 errors.append(f"docx2pdf failed: {str(e)}")
             
-            # --- Attempt 2: python-docx + reportlab (fallback) ---
-            try:
-                from reportlab.lib.pagesizes import A4
-                from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-                from reportlab.lib.styles import getSampleStyleSheet
-                from reportlab.lib.units import inch
-                
-                # Read DOCX content
-                doc = Document(filename)
-                
-                # Create PDF
-                pdf_doc = SimpleDocTemplate(output_filename, pagesize=A4)
-                styles = getSampleStyleSheet()
-                story = []
-                
-                # Add content from DOCX
-                for paragraph in doc.paragraphs:
-                    if paragraph.text.strip():
-                        # Clean text for reportlab
-                        clean_text = paragraph.text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                        p = Paragraph(clean_text, styles['Normal'])
-                        story.append(p)
-                        story.append(Spacer(1, 12))
-                
-                # Build PDF
-                pdf_doc.build(story)
-                
-                if os.path.exists(output_filename) and os.path.getsize(output_filename) > 0:
-                    return f"Document successfully converted to PDF via python-docx + reportlab: {output_filename}"
-                else:
-                    errors.append("python-docx + reportlab conversion failed to create a valid output file.")
-                    
-            except ImportError as e:
-                errors.append(f"Required libraries not installed for reportlab conversion: {str(e)}")
-            except Exception as e:
-                errors.append(f"python-docx + reportlab conversion failed: {str(e)}")
+            # --- Attempt 2: native reportlab renderer (fallback) ---
+            native_result = _render_pdf_natively(filename, output_filename, errors)
+            if native_result:
+                return native_result
             
             # --- If all attempts failed ---
             error_summary = "Failed to convert document to PDF using all available methods.\n"
@@ -197,7 +191,7 @@ async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -
                             
                             # Final check: does the target file now exist?
                             if os.path.exists(output_filename):
-                                return f"Document successfully converted to PDF via {cmd_name}: {output_filename}"
+                                return ConversionResult(f"Document successfully converted to PDF via {cmd_name}: {output_filename}")
                         
                         # If we get here, soffice returned 0 but the expected file wasn't created.
                         errors.append(f"{cmd_name} returned success code, but output file '{created_pdf_path}' was not found.")
@@ -214,7 +208,7 @@ async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -
                 from docx2pdf import convert
                 convert(filename, output_filename)
                 if os.path.exists(output_filename) and os.path.getsize(output_filename) > 0:
-                    return f"Document successfully converted to PDF via docx2pdf: {output_filename}"
+                    return ConversionResult(f"Document successfully converted to PDF via docx2pdf: {output_filename}")
                 else:
                     errors.append("docx2pdf fallback was executed but failed to create a valid output file.")
             except ImportError:
@@ -222,6 +216,11 @@ async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -
             except Exception as e:
                 errors.append(f"docx2pdf fallback failed with an exception: {str(e)}")
 
+            # --- Attempt 3: native reportlab renderer ---
+            native_result = _render_pdf_natively(filename, output_filename, errors)
+            if native_result:
+                return native_result
+
             # --- If all attempts failed ---
             error_summary = "Failed to convert document to PDF using all available methods.\n"
             error_summary += "Recorded errors: " + "; ".join(errors) + "\n"
@@ -230,7 +229,11 @@ async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -
             error_summary += "2. Microsoft Word (required for docx2pdf on Windows/macOS)"
             return error_summary
         else:
-            return f"PDF conversion not supported on {system} platform"
+            errors = []
+            native_result = _render_pdf_natively(filename, output_filename, errors)
+            if native_result:
+                return native_result
+            return f"PDF conversion failed on {system} platform: " + "; ".join(errors)
             
     except Exception as e:
         return f"Failed to convert document to PDF: {str(e)}"
@@ -263,7 +266,7 @@ async def convert_to_txt(filename: str, output_filename: Optional[str] = None) -
             return text
         with open(output_filename, 'w', encoding='utf-8') as f:
             f.write(text)
-        return f"Document successfully converted to TXT: {output_filename}"
+        return ConversionResult(f"Document successfully converted to TXT: {output_filename}")
     except Exception as e:
         return f"Failed to convert document to TXT: {str(e)}"
 
@@ -298,7 +301,7 @@ async def convert_to_html(filename: str, output_filename: Optional[str] = None)
             html = result.value
         with open(output_filename, 'w', encoding='utf-8') as f:
             f.write(html)
-        return f"Document successfully converted to HTML: {output_filename}"
+        return ConversionResult(f"Document successfully converted to HTML: {output_filename}")
     except Exception as e:
         return f"Failed to convert document to HTML: {str(e)}"
 
@@ -323,22 +326,10 @@ async def convert_to_markdown(filename: str, output_filename: Optional[str] = No
         return f"Cannot create Markdown: {error_message} (Path: {output_filename})"
 
     try:
-        try:
-            import mammoth  # type: ignore
-        except ImportError:
-            return "Failed to convert document to Markdown: mammoth is not installed. Please install 'mammoth'."
-        try:
-            from markdownify import markdownify as md  # type: ignore
-        except ImportError:
-            return "Failed to convert document to Markdown: markdownify is not installed. Please install 'markdownify'."
-
-        with open(filename, 'rb') as docx_file:
-            result = mammoth.convert_to_html(docx_file)
-            html = result.value
-        markdown = md(html)
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            f.write(markdown)
-        return f"Document successfully converted to Markdown: {output_filename}"
+        # Single pass over the DOCX XML; no HTML round-trip
+        from word_document_server.core.markdown import convert_docx_to_markdown
+        convert_docx_to_markdown(filename, output_filename)
+        return ConversionResult(f"Document successfully converted to Markdown: {output_filename}")
     except Exception as e:
         return f"Failed to convert document to Markdown: {str(e)}"
 
@@ -366,7 +357,7 @@ async def convert_html_to_markdown(input_path: str, output_path: Optional[str] =
         markdown = md(html)
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(markdown)
-        return f"Document successfully converted to Markdown: {output_path}"
+        return ConversionResult(f"Document successfully converted to Markdown: {output_path}")
     except Exception as e:
         return f"Failed to convert HTML to Markdown: {str(e)}"
 
@@ -394,7 +385,7 @@ async def convert_markdown_to_html(input_path: str, output_path: Optional[str] =
         html = markdown.markdown(md_text, output_format='html5')
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(html)
-        return f"Document successfully converted to HTML: {output_path}"
+        return ConversionResult(f"Document successfully converted to HTML: {output_path}")
     except Exception as e:
         return f"Failed to convert Markdown to HTML: {str(e)}"
 
@@ -438,7 +429,7 @@ async def convert_html_to_pdf(input_path: str, output_path: Optional[str] = None
                         if created_pdf_path != output_path:
                             shutil.move(created_pdf_path, output_path)
                         if os.path.exists(output_path):
-                            return f"Document successfully converted to PDF via {cmd_name}: {output_path}"
+                            return ConversionResult(f"Document successfully converted to PDF via {cmd_name}: {output_path}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_pdf_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -517,7 +508,7 @@ async def convert_to_rtf(filename: str, output_filename: Optional[str] = None) -
                         if created_path != output_filename:
                             shutil.move(created_path, output_filename)
                         if os.path.exists(output_filename):
-                            return f"Document successfully converted to RTF via {cmd_name}: {output_filename}"
+                            return ConversionResult(f"Document successfully converted to RTF via {cmd_name}: {output_filename}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -570,7 +561,7 @@ async def convert_to_odt(filename: str, output_filename: Optional[str] = None) -
                         if created_path != output_filename:
                             shutil.move(created_path, output_filename)
                         if os.path.exists(output_filename):
-                            return f"Document successfully converted to ODT via {cmd_name}: {output_filename}"
+                            return ConversionResult(f"Document successfully converted to ODT via {cmd_name}: {output_filename}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -623,7 +614,7 @@ async def convert_html_to_docx(input_path: str, output_path: Optional[str] = Non
                         if created_path != output_path:
                             shutil.move(created_path, output_path)
                         if os.path.exists(output_path):
-                            return f"Document successfully converted to DOCX via {cmd_name}: {output_path}"
+                            return ConversionResult(f"Document successfully converted to DOCX via {cmd_name}: {output_path}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -650,49 +641,28 @@ async def convert_markdown_to_docx(input_path: str, output_path: Optional[str] =
     is_writeable, error_message = check_file_writeable(output_path)
     if not is_writeable:
         return f"Cannot create DOCX: {error_message} (Path: {output_path}, Dir: {output_dir})"
-    # Strategy: convert MD -> HTML, then HTML -> DOCX via LibreOffice; fallback to naive python-docx.
+    # Build the DOCX directly from the Markdown source; no HTML or LibreOffice round trip
     try:
-        # Convert Markdown to HTML first
-        try:
-            import markdown  # type: ignore
-        except ImportError:
-            return "Failed to convert Markdown to DOCX: markdown is not installed. Please install 'markdown'."
-        with open(input_path, 'r', encoding='utf-8') as f:
-            md_text = f.read()
-        html = markdown.markdown(md_text, output_format='html5')
-        tmp_html = os.path.join(output_dir, '__tmp_md_to_html__.html')
-        with open(tmp_html, 'w', encoding='utf-8') as f:
-            f.write(html)
-        # Use LibreOffice to convert HTML -> DOCX
-        html_to_docx_result = await convert_html_to_docx(tmp_html, output_path)
-        try:
-            if os.path.exists(tmp_html):
-                os.remove(tmp_html)
-        except Exception:
-            pass
-        if os.path.exists(output_path):
-            return html_to_docx_result
-        # Fallback: naive python-docx rendering
-        try:
-            from docx import Document
-        except Exception:
-            return "Failed to convert Markdown to DOCX and no fallback available."
-        doc = Document()
-        for line in md_text.splitlines():
-            if line.startswith('#'):
-                level = len(line) - len(line.lstrip('#'))
-                text = line.lstrip('#').strip()
-                doc.add_heading(text, level=min(level, 4))
-            elif line.startswith(('- ', '* ')):
-                doc.add_paragraph(line[2:].strip())
-            else:
-                doc.add_paragraph(line)
-        doc.save(output_path)
-        return f"Document successfully converted to DOCX (fallback naive): {output_path}"
+        from word_document_server.core.markdown import convert_markdown_to_docx_file
+        stats = convert_markdown_to_docx_file(input_path, output_path)
+        return ConversionResult(f"Document successfully converted to DOCX: {output_path} "
+                f"({stats['blocks']} blocks, {stats['images']} images)")
     except Exception as e:
         return f"Failed to convert Markdown to DOCX: {str(e)}"
 
-async def convert_txt_to_docx(input_path: str, output_path: Optional[str] = None) -> str:
+async def convert_txt_to_docx(input_path: str, output_path: Optional[str] = None,
+                              max_paragraphs_per_part: Optional[int] = None,
+                              progress_callback=None) -> str:
+    """Convert a text file to DOCX, streaming paragraphs straight into the package.
+
+    Args:
+        input_path: Path to the source text file
+        output_path: Path of the DOCX file to write (defaults to the input name)
+        max_paragraphs_per_part: Optional cap on paragraphs per output file; larger
+                                 inputs are split into name_part2.docx, name_part3.docx, ...
+        progress_callback: Optional callable (or coroutine function) taking
+                           (progress, total, message), e.g. Context.report_progress
+    """
     if not os.path.exists(input_path):
         return f"Document {input_path} does not exist"
     if not output_path:
@@ -707,13 +677,27 @@ async def convert_txt_to_docx(input_path: str, output_path: Optional[str] = None
     is_writeable, error_message = check_file_writeable(output_path)
     if not is_writeable:
         return f"Cannot create DOCX: {error_message} (Path: {output_path}, Dir: {output_dir})"
+    if max_paragraphs_per_part is not None:
+        try:
+            max_paragraphs_per_part = int(max_paragraphs_per_part)
+        except (ValueError, TypeError):
+            return "Invalid parameter: max_paragraphs_per_part must be an integer"
+        if max_paragraphs_per_part < 1:
+            return "Invalid parameter: max_paragraphs_per_part must be a positive integer"
     try:
-        doc = Document()
-        with open(input_path, 'r', encoding='utf-8') as f:
-            for line in f.readlines():
-                doc.add_paragraph(line.rstrip('\n'))
-        doc.save(output_path)
-        return f"Document successfully converted to DOCX: {output_path}"
+        from word_document_server.core.plaintext import stream_text_to_docx
+        progress = None
+        for progress in stream_text_to_docx(input_path, output_path, max_paragraphs_per_part):
+            if progress_callback is not None:
+                result = progress_callback(progress['bytes_read'], progress['total_bytes'],
+                                           f"{progress['paragraphs']} paragraphs written")
+                if inspect.isawaitable(result):
+                    await result
+        parts = progress['parts']
+        if len(parts) > 1:
+            return ConversionResult(f"Document successfully converted to DOCX: {len(parts)} parts, "
+                    f"{progress['paragraphs']} paragraphs: " + ", ".join(parts))
+        return ConversionResult(f"Document successfully converted to DOCX: {output_path}")
     except Exception as e:
         return f"Failed to convert TXT to DOCX: {str(e)}"
 
@@ -757,7 +741,7 @@ async def convert_odt_to_docx(input_path: str, output_path: Optional[str] = None
                         if created_path != output_path:
                             shutil.move(created_path, output_path)
                         if os.path.exists(output_path):
-                            return f"Document successfully converted to DOCX via {cmd_name}: {output_path}"
+                            return ConversionResult(f"Document successfully converted to DOCX via {cmd_name}: {output_path}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -809,7 +793,7 @@ async def convert_rtf_to_docx(input_path: str, output_path: Optional[str] = None
                         if created_path != output_path:
                             shutil.move(created_path, output_path)
                         if os.path.exists(output_path):
-                            return f"Document successfully converted to DOCX via {cmd_name}: {output_path}"
+                            return ConversionResult(f"Document successfully converted to DOCX via {cmd_name}: {output_path}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -862,7 +846,7 @@ async def convert_to_doc(filename: str, output_filename: Optional[str] = None) -
                         if created_path != output_filename:
                             shutil.move(created_path, output_filename)
                         if os.path.exists(output_filename):
-                            return f"Document successfully converted to DOC via {cmd_name}: {output_filename}"
+                            return ConversionResult(f"Document successfully converted to DOC via {cmd_name}: {output_filename}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -914,7 +898,7 @@ async def convert_doc_to_docx(input_path: str, output_path: Optional[str] = None
                         if created_path != output_path:
                             shutil.move(created_path, output_path)
                         if os.path.exists(output_path):
-                            return f"Document successfully converted to DOCX via {cmd_name}: {output_path}"
+                            return ConversionResult(f"Document successfully converted to DOCX via {cmd_name}: {output_path}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -966,7 +950,7 @@ async def convert_txt_to_pdf(input_path: str, output_path: Optional[str] = None)
                         if created_pdf_path != output_path:
                             shutil.move(created_pdf_path, output_path)
                         if os.path.exists(output_path):
-                            return f"Document successfully converted to PDF via {cmd_name}: {output_path}"
+                            return ConversionResult(f"Document successfully converted to PDF via {cmd_name}: {output_path}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_pdf_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -1018,7 +1002,7 @@ async def convert_odt_to_pdf(input_path: str, output_path: Optional[str] = None)
                         if created_pdf_path != output_path:
                             shutil.move(created_pdf_path, output_path)
                         if os.path.exists(output_path):
-                            return f"Document successfully converted to PDF via {cmd_name}: {output_path}"
+                            return ConversionResult(f"Document successfully converted to PDF via {cmd_name}: {output_path}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_pdf_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -1070,7 +1054,7 @@ async def convert_rtf_to_pdf(input_path: str, output_path: Optional[str] = None)
                         if created_pdf_path != output_path:
                             shutil.move(created_pdf_path, output_path)
                         if os.path.exists(output_path):
-                            return f"Document successfully converted to PDF via {cmd_name}: {output_path}"
+                            return ConversionResult(f"Document successfully converted to PDF via {cmd_name}: {output_path}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_pdf_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -1122,7 +1106,7 @@ async def convert_doc_to_pdf(input_path: str, output_path: Optional[str] = None)
                         if created_pdf_path != output_path:
                             shutil.move(created_pdf_path, output_path)
                         if os.path.exists(output_path):
-                            return f"Document successfully converted to PDF via {cmd_name}: {output_path}"
+                            return ConversionResult(f"Document successfully converted to PDF via {cmd_name}: {output_path}")
                     errors.append(f"{cmd_name} returned success code, but output file '{created_pdf_path}' was not found.")
                 else:
                     errors.append(f"{cmd_name} failed. Stderr: {result.stderr.strip()}")
@@ -4,9 +4,12 @@ Formatting tools for Word Document Server.
 These tools handle formatting operations for Word documents,
 including text formatting, table formatting, and custom styles.
 """
+import copy
 import os
+import re
 from typing import List, Optional, Dict, Any
 from docx import Document
+from docx.table import Table
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_COLOR_INDEX
 from docx.enum.style import WD_STYLE_TYPE
@@ -18,7 +21,8 @@ from word_document_server.core.tables import (
     highlight_header_row, merge_cells, merge_cells_horizontal, merge_cells_vertical,
     set_cell_alignment_by_position, set_table_alignment, set_column_width_by_position,
     set_column_widths, set_table_width as set_table_width_func, auto_fit_table,
-    format_cell_text_by_position, set_cell_padding_by_position
+    format_cell_text_by_position, set_cell_padding_by_position, get_table_grid,
+    format_cell_text, set_cell_shading, set_cell_alignment, set_cell_padding
 )
 
 
@@ -893,20 +897,26 @@ async def set_table_width(filename: str, table_index: int, width: float,
         return f"Failed to set table width: {str(e)}"
 
 
-async def auto_fit_table_columns(filename: str, table_index: int) -> str:
-    """Set table columns to auto-fit based on content.
+async def auto_fit_table_columns(filename: str, table_index: int, max_width: Optional[float] = None) -> str:
+    """Size table columns to their content, fitting the page margins.
     
     Args:
         filename: Path to the Word document
         table_index: Index of the table (0-based)
+        max_width: Optional maximum table width in points (default: page width minus margins)
     """
     filename = ensure_docx_extension(filename)
     
     # Ensure numeric parameters are the correct type
     try:
         table_index = int(table_index)
+        if max_width is not None:
+            max_width = float(max_width)
     except (ValueError, TypeError):
-        return "Invalid parameter: table_index must be an integer"
+        return "Invalid parameter: table_index must be an integer and max_width a number"
+    
+    if max_width is not None and max_width <= 0:
+        return "Invalid parameter: max_width must be positive"
     
     if not os.path.exists(filename):
         return f"Document {filename} does not exist"
@@ -926,7 +936,7 @@ async def auto_fit_table_columns(filename: str, table_index: int) -> str:
         table = doc.tables[table_index]
         
         # Apply auto-fit
-        success = auto_fit_table(table)
+        success = auto_fit_table(table, max_width)
         
         if success:
             doc.save(filename)
@@ -1110,3 +1120,186 @@ async def set_table_cell_padding(filename: str, table_index: int, row_index: int
             return f"Failed to set cell padding. Check that indices are valid."
     except Exception as e:
         return f"Failed to set cell padding: {str(e)}"
+
+
+_TABLE_OPERATIONS = {
+    "format_text": ("text_content", "bold", "italic", "underline", "color", "font_size", "font_name"),
+    "shading": ("fill_color", "pattern"),
+    "alignment": ("horizontal", "vertical"),
+    "padding": ("top", "bottom", "left", "right", "unit"),
+    "merge": (),
+}
+
+
+def _validate_table_operation(op: Any, row_count: int, col_count: int) -> Dict[str, Any]:
+    """Normalize one operation for apply_table_operations; raises ValueError if it is invalid."""
+    if not isinstance(op, dict):
+        raise ValueError("operation must be an object")
+    kind = op.get("op")
+    if kind not in _TABLE_OPERATIONS:
+        raise ValueError(f"unknown op '{kind}'. Valid ops: {', '.join(_TABLE_OPERATIONS)}")
+    unknown = set(op) - {"op", "row", "col", "start_row", "start_col", "end_row", "end_col"} - set(_TABLE_OPERATIONS[kind])
+    if unknown:
+        raise ValueError(f"unexpected field(s) for '{kind}': {', '.join(sorted(unknown))}")
+
+    try:
+        start_row = int(op["start_row"] if "start_row" in op else op["row"])
+        start_col = int(op["start_col"] if "start_col" in op else op["col"])
+        end_row = int(op.get("end_row", start_row))
+        end_col = int(op.get("end_col", start_col))
+    except KeyError:
+        raise ValueError("row and col (or start_row and start_col) are required")
+    except (ValueError, TypeError):
+        raise ValueError("row and column indices must be integers")
+    if not (0 <= start_row <= end_row < row_count):
+        raise ValueError(f"row range {start_row}-{end_row} is outside the table (0-{row_count - 1})")
+    if not (0 <= start_col <= end_col < col_count):
+        raise ValueError(f"column range {start_col}-{end_col} is outside the table (0-{col_count - 1})")
+    if kind == "merge" and start_row == end_row and start_col == end_col:
+        raise ValueError("cannot merge a single cell with itself")
+
+    normalized = {"op": kind, "start_row": start_row, "start_col": start_col,
+                  "end_row": end_row, "end_col": end_col}
+    for key in _TABLE_OPERATIONS[kind]:
+        if key in op and op[key] is not None:
+            normalized[key] = op[key]
+    if kind == "format_text" and "font_size" in normalized:
+        try:
+            normalized["font_size"] = int(normalized["font_size"])
+        except (ValueError, TypeError):
+            raise ValueError("font_size must be an integer")
+    elif kind == "shading":
+        if not re.fullmatch(r"#?[0-9A-Fa-f]{6}", str(normalized.get("fill_color", ""))):
+            raise ValueError("fill_color must be a hex color such as 'F2F2F2'")
+    elif kind == "alignment":
+        if normalized.get("horizontal", "left").lower() not in ("left", "center", "right", "justify"):
+            raise ValueError("horizontal must be left, center, right or justify")
+        if normalized.get("vertical", "top").lower() not in ("top", "center", "bottom"):
+            raise ValueError("vertical must be top, center or bottom")
+    elif kind == "padding":
+        if normalized.get("unit", "points").lower() not in ("points", "percent"):
+            raise ValueError("unit must be points or percent")
+        try:
+            for side in ("top", "bottom", "left", "right"):
+                if side in normalized:
+                    normalized[side] = float(normalized[side])
+        except (ValueError, TypeError):
+            raise ValueError("padding values must be numbers")
+    return normalized
+
+
+def _check_merges(table, ops: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Dry-run the merges of a batch on a copy of the table.
+
+    Returns the error of the first merge that would fail (with its position), or None.
+    """
+    if not any(op["op"] == "merge" for op in ops):
+        return None
+    trial = Table(copy.deepcopy(table._tbl), table._parent)
+    for position, op in enumerate(ops):
+        if op["op"] != "merge":
+            continue
+        # Earlier merges change the layout, so each range is checked against the grid they leave
+        grid = get_table_grid(trial)
+        start = grid.cell(op["start_row"], op["start_col"])
+        end = grid.cell(op["end_row"], op["end_col"])
+        try:
+            if start is None or end is None:
+                raise ValueError("the range starts or ends at an empty grid position")
+            start.merge(end)
+        except Exception as e:
+            return (f"Invalid operation {position}: cannot merge ({op['start_row']},{op['start_col']}) to "
+                    f"({op['end_row']},{op['end_col']}): {str(e)}")
+    return None
+
+
+async def apply_table_operations(filename: str, table_index: int, ops: List[Dict[str, Any]]) -> str:
+    """Apply many table cell edits with a single load and save.
+
+    Every operation is validated before anything is changed; if any is invalid
+    the document is left untouched.
+
+    Args:
+        filename: Path to the Word document
+        table_index: Index of the table (0-based)
+        ops: List of operations. Each has an "op" and a target cell ("row", "col"),
+             or a rectangular range ("start_row", "start_col", "end_row", "end_col"):
+             - {"op": "format_text", text_content, bold, italic, underline, color, font_size, font_name}
+             - {"op": "shading", fill_color, pattern}
+             - {"op": "alignment", horizontal, vertical}
+             - {"op": "padding", top, bottom, left, right, unit ("points" or "percent")}
+             - {"op": "merge"} merges the whole range into one cell
+    """
+    filename = ensure_docx_extension(filename)
+
+    try:
+        table_index = int(table_index)
+    except (ValueError, TypeError):
+        return "Invalid parameter: table_index must be an integer"
+    if not isinstance(ops, list) or not ops:
+        return "Invalid parameter: ops must be a non-empty list of operations"
+
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}. Consider creating a copy first."
+
+    try:
+        doc = Document(filename)
+
+        # Validate table index
+        if table_index < 0 or table_index >= len(doc.tables):
+            return f"Invalid table index. Document has {len(doc.tables)} tables (0-{len(doc.tables)-1})."
+
+        table = doc.tables[table_index]
+        grid = get_table_grid(table)
+        row_count = grid.row_count
+        col_count = grid.col_count
+
+        # Validate everything before touching the document
+        normalized = []
+        for position, op in enumerate(ops):
+            try:
+                normalized.append(_validate_table_operation(op, row_count, col_count))
+            except ValueError as e:
+                return f"Invalid operation {position}: {str(e)}. No changes were made."
+        merge_error = _check_merges(table, normalized)
+        if merge_error:
+            return f"{merge_error}. No changes were made."
+
+        for position, op in enumerate(normalized):
+            kind = op["op"]
+            if kind == "merge":
+                if not merge_cells(table, op["start_row"], op["start_col"], op["end_row"], op["end_col"]):
+                    return f"Failed to apply operation {position}: cells could not be merged. No changes were saved."
+                # Merging changes the cell layout; build a new grid before the next operation
+                grid = get_table_grid(table)
+                continue
+            seen = set()
+            for row in grid.rows[op["start_row"]:op["end_row"] + 1]:
+                for cell in row[op["start_col"]:op["end_col"] + 1]:
+                    # A merged cell spans several grid positions; edit it once
+                    if cell is None or id(cell._tc) in seen:
+                        continue
+                    seen.add(id(cell._tc))
+                    if kind == "format_text":
+                        format_cell_text(cell, op.get("text_content"), op.get("bold"), op.get("italic"),
+                                         op.get("underline"), op.get("color"), op.get("font_size"),
+                                         op.get("font_name"))
+                    elif kind == "shading":
+                        set_cell_shading(cell, op["fill_color"], op.get("pattern", "clear"))
+                    elif kind == "alignment":
+                        set_cell_alignment(cell, op.get("horizontal", "left"), op.get("vertical", "top"))
+                    elif kind == "padding":
+                        word_unit = "dxa" if op.get("unit", "points").lower() == "points" else "pct"
+                        set_cell_padding(cell, op.get("top"), op.get("bottom"), op.get("left"),
+                                         op.get("right"), word_unit)
+
+        doc.save(filename)
+        return f"Applied {len(normalized)} table operations successfully to table {table_index}."
+    except Exception as e:
+        return f"Failed to apply table operations: {str(e)}"
@@ -0,0 +1,86 @@
+"""
+Asynchronous conversion job tools for Word Document Server.
+
+These tools queue long-running conversions instead of holding the request
+open: submit_conversion returns a job id that clients poll with
+get_job_status and get_job_result.
+"""
+import os
+import json
+from typing import Optional
+
+from word_document_server.core.jobs import (
+    SUCCEEDED, FAILED, available_conversions, get_job_queue, job_to_dict
+)
+
+
+async def submit_conversion(conversion: str, input_path: str, output_path: Optional[str] = None,
+                            priority: int = 5, client_id: str = "default", max_attempts: int = 3) -> str:
+    """Queue a conversion and return its job id.
+
+    Args:
+        conversion: Name of a conversion tool, e.g. "convert_to_pdf" or "convert_markdown_to_docx"
+        input_path: Path to the source document
+        output_path: Optional output path, as accepted by the conversion tool
+        priority: Higher numbers run first (default 5); use a low priority for large batches
+        client_id: Identifier used to share workers fairly between clients
+        max_attempts: How many times a failing conversion is tried, with exponential backoff
+    """
+    conversions = available_conversions()
+    if conversion not in conversions:
+        return f"Unknown conversion '{conversion}'. Available conversions: {', '.join(conversions)}"
+    if not os.path.exists(input_path):
+        return f"Document {input_path} does not exist"
+    try:
+        priority = int(priority)
+        max_attempts = int(max_attempts)
+    except (ValueError, TypeError):
+        return "Invalid parameter: priority and max_attempts must be integers"
+    if max_attempts < 1:
+        return "Invalid parameter: max_attempts must be at least 1"
+
+    try:
+        queue = get_job_queue()
+        job_id = queue.store.submit(
+            conversion, os.path.abspath(input_path),
+            os.path.abspath(output_path) if output_path else None,
+            priority=priority, client_id=client_id or "default", max_attempts=max_attempts
+        )
+        queue.notify()
+        return json.dumps({"job_id": job_id, "status": "queued"}, indent=2)
+    except Exception as e:
+        return f"Failed to submit conversion: {str(e)}"
+
+
+async def get_job_status(job_id: str) -> str:
+    """Get the status, progress and attempt count of a conversion job.
+
+    Args:
+        job_id: Id returned by submit_conversion
+    """
+    try:
+        job = get_job_queue().store.get(job_id)
+        if job is None:
+            return f"Job {job_id} not found"
+        return json.dumps(job_to_dict(job), indent=2)
+    except Exception as e:
+        return f"Failed to get job status: {str(e)}"
+
+
+async def get_job_result(job_id: str) -> str:
+    """Get the result message of a finished conversion job.
+
+    Args:
+        job_id: Id returned by submit_conversion
+    """
+    try:
+        job = get_job_queue().store.get(job_id)
+        if job is None:
+            return f"Job {job_id} not found"
+        if job["status"] == SUCCEEDED:
+            return job["result"]
+        if job["status"] == FAILED:
+            return f"Job {job_id} failed after {job['attempts']} attempt(s): {job['error']}"
+        return f"Job {job_id} is still {job['status']}"
+    except Exception as e:
+        return f"Failed to get job result: {str(e)}"
@@ -5,12 +5,15 @@ These tools handle document protection features such as
 password protection, restricted editing, and digital signatures.
 """
 import os
+import glob
+import json
 import hashlib
 import datetime
-import io 
+import inspect
+import uuid
 from typing import List, Optional, Dict, Any
 from docx import Document
-import msoffcrypto 
+import msoffcrypto
 
 from word_document_server.utils.file_utils import check_file_writeable, ensure_docx_extension
 
@@ -19,8 +22,10 @@ from word_document_server.utils.file_utils import check_file_writeable, ensure_d
 from word_document_server.core.protection import (
     add_protection_info,
     verify_document_protection,
-    create_signature_info
+    create_signature_info,
+    verify_signature
 )
+from word_document_server.core.encryption import encrypt_document, decrypt_document, process_documents
 
 
 async def protect_document(filename: str, password: str) -> str:
@@ -41,24 +46,9 @@ async def protect_document(filename: str, password: str) -> str:
         return f"Cannot protect document: {error_message}"
 
     try:
-        # Read the original file content
-        with open(filename, "rb") as infile:
-            original_data = infile.read()
+        # Encrypted segment by segment into a temporary file that replaces the original
+        encrypt_document(filename, password)
 
-        # Create an msoffcrypto file object from the original data
-        file = msoffcrypto.OfficeFile(io.BytesIO(original_data))
-        file.load_key(password=password) # Set the password for encryption
-
-        # Encrypt the data into an in-memory buffer
-        encrypted_data_io = io.BytesIO()
-        
-        file.encrypt(password=password, outfile=encrypted_data_io) 
-
-        # Overwrite the original file with the encrypted data
-        with open(filename, "wb") as outfile:
-            outfile.write(encrypted_data_io.getvalue())
-
-        
         base_path, _ = os.path.splitext(filename)
         metadata_path = f"{base_path}.protection"
         if os.path.exists(metadata_path):
@@ -67,16 +57,8 @@ async def protect_document(filename: str, password: str) -> str:
         return f"Document {filename} encrypted successfully with password."
 
     except Exception as e:
-        # Attempt to restore original file content on failure
-        try:
-            if 'original_data' in locals():
-                with open(filename, "wb") as outfile:
-                    outfile.write(original_data)
-                return f"Failed to encrypt document {filename}: {str(e)}. Original file restored."
-            else:
-                 return f"Failed to encrypt document {filename}: {str(e)}. Could not restore original file."
-        except Exception as restore_e:
-             return f"Failed to encrypt document {filename}: {str(e)}. Also failed to restore original file: {str(restore_e)}"
+        # The original file is only replaced once encryption has completed
+        return f"Failed to encrypt document {filename}: {str(e)}. Original file left unchanged."
 
 
 async def add_restricted_editing(filename: str, password: str, editable_sections: List[str]) -> str:
@@ -139,9 +121,20 @@ async def add_digital_signature(filename: str, signer_name: str, reason: Optiona
 
     try:
         doc = Document(filename)
+        signature_id = uuid.uuid4().hex[:8]
 
-        # Create signature info
-        signature_info = create_signature_info(doc, signer_name, reason)
+        # Add a visible signature block first, so the signature covers the saved document
+        doc.add_paragraph("").add_run()  # Add empty paragraph for spacing
+        signature_para = doc.add_paragraph()
+        signature_para.add_run(f"Digitally signed by: {signer_name}").bold = True
+        if reason:
+            signature_para.add_run(f"\nReason: {reason}")
+        signature_para.add_run(f"\nDate: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        signature_para.add_run(f"\nSignature ID: {signature_id}")
+        doc.save(filename)
+
+        # Create signature info from the per-part hashes of the saved package
+        signature_info = create_signature_info(filename, signer_name, reason, signature_id)
 
         # Add protection info to metadata
         success = add_protection_info(
@@ -152,18 +145,6 @@ async def add_digital_signature(filename: str, signer_name: str, reason: Optiona
         )
 
         if success:
-            # Add a visible signature block to the document
-            doc.add_paragraph("").add_run()  # Add empty paragraph for spacing
-            signature_para = doc.add_paragraph()
-            signature_para.add_run(f"Digitally signed by: {signer_name}").bold = True
-            if reason:
-                signature_para.add_run(f"\nReason: {reason}")
-            signature_para.add_run(f"\nDate: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            signature_para.add_run(f"\nSignature ID: {signature_info['content_hash'][:8]}")
-
-            # Save the document with the visible signature
-            doc.save(filename)
-
             return f"Digital signature added to document {filename}"
         else:
             return f"Failed to add digital signature to document {filename}"
@@ -194,29 +175,11 @@ async def verify_document(filename: str, password: Optional[str] = None) -> str:
         metadata_path = f"{base_path}.protection"
 
         if os.path.exists(metadata_path):
-            try:
-                import json
-                with open(metadata_path, 'r') as f:
-                    protection_data = json.load(f)
-
-                if protection_data.get("type") == "signature":
-                    # Get the original content hash
-                    signature_info = protection_data.get("signature", {})
-                    original_hash = signature_info.get("content_hash")
-
-                    if original_hash:
-                        # Calculate current content hash
-                        doc = Document(filename)
-                        text_content = "\n".join([p.text for p in doc.paragraphs])
-                        current_hash = hashlib.sha256(text_content.encode()).hexdigest()
-
-                        # Compare hashes
-                        if current_hash != original_hash:
-                            return f"Document has been modified since it was signed by {signature_info.get('signer')}"
-                        else:
-                            return f"Document signature is valid. Signed by {signature_info.get('signer')} on {signature_info.get('timestamp')}"
-            except Exception as e:
-                return f"Error verifying signature: {str(e)}"
+            with open(metadata_path, 'r') as f:
+                protection_data = json.load(f)
+
+            if protection_data.get("type") == "signature":
+                return verify_signature(filename)[1]
 
         return message
     except Exception as e:
@@ -240,36 +203,115 @@ async def unprotect_document(filename: str, password: str) -> str:
         return f"Cannot modify document: {error_message}"
 
     try:
-        # Read the encrypted file content
-        with open(filename, "rb") as infile:
-            encrypted_data = infile.read()
-
-        # Create an msoffcrypto file object from the encrypted data
-        file = msoffcrypto.OfficeFile(io.BytesIO(encrypted_data))
-        file.load_key(password=password) # Set the password for decryption
-
-        # Decrypt the data into an in-memory buffer
-        decrypted_data_io = io.BytesIO()
-        file.decrypt(outfile=decrypted_data_io) # Pass the buffer as the 'outfile' argument
-
-        # Overwrite the original file with the decrypted data
-        with open(filename, "wb") as outfile:
-            outfile.write(decrypted_data_io.getvalue())
-
+        decrypt_document(filename, password)
         return f"Document {filename} decrypted successfully."
 
     except msoffcrypto.exceptions.InvalidKeyError:
          return f"Failed to decrypt document {filename}: Incorrect password."
-    except msoffcrypto.exceptions.InvalidFormatError:
+    except (msoffcrypto.exceptions.FileFormatError, msoffcrypto.exceptions.DecryptionError):
          return f"Failed to decrypt document {filename}: File is not encrypted or is not a supported Office format."
     except Exception as e:
-        # Attempt to restore encrypted file content on failure
+        return f"Failed to decrypt document {filename}: {str(e)}. Encrypted file left unchanged."
+
+
+def _collect_documents(paths: List[str], recursive: bool = False) -> List[str]:
+    """Expand a mix of .docx files and folders into a de-duplicated list of documents."""
+    documents = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            pattern = os.path.join(path, '**', '*.docx') if recursive else os.path.join(path, '*.docx')
+            # Word's "~$" lock files share the extension but are not documents
+            found = sorted(p for p in glob.glob(pattern, recursive=recursive)
+                           if not os.path.basename(p).startswith('~$'))
+        else:
+            found = [ensure_docx_extension(path)]
+        for document in found:
+            key = os.path.abspath(document)
+            if key not in seen:
+                seen.add(key)
+                documents.append(document)
+    return documents
+
+
+async def _run_batch(paths: List[str], password: str, decrypt: bool, recursive: bool,
+                     max_workers: Optional[int], progress_callback) -> str:
+    if not paths:
+        return json.dumps({'success': False, 'error': 'No files or folders given'}, indent=2)
+    if not password:
+        return json.dumps({'success': False, 'error': 'Password cannot be empty'}, indent=2)
+    if max_workers is not None:
         try:
-            if 'encrypted_data' in locals():
-                with open(filename, "wb") as outfile:
-                    outfile.write(encrypted_data)
-                return f"Failed to decrypt document {filename}: {str(e)}. Encrypted file restored."
-            else:
-                 return f"Failed to decrypt document {filename}: {str(e)}. Could not restore encrypted file."
-        except Exception as restore_e:
-             return f"Failed to decrypt document {filename}: {str(e)}. Also failed to restore encrypted file: {str(restore_e)}"
+            max_workers = int(max_workers)
+        except (ValueError, TypeError):
+            return json.dumps({'success': False, 'error': 'max_workers must be an integer'}, indent=2)
+        if max_workers < 1:
+            return json.dumps({'success': False, 'error': 'max_workers must be at least 1'}, indent=2)
+
+    documents = _collect_documents(paths, recursive)
+    results = {}
+    pending = []
+    for document in documents:
+        if not os.path.exists(document):
+            results[document] = {'path': document, 'success': False, 'error': 'Document does not exist'}
+            continue
+        is_writeable, error_message = check_file_writeable(document)
+        if not is_writeable:
+            results[document] = {'path': document, 'success': False, 'error': error_message}
+            continue
+        pending.append(document)
+
+    try:
+        done = len(results)
+        for result in process_documents(pending, password, decrypt=decrypt, max_workers=max_workers):
+            results[result['path']] = result
+            done += 1
+            if progress_callback is not None:
+                status = 'done' if result['success'] else f"failed: {result['error']}"
+                reported = progress_callback(done, len(documents), f"{result['path']} {status}")
+                if inspect.isawaitable(reported):
+                    await reported
+    except Exception as e:
+        # Files finished before the error keep their new state
+        for document in pending:
+            results.setdefault(document, {'path': document, 'success': False, 'error': str(e)})
+
+    ordered = [results[document] for document in documents]
+    succeeded = sum(1 for result in ordered if result['success'])
+    return json.dumps({
+        'success': succeeded == len(ordered) and bool(ordered),
+        'total': len(ordered),
+        'succeeded': succeeded,
+        'failed': len(ordered) - succeeded,
+        'results': ordered
+    }, indent=2)
+
+
+async def protect_documents_batch(paths: List[str], password: str, recursive: bool = False,
+                                  max_workers: Optional[int] = None, progress_callback=None) -> str:
+    """Encrypt many Word documents with a password, in parallel.
+
+    Args:
+        paths: Document paths and/or folders (every .docx in a folder is included)
+        password: Password to protect the documents with
+        recursive: Also include documents in subfolders of the given folders
+        max_workers: Number of worker processes (default: CPU count)
+        progress_callback: Optional callable (or coroutine function) taking
+                           (progress, total, message), e.g. Context.report_progress
+    """
+    return await _run_batch(paths, password, False, recursive, max_workers, progress_callback)
+
+
+async def unprotect_documents_batch(paths: List[str], password: str, recursive: bool = False,
+                                    max_workers: Optional[int] = None, progress_callback=None) -> str:
+    """Remove password protection from many Word documents, in parallel.
+
+    Args:
+        paths: Document paths and/or folders (every .docx in a folder is included)
+        password: Password the documents were protected with
+        recursive: Also include documents in subfolders of the given folders
+        max_workers: Number of worker processes (default: CPU count)
+        progress_callback: Optional callable (or coroutine function) taking
+                           (progress, total, message), e.g. Context.report_progress
+    """
+    return await _run_batch(paths, password, True, recursive, max_workers, progress_callback)
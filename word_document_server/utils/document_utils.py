@@ -5,9 +5,8 @@ import json
 from typing import Dict, List, Any
 from docx import Document
 from docx.oxml.table import CT_Tbl
-from docx.oxml.text.paragraph import CT_P
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+from docx.oxml.ns import qn, nsdecls
+from docx.oxml import OxmlElement, parse_xml
 
 
 def get_document_properties(doc_path: str) -> Dict[str, Any]:
@@ -17,23 +16,9 @@ def get_document_properties(doc_path: str) -> Dict[str, Any]:
         return {"error": f"Document {doc_path} does not exist"}
     
     try:
-        doc = Document(doc_path)
-        core_props = doc.core_properties
-        
-        return {
-            "title": core_props.title or "",
-            "author": core_props.author or "",
-            "subject": core_props.subject or "",
-            "keywords": core_props.keywords or "",
-            "created": str(core_props.created) if core_props.created else "",
-            "modified": str(core_props.modified) if core_props.modified else "",
-            "last_modified_by": core_props.last_modified_by or "",
-            "revision": core_props.revision or 0,
-            "page_count": len(doc.sections),
-            "word_count": sum(len(paragraph.text.split()) for paragraph in doc.paragraphs),
-            "paragraph_count": len(doc.paragraphs),
-            "table_count": len(doc.tables)
-        }
+        # Read from docProps/*.xml in the zip; the body is only walked when Word's statistics are missing
+        from word_document_server.core.properties import get_package_properties
+        return get_package_properties(doc_path)
     except Exception as e:
         return {"error": f"Failed to get document properties: {str(e)}"}
 
@@ -97,9 +82,11 @@ def get_document_structure(doc_path: str) -> Dict[str, Any]:
             for row_idx in range(max_rows):
                 row_data = []
                 max_cols = min(3, len(table.columns))
+                # row.cells only resolves this row; table.cell() re-walks the whole table per call
+                row_cells = table.rows[row_idx].cells
                 for col_idx in range(max_cols):
                     try:
-                        cell_text = table.cell(row_idx, col_idx).text
+                        cell_text = row_cells[col_idx].text
                         row_data.append(cell_text[:20] + ("..." if len(cell_text) > 20 else ""))
                     except IndexError:
                         row_data.append("N/A")
@@ -334,6 +321,74 @@ def add_bullet_numbering(paragraph, num_id=1, level=0):
     return paragraph
 
 
+_LIST_DEFINITIONS = {
+    'bullet': ('ListBulletMultilevel', 'bullet', ['•', '◦', '▪'] * 3),
+    'number': ('ListNumberMultilevel', 'decimal', [f'%{i}.' for i in range(1, 10)]),
+}
+
+
+def ensure_list_numbering(doc, bullet_type: str = 'bullet', restart: bool = False) -> int:
+    """
+    Return a numbering ID for a nine-level bulleted or numbered list.
+
+    The abstract definition is created once per document (found again by its
+    w:name); a new w:num with a start override is added when restart is True,
+    so each numbered list starts again at 1.
+
+    Args:
+        doc: Document object
+        bullet_type: 'bullet' or 'number'
+        restart: If True, always allocate a fresh numbering instance
+
+    Returns:
+        The numId to pass to add_bullet_numbering
+    """
+    name, num_fmt, texts = _LIST_DEFINITIONS['number' if bullet_type == 'number' else 'bullet']
+    numbering = doc.part.numbering_part.element
+
+    abstract_id = None
+    used_abstract_ids = set()
+    for abstract in numbering.findall(qn('w:abstractNum')):
+        used_abstract_ids.add(int(abstract.get(qn('w:abstractNumId'))))
+        name_el = abstract.find(qn('w:name'))
+        if name_el is not None and name_el.get(qn('w:val')) == name:
+            abstract_id = int(abstract.get(qn('w:abstractNumId')))
+
+    if abstract_id is None:
+        abstract_id = max(used_abstract_ids, default=-1) + 1
+        levels = []
+        for ilvl, text in enumerate(texts):
+            indent = 720 * (ilvl + 1)
+            levels.append(
+                f'<w:lvl w:ilvl="{ilvl}"><w:start w:val="1"/><w:numFmt w:val="{num_fmt}"/>'
+                f'<w:lvlText w:val="{text}"/><w:lvlJc w:val="left"/>'
+                f'<w:pPr><w:ind w:left="{indent}" w:hanging="360"/></w:pPr></w:lvl>'
+            )
+        abstract = parse_xml(
+            f'<w:abstractNum {nsdecls("w")} w:abstractNumId="{abstract_id}">'
+            f'<w:multiLevelType w:val="hybridMultilevel"/><w:name w:val="{name}"/>'
+            f'{"".join(levels)}</w:abstractNum>'
+        )
+        # Schema order: every w:abstractNum precedes the w:num elements
+        first_num = numbering.find(qn('w:num'))
+        if first_num is not None:
+            first_num.addprevious(abstract)
+        else:
+            numbering.append(abstract)
+    else:
+        for num in numbering.findall(qn('w:num')):
+            ref = num.find(qn('w:abstractNumId'))
+            if not restart and ref is not None and int(ref.get(qn('w:val'))) == abstract_id:
+                return int(num.get(qn('w:numId')))
+
+    num_id = max((int(n.get(qn('w:numId'))) for n in numbering.findall(qn('w:num'))), default=0) + 1
+    override = '<w:lvlOverride w:ilvl="0"><w:startOverride w:val="1"/></w:lvlOverride>' if restart else ''
+    numbering.append(parse_xml(
+        f'<w:num {nsdecls("w")} w:numId="{num_id}"><w:abstractNumId w:val="{abstract_id}"/>{override}</w:num>'
+    ))
+    return num_id
+
+
 def insert_numbered_list_near_text(doc_path: str, target_text: str = None, list_items: list = None, position: str = 'after', target_paragraph_index: int = None, bullet_type: str = 'bullet') -> str:
     """
     Insert a bulleted or numbered list before or after the target paragraph. Specify by text or paragraph index. Skips TOC paragraphs in text search.
@@ -443,41 +498,16 @@ def delete_block_under_header(doc, header_text):
     Remove all elements (paragraphs, tables, etc.) after the header (by text) and before the next heading/TOC (by style).
     Returns: (header_element, elements_removed)
     """
-    # Find the header paragraph by text (like delete_paragraph finds by index)
-    header_para = None
-    header_idx = None
-    
-    for i, para in enumerate(doc.paragraphs):
-        if para.text.strip().lower() == header_text.strip().lower():
-            header_para = para
-            header_idx = i
-            break
-    
-    if header_para is None:
+    from word_document_server.core.sections import scan_body, find_block, section_end, replace_blocks
+    # One pass over the body; doc.paragraphs would be rebuilt for every removed paragraph
+    style_names = {style.style_id: style.name for style in doc.styles}
+    blocks = scan_body(doc.element.body, style_names)
+    wanted = header_text.strip().lower()
+    header_index = find_block(blocks, lambda block: block.text.lower() == wanted)
+    if header_index is None:
         return None, 0
-    
-    # Find the next heading/TOC paragraph to determine the end of the block
-    end_idx = None
-    for i in range(header_idx + 1, len(doc.paragraphs)):
-        para = doc.paragraphs[i]
-        if para.style and para.style.name.lower().startswith(('heading', 'título', 'toc')):
-            end_idx = i
-            break
-    
-    # If no next heading found, delete until end of document
-    if end_idx is None:
-        end_idx = len(doc.paragraphs)
-    
-    # Remove paragraphs by index (like delete_paragraph does)
-    removed_count = 0
-    for i in range(header_idx + 1, end_idx):
-        if i < len(doc.paragraphs):  # Safety check
-            para = doc.paragraphs[header_idx + 1]  # Always remove the first paragraph after header
-            p = para._p
-            p.getparent().remove(p)
-            removed_count += 1
-    
-    return header_para._p, removed_count
+    removed_count = replace_blocks(blocks, header_index + 1, section_end(blocks, header_index), [])
+    return blocks[header_index].element, removed_count
 
 # --- Usage in replace_paragraph_block_below_header ---
 def replace_paragraph_block_below_header(
@@ -489,45 +519,49 @@ def replace_paragraph_block_below_header(
 ) -> str:
     """
     Reemplaza todo el contenido debajo de una cabecera (por texto), hasta el siguiente encabezado/TOC (por estilo).
+    Las tablas y controles de contenido de la sección también se reemplazan.
     """
-    from docx import Document
     import os
+    from word_document_server.core.sections import BodyEditor, find_block, section_end, is_section_boundary
     if not os.path.exists(doc_path):
         return f"Document {doc_path} not found."
     
-    doc = Document(doc_path)
+    editor = BodyEditor(doc_path)
     
-    # Find the header paragraph first
-    header_para = None
-    header_idx = None
-    for i, para in enumerate(doc.paragraphs):
-        para_text = para.text.strip().lower()
-        is_toc = is_toc_paragraph(para)
-        if para_text == header_text.strip().lower() and not is_toc:
-            header_para = para
-            header_idx = i
-            break
-    
-    if header_para is None:
+    # Find the header paragraph, skipping TOC entries with the same text
+    wanted = header_text.strip().lower()
+    header_index = find_block(editor.blocks, lambda block: block.text.lower() == wanted
+                              and not (block.style or '').upper().startswith('TOC'))
+    if header_index is None:
         return f"Header '{header_text}' not found in document."
     
-    # Delete everything under the header using the same document instance
-    header_el, removed_count = delete_block_under_header(doc, header_text)
+    is_end = is_section_boundary
+    if callable(detect_block_end_fn):
+        is_end = lambda block: is_section_boundary(block) or bool(detect_block_end_fn(block.text, block.element))
+    end_index = section_end(editor.blocks, header_index, is_end)
     
-    # Now insert new paragraphs after the header (which should still be in the document)
     style_to_use = new_paragraph_style or "Normal"
-    
-    # Find the header again after deletion (it should still be there)
-    current_para = header_para
-    for text in new_paragraphs:
-        new_para = doc.add_paragraph(text, style=style_to_use)
-        current_para._element.addnext(new_para._element)
-        current_para = new_para
-    
-    doc.save(doc_path)
+    try:
+        new_elements = editor.paragraphs(new_paragraphs, style_to_use)
+    except ValueError as e:
+        return str(e)
+    removed_count = editor.replace(header_index + 1, end_index, new_elements)
+    editor.save()
     return f"Replaced content under '{header_text}' with {len(new_paragraphs)} paragraph(s), style: {style_to_use}, removed {removed_count} elements."
 
 
+def _is_visually_distinct(block) -> bool:
+    """True for a paragraph with a bold, all caps or resized run."""
+    if block.element.tag != qn('w:p'):
+        return False
+    for run in block.element.iter(qn('w:r')):
+        rpr = run.find(qn('w:rPr'))
+        if rpr is not None and (rpr.find(qn('w:b')) is not None or rpr.find(qn('w:caps')) is not None
+                                or rpr.find(qn('w:sz')) is not None):
+            return True
+    return False
+
+
 def replace_block_between_manual_anchors(
     doc_path: str,
     start_anchor_text: str,
@@ -541,78 +575,32 @@ def replace_block_between_manual_anchors(
     If end_anchor_text is None, deletes until next visually distinct paragraph (bold, all caps, or different font size), or end of document.
     Inserts new_paragraphs after the start anchor.
     """
-    from docx import Document
     import os
+    from word_document_server.core.sections import BodyEditor, find_block, section_end
     if not os.path.exists(doc_path):
         return f"Document {doc_path} not found."
-    doc = Document(doc_path)
-    body = doc.element.body
-    elements = list(body)
-    start_idx = None
-    end_idx = None
+    editor = BodyEditor(doc_path)
     # Find start anchor
-    for i, el in enumerate(elements):
-        if el.tag == CT_P.tag:
-            p_text = "".join([node.text or '' for node in el.iter() if node.tag.endswith('}t')]).strip()
-            if match_fn:
-                if match_fn(p_text, el):
-                    start_idx = i
-                    break
-            elif p_text == start_anchor_text.strip():
-                start_idx = i
-                break
+    if match_fn:
+        start_idx = find_block(editor.blocks, lambda block: match_fn(block.text, block.element))
+    else:
+        start_idx = find_block(editor.blocks, lambda block: block.text == start_anchor_text.strip())
     if start_idx is None:
         return f"Start anchor '{start_anchor_text}' not found."
-    # Find end anchor
+    # Find end anchor; without one, the heuristic ends at the next visually distinct paragraph
     if end_anchor_text:
-        for i in range(start_idx + 1, len(elements)):
-            el = elements[i]
-            if el.tag == CT_P.tag:
-                p_text = "".join([node.text or '' for node in el.iter() if node.tag.endswith('}t')]).strip()
-                if match_fn:
-                    if match_fn(p_text, el, is_end=True):
-                        end_idx = i
-                        break
-                elif p_text == end_anchor_text.strip():
-                    end_idx = i
-                    break
+        if match_fn:
+            is_end = lambda block: block.element.tag == qn('w:p') and match_fn(block.text, block.element, is_end=True)
+        else:
+            is_end = lambda block: block.element.tag == qn('w:p') and block.text == end_anchor_text.strip()
     else:
-        # Heuristic: next visually distinct paragraph (bold, all caps, or different font size), or end of document
-        for i in range(start_idx + 1, len(elements)):
-            el = elements[i]
-            if el.tag == CT_P.tag:
-                # Check for bold, all caps, or font size
-                runs = [node for node in el.iter() if node.tag.endswith('}r')]
-                for run in runs:
-                    rpr = run.find(qn('w:rPr'))
-                    if rpr is not None:
-                        if rpr.find(qn('w:b')) is not None or rpr.find(qn('w:caps')) is not None or rpr.find(qn('w:sz')) is not None:
-                            end_idx = i
-                            break
-                if end_idx is not None:
-                    break
-    # Mark elements for removal
-    to_remove = []
-    for i in range(start_idx + 1, end_idx if end_idx is not None else len(elements)):
-        to_remove.append(elements[i])
-    for el in to_remove:
-        body.remove(el)
-    doc.save(doc_path)
-    # Reload and find start anchor for insertion
-    doc = Document(doc_path)
-    paras = doc.paragraphs
-    anchor_idx = None
-    for i, para in enumerate(paras):
-        if para.text.strip() == start_anchor_text.strip():
-            anchor_idx = i
-            break
-    if anchor_idx is None:
-        return f"Start anchor '{start_anchor_text}' not found after deletion (unexpected)."
-    anchor_para = paras[anchor_idx]
+        is_end = _is_visually_distinct
+    end_idx = section_end(editor.blocks, start_idx, is_end)
     style_to_use = new_paragraph_style or "Normal"
-    for text in new_paragraphs:
-        new_para = doc.add_paragraph(text, style=style_to_use)
-        anchor_para._element.addnext(new_para._element)
-        anchor_para = new_para
-    doc.save(doc_path)
-    return f"Replaced content between '{start_anchor_text}' and '{end_anchor_text or 'next logical header'}' with {len(new_paragraphs)} paragraph(s), style: {style_to_use}, removed {len(to_remove)} elements."
+    try:
+        new_elements = editor.paragraphs(new_paragraphs, style_to_use)
+    except ValueError as e:
+        return str(e)
+    removed_count = editor.replace(start_idx + 1, end_idx, new_elements)
+    editor.save()
+    return f"Replaced content between '{start_anchor_text}' and '{end_anchor_text or 'next logical header'}' with {len(new_paragraphs)} paragraph(s), style: {style_to_use}, removed {removed_count} elements."
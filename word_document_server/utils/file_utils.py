@@ -2,7 +2,10 @@
 File utility functions for Word Document Server.
 """
 import os
-from typing import Tuple, Optional
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, Tuple, Optional
 import shutil
 
 
@@ -96,3 +99,35 @@ def ensure_docx_extension(filepath: str) -> str:
     except Exception:
         # Fallback: return original to avoid breaking callers
         return filepath
+
+
+@lru_cache(maxsize=1)
+def _umask() -> int:
+    # Read once: the process umask can only be read by setting it
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+@contextmanager
+def atomic_output(target: str) -> Iterator[str]:
+    """
+    Yield a temporary path next to target that replaces target when the block succeeds.
+
+    The temporary file has a unique name, so concurrent writers of the same
+    target never share it. If the block raises, it is removed and target is
+    left untouched.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)), suffix='.tmp')
+    os.close(fd)
+    try:
+        # mkstemp creates the file owner-only; give it the mode the target has (or a new file would get)
+        if os.path.exists(target):
+            shutil.copymode(target, temp_path)
+        else:
+            os.chmod(temp_path, 0o666 & ~_umask())
+        yield temp_path
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)